@@ -0,0 +1,34 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+import sys
+import traceback
+
+# プロジェクトのルートディレクトリをPYTHONPATHに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.aws_database import AWSDatabase
+from utils.logging_config import setup_logging
+from utils.migration_runner import MigrationRunner
+from utils.migrations import consumption_server_status
+
+async def backfill_consumption_status():
+    """
+    server_status属性を持たない既存の消費履歴に属性を付与する
+    （ServerStatusIndex はserver_statusを持つ項目のみを索引するため）
+
+    batch/run_migration.py consumption_server_status と同じ処理（チェックポイントなし）
+    """
+    try:
+        db = AWSDatabase()
+        totals = await MigrationRunner(db.executor.run).run(consumption_server_status(db))
+        print(f"{totals['updated']}件のレコードにserver_statusを付与しました")
+
+    except Exception as e:
+        print(f"バッチ処理中にエラーが発生: {e}")
+        print(traceback.format_exc())
+
+if __name__ == "__main__":
+    load_dotenv()
+    setup_logging()
+    asyncio.run(backfill_consumption_status())
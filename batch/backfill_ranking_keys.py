@@ -0,0 +1,34 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+import sys
+import traceback
+
+# プロジェクトのルートディレクトリをPYTHONPATHに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.aws_database import AWSDatabase
+from utils.logging_config import setup_logging
+from utils.migration_runner import MigrationRunner
+from utils.migrations import ranking_keys
+
+async def backfill_ranking_keys():
+    """
+    ranking_key属性を持たない既存ユーザーレコードに属性を付与する
+    （ServerUnitRankingIndex はranking_keyを持つ項目のみを索引するため）
+
+    batch/run_migration.py ranking_keys と同じ処理（チェックポイントなし）
+    """
+    try:
+        db = AWSDatabase()
+        totals = await MigrationRunner(db.executor.run).run(ranking_keys(db))
+        print(f"{totals['updated']}件のレコードにranking_keyを付与しました")
+
+    except Exception as e:
+        print(f"バッチ処理中にエラーが発生: {e}")
+        print(traceback.format_exc())
+
+if __name__ == "__main__":
+    load_dotenv()
+    setup_logging()
+    asyncio.run(backfill_ranking_keys())
@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from decimal import Decimal
+
+# プロジェクトのルートディレクトリをPYTHONPATHに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.aws_database import AWSDatabase
+from utils.logging_config import setup_logging
+from utils.migration_runner import MigrationRunner
+from utils.migrations import ranking_keys
+from utils.storage import create_dynamodb_resource
+
+
+async def check_dry_run_then_run(records: int, segments: int) -> bool:
+    """
+    ドライランのあとに本番実行しても全件が更新されることを確かめる
+
+    メモリ上のテーブルに ranking_key のないユーザーレコードを作り、
+    同じチェックポイントディレクトリで ranking_keys をドライラン → 本番実行する
+    """
+    db = AWSDatabase(create_dynamodb_resource('memory'))
+    for i in range(records):
+        server_id = f"check-server-{i % 3}"
+        user_id = f"check-user-{i}"
+        await db._call(db.users_table.put_item, Item={
+            'pk': f"USER#{user_id}#SERVER#{server_id}#UNIT#1",
+            'user_id': user_id,
+            'server_id': server_id,
+            'unit_id': '1',
+            'points': Decimal(i)
+        })
+
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        dry_totals = await MigrationRunner(
+            db.executor.run, total_segments=segments, checkpoint_dir=checkpoint_dir, dry_run=True
+        ).run(ranking_keys(db))
+        print(f"ドライラン: {dry_totals}")
+
+        totals = await MigrationRunner(
+            db.executor.run, total_segments=segments, checkpoint_dir=checkpoint_dir
+        ).run(ranking_keys(db))
+        print(f"本番実行: {totals}")
+
+    response = await db._call(db.users_table.scan)
+    missing = [item['pk'] for item in response.get('Items', []) if 'ranking_key' not in item]
+
+    ok = dry_totals['updated'] == records and totals['updated'] == records and not missing
+    if ok:
+        print(f"OK: ドライランのあとの本番実行で {records}件すべてに ranking_key を付与しました")
+    else:
+        print(f"NG: ranking_key のないレコードが {len(missing)}件残っています")
+    return ok
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="マイグレーションのドライランがチェックポイントを進めないことを確認")
+    parser.add_argument('--records', type=int, default=20)
+    parser.add_argument('--segments', type=int, default=4)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(check_dry_run_then_run(args.records, args.segments)) else 1)
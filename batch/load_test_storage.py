@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from dotenv import load_dotenv
+
+# プロジェクトのルートディレクトリをPYTHONPATHに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.aws_database import AWSDatabase
+from utils.logging_config import setup_logging
+from utils.storage import create_dynamodb_resource
+
+
+async def _timed(label: str, results: dict, coro):
+    started = time.perf_counter()
+    value = await coro
+    results.setdefault(label, []).append(time.perf_counter() - started)
+    return value
+
+
+async def run_load_test(backend: str, servers: int, users: int, operations: int, concurrency: int):
+    """
+    ガチャ・バトル報酬・ポイント消費のDBアクセスを模擬して処理時間を計測する
+
+    --backend memory / sqlite を指定すればDynamoDBなしで実行できる
+    """
+    db = AWSDatabase(create_dynamodb_resource(backend))
+    semaphore = asyncio.Semaphore(concurrency)
+    results: dict = {}
+
+    async def gacha_roll():
+        server_id = f"load-server-{random.randrange(servers)}"
+        user_id = f"load-user-{random.randrange(users)}"
+        async with semaphore:
+            await _timed('increment_points', results, db.increment_points(user_id, server_id, random.randint(1, 100)))
+            await _timed('get_user_rank', results, db.get_user_rank(server_id, user_id))
+
+    async def battle_rewards():
+        server_id = f"load-server-{random.randrange(servers)}"
+        deltas = {f"load-user-{random.randrange(users)}": 100 for _ in range(50)}
+        async with semaphore:
+            await _timed('bulk_increment_points', results, db.bulk_increment_points(server_id, deltas))
+
+    async def consumption():
+        server_id = f"load-server-{random.randrange(servers)}"
+        user_id = f"load-user-{random.randrange(users)}"
+        async with semaphore:
+            await _timed('save_consumption_history', results, db.save_consumption_history({
+                'server_id': server_id,
+                'user_id': user_id,
+                'points': Decimal(10),
+                'unit_id': '1'
+            }))
+            request = await _timed(
+                'find_latest_pending_consumption', results,
+                db.find_latest_pending_consumption(server_id, user_id, 10, '1')
+            )
+            if request:
+                await _timed('update_consumption_status', results, db.update_consumption_status(
+                    server_id, request['timestamp'], 'approved', 'load-admin'
+                ))
+
+    started = time.perf_counter()
+    tasks = []
+    for _ in range(operations):
+        roll = random.random()
+        if roll < 0.8:
+            tasks.append(gacha_roll())
+        elif roll < 0.9:
+            tasks.append(battle_rewards())
+        else:
+            tasks.append(consumption())
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n=== load test ({backend}) ===")
+    print(f"servers={servers} users={users} operations={operations} concurrency={concurrency}")
+    print(f"total: {elapsed:.2f}s ({operations / elapsed:.1f} ops/s)")
+    for label, durations in sorted(results.items()):
+        durations.sort()
+        p50 = durations[len(durations) // 2] * 1000
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000
+        print(f"  {label:<34} n={len(durations):<6} p50={p50:7.2f}ms p99={p99:7.2f}ms")
+    print(f"db executor: {db.executor.stats()}")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    setup_logging()
+    parser = argparse.ArgumentParser(description="ストレージ層の負荷テスト")
+    parser.add_argument('--backend', default=os.getenv('STORAGE_BACKEND', 'memory'),
+                        choices=['memory', 'sqlite', 'dynamodb'])
+    parser.add_argument('--servers', type=int, default=10)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--operations', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args.backend, args.servers, args.users, args.operations, args.concurrency))
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+from dotenv import load_dotenv
+import sys
+import traceback
+
+# プロジェクトのルートディレクトリをPYTHONPATHに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.aws_database import AWSDatabase
+from utils.logging_config import setup_logging
+from utils.migration_runner import MigrationRunner
+from utils.migrations import MIGRATIONS
+from utils.storage import create_dynamodb_resource
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints')
+
+
+async def run_migration(args):
+    """
+    名前を指定してマイグレーションを実行する
+
+    中断した場合は同じ引数で再実行するとチェックポイントから再開する（--reset で最初から）
+    """
+    try:
+        if args.backend == 'dynamodb':
+            db = AWSDatabase()
+        else:
+            db = AWSDatabase(create_dynamodb_resource(args.backend))
+
+        migration_kwargs = {}
+        if args.name == 'consumption_unit_ids':
+            migration_kwargs = {'server_id': args.server_id, 'unit_id': args.unit_id}
+        migration = MIGRATIONS[args.name](db, **migration_kwargs)
+
+        runner = MigrationRunner(
+            db.executor.run,
+            total_segments=args.segments,
+            page_size=args.page_size,
+            batch_size=args.batch_size,
+            max_read_units=args.max_read_units,
+            max_write_units=args.max_write_units,
+            checkpoint_dir=None if args.no_checkpoint else args.checkpoint_dir,
+            dry_run=args.dry_run
+        )
+        print(f"マイグレーション {migration.name} を開始します: {migration.description}")
+        totals = await runner.run(migration, reset=args.reset)
+        verb = "更新対象" if args.dry_run else "更新"
+        print(f"{totals['scanned']}件を読み込み、{totals['updated']}件を{verb}しました"
+              f"（スキップ {totals['skipped']}件、失敗 {totals['failed']}件）")
+
+    except Exception as e:
+        print(f"バッチ処理中にエラーが発生: {e}")
+        print(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    setup_logging()
+    parser = argparse.ArgumentParser(description="DynamoDBテーブルのマイグレーション/バックフィル")
+    parser.add_argument('name', choices=sorted(MIGRATIONS))
+    parser.add_argument('--backend', default=os.getenv('STORAGE_BACKEND', 'dynamodb'),
+                        choices=['dynamodb', 'sqlite', 'memory'])
+    parser.add_argument('--segments', type=int, default=4, help="並列スキャンのセグメント数")
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=25, help="同時に発行する更新件数")
+    parser.add_argument('--max-read-units', type=float, default=0, help="1秒あたりの読み込みキャパシティ上限（0で無制限）")
+    parser.add_argument('--max-write-units', type=float, default=0, help="1秒あたりの書き込みキャパシティ上限（0で無制限）")
+    parser.add_argument('--checkpoint-dir', default=DEFAULT_CHECKPOINT_DIR)
+    parser.add_argument('--no-checkpoint', action='store_true')
+    parser.add_argument('--reset', action='store_true', help="チェックポイントを破棄して最初から実行")
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--server-id', help="consumption_unit_ids: 対象サーバー（省略時は全サーバー）")
+    parser.add_argument('--unit-id', help="consumption_unit_ids: 設定する unit_id（省略時はサーバー設定から決定）")
+    asyncio.run(run_migration(parser.parse_args()))
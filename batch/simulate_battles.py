@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import traceback
+
+# プロジェクトのルートディレクトリをPYTHONPATHに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.battle import EventType
+from utils.battle_engine import DEFAULT_EVENT_WEIGHTS, simulate_battles
+from utils.logging_config import setup_logging
+
+
+def parse_weights(value: str):
+    """'battle=0.4,accident=0.2,...' 形式のイベント発生率（指定しなかった種別はデフォルト）"""
+    weights = dict(DEFAULT_EVENT_WEIGHTS)
+    for entry in value.split(','):
+        name, weight = entry.split('=')
+        weights[EventType(name.strip().lower())] = float(weight)
+    return weights
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q / 100))]
+
+
+def print_report(summary):
+    rounds = sorted(summary.rounds)
+    finished = len(rounds)
+    print(f"【バトルロイヤル シミュレーション】{summary.players}人 × {summary.games:,}試合")
+    print(f"実行時間 {summary.elapsed_seconds:.2f}秒（{summary.games / max(summary.elapsed_seconds, 1e-9):,.0f}試合/秒）")
+    if summary.unfinished:
+        print(f"打ち切り {summary.unfinished:,}試合")
+    if not finished:
+        return
+
+    print("")
+    print("■ 試合の長さ（ラウンド数）")
+    print(f"  平均 {sum(rounds) / finished:.1f} / 最短 {rounds[0]} / 最長 {rounds[-1]}")
+    print(f"  p10 / p50 / p90: {percentile(rounds, 10)} / {percentile(rounds, 50)} / {percentile(rounds, 90)}")
+    print(f"  所要時間の目安（1ラウンド5秒）: 平均 {sum(rounds) / finished * 5 / 60:.1f}分")
+
+    print("")
+    print("■ 脱落・復活（1試合あたり）")
+    print(f"  キル {summary.deaths_by_battle / finished:.1f} / 事故 {summary.deaths_by_accident / finished:.1f}"
+          f" / 復活 {summary.revivals / finished:.1f}")
+
+    print("")
+    print("■ キル数の分布（プレイヤー単位）")
+    total_players = sum(summary.kill_histogram.values())
+    for kills in sorted(summary.kill_histogram):
+        count = summary.kill_histogram[kills]
+        print(f"  {kills:>3}キル: {count / total_players:6.1%}")
+    print(f"  優勝者の平均キル {sum(summary.winner_kills) / finished:.2f}"
+          f" / 最多キルの平均 {sum(summary.max_kills) / finished:.2f}")
+
+
+def main(args):
+    """
+    バトルロイヤルの進行をオフラインでシミュレーションする
+
+    試合の長さ（ラウンド数）とキル数の分布を表示する
+    """
+    try:
+        weights = parse_weights(args.weights) if args.weights else None
+        summary = simulate_battles(args.games, args.players, seed=args.seed, event_weights=weights)
+        print_report(summary)
+
+    except Exception as e:
+        print(f"バッチ処理中にエラーが発生: {e}")
+        print(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="バトルロイヤルのシミュレーション")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--players', type=int, default=50)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--weights', help="イベント発生率（例: battle=0.5,revival=0.02）")
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+import sys
+import traceback
+
+# プロジェクトのルートディレクトリをPYTHONPATHに追加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.server_settings import ServerSettings
+from utils.aws_database import AWSDatabase
+from utils.logging_config import setup_logging
+from utils.gacha_simulator import Cohort, GachaEconomySimulator, collect_thresholds, default_cohorts, format_report
+from utils.settings_manager import ServerSettingsManager
+from utils.storage import create_dynamodb_resource
+
+
+async def load_settings(args):
+    """サーバー設定を JSON ファイルまたは DB から読み込む"""
+    if args.settings_json:
+        with open(args.settings_json, 'r', encoding='utf-8') as f:
+            return ServerSettings.from_dict(json.load(f))
+    if args.backend == 'dynamodb':
+        db = AWSDatabase()
+    else:
+        db = AWSDatabase(create_dynamodb_resource(args.backend))
+    return await ServerSettingsManager(db).get_settings(args.server_id)
+
+
+def parse_cohorts(value: str):
+    """'名前:人数:参加率,...' 形式のユーザー層指定"""
+    cohorts = []
+    for entry in value.split(','):
+        name, users, participation = entry.split(':')
+        cohorts.append(Cohort(name, int(users), float(participation)))
+    return cohorts
+
+
+async def simulate_gacha_economy(args):
+    """
+    ガチャ設定でのポイント獲得をオフラインでシミュレーションする
+
+    ユーザー層ごとの累計ポイント分布と、消費申請/ロール付与のしきい値に
+    到達するまでの日数を表示する
+    """
+    try:
+        settings = await load_settings(args)
+        if not settings or not settings.gacha_settings.gacha_list:
+            print("ガチャ設定が見つかりません")
+            return
+
+        gacha_list = settings.gacha_settings.gacha_list
+        gacha_settings = next((gacha for gacha in gacha_list if gacha.name == args.gacha_name), None) \
+            if args.gacha_name else gacha_list[0]
+        if not gacha_settings:
+            print(f"ガチャ {args.gacha_name} が見つかりません（{', '.join(gacha.name for gacha in gacha_list)}）")
+            return
+        if args.pulls_per_roll:
+            gacha_settings.pulls_per_roll = args.pulls_per_roll
+
+        thresholds = collect_thresholds(settings, gacha_settings)
+        for entry in args.threshold or []:
+            label, points = entry.split('=')
+            thresholds[label] = int(points)
+
+        cohorts = parse_cohorts(args.cohorts) if args.cohorts else default_cohorts(args.users)
+        simulator = GachaEconomySimulator.from_settings(gacha_settings, seed=args.seed)
+        result = simulator.run(args.days, cohorts, thresholds)
+        print(format_report(result, settings.global_settings.point_unit))
+
+    except Exception as e:
+        print(f"バッチ処理中にエラーが発生: {e}")
+        print(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    setup_logging()
+    parser = argparse.ArgumentParser(description="ガチャ経済のモンテカルロシミュレーション")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--server-id', help="DB からサーバー設定を読み込む")
+    source.add_argument('--settings-json', help="サーバー設定の JSON ファイル")
+    parser.add_argument('--backend', default=os.getenv('STORAGE_BACKEND', 'dynamodb'),
+                        choices=['dynamodb', 'sqlite', 'memory'])
+    parser.add_argument('--gacha-name', help="対象のガチャ名（省略時は最初のガチャ）")
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--users', type=int, default=10000, help="ユーザー層ごとの人数")
+    parser.add_argument('--cohorts', help="ユーザー層の指定（例: 毎日:5000:1.0,週末:5000:0.3）")
+    parser.add_argument('--pulls-per-roll', type=int, help="設定の連数を上書きする")
+    parser.add_argument('--threshold', action='append', help="追加のしきい値（例: --threshold 上位ロール=50000）")
+    parser.add_argument('--seed', type=int)
+    asyncio.run(simulate_gacha_economy(parser.parse_args()))
@@ -1,7 +1,11 @@
+import logging
 import discord
 from discord import app_commands
 from discord.ext import commands
 import traceback
+from utils import metrics
+
+logger = logging.getLogger(__name__)
 
 class Admin(commands.Cog):
     def __init__(self, bot):
@@ -123,7 +127,80 @@ class Admin(commands.Cog):
             # データベース状態
             debug_info.append("\n【データベース状態】")
             debug_info.append(f"Database Available: {self.bot.db_available}")
-            
+            if self.bot.db_available:
+                cache_stats = self.bot.settings_manager.cache_stats()
+                debug_info.append(
+                    f"Settings Cache: {cache_stats['entries']} entries, "
+                    f"hits {cache_stats['hits']} / misses {cache_stats['misses']} "
+                    f"({cache_stats['hit_rate']:.1%})"
+                )
+                profile_stats = self.bot.profile_manager.cache_stats()
+                debug_info.append(
+                    f"Profile Cache: {profile_stats['entries']} entries, "
+                    f"hits {profile_stats['hits']} / misses {profile_stats['misses']} "
+                    f"({profile_stats['hit_rate']:.1%})"
+                )
+                roll_stats = self.bot.roll_ledger.cache_stats()
+                debug_info.append(
+                    f"Daily Roll Cache: {roll_stats['entries']} entries, "
+                    f"hits {roll_stats['hits']} / misses {roll_stats['misses']} "
+                    f"({roll_stats['hit_rate']:.1%})"
+                )
+                draw_stats = self.bot.gacha_draw.stats()
+                debug_info.append(
+                    f"Gacha Draw Tables: {draw_stats['entries']} cached, "
+                    f"compiles {draw_stats['compiles']} / hits {draw_stats['hits']}"
+                )
+                fortune_stats = self.bot.fortune_ledger.cache_stats()
+                table_stats = self.bot.fortune_tables.stats()
+                debug_info.append(
+                    f"Fortune Cache: {fortune_stats['entries']} entries, "
+                    f"hits {fortune_stats['hits']} / misses {fortune_stats['misses']}, "
+                    f"tables {table_stats['entries']} (compiles {table_stats['compiles']})"
+                )
+                outbound_stats = self.bot.message_scheduler.stats()
+                debug_info.append(
+                    f"Outbound Queue: {outbound_stats['queued']} queued in {outbound_stats['channels']} channels, "
+                    f"sent {outbound_stats['sent']} (+{outbound_stats['coalesced']} coalesced), "
+                    f"dropped {outbound_stats['dropped']}, failed {outbound_stats['failed']}, "
+                    f"rate limited {outbound_stats['rate_limited']}"
+                )
+                digest_stats = self.bot.notification_digest.stats()
+                debug_info.append(
+                    f"History Digest: {digest_stats['pending_events']} pending in {digest_stats['pending_channels']} channels, "
+                    f"{digest_stats['events']} events / {digest_stats['flushes']} flushes"
+                )
+                dispatch_stats = self.bot.message_dispatcher.stats()
+                debug_info.append(
+                    f"Message Dispatch: {dispatch_stats['messages']} messages, "
+                    f"skipped {dispatch_stats['skipped']}, dispatched {dispatch_stats['dispatched']}, "
+                    f"{dispatch_stats['servers']} servers cached ({dispatch_stats['bitmap_loads']} loads)"
+                )
+                db_stats = self.bot.db.executor.stats()
+                debug_info.append(
+                    f"DB Calls: {db_stats['calls']} (in flight {db_stats['in_flight']}/{db_stats['max_concurrency']}, "
+                    f"peak {db_stats['max_in_flight']}, waiting {db_stats['waiting']}, "
+                    f"timeouts {db_stats['timeouts']}, avg wait {db_stats['avg_wait_ms']:.1f}ms)"
+                )
+
+            # メトリクス（合計処理時間の長いハンドラ順）
+            debug_info.append("\n【メトリクス】")
+            for row in metrics.handler_summary(limit=8):
+                debug_info.append(
+                    f"- {row['kind']}:{row['name']} n={row['count']} err={row['errors']} "
+                    f"avg {row['avg_ms']:.0f}ms p95≤{row['p95_ms']:.0f}ms db {row['db_calls']:.1f}/call"
+                )
+            for row in metrics.timing_summary(metrics.DB_CALL_SECONDS, limit=5):
+                operation, table = row['labels']
+                debug_info.append(
+                    f"- db:{operation}({table or '-'}) n={row['count']} avg {row['avg_ms']:.1f}ms p95≤{row['p95_ms']:.0f}ms"
+                )
+            for row in metrics.timing_summary(metrics.DISCORD_HTTP_SECONDS, limit=5):
+                method, route = row['labels']
+                debug_info.append(
+                    f"- http:{method} {route} n={row['count']} avg {row['avg_ms']:.0f}ms p95≤{row['p95_ms']:.0f}ms"
+                )
+
             # サーバー設定
             debug_info.append("\n【サーバー設定】")
             settings = await self.bot.get_server_settings(str(interaction.guild_id))
@@ -169,8 +246,7 @@ class Admin(commands.Cog):
                     await interaction.followup.send(f"```{chunk}```", ephemeral=True)
 
         except Exception as e:
-            print(f"[ERROR] Error in debug_bot: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in debug_bot: %s", e, exc_info=True)
             await interaction.response.send_message(
                 f"デバッグ中にエラーが発生しました。\nError: {str(e)}",
                 ephemeral=True
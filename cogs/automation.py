@@ -1,11 +1,16 @@
+import logging
 import discord
 from discord.ext import commands
 from discord import app_commands
 from utils.automation_manager import AutomationManager
+from utils.automation_rule_index import EVENT_MESSAGE
+from utils.metrics import instrument
 from typing import Optional, List
 import traceback
 import json
 
+logger = logging.getLogger(__name__)
+
 class RuleModal(discord.ui.Modal):
     def __init__(self, title: str = "新しいルール作成"):
         super().__init__(title=title)
@@ -38,11 +43,28 @@ class Automation(commands.Cog):
         self.bot = bot
         self.automation_manager = AutomationManager(bot)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
+    async def cog_load(self):
+        # メッセージはディスパッチャー経由で受け取る（メッセージで評価するルールがあるサーバーのみ）
+        self.bot.message_dispatcher.register(
+            'automation', self.on_automation_message, self.has_message_rules
+        )
+
+    async def cog_unload(self):
+        self.bot.message_dispatcher.unregister('automation')
+
+    async def has_message_rules(self, server_id: str) -> bool:
+        """メッセージイベントで評価するルールがあるか（ディスパッチャーの機能ビットマップの作成時に呼ばれる）"""
+        compiled = await self.automation_manager.rule_index.get(server_id)
+        return bool(compiled.rules_for_event(EVENT_MESSAGE))
+
+    async def on_automation_message(self, message):
+        """
+        メッセージイベントのルールを処理
 
+        呼び出し元
+        utils\message_dispatcher.py
+            MessageDispatcher.on_message
+        """
         try:
             # メッセージイベントの処理
             await self.automation_manager.process_automation_rules(
@@ -52,10 +74,10 @@ class Automation(commands.Cog):
                 {'message_content': message.content}
             )
         except Exception as e:
-            print(f"Error processing message automation: {e}")
-            print(traceback.format_exc())
+            logger.error("Error processing message automation: %s", e, exc_info=True)
 
     @commands.Cog.listener()
+    @instrument('listener', 'automation.on_member_update')
     async def on_member_update(self, before, after):
         try:
             # メンバー更新イベントの処理
@@ -69,8 +91,7 @@ class Automation(commands.Cog):
                 }
             )
         except Exception as e:
-            print(f"Error processing member update automation: {e}")
-            print(traceback.format_exc())
+            logger.error("Error processing member update automation: %s", e, exc_info=True)
 
     # async def create_rule(self, interaction: discord.Interaction):
     #     modal = RuleModal()
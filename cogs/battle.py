@@ -1,14 +1,23 @@
+import logging
 import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import copy
 from datetime import datetime
-import traceback
 from typing import Optional
 
-from models.battle import BattleGame, BattleStatus, EventType
-from utils.battle_events import generate_battle_event, format_round_message
+from models.battle import BattleGame, BattleStatus
+from utils.battle_engine import BattleEngine
+from utils.battle_feed import BattleFeed
+from utils.message_scheduler import Priority
 from utils.point_manager import PointSource  # 追加
+from utils.metrics import instrument
+
+logger = logging.getLogger(__name__)
+
+# ラウンドの進行間隔（秒）。表示は BattleFeed が複数ラウンドをまとめて編集する
+ROUND_INTERVAL_SECONDS = 3
 
 class BattleView(discord.ui.View):
     def __init__(self, game: BattleGame, cog):
@@ -17,6 +26,7 @@ class BattleView(discord.ui.View):
         self.cog = cog
 
     @discord.ui.button(label="参加", style=discord.ButtonStyle.green)
+    @instrument('button', 'battle_join')
     async def join_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """バトルに参加"""
         try:
@@ -52,7 +62,7 @@ class BattleView(discord.ui.View):
                 await interaction.response.send_message("すでに参加しています。", ephemeral=True)
 
         except Exception as e:
-            print(f"Error in join_button: {e}")
+            logger.error("Error in join_button: %s", e)
             await interaction.response.send_message(
                 "参加処理中にエラーが発生しました。",
                 ephemeral=True
@@ -64,7 +74,7 @@ class BattleView(discord.ui.View):
             embed = await self._create_battle_info_embed()
             await interaction.message.edit(embed=embed, view=self)
         except Exception as e:
-            print(f"Error updating battle info: {e}")
+            logger.error("Error updating battle info: %s", e)
 
     async def _create_battle_info_embed(self) -> discord.Embed:
         """バトル情報のEmbed作成"""
@@ -101,36 +111,37 @@ class BattleRoyale(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.active_games = {}
-        print("Battle Royale cog initialized")
-        print("[Battle] Cog initialized, active_games cleared")
+        logger.debug("Battle Royale cog initialized")
+        logger.debug("Cog initialized, active_games cleared")
 
     @commands.Cog.listener()
+    @instrument('listener', 'battle.on_ready')
     async def on_ready(self):
         """ボット起動時に実行"""
         self.active_games = {}  # ボット起動時にもクリア
-        print("[Battle] Bot ready, active_games cleared")
+        logger.debug("Bot ready, active_games cleared")
 
     async def get_battle_settings(self, guild_id: str):
         """バトル設定を取得"""
         try:
-            print(f"[DEBUG] Getting settings for guild ID: {guild_id}")
+            logger.debug("Getting settings for guild ID: %s", guild_id)
             settings = await self.bot.get_server_settings(guild_id)
-            print(f"[DEBUG] Retrieved settings: {settings}")
+            logger.debug("Retrieved settings: %s", settings)
             
             if not settings:
-                print("[DEBUG] No settings found")
+                logger.debug("No settings found")
                 return None
                 
             if not settings.global_settings.features_enabled.get('battle', True):
-                print("[DEBUG] Battle feature is disabled")
+                logger.debug("Battle feature is disabled")
                 return None
                 
-            print(f"[DEBUG] Battle settings: {settings.battle_settings}")
-            return settings.battle_settings
+            logger.debug("Battle settings: %s", settings.battle_settings)
+            # 設定はキャッシュと共有されるため、ゲームごとに変更できるようコピーを返す
+            return copy.copy(settings.battle_settings)
             
         except Exception as e:
-            print(f"[ERROR] Error getting battle settings: {e}")
-            print(f"[ERROR] Full traceback: {traceback.format_exc()}")
+            logger.error("Error getting battle settings: %s", e, exc_info=True)
             return None
 
     @app_commands.command(name="battle", description="バトルロイヤルを開始します")
@@ -146,20 +157,20 @@ class BattleRoyale(commands.Cog):
         dummy_count: int = 10
     ):
         start_time = datetime.now()
-        print(f"[Battle] Command received at {start_time}")
-        print(f"[Battle] Interaction ID: {interaction.id}")
-        print(f"[Battle] Guild ID: {interaction.guild_id}")
+        logger.debug("Command received at %s", start_time)
+        logger.debug("Interaction ID: %s", interaction.id)
+        logger.debug("Guild ID: %s", interaction.guild_id)
         
         try:
-            print("[Battle] Attempting to defer")
+            logger.debug("Attempting to defer")
             # await interaction.response.defer()
-            print("[Battle] Successfully deferred")
+            logger.debug("Successfully deferred")
             
             server_id = str(interaction.guild_id)
-            print(f"[DEBUG] Starting battle for server ID: {server_id}")
+            logger.debug("Starting battle for server ID: %s", server_id)
             
             if server_id in self.active_games:
-                print(f"[DEBUG] Battle already active in server {server_id}")
+                logger.debug("Battle already active in server %s", server_id)
                 await interaction.followup.send(
                     "すでにバトルが進行中です。",
                     ephemeral=True
@@ -167,12 +178,12 @@ class BattleRoyale(commands.Cog):
                 return
 
             # 設定を取得
-            print(f"[DEBUG] Attempting to get battle settings")
+            logger.debug("Attempting to get battle settings")
             settings = await self.get_battle_settings(server_id)
-            print(f"[DEBUG] Retrieved battle settings: {settings}")
+            logger.debug("Retrieved battle settings: %s", settings)
             
             if settings is None:
-                print(f"[DEBUG] No battle settings found for server {server_id}")
+                logger.debug("No battle settings found for server %s", server_id)
                 await interaction.followup.send(
                     "このサーバーではバトル機能が無効になっています。",
                     ephemeral=True
@@ -230,8 +241,7 @@ class BattleRoyale(commands.Cog):
             await self.start_countdown(interaction.channel, game)
 
         except Exception as e:
-            print(f"Error starting battle: {e}")
-            print(traceback.format_exc())
+            logger.error("Error starting battle: %s", e, exc_info=True)
             await interaction.response.send_message(
                 "バトルの開始に失敗しました。",
                 ephemeral=True
@@ -245,7 +255,9 @@ class BattleRoyale(commands.Cog):
             
             for remaining in range(total_seconds, 0, -1):
                 if remaining in warning_times:
-                    await channel.send(f"⚔️ 開始まであと{remaining}秒！")
+                    self.bot.message_scheduler.send(
+                        channel, f"⚔️ 開始まであと{remaining}秒！", priority=Priority.NORMAL, coalesce=False
+                    )
                 await asyncio.sleep(1)
             
             if game.status == BattleStatus.WAITING:
@@ -257,8 +269,7 @@ class BattleRoyale(commands.Cog):
                     del self.active_games[game.server_id]
 
         except Exception as e:
-            print(f"Error in countdown: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in countdown: %s", e, exc_info=True)
             await channel.send("エラーが発生したため、バトルを中止します。")
             if game.server_id in self.active_games:
                 del self.active_games[game.server_id]
@@ -284,75 +295,30 @@ class BattleRoyale(commands.Cog):
             await self.run_battle_rounds(channel, game)
 
         except Exception as e:
-            print(f"Error in battle game: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in battle game: %s", e, exc_info=True)
             await channel.send("エラーが発生したため、バトルを中止します。")
             if game.server_id in self.active_games:
                 del self.active_games[game.server_id]
 
     async def run_battle_rounds(self, channel: discord.TextChannel, game: BattleGame):
-        """バトルのラウンドを実行"""
+        """バトルのラウンドを実行（進行は BattleEngine、表示は1つの実況メッセージを編集する）"""
         try:
-            while not game.is_finished:
-                events = []
-                for _ in range(min(len(game.alive_players) // 2, 5)):
-                    # 引数を正しく渡すように修正
-                    event = generate_battle_event(
-                        alive_players=game.alive_players,
-                        dead_players=game.dead_players
-                    )
-                    if event:
-                        events.append(event)
-                        # イベントの処理
-                        if event.killed_players:
-                            for player_id in event.killed_players:
-                                game.kill_player(player_id)
-                        if event.revived_players:
-                            for player_id in event.revived_players:
-                                game.revive_player(player_id)
-
-                round_embed = format_round_message(game.round_number, events, len(game.alive_players))
-                if game.settings.test_mode:
-                    round_embed.title = f"🧪 {round_embed.title}"
-
-                await channel.send(embed=round_embed)
-                
-                if game.settings.test_mode:
-                    await self.send_debug_info(channel, game)
-                
-                game.round_number += 1
-                await asyncio.sleep(5)
+            feed = BattleFeed(channel, test_mode=game.settings.test_mode)
+            await feed.start()
+            for round_result in BattleEngine(game).rounds():
+                await feed.push_round(round_result)
+                await asyncio.sleep(ROUND_INTERVAL_SECONDS)
+            await feed.close()
+            logger.debug("Battle feed for %s used %s API calls over %s rounds",
+                         game.server_id, feed.api_calls, game.round_number - 1)
 
             await self.end_battle(channel, game)
             
         except Exception as e:
-            print(f"Error in battle rounds: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in battle rounds: %s", e, exc_info=True)
             await channel.send("バトル進行中にエラーが発生しました。")
             await self.end_battle(channel, game)
 
-    async def process_battle_event(self, game: BattleGame, event):
-        """バトルイベントの処理"""
-        if event.event_type == EventType.KILL:
-            for player_id in event.killed_players:
-                game.kill_player(player_id)
-        elif event.event_type == EventType.REVIVE:
-            for player_id in event.revived_players:
-                game.revive_player(player_id)
-
-    async def send_debug_info(self, channel: discord.TextChannel, game: BattleGame):
-        """デバッグ情報の送信"""
-        debug_embed = discord.Embed(
-            title="🧪 ラウンドデバッグ情報",
-            description=f"ラウンド {game.round_number}",
-            color=discord.Color.greyple()
-        )
-        debug_embed.add_field(
-            name="生存者情報",
-            value=f"生存: {len(game.alive_players)}人\n脱落: {len(game.dead_players)}人"
-        )
-        await channel.send(embed=debug_embed)
-
     async def end_battle(self, channel: discord.TextChannel, game: BattleGame):
         """バトルを終了"""
         try:
@@ -371,8 +337,7 @@ class BattleRoyale(commands.Cog):
                 await self.handle_rewards(channel.guild, winner_id, game)
 
         except Exception as e:
-            print(f"Error in end battle: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in end battle: %s", e, exc_info=True)
             await channel.send("バトル終了処理中にエラーが発生しました。")
         
         finally:
@@ -409,6 +374,7 @@ class BattleRoyale(commands.Cog):
             return f"ダミープレイヤー {player_id}"
         return f"<@{player_id}>"
 
+    @instrument('task', 'battle_rewards')
     async def handle_rewards(self, guild: discord.Guild, winner_id: str, game: BattleGame):
         """報酬の付与処理"""
         try:
@@ -420,7 +386,7 @@ class BattleRoyale(commands.Cog):
                     if winner and role:
                         await winner.add_roles(role)
                 except Exception as e:
-                    print(f"Failed to add winner role: {e}")
+                    logger.error("Failed to add winner role: %s", e)
 
             # ポイントの付与
             if game.settings.points_enabled and hasattr(self.bot, 'point_manager'):
@@ -428,63 +394,33 @@ class BattleRoyale(commands.Cog):
                     # unit_idの取得（デフォルト値対応）
                     unit_id = getattr(game.settings, 'unit_id', "1")
 
-                    # サーバー設定からポイント単位名を取得
-                    server_settings = await self.bot.get_server_settings(game.server_id)
-                    point_unit_name = server_settings.global_settings.point_unit
-
-                    if server_settings.global_settings.multiple_points_enabled:
-                        unit = next(
-                            (u for u in server_settings.global_settings.point_units 
-                            if u.unit_id == unit_id),
-                            None
-                        )
-                        if unit:
-                            point_unit_name = unit.name
-
-                    # 優勝者のポイント付与
-                    winner_current_points = await self.bot.point_manager.get_points(
-                        game.server_id,
-                        winner_id,
-                        unit_id
+                    # 優勝ポイントとキルポイントをまとめて付与（ダミープレイヤー以外）
+                    awards = [(winner_id, game.settings.winner_points, PointSource.BATTLE_WIN)]
+                    awards.extend(
+                        (player_id, kills * game.settings.points_per_kill, PointSource.BATTLE_KILL)
+                        for player_id, kills in game.kill_counts.items()
+                        if kills > 0
                     )
-                    
-                    # 優勝ポイントを加算
-                    winner_new_points = winner_current_points + game.settings.winner_points
-                    await self.bot.point_manager.update_points(
-                        winner_id,
+                    awards = [award for award in awards if not str(award[0]).startswith('dummy_')]
+
+                    awarded = await self.bot.point_manager.award_points_bulk(
                         game.server_id,
-                        winner_new_points,
+                        awards,
                         unit_id,
-                        PointSource.BATTLE_WIN
+                        title="⚔️ バトル報酬"
                     )
-                        
-                    # キルポイントの付与（ダミープレイヤー以外に対して）
-                    for player_id, kills in game.kill_counts.items():
-                        if kills > 0 and not str(player_id).startswith('dummy_'):
-                            current_points = await self.bot.point_manager.get_points(
-                                game.server_id,
-                                player_id,
-                                unit_id
-                            )
-                            
-                            kill_points = kills * game.settings.points_per_kill
-                            new_points = current_points + kill_points
-                            
-                            await self.bot.point_manager.update_points(
-                                player_id,
-                                game.server_id,
-                                new_points,
-                                unit_id,
-                                PointSource.BATTLE_KILL
-                            )
+
+                    # 付与できなかった（または結果が分からない）プレイヤーを残す
+                    missing = sorted({str(player_id) for player_id, points, _ in awards if points} - set(awarded))
+                    if missing:
+                        logger.error("Battle rewards were not confirmed for %s players in server %s: %s",
+                                     len(missing), game.server_id, missing)
 
                 except Exception as e:
-                    print(f"Failed to add points: {e}")
-                    print(traceback.format_exc())
+                    logger.error("Failed to add points: %s", e, exc_info=True)
 
         except Exception as e:
-            print(f"Error handling rewards: {e}")
-            print(traceback.format_exc())
+            logger.error("Error handling rewards: %s", e, exc_info=True)
 
     @app_commands.command(name="battle_stop", description="進行中のバトルを強制終了します")
     @app_commands.checks.has_permissions(administrator=True)
@@ -526,18 +462,16 @@ class BattleRoyale(commands.Cog):
             del self.active_games[server_id]
             
         except Exception as e:
-            print(f"Error stopping battle: {e}")
-            print(traceback.format_exc())
+            logger.error("Error stopping battle: %s", e, exc_info=True)
             await interaction.followup.send(
                 "バトルの終了処理中にエラーが発生しました。",
                 ephemeral=True
             )
 
 async def setup(bot):
-    print("[Battle] Setting up Battle Royale Cog")
+    logger.debug("Setting up Battle Royale Cog")
     try:
         await bot.add_cog(BattleRoyale(bot))
-        print("[Battle] Successfully added Battle Royale Cog")
+        logger.debug("Successfully added Battle Royale Cog")
     except Exception as e:
-        print(f"[Battle] Failed to add cog: {e}")
-        print(traceback.format_exc())
\ No newline at end of file
+        logger.error("Failed to add cog: %s", e, exc_info=True)
\ No newline at end of file
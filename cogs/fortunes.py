@@ -1,48 +1,10 @@
+import logging
 import discord
 from discord.ext import commands
 from discord import app_commands
-import random
-from datetime import datetime
-import pytz
-import traceback
-
-DEFAULT_FORTUNE_RESULTS = {
-    "大吉": {
-        "description": "とても良い1日になりそう！チャレンジが実を結ぶ時です。",
-        "color": 0xFF0000,
-        "lucky_item": ["四つ葉のクローバー", "赤い靴下", "クリスタル"],
-        "lucky_color": ["赤", "金", "白"],
-        "weight": 10
-    },
-    "吉": {
-        "description": "良いことが待っています。前向きな姿勢で過ごしましょう。",
-        "color": 0xFFA500,
-        "lucky_item": ["硬貨", "手帳", "鈴"],
-        "lucky_color": ["青", "緑", "黄"],
-        "weight": 30
-    },
-    "中吉": {
-        "description": "平穏な一日になりそう。小さな幸せを大切に。",
-        "color": 0xFFFF00,
-        "lucky_item": ["ペン", "メモ帳", "キーホルダー"],
-        "lucky_color": ["紫", "ピンク", "オレンジ"],
-        "weight": 40
-    },
-    "小吉": {
-        "description": "穏やかな日になりそう。慎重に行動すれば良い結果に。",
-        "color": 0x00FF00,
-        "lucky_item": ["消しゴム", "カレンダー", "マスク"],
-        "lucky_color": ["水色", "茶色", "グレー"],
-        "weight": 15
-    },
-    "凶": {
-        "description": "少し慎重に行動した方が良さそう。でも心配はいりません。",
-        "color": 0x808080,
-        "lucky_item": ["お守り", "傘", "時計"],
-        "lucky_color": ["黒", "紺", "深緑"],
-        "weight": 5
-    }
-}
+from utils.fortune_table import DEFAULT_FORTUNE_RESULTS
+
+logger = logging.getLogger(__name__)
 
 TRIGGER_WORDS = ["占い", "占って", "うらない"]
 
@@ -51,6 +13,19 @@ class Fortunes(commands.Cog):
         self.bot = bot
         self.db = bot.db
 
+    async def cog_load(self):
+        # メッセージはディスパッチャー経由で受け取る（トリガーワードを含み、占いが有効なサーバーのみ）
+        self.bot.message_dispatcher.register(
+            'fortune', self.on_fortune_message, self.is_fortune_enabled, triggers=TRIGGER_WORDS
+        )
+
+    async def cog_unload(self):
+        self.bot.message_dispatcher.unregister('fortune')
+
+    async def is_fortune_enabled(self, server_id: str) -> bool:
+        """占い機能が有効か（ディスパッチャーの機能ビットマップの作成時に呼ばれる）"""
+        return await self.get_fortune_settings(server_id) is not None
+
     async def get_fortune_settings(self, guild_id: str):
         """占い設定を取得"""
         try:
@@ -59,21 +34,9 @@ class Fortunes(commands.Cog):
                 return None
             return settings.fortune_settings
         except Exception as e:
-            print(f"Error getting fortune settings: {e}")
+            logger.error("Error getting fortune settings: %s", e)
             return None
 
-    def get_fortune_results(self, settings):
-        """設定に基づいた占い結果の定義を取得"""
-        fortune_results = DEFAULT_FORTUNE_RESULTS.copy()
-        
-        # カスタムメッセージの適用
-        if settings and hasattr(settings, 'custom_messages') and settings.custom_messages:
-            for fortune_type, message in settings.custom_messages.items():
-                if fortune_type in fortune_results:
-                    fortune_results[fortune_type]['description'] = message
-
-        return fortune_results
-
     async def perform_fortune(self, user, channel, guild):
         """占いを実行する共通関数"""
         try:
@@ -86,39 +49,35 @@ class Fortunes(commands.Cog):
                 await channel.send("このサーバーでは占い機能が無効になっています。")
                 return
 
-            # 日付チェック
-            jst = pytz.timezone('Asia/Tokyo')
-            today = datetime.now(jst).strftime('%Y-%m-%d')
-            
-            # 最新の占い結果を取得
-            latest_fortune = self.db.get_latest_fortune(user_id, server_id)
-            
-            if latest_fortune and latest_fortune['created_at'].split('T')[0] == today:
-                daily_message = getattr(settings, 'daily_message', "今日はすでに占いをしています。明日また挑戦してください！")
-                await channel.send(f"{user.mention} {daily_message}")
+            # 今日の占い結果（当日分はキャッシュで判定）
+            if await self.bot.fortune_ledger.get_fortune(server_id, user_id):
+                await channel.send(f"{user.mention} {settings.daily_message}")
                 return
 
-            # 占い結果の取得
-            fortune_results = self.get_fortune_results(settings)
-            fortune_type = random.choices(
-                list(fortune_results.keys()),
-                weights=[f["weight"] for f in fortune_results.values()]
-            )[0]
-            fortune_data = fortune_results[fortune_type]
+            # サーバーごとのコンパイル済みの結果表で抽選
+            table = self.bot.fortune_tables.get(server_id, settings)
+            fortune_type, fortune_data, lucky_item, lucky_color = table.draw()
 
-            # 結果を記録
-            self.db.record_fortune(user_id, server_id, fortune_type)
+            # 結果を条件付きで記録（同時に占った場合は先に記録された方のみ有効）
+            claimed, _ = await self.bot.fortune_ledger.claim_fortune(
+                server_id, user_id, fortune_type, lucky_item, lucky_color
+            )
+            if claimed is None:
+                await channel.send("占いの実行中にエラーが発生しました。")
+                return
+            if not claimed:
+                await channel.send(f"{user.mention} {settings.daily_message}")
+                return
 
             # 結果表示用Embedを作成
-            embed = await self._create_fortune_embed(user, fortune_type, fortune_data)
+            embed = self._create_fortune_embed(user, fortune_type, fortune_data, lucky_item, lucky_color)
             await channel.send(embed=embed)
 
         except Exception as e:
-            print(f"Error in perform_fortune: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in perform_fortune: %s", e, exc_info=True)
             await channel.send("占いの実行中にエラーが発生しました。")
 
-    async def _create_fortune_embed(self, user, fortune_type, fortune_data):
+    def _create_fortune_embed(self, user, fortune_type, fortune_data, lucky_item, lucky_color):
         """占い結果表示用Embedの作成"""
         embed = discord.Embed(
             title=f"🔮 {user.name}さんの今日の運勢",
@@ -131,9 +90,6 @@ class Fortunes(commands.Cog):
             inline=False
         )
         
-        lucky_item = random.choice(fortune_data["lucky_item"])
-        lucky_color = random.choice(fortune_data["lucky_color"])
-        
         embed.add_field(name="ラッキーアイテム", value=lucky_item, inline=True)
         embed.add_field(name="ラッキーカラー", value=lucky_color, inline=True)
         
@@ -141,13 +97,15 @@ class Fortunes(commands.Cog):
         
         return embed
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot or not message.guild:
-            return
-            
-        if any(word in message.content for word in TRIGGER_WORDS):
-            await self.perform_fortune(message.author, message.channel, message.guild)
+    async def on_fortune_message(self, message):
+        """
+        トリガーワードを含むメッセージで占う
+
+        呼び出し元
+        utils\message_dispatcher.py
+            MessageDispatcher.on_message
+        """
+        await self.perform_fortune(message.author, message.channel, message.guild)
 
     @app_commands.command(name="fortune_stats", description="占い結果の統計を表示します")
     async def fortune_stats(self, interaction: discord.Interaction):
@@ -169,18 +127,17 @@ class Fortunes(commands.Cog):
             await interaction.response.send_message(embed=stats_embed, ephemeral=True)
 
         except Exception as e:
-            print(f"Error in fortune_stats: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in fortune_stats: %s", e, exc_info=True)
             await interaction.response.send_message(
                 "統計情報の取得中にエラーが発生しました。",
                 ephemeral=True
             )
 
     async def _create_stats_embed(self, user_id, server_id, username):
-        """統計情報表示用Embedの作成"""
-        history = self.db.get_fortune_history_stats(user_id, server_id)
+        """統計情報表示用Embedの作成（運勢ごとの累計回数の1項目を読む）"""
+        counts = await self.bot.fortune_ledger.get_stats(server_id, user_id)
         
-        if not history:
+        if not counts:
             return discord.Embed(
                 title=f"🔮 {username}さんの運勢統計",
                 description="まだ占い履歴がありません。チャットで「占い」と発言してみましょう！",
@@ -195,7 +152,7 @@ class Fortunes(commands.Cog):
         # 結果の集計
         fortune_counts = {}
         for fortune_type in DEFAULT_FORTUNE_RESULTS.keys():
-            count = sum(1 for record in history if record["fortune_type"] == fortune_type)
+            count = counts.get(fortune_type, 0)
             if count > 0:
                 fortune_counts[fortune_type] = count
         
@@ -1,19 +1,28 @@
+import logging
 import discord
 from discord.ext import commands
 from discord import app_commands
 import pytz
 from datetime import datetime
 import traceback
-import random
 import asyncio  # 追加
 from utils.point_manager import PointSource
+from utils.metrics import instrument
+from utils.gacha_simulator import GachaEconomySimulator, collect_thresholds, default_cohorts, format_report
 import urllib.parse  # 追加
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from models.server_settings import GachaSettings, MessageSettings, MediaSettings, GachaFeatureSettings
 import uuid
 from discord.ext import tasks
 from datetime import time as datetime_time
 
+logger = logging.getLogger(__name__)
+
+# /gacha_simulate の上限（数秒で終わる範囲）
+SIMULATION_MAX_DAYS = 365
+SIMULATION_MAX_USERS = 100000
+SIMULATION_MAX_DRAWS = 100_000_000
+
 def get_button_labels(messages: Optional[MessageSettings]) -> Dict[str, str]:
     """ボタンのラベルを取得。設定がない場合はデフォルト値を返す"""
     default_labels = {
@@ -23,21 +32,37 @@ def get_button_labels(messages: Optional[MessageSettings]) -> Dict[str, str]:
     }
     
     if not messages or not hasattr(messages, 'button_labels') or not messages.button_labels:
-        print(f"[DEBUG] Using default button labels")
+        logger.debug("Using default button labels")
         return default_labels
     
-    print(f"[DEBUG] Using custom button labels: {messages.button_labels}")
+    logger.debug("Using custom button labels: %s", messages.button_labels)
     return messages.button_labels
 
+def summarize_pulls(pulls: List[Dict]) -> Tuple[Dict, str, int]:
+    """
+    複数回の抽選結果をまとめる
+
+    Returns:
+        (表示するアイテム（最もポイントの高いもの）, 獲得アイテムの表示名, 合計ポイント)
+    """
+    total_points = sum(int(item['points']) for item in pulls)
+    if len(pulls) == 1:
+        return pulls[0], pulls[0]['name'], total_points
+
+    counts: Dict[str, int] = {}
+    for item in sorted(pulls, key=lambda item: int(item['points']), reverse=True):
+        counts[item['name']] = counts.get(item['name'], 0) + 1
+    featured = max(pulls, key=lambda item: int(item['points']))
+    summary = " / ".join(f"{name} ×{count}" for name, count in counts.items())
+    return featured, summary, total_points
+
 class GachaView(discord.ui.View):
     def __init__(self, bot, gacha_id: str, server_id: str = None):  # server_idを追加
         super().__init__(timeout=None)
         self.bot = bot
         self.gacha_id = gacha_id  # インスタンス変数として保存
         self.server_id = server_id  # サーバーIDを保存
-        print(f"[DEBUG] GachaView init - Gacha ID: {gacha_id}") # このデバッグログは機能には影響しません
-        if not hasattr(bot, 'gacha_messages'):
-            bot.gacha_messages = {}
+        logger.debug("GachaView init - Gacha ID: %s", gacha_id)
 
     async def initialize(self):
         """初期化処理を実行"""
@@ -47,12 +72,12 @@ class GachaView(discord.ui.View):
         """初期ラベルを設定"""
         try:
             if not self.server_id:
-                print("[ERROR] Server ID is not set")
+                logger.error("Server ID is not set")
                 return
 
             settings = await self.bot.get_server_settings(self.server_id)
             if not settings:
-                print(f"[ERROR] Could not get settings for server {self.server_id}")
+                logger.error("Could not get settings for server %s", self.server_id)
                 return
 
             gacha_settings = next(
@@ -62,7 +87,7 @@ class GachaView(discord.ui.View):
             )
             
             if not gacha_settings:
-                print(f"[ERROR] Could not find gacha settings for gacha ID {self.gacha_id}")
+                logger.error("Could not find gacha settings for gacha ID %s", self.gacha_id)
                 return
 
             labels = get_button_labels(gacha_settings.messages if gacha_settings else None)
@@ -77,14 +102,14 @@ class GachaView(discord.ui.View):
                     elif child.custom_id == 'points_button':
                         child.label = labels['points']
         except Exception as e:
-            print(f"[ERROR] Failed to set initial labels: {e}")
+            logger.error("Failed to set initial labels: %s", e)
 
-    async def _create_result_embed(self, result_item, points, new_points, settings, gacha_settings, interaction, point_unit_id="1"):
+    async def _create_result_embed(self, result_item, points, new_points, settings, gacha_settings, interaction, point_unit_id="1", item_summary=None):
             """結果表示用Embedの作成"""
-            print(f"[DEBUG] create_result_embed - ユーザーID: {interaction.user.id}")
-            print(f"[DEBUG] create_result_embed - 獲得ポイント: {points}")
-            print(f"[DEBUG] create_result_embed - 新しい合計ポイント: {new_points}")
-            print(f"[DEBUG] create_result_embed - ポイントユニットID: {point_unit_id}")
+            logger.debug("create_result_embed - ユーザーID: %s", interaction.user.id)
+            logger.debug("create_result_embed - 獲得ポイント: %s", points)
+            logger.debug("create_result_embed - 新しい合計ポイント: %s", new_points)
+            logger.debug("create_result_embed - ポイントユニットID: %s", point_unit_id)
             
             # ポイント単位の取得
             point_unit_name = settings.global_settings.point_unit
@@ -98,7 +123,7 @@ class GachaView(discord.ui.View):
                     point_unit_name = point_unit.name
             
             embed = discord.Embed(title=f"{gacha_settings.name}の結果", color=0x00ff00)
-            embed.add_field(name="獲得アイテム", value=result_item['name'], inline=False)
+            embed.add_field(name="獲得アイテム", value=item_summary or result_item['name'], inline=False)
             embed.add_field(
                 name="ポイント", 
                 value=f"+{points}{point_unit_name}",
@@ -137,10 +162,13 @@ class GachaView(discord.ui.View):
             else:
                 await interaction.followup.send(message, ephemeral=True)
         except Exception:
-            print("Failed to send error message to user")
+            logger.error("Failed to send error message to user")
         
     @discord.ui.button(label="ガチャを回す！", custom_id='gacha_button', style=discord.ButtonStyle.primary)
+    @instrument('button')
     async def gacha_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        # 今回記録した実行（ポイントを付与するまでに失敗したら取り消す）
+        pending_roll = None
         try:
             user_id = str(interaction.user.id)
             server_id = str(interaction.guild_id)
@@ -176,20 +204,30 @@ class GachaView(discord.ui.View):
                 else "1"
             )
             
-            # 日付チェック
-            jst = pytz.timezone('Asia/Tokyo')
-            today = datetime.now(jst).strftime('%Y-%m-%d')
-            
-            # キャッシュからデータを取得（gacha_idを含める）
-            cache_key = f"{user_id}_{server_id}_{self.gacha_id}_gacha_result"
-            cached_data = self.bot.cache.get(cache_key)
+            # ガチャ実行（コンパイル済みの抽選表で pulls_per_roll 回まとめて引く。
+            # 結果を台帳に条件付きで記録できた場合のみ有効）
+            pulls = self.bot.gacha_draw.draw(gacha_settings, gacha_settings.pulls_per_roll)
+            result_item, item_summary, points_to_add = summarize_pulls(pulls)
+
+            # 当日の実行済みはキャッシュだけで判定し、未実行なら条件付き書き込みで記録する
+            roll = self.bot.roll_ledger.get_cached_roll(server_id, self.gacha_id, user_id)
+            claimed = False
+            if roll is None:
+                claimed, roll = await self.bot.roll_ledger.claim_roll(
+                    server_id, self.gacha_id, user_id, item_summary, points_to_add
+                )
+                if claimed is None:
+                    await self._handle_error(interaction, "ガチャの実行中にエラーが発生しました。")
+                    return
+                if claimed:
+                    pending_roll = roll
 
             # 既にガチャを引いている場合の処理
-            if cached_data and cached_data.get('last_gacha_date') == today:
-                last_item = cached_data.get('last_item', '不明')
-                last_points = cached_data.get('last_points', 0)
+            if not claimed:
+                last_item = roll.get('last_item', '不明') if roll else '不明'
+                last_points = roll.get('last_points', 0) if roll else 0
                 total_points = await self.bot.point_manager.get_points(server_id, user_id, point_unit_id)
-                print(f"[DEBUG] 今日のガチャは既に実行済みです - ユーザーID: {user_id}, 最後のアイテム: {last_item}, 獲得ポイント: {last_points}, 合計ポイント: {total_points}")
+                logger.debug("今日のガチャは既に実行済みです - ユーザーID: %s, 最後のアイテム: %s, 獲得ポイント: %s, 合計ポイント: %s", user_id, last_item, last_points, total_points)
 
                 # ポイント単位の取得
                 unit_name = next(
@@ -225,25 +263,10 @@ class GachaView(discord.ui.View):
                 # アニメーションがない場合は応答を遅延
                 await interaction.response.defer(ephemeral=True)
 
-            # ガチャ実行
-            result_item = random.choices(
-                gacha_settings.items,
-                weights=[float(item['weight']) for item in gacha_settings.items]
-            )[0]
-            
-            # 獲得ポイントを計算
-            points_to_add = int(result_item['points'])
-            print(f"[DEBUG] 獲得したポイント: {points_to_add}, アイテム: {result_item['name']}")
-
-            # キャッシュに結果を保存（その日のガチャ結果として）
-            self.bot.cache[cache_key] = {
-                'last_gacha_date': today,
-                'last_item': result_item['name'],
-                'last_points': points_to_add
-            }
+            logger.debug("獲得したポイント: %s, アイテム: %s", points_to_add, item_summary)
 
-            # ポイントを更新（通知も行われる）
-            await self.bot.point_manager.update_points(
+            # ポイントを更新し、更新後の残高を受け取る（通知も行われる）
+            current_total = await self.bot.point_manager.add_points(
                 user_id,
                 server_id,
                 points_to_add,  # 直接増加量を指定
@@ -251,9 +274,11 @@ class GachaView(discord.ui.View):
                 PointSource.GACHA,
                 username=username  # ここでユーザーネームを渡す
             )
-
-            # 更新後のポイントを取得
-            current_total = await self.bot.point_manager.get_points(server_id, user_id, point_unit_id)
+            if current_total is None:
+                await self.bot.roll_ledger.release_roll(pending_roll)
+                await self._handle_error(interaction, "ポイントの付与に失敗しました。もう一度ガチャを回してください。")
+                return
+            pending_roll = None
 
             # ロール付与チェック
             if hasattr(gacha_settings, 'roles') and gacha_settings.roles:
@@ -269,15 +294,16 @@ class GachaView(discord.ui.View):
                                     ephemeral=True
                                 )
                         except Exception as e:
-                            print(f"Failed to add role: {e}")
+                            logger.error("Failed to add role: %s", e)
 
             # 結果表示用のEmbedとViewの作成
             result_embed = await self._create_result_embed(
-                result_item, points_to_add, current_total, settings, gacha_settings, interaction, point_unit_id
+                result_item, points_to_add, current_total, settings, gacha_settings, interaction, point_unit_id,
+                item_summary=item_summary
             )
             
             # X投稿用のViewを作成
-            tweet_text = f"{gacha_settings.name}の結果！\n{result_item['name']}を獲得！\n+{points_to_add}ポイント獲得！\n"
+            tweet_text = f"{gacha_settings.name}の結果！\n{item_summary}を獲得！\n+{points_to_add}ポイント獲得！\n"
 
             # 設定からカスタムメッセージを追加（設定がある場合のみ）
             if (gacha_settings.messages and 
@@ -299,35 +325,26 @@ class GachaView(discord.ui.View):
                 # アニメーション表示後、結果で上書き
                 await interaction.edit_original_response(embed=result_embed, view=share_view)
             else:
-                # 通常の結果表示
+                # 通常の結果表示（エフェメラルのため後から削除する必要はない）
                 await interaction.followup.send(embed=result_embed, view=share_view, ephemeral=True)
 
-            # 結果送信後、メッセージを追跡用辞書に保存
-            if interaction.guild_id not in self.bot.gacha_messages:
-                self.bot.gacha_messages[interaction.guild_id] = {}
-            
-            message = await interaction.original_response()
-            self.bot.gacha_messages[interaction.guild_id][interaction.user.id] = {
-                'channel_id': interaction.channel_id,
-                'message_id': message.id
-            }
-
         except Exception as e:
-            error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
-            print(error_msg)
+            logger.error("エラーが発生しました: %s", e, exc_info=True)
+            if pending_roll is not None:
+                await self.bot.roll_ledger.release_roll(pending_roll)
             await self._handle_error(interaction, "ガチャの実行中にエラーが発生しました。")
 
 
     
     @discord.ui.button(label="ガチャ結果をXに投稿", custom_id='share_button', style=discord.ButtonStyle.secondary, emoji="🐦")
+    @instrument('button')
     async def share_to_twitter(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
             user_id = str(interaction.user.id)
             server_id = str(interaction.guild.id)
             
-            # 現在のガチャ結果をキャッシュから取得
-            cache_key = f"{user_id}_{server_id}_{self.gacha_id}_gacha_result"
-            cached_data = self.bot.cache.get(cache_key)
+            # 今日のガチャ結果を台帳から取得
+            cached_data = await self.bot.roll_ledger.get_roll(server_id, self.gacha_id, user_id)
             
             if not cached_data:
                 await interaction.response.send_message(
@@ -397,12 +414,12 @@ class GachaView(discord.ui.View):
             )
 
         except Exception as e:
-            error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
-            print(error_msg)
+            logger.error("エラーが発生しました: %s", e, exc_info=True)
             await self._handle_error(interaction, "X投稿リンクの生成中にエラーが発生しました。")
 
     # GachaViewクラスに以下のメソッドを追加
     @discord.ui.button(label="ポイントを確認", custom_id='points_button', style=discord.ButtonStyle.success)
+    @instrument('button')
     async def check_points(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
             user_id = str(interaction.user.id)
@@ -446,27 +463,18 @@ class GachaView(discord.ui.View):
                     None
                 )
                 point_unit_name = point_unit.name if point_unit else settings.global_settings.point_unit
-                total_points = await self.bot.point_manager.get_points(server_id, user_id, point_unit_id)
-
-                # このポイント種別でのランキングを取得
-                server_rankings = await self.bot.db.get_server_user_rankings(server_id)
-                filtered_rankings = [
-                    rank for rank in server_rankings 
-                    if rank.get('unit_id', '1') == point_unit_id
-                ]
             else:
                 # 単一ポイント管理の場合
+                point_unit_id = "1"
                 point_unit_name = settings.global_settings.point_unit
-                total_points = await self.bot.point_manager.get_points(server_id, user_id)
-                server_rankings = await self.bot.db.get_server_user_rankings(server_id)
-                filtered_rankings = server_rankings
 
+            total_points = await self.bot.point_manager.get_points(server_id, user_id, point_unit_id)
+
+            # このポイント種別でのランキング（サーバー/ユニット単位の索引を参照）
             total_members = interaction.guild.member_count
-            user_server_rank = next(
-                (i + 1 for i, rank in enumerate(filtered_rankings) 
-                if str(rank['user_id']) == str(user_id)),
-                len(filtered_rankings) + 1
-            )
+            user_server_rank = await self.bot.db.get_user_rank(
+                server_id, user_id, point_unit_id, points=total_points
+            ) or total_members
 
             # RANKとPOINTを大きく表示
             rank_display = f"```fix\n{user_server_rank}/{total_members}```"
@@ -505,8 +513,7 @@ class GachaView(discord.ui.View):
             await interaction.response.send_message(embed=embed, ephemeral=True)
                     
         except Exception as e:
-            error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
-            print(error_msg)
+            logger.error("エラーが発生しました: %s", e, exc_info=True)
             await self._handle_error(interaction, "ポイントの確認中にエラーが発生しました。")
 
 class Gacha(commands.Cog):
@@ -519,19 +526,10 @@ class Gacha(commands.Cog):
 
     @tasks.loop(time=datetime_time(hour=0, minute=0, tzinfo=pytz.timezone('Asia/Tokyo')))
     async def midnight_cleanup(self):
-        """午前0時にガチャ結果メッセージを削除"""
-        for guild_id, user_messages in self.bot.gacha_messages.items():
-            for user_id, data in user_messages.items():
-                try:
-                    channel = self.bot.get_channel(data['channel_id'])
-                    if channel:
-                        message = await channel.fetch_message(data['message_id'])
-                        await message.delete()
-                except Exception as e:
-                    print(f"メッセージの削除中にエラーが発生: {e}")
-
-        # 追跡用辞書をクリア
-        self.bot.gacha_messages.clear()
+        """午前0時に前日分のキャッシュを整理する"""
+        # 前日分の実行記録をキャッシュから外す（DB の記録は TTL で消える）
+        self.bot.roll_ledger.prune()
+        self.bot.fortune_ledger.prune()
 
     @midnight_cleanup.before_loop
     async def before_cleanup(self):
@@ -545,7 +543,7 @@ class Gacha(commands.Cog):
         for perm, value in required_perms.items():
             if getattr(permissions, perm, None) != value:
                 missing_perms.append(perm)
-                print(f"[ERROR] Missing permission: {perm}")
+                logger.error("Missing permission: %s", perm)
 
         return missing_perms
     
@@ -642,7 +640,7 @@ class Gacha(commands.Cog):
                                     elif child.custom_id == 'points':
                                         child.label = labels.get('points', 'ポイントを確認')
         except Exception as e:
-            print(f"Button initialization error: {e}")
+            logger.error("Button initialization error: %s", e)
 
     @app_commands.command(name="gacha_setup", description="ガチャの初期設定とパネルを設置します")
     @app_commands.checks.has_permissions(administrator=True)
@@ -651,13 +649,13 @@ class Gacha(commands.Cog):
         try:
 
             # 直接チャンネルにメッセージを送信
-            print("[DEBUG] Starting gacha panel setup...")
+            logger.debug("Starting gacha panel setup...")
 
             # サーバーIDとチャンネルIDを先に取得
             server_id = str(interaction.guild_id)
             channel_id = str(interaction.channel_id)
 
-            print(f"[DEBUG] Server ID: {server_id}, Channel ID: {channel_id}")
+            logger.debug("Server ID: %s, Channel ID: %s", server_id, channel_id)
 
             # チャンネル名を取得
             channel = interaction.channel
@@ -727,7 +725,7 @@ class Gacha(commands.Cog):
                 # 利用可能なポイントユニットがある場合は最初のものを使用
                 if settings.global_settings.point_units:
                     point_unit_id = settings.global_settings.point_units[0].unit_id
-                    print(f"[DEBUG] Selected point unit ID: {point_unit_id}")
+                    logger.debug("Selected point unit ID: %s", point_unit_id)
 
             # 新しいガチャ設定を GachaSettings 型で作成
             new_gacha = GachaSettings(
@@ -781,7 +779,7 @@ class Gacha(commands.Cog):
             try:
                 await temp_message.delete()
             except Exception as e:
-                print(f"[WARN] Failed to delete temporary message: {e}")
+                logger.warning("Failed to delete temporary message: %s", e)
 
             await interaction.followup.send(
                 f"ガチャパネルの設置が完了しました！\nポイント単位: {point_unit_name}",
@@ -790,7 +788,7 @@ class Gacha(commands.Cog):
 
         except Exception as e:
             error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
-            print(f"[ERROR] Setup failed: {error_msg}")
+            logger.error("Setup failed: %s", error_msg)
             await interaction.followup.send("ガチャパネルの設置中にエラーが発生しました。", ephemeral=True)
 
     @app_commands.command(name="gacha_panel", description="ガチャパネルを設置します")
@@ -801,17 +799,17 @@ class Gacha(commands.Cog):
         
         try:
             # 直接チャンネルにメッセージを送信
-            print("[DEBUG] Starting gacha panel setup...")
+            logger.debug("Starting gacha panel setup...")
             
             # サーバーIDとチャンネルIDを取得
             server_id = str(interaction.guild_id)
             channel_id = str(interaction.channel_id)
             
-            print(f"[DEBUG] Server ID: {server_id}, Channel ID: {channel_id}")
+            logger.debug("Server ID: %s, Channel ID: %s", server_id, channel_id)
 
             # サーバー設定を取得
             settings = await self.bot.get_server_settings(server_id)
-            print(f"[DEBUG] Server settings retrieved: {settings is not None}")
+            logger.debug("Server settings retrieved: %s", settings is not None)
 
             if not settings or not settings.gacha_settings.enabled:
                 await channel.send("このサーバーではガチャ機能が無効になっています。", delete_after=5)
@@ -824,7 +822,7 @@ class Gacha(commands.Cog):
                 None
             )
             
-            print(f"[DEBUG] Gacha settings found: {gacha_settings is not None}")
+            logger.debug("Gacha settings found: %s", gacha_settings is not None)
 
             if not gacha_settings:
                 await channel.send(
@@ -843,7 +841,7 @@ class Gacha(commands.Cog):
                 )
                 if point_unit:
                     point_unit_name = point_unit.name
-                    print(f"[DEBUG] Using point unit: {point_unit_name}")
+                    logger.debug("Using point unit: %s", point_unit_name)
 
             # パネルの作成と送信
             embed = await self._create_panel_embed(gacha_settings)
@@ -855,7 +853,7 @@ class Gacha(commands.Cog):
                     inline=False
                 )
 
-            print("[DEBUG] Sending gacha panel...")
+            logger.debug("Sending gacha panel...")
             view = GachaView(self.bot, gacha_settings.gacha_id, server_id)  # server_idを追加
             await view.initialize()  # 初期化を実行
             await channel.send(embed=embed, view=view)
@@ -871,13 +869,81 @@ class Gacha(commands.Cog):
             await asyncio.sleep(3)
             await temp_message.delete()
 
-            print("[DEBUG] Gacha panel setup completed successfully")
+            logger.debug("Gacha panel setup completed successfully")
 
         except Exception as e:
             error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
-            print(f"[ERROR] Panel setup failed: {error_msg}")
+            logger.error("Panel setup failed: %s", error_msg)
             if channel:
                 await channel.send("ガチャパネルの設置中にエラーが発生しました。", delete_after=5)
 
+    @app_commands.command(name="gacha_simulate", description="ガチャ設定でのポイント獲得をシミュレーションします")
+    @app_commands.describe(
+        days="シミュレーションする日数（最大365）",
+        users="ユーザー層ごとの人数（最大100000）",
+        gacha_name="対象のガチャ名（省略時はこのチャンネルのガチャ、なければ最初のガチャ）",
+        seed="乱数シード（同じ値なら同じ結果）"
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def gacha_simulate(
+        self,
+        interaction: discord.Interaction,
+        days: int = 30,
+        users: int = 1000,
+        gacha_name: Optional[str] = None,
+        seed: Optional[int] = None
+    ):
+        """ガチャ経済のモンテカルロシミュレーション（毎日/ときどき/たまに引くユーザー層）"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+            days = max(1, min(days, SIMULATION_MAX_DAYS))
+            users = max(1, min(users, SIMULATION_MAX_USERS))
+
+            settings = await self.bot.get_server_settings(str(interaction.guild_id))
+            if not settings or not settings.gacha_settings.gacha_list:
+                await interaction.followup.send("ガチャ設定が見つかりません。", ephemeral=True)
+                return
+
+            gacha_list = settings.gacha_settings.gacha_list
+            if gacha_name:
+                gacha_settings = next((gacha for gacha in gacha_list if gacha.name == gacha_name), None)
+            else:
+                gacha_settings = next(
+                    (gacha for gacha in gacha_list if gacha.channel_id == str(interaction.channel_id)),
+                    gacha_list[0]
+                )
+            if not gacha_settings or not gacha_settings.items:
+                await interaction.followup.send("対象のガチャ（またはアイテム設定）が見つかりません。", ephemeral=True)
+                return
+
+            point_unit_name = settings.global_settings.point_unit
+            if settings.global_settings.multiple_points_enabled:
+                point_unit_name = next(
+                    (unit.name for unit in settings.global_settings.point_units
+                    if unit.unit_id == gacha_settings.point_unit_id),
+                    point_unit_name
+                )
+
+            simulator = GachaEconomySimulator.from_settings(gacha_settings, seed=seed)
+            cohorts = default_cohorts(users)
+            # 抽選回数の上限に収まるように人数を減らす
+            draws_per_user = days * simulator.pulls_per_roll * len(cohorts)
+            if users * draws_per_user > SIMULATION_MAX_DRAWS:
+                cohorts = default_cohorts(max(1, SIMULATION_MAX_DRAWS // draws_per_user))
+            thresholds = collect_thresholds(settings, gacha_settings)
+            # CPU を使う処理なのでイベントループの外で実行
+            result = await asyncio.to_thread(simulator.run, days, cohorts, thresholds)
+            report = format_report(result, point_unit_name)
+
+            chunks = [report[i:i+1900] for i in range(0, len(report), 1900)]
+            for chunk in chunks:
+                await interaction.followup.send(f"```{chunk}```", ephemeral=True)
+
+        except ValueError as e:
+            await interaction.followup.send(f"アイテム設定に誤りがあります: {e}", ephemeral=True)
+        except Exception as e:
+            logger.error("Error in gacha_simulate: %s", e, exc_info=True)
+            await interaction.followup.send("シミュレーション中にエラーが発生しました。", ephemeral=True)
+
 async def setup(bot):
     await bot.add_cog(Gacha(bot))
\ No newline at end of file
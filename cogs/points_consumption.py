@@ -1,3 +1,4 @@
+import logging
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -5,11 +6,17 @@ import traceback
 from datetime import datetime
 import pytz
 from models.server_settings import PointConsumptionFeatureSettings, PointConsumptionModalSettings, ServerSettings, PointUnit
+from utils.migration_runner import MigrationRunner
+from utils.migrations import consumption_unit_ids
+from utils.metrics import instrument
+from utils.message_scheduler import Priority
 import asyncio
 import re
 from typing import Optional
 from decimal import Decimal
 
+logger = logging.getLogger(__name__)
+
 class PointsConsumption(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -61,7 +68,7 @@ class PointsConsumption(commands.Cog):
 
         except Exception as e:
             error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
-            print(f"[ERROR] Setup failed: {error_msg}")
+            logger.error("Setup failed: %s", error_msg)
             await interaction.followup.send(
                 "設定中にエラーが発生しました。",
                 ephemeral=True
@@ -84,25 +91,25 @@ class PointsConsumption(commands.Cog):
                 raise ValueError("Point consumption settings not found")
 
             # 既存のボットメッセージを削除
-            print("[DEBUG] Cleaning up existing messages...")
+            logger.debug("Cleaning up existing messages...")
             try:
                 async for message in channel.history(limit=100):
                     if message.author == self.bot.user:
                         try:
                             await message.delete()
-                            print(f"[DEBUG] Deleted message: {message.id}")
+                            logger.debug("Deleted message: %s", message.id)
                             await asyncio.sleep(0.5)  # Discord APIの制限を考慮
                         except Exception as e:
-                            print(f"[DEBUG] Message deletion error: {e}")
+                            logger.debug("Message deletion error: %s", e)
             except Exception as e:
-                print(f"[ERROR] Error while cleaning up messages: {e}")
+                logger.error("Error while cleaning up messages: %s", e)
 
             # パネルのメッセージを設定
             panel_title = consumption_settings.panel_title
             
             # 利用可能なポイントプールの取得
             point_units = settings.global_settings.point_units
-            print(f"[DEBUG] Found {len(point_units)} point units")
+            logger.debug("Found %s point units", len(point_units))
             
             # Embedの作成
             embed = discord.Embed(
@@ -150,8 +157,7 @@ class PointsConsumption(commands.Cog):
                 )
 
         except Exception as e:
-            print(f"[ERROR] Error in setup_consumption_panel: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in setup_consumption_panel: %s", e, exc_info=True)
             if not interaction.response.is_done():
                 await interaction.response.send_message(
                     "パネルの設置中にエラーが発生しました。",
@@ -184,7 +190,7 @@ class PointsConsumption(commands.Cog):
 
         except Exception as e:
             error_msg = f"エラーが発生しました: {str(e)}\n{traceback.format_exc()}"
-            print(f"[ERROR] Panel setup failed: {error_msg}")
+            logger.error("Panel setup failed: %s", error_msg)
             await interaction.followup.send(
                 "パネル設置中にエラーが発生しました。",
                 ephemeral=True
@@ -232,40 +238,31 @@ class PointsConsumption(commands.Cog):
             return request_data
 
         except Exception as e:
-            print(f"Error creating consumption request: {e}")
+            logger.error("Error creating consumption request: %s", e)
             return None
 
     @commands.Cog.listener()
+    @instrument('listener', 'points_consumption.on_interaction')
     async def on_interaction(self, interaction: discord.Interaction):
         """インタラクションハンドラー - デバッグログ強化版"""
         try:
             if not interaction.data or 'custom_id' not in interaction.data:
                 return
 
-            print(f"[DEBUG] Received interaction with custom_id: {interaction.data['custom_id']}")
+            logger.debug("Received interaction with custom_id: %s", interaction.data['custom_id'])
 
             # サーバー設定の取得
             settings = await self.bot.get_server_settings(str(interaction.guild_id))
-            # settings の中身を確認
-            print(f"[DEBUG] Retrieved modal_settings.fields: {settings.point_consumption_settings.modal_settings.fields}")
-            print(f"[DEBUG] wallet field directly after retrieval: {settings.point_consumption_settings.modal_settings.fields.get('wallet')}")
-
-            # 設定情報の詳細ログ
-            print(f"[DEBUG] Server settings loaded: {settings is not None}")
-            if settings:
-                print("[DEBUG] Global settings:")
-                print(f"  - Point units: {[unit.__dict__ for unit in settings.global_settings.point_units]}")
-                print(f"  - Features enabled: {settings.global_settings.features_enabled}")
-                print(f"  - Multiple points enabled: {settings.global_settings.multiple_points_enabled}")
-                
-                print("[DEBUG] Point consumption settings:")
-                if settings.point_consumption_settings:
-                    print(f"  - Enabled: {settings.point_consumption_settings.enabled}")
-                    print(f"  - Button name: {settings.point_consumption_settings.button_name}")
-                    print(f"  - Panel message: {settings.point_consumption_settings.panel_message}")
-                    print(f"  - Thread welcome message: {settings.point_consumption_settings.thread_welcome_message}")
-                else:
-                    print("  - No point consumption settings found")
+            # 設定情報の詳細ログ（DEBUG が有効な場合のみ組み立てる）
+            if settings and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Settings for %s: point_units=%s features_enabled=%s multiple_points_enabled=%s consumption=%s",
+                    interaction.guild_id,
+                    [unit.__dict__ for unit in settings.global_settings.point_units],
+                    settings.global_settings.features_enabled,
+                    settings.global_settings.multiple_points_enabled,
+                    settings.point_consumption_settings
+                )
 
             if not settings or not settings.point_consumption_settings:
                 await interaction.response.send_message(
@@ -276,23 +273,23 @@ class PointsConsumption(commands.Cog):
 
             # ボタンのカスタムID処理
             custom_id = interaction.data['custom_id']
-            print(f"[DEBUG] Processing custom_id: {custom_id}")
+            logger.debug("Processing custom_id: %s", custom_id)
 
             if custom_id.startswith('consume_points_'):
-                print("[DEBUG] Handling consume points button")
+                logger.debug("Handling consume points button")
                 await self.handle_consume_button(interaction)
                 
             elif custom_id.startswith('show_consumption_modal_'):
-                print("[DEBUG] Handling show modal button")
+                logger.debug("Handling show modal button")
                 unit_id = custom_id.split('_')[-1]
-                print(f"[DEBUG] Unit ID from custom_id: {unit_id}")
+                logger.debug("Unit ID from custom_id: %s", unit_id)
                 
                 available_points = await self.bot.point_manager.get_points(
                     str(interaction.guild_id),
                     str(interaction.user.id),
                     unit_id
                 )
-                print(f"[DEBUG] Available points: {available_points}")
+                logger.debug("Available points: %s", available_points)
                 
                 modal = PointConsumptionModal(
                     settings,
@@ -305,17 +302,16 @@ class PointsConsumption(commands.Cog):
                 await interaction.response.send_modal(modal)
                 
             elif custom_id.startswith('approve_consume_'):
-                print("[DEBUG] Handling approve button")
-                print(f"[DEBUG] Custom ID parts: {custom_id.split('_')}")
+                logger.debug("Handling approve button")
+                logger.debug("Custom ID parts: %s", custom_id.split('_'))
                 await self.handle_approve_button(interaction)
 
             elif custom_id.startswith('cancel_consume_'):
-                print("[DEBUG] Handling cancel button")
+                logger.debug("Handling cancel button")
                 await self.handle_cancel_button(interaction)
 
         except Exception as e:
-            print(f"[ERROR] Error in on_interaction: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in on_interaction: %s", e, exc_info=True)
             if not interaction.response.is_done():
                 await interaction.response.send_message(
                     "エラーが発生しました。",
@@ -329,16 +325,17 @@ class PointsConsumption(commands.Cog):
     #             return thread
     #     return None
 
+    @instrument('button', 'consume_points')
     async def handle_consume_button(self, interaction: discord.Interaction):
         """ポイント消費ボタンのハンドラー - デバッグログ追加版"""
         try:
-            print(f"[DEBUG] Starting handle_consume_button for user {interaction.user.id}")
-            print(f"[DEBUG] Custom ID: {interaction.data.get('custom_id')}")
+            logger.debug("Starting handle_consume_button for user %s", interaction.user.id)
+            logger.debug("Custom ID: %s", interaction.data.get('custom_id'))
             
             # サーバー設定を取得
             settings = await self.bot.get_server_settings(str(interaction.guild_id))
-            print(f"[DEBUG] Server settings retrieved: {settings is not None}")
-            print(f"[DEBUG] Point consumption settings: {settings.point_consumption_settings is not None if settings else False}")
+            logger.debug("Server settings retrieved: %s", settings is not None)
+            logger.debug("Point consumption settings: %s", settings.point_consumption_settings is not None if settings else False)
 
             if not settings or not settings.point_consumption_settings:
                 await interaction.response.send_message(
@@ -349,17 +346,17 @@ class PointsConsumption(commands.Cog):
 
             # カスタムIDからポイントユニットIDを抽出
             unit_id = interaction.data['custom_id'].split('_')[-1]
-            print(f"[DEBUG] Extracted unit_id: {unit_id}")
+            logger.debug("Extracted unit_id: %s", unit_id)
             
             # ポイントユニット情報の取得
             point_units = settings.global_settings.point_units
-            print(f"[DEBUG] Available point units: {[unit.__dict__ for unit in point_units]}")
+            logger.debug("Available point units: %s", point_units)
             
             point_unit = next(
                 (unit for unit in settings.global_settings.point_units if unit.unit_id == unit_id),
                 None
             )
-            print(f"[DEBUG] Found point unit: {point_unit.__dict__ if point_unit else None}")
+            logger.debug("Found point unit: %s", point_unit)
 
             if not point_unit:
                 await interaction.response.send_message(
@@ -371,19 +368,19 @@ class PointsConsumption(commands.Cog):
             consumption_settings = settings.point_consumption_settings
             # スレッド名の生成
             thread_name = f"{interaction.user.name}-{point_unit.name}-{consumption_settings.panel_title}"
-            print(f"[DEBUG] Generated thread name: {thread_name}")
+            logger.debug("Generated thread name: %s", thread_name)
 
             # 既存スレッドの検索
             existing_threads = [t for t in interaction.guild.threads if not t.archived]
-            print(f"[DEBUG] Found {len(existing_threads)} active threads")
+            logger.debug("Found %s active threads", len(existing_threads))
             # print(f"[DEBUG] Active thread names: {[t.name for t in existing_threads]}")
             
             existing_thread = None
             for thread in existing_threads:
-                print(f"[DEBUG] Checking thread: {thread.name}")
+                logger.debug("Checking thread: %s", thread.name)
                 if thread.name == thread_name:
                     existing_thread = thread
-                    print(f"[DEBUG] Found matching thread: {thread.id}")
+                    logger.debug("Found matching thread: %s", thread.id)
                     break
 
             # 利用可能ポイントの取得
@@ -392,7 +389,7 @@ class PointsConsumption(commands.Cog):
                 str(interaction.user.id),
                 unit_id
             )
-            print(f"[DEBUG] Available points for user: {available_points}")
+            logger.debug("Available points for user: %s", available_points)
 
             # ウェルカムメッセージの準備
             message = consumption_settings.thread_welcome_message.format(
@@ -400,7 +397,7 @@ class PointsConsumption(commands.Cog):
                 points=available_points,
                 unit=point_unit.name
             )
-            print(f"[DEBUG] Prepared welcome message")
+            logger.debug("Prepared welcome message")
 
             # 申請ボタンの作成
             view = discord.ui.View()
@@ -410,10 +407,10 @@ class PointsConsumption(commands.Cog):
                 custom_id=f"show_consumption_modal_{unit_id}"
             )
             view.add_item(modal_button)
-            print(f"[DEBUG] Created modal button with custom_id: {modal_button.custom_id}")
+            logger.debug("Created modal button with custom_id: %s", modal_button.custom_id)
 
             if existing_thread:
-                print(f"[DEBUG] Using existing thread: {existing_thread.id}")
+                logger.debug("Using existing thread: %s", existing_thread.id)
                 await interaction.response.send_message(
                     f"既存のポイント消費申請スレッドが見つかりました。\n{existing_thread.jump_url}",
                     ephemeral=True
@@ -422,16 +419,16 @@ class PointsConsumption(commands.Cog):
                 return
 
             # プライベートスレッドの作成
-            print(f"[DEBUG] Creating new thread in channel: {interaction.channel.id}")
+            logger.debug("Creating new thread in channel: %s", interaction.channel.id)
             try:
                 thread = await interaction.channel.create_thread(
                     name=thread_name,
                     auto_archive_duration=1440,
                     type=discord.ChannelType.private_thread
                 )
-                print(f"[DEBUG] Successfully created thread: {thread.id}")
+                logger.debug("Successfully created thread: %s", thread.id)
             except Exception as e:
-                print(f"[DEBUG] Error creating thread: {e}")
+                logger.error("Error creating thread: %s", e)
                 raise
 
             # スレッドの初期化を待つ
@@ -440,26 +437,26 @@ class PointsConsumption(commands.Cog):
             # スレッドのセットアップ
             try:
                 await thread.add_user(interaction.user)
-                print(f"[DEBUG] Added user {interaction.user.id} to thread")
+                logger.debug("Added user %s to thread", interaction.user.id)
 
                 # 承認ロールを持つメンバーを追加
                 if consumption_settings.approval_roles:
-                    print(f"[DEBUG] Adding members with approval roles: {consumption_settings.approval_roles}")
+                    logger.debug("Adding members with approval roles: %s", consumption_settings.approval_roles)
                     for member in interaction.guild.members:
                         member_role_ids = [str(role.id) for role in member.roles]
                         if any(role_id in consumption_settings.approval_roles for role_id in member_role_ids):
                             try:
                                 await thread.add_user(member)
-                                print(f"[DEBUG] Added approver {member.id} to thread")
+                                logger.debug("Added approver %s to thread", member.id)
                             except Exception as e:
-                                print(f"[DEBUG] Failed to add member {member.id} to thread: {e}")
+                                logger.warning("Failed to add member %s to thread: %s", member.id, e)
                                 continue
             except Exception as e:
-                print(f"[DEBUG] Error in thread setup: {e}")
+                logger.error("Error in thread setup: %s", e)
                 raise
 
             # 通知の送信
-            print(f"[DEBUG] Sending thread creation notification")
+            logger.debug("Sending thread creation notification")
             await interaction.response.send_message(
                 f"ポイント消費申請用のスレッドを作成しました。\n{thread.jump_url}",
                 ephemeral=True
@@ -467,16 +464,15 @@ class PointsConsumption(commands.Cog):
 
             # ウェルカムメッセージの送信
             try:
-                print(f"[DEBUG] Sending welcome message to thread")
+                logger.debug("Sending welcome message to thread")
                 await thread.send(message, view=view)
             except discord.errors.HTTPException as e:
-                print(f"[DEBUG] HTTP error sending welcome message: {e}")
+                logger.debug("HTTP error sending welcome message: %s", e)
                 await asyncio.sleep(1)
                 await thread.send(message, view=view)
 
         except Exception as e:
-            print(f"[ERROR] Error in handle_consume_button: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in handle_consume_button: %s", e, exc_info=True)
             if not interaction.response.is_done():
                 await interaction.response.send_message(
                     "エラーが発生しました。",
@@ -508,58 +504,25 @@ class PointsConsumption(commands.Cog):
         """
         try:
             if settings.global_settings.multiple_points_enabled:
-                print(f"[WARNING] Server {server_id} has multiple points enabled. Manual unit_id mapping required.")
+                logger.warning("Server %s has multiple points enabled. Manual unit_id mapping required.", server_id)
                 return False
 
-            # まず全てのデータを取得
-            all_records = await asyncio.to_thread(
-                self.bot.db.point_consumption_history_table.scan,
-                FilterExpression='server_id = :sid',
-                ExpressionAttributeValues={
-                    ':sid': server_id
-                }
-            )
-
-            if not all_records.get('Items'):
-                return True  # データが存在しない場合は成功扱い
-
-            # unit_idが存在しないレコードを抽出
-            records_to_update = [
-                record for record in all_records['Items']
-                if 'unit_id' not in record
-            ]
-
-            if not records_to_update:
-                return True  # 更新が必要なレコードが存在しない場合は成功扱い
-
             # デフォルトのunit_idを取得
             default_unit_id = settings.global_settings.point_units[0].unit_id if settings.global_settings.point_units else "1"
 
-            # 各レコードを更新
-            for record in records_to_update:
-                try:
-                    await asyncio.to_thread(
-                        self.bot.db.point_consumption_history_table.update_item,
-                        Key={
-                            'server_id': server_id,
-                            'timestamp': record['timestamp']
-                        },
-                        UpdateExpression="SET unit_id = :uid",
-                        ExpressionAttributeValues={
-                            ':uid': default_unit_id
-                        }
-                    )
-                    print(f"[DEBUG] Updated record {record['timestamp']} with unit_id: {default_unit_id}")
-                except Exception as e:
-                    print(f"[ERROR] Failed to update record {record['timestamp']}: {e}")
-                    continue
+            # サーバーのパーティションだけをクエリして補完（全件の補完は batch/run_migration.py）
+            runner = MigrationRunner(self.bot.db.executor.run)
+            totals = await runner.run(consumption_unit_ids(self.bot.db, server_id, default_unit_id))
+            if totals['updated']:
+                logger.debug("Updated %s records with unit_id: %s", totals['updated'], default_unit_id)
 
             return True
 
         except Exception as e:
-            print(f"[ERROR] Error updating missing unit_ids: {e}")
+            logger.error("Error updating missing unit_ids: %s", e)
             return False
 
+    @instrument('button', 'approve_consume')
     async def handle_approve_button(self, interaction: discord.Interaction):
         """承認ボタンのハンドラー"""
         # print("[DEBUG] Starting approval process")
@@ -575,7 +538,7 @@ class PointsConsumption(commands.Cog):
             # print(f"[DEBUG] Retrieved server settings: {settings is not None}")
             # print(f"[DEBUG] Point consumption settings: {settings.point_consumption_settings is not None if settings else False}")
             if not settings or not settings.point_consumption_settings:
-                print("[DEBUG] Settings not found")
+                logger.debug("Settings not found")
                 await interaction.followup.send(
                     "設定が見つかりません。管理者にお問い合わせください。",
                     ephemeral=True
@@ -600,15 +563,23 @@ class PointsConsumption(commands.Cog):
                 )
                 return
 
-            # カスタムIDから情報を抽出
+            # カスタムIDから対象の申請を取得
             try:
-                user_id, points, unit_id, wallet_address = self._parse_button_custom_id(interaction.data['custom_id'])
+                request = await self._resolve_consumption_request(interaction, settings)
+                logger.debug("Pending request: %s", request)
+                if not request or request.get('status') != 'pending':
+                    logger.debug("No matching request found in database")
+                    await interaction.followup.send(
+                        "リクエストが見つかりません。申請が既に処理されているか、期限切れの可能性があります。",
+                        ephemeral=True
+                    )
+                    return
+
+                user_id = str(request['user_id'])
+                points = int(request['points'])
+                unit_id = str(request.get('unit_id'))
+                wallet_address = request.get('wallet_address')
 
-                # print(f"[DEBUG] Parsed button data:")
-                # print(f"  user_id: {user_id}")
-                # print(f"  points: {points}")
-                # print(f"  unit_id: {unit_id}")
-                
                 # ポイントユニット情報の取得
                 point_unit = next(
                     (unit for unit in settings.global_settings.point_units if unit.unit_id == unit_id),
@@ -637,16 +608,28 @@ class PointsConsumption(commands.Cog):
             async with await self._get_consumption_lock(user_id, unit_id):
                 # print("[DEBUG] Lock acquired")
 
-                # unit_idの補完を実行
-                await self.update_missing_unit_ids(str(interaction.guild_id), settings)
+                # 申請を pending → approved に条件付きで更新（同時に押された場合は1回だけ成功）
+                claimed = await self.bot.db.update_consumption_status(
+                    str(interaction.guild_id),
+                    request['timestamp'],
+                    'approved',
+                    str(interaction.user.id),
+                    expected_status='pending'
+                )
+                if not claimed:
+                    await interaction.followup.send(
+                        "リクエストが見つかりません。申請が既に処理されているか、期限切れの可能性があります。",
+                        ephemeral=True
+                    )
+                    return
                 
                 # ポイント消費実行
-                print(f"[DEBUG] Executing point consumption:")
-                print(f"  user_id: {user_id}")
-                print(f"  server_id: {str(interaction.guild_id)}")
-                print(f"  points: {-points}")
-                print(f"  unit_id: {unit_id}")
-                print(f"  source: {str(interaction.user.id)}")
+                logger.debug("Executing point consumption:")
+                logger.debug("user_id: %s", user_id)
+                logger.debug("server_id: %s", str(interaction.guild_id))
+                logger.debug("points: %s", -points)
+                logger.debug("unit_id: %s", unit_id)
+                logger.debug("source: %s", str(interaction.user.id))
                 
                 success = await self.bot.point_manager.consume_points(
                     user_id=user_id,
@@ -658,120 +641,75 @@ class PointsConsumption(commands.Cog):
                 )
                 # print(f"[DEBUG] Point consumption result: {success}")
 
-                if success:
-                    # print("[DEBUG] Point consumption successful, updating history")
-                    # # 履歴のステータス更新
-                    # print(f"[DEBUG] Executing database scan with params:")
-                    # print(f"  server_id: {str(interaction.guild_id)}")
-                    # print(f"  user_id: {user_id}")
-                    # print(f"  status: pending")
-                    # print(f"  points: {points}")
-                    # print(f"  unit_id: {unit_id}")
-
-                    # まず条件なしでスキャンして全データを確認
-                    all_items = await asyncio.to_thread(
-                        self.bot.db.point_consumption_history_table.scan
+                if not success:
+                    # 消費できなかった申請は保留中に戻す
+                    await self.bot.db.update_consumption_status(
+                        str(interaction.guild_id),
+                        request['timestamp'],
+                        'pending',
+                        str(interaction.user.id),
+                        reason='consume_failed',
+                        expected_status='approved'
                     )
-                    # print("\n[DEBUG] === All records in database ===")
-                    for item in all_items.get('Items', []):
-                        print(f"Record: {item}")
-                    
-                    response = await asyncio.to_thread(
-                        self.bot.db.point_consumption_history_table.scan,
-                        FilterExpression='server_id = :sid AND user_id = :uid AND #status = :status AND points = :p AND unit_id = :unit_id',  # :points を :p に変更
-                        ExpressionAttributeNames={'#status': 'status'},
-                        ExpressionAttributeValues={
-                            ':sid': str(interaction.guild_id),
-                            ':uid': user_id,
-                            ':status': 'pending',
-                            ':p': Decimal(str(points)),
-                            ':unit_id': unit_id
-                        }
+                    await interaction.followup.send(
+                        "ポイントの消費に失敗しました。ユーザーの残高を確認してください。",
+                        ephemeral=True
                     )
+                    return
 
-                    # print(f"\n[DEBUG] === Scan results ===")
-                    # print(f"  Found items: {len(response.get('Items', []))}")
-                    # 見つかった各レコードの詳細をログに出力
-                    for idx, item in enumerate(response.get('Items', [])):
-                        print(f"\n[DEBUG] Record {idx + 1}:")
-                        print(f"  Server ID: {item.get('server_id')}")
-                        print(f"  User ID: {item.get('user_id')}")
-                        print(f"  Points: {item.get('points')}")
-                        print(f"  Unit ID: {item.get('unit_id')}")
-                        print(f"  Status: {item.get('status')}")
-                        print(f"  Timestamp: {item.get('timestamp')}")
-
-                    print(f"[DEBUG] Database scan response:")
-                    print(f"  Result: {response}")
-                    if not response.get('Items'):  # NOT演算子を追加
-                        print("[DEBUG] No matching request found in database")
-                        await interaction.followup.send(
-                            "リクエストが見つかりません。申請が既に処理されているか、期限切れの可能性があります。",
-                            ephemeral=True
-                        )
-                        return
+                # ウォレットアドレス・メールアドレスをプロフィールに保存（次回のモーダル初期値）
+                await self.bot.profile_manager.record_approval(
+                    str(interaction.guild_id),
+                    user_id,
+                    wallet_address=wallet_address,
+                    email=request.get('email')
+                )
 
-                    # リクエストが見つかった場合の処理
-                    latest_request = sorted(
-                        response['Items'],
-                        key=lambda x: x['timestamp'],
-                        reverse=True
-                    )[0]
-                    
-                    # print("[DEBUG] Updating consumption status")
-                    await self.bot.db.update_consumption_status(
-                        str(interaction.guild_id),
-                        latest_request['timestamp'],
-                        'approved',
-                        str(interaction.user.id)
-                    )
+                # メッセージ削除
+                try:
+                    logger.debug("Attempting to delete approval message")
+                    await interaction.message.delete()
+                except Exception as e:
+                    logger.error("Failed to delete approval message: %s", e)
 
-                    # メッセージ削除
-                    try:
-                        print("[DEBUG] Attempting to delete approval message")
-                        await interaction.message.delete()
-                    except Exception as e:
-                        print(f"[ERROR] Failed to delete approval message: {e}")
-
-                    # 完了メッセージ送信
-                    if consumption_settings.completion_message_enabled:
-                        # print("[DEBUG] Sending completion message")
-                        message = consumption_settings.completion_message.format(
-                            user=f"<@{user_id}>",
-                            points=points,
-                            unit=point_unit.name,
-                            admin=interaction.user.mention
-                        )
-                        # print(f"[DEBUG] Completion message: {message}")
-                        await interaction.channel.send(message)
-
-                    # 履歴の記録
-                    if consumption_settings.history_enabled and consumption_settings.history_channel_id:
-                        # print("[DEBUG] Recording consumption history")
-                        await self.log_consumption(
-                            interaction.guild_id,
-                            {
-                                'user_id': user_id,
-                                'points': points,
-                                'admin_id': str(interaction.user.id),
-                            },
-                            settings
-                        )
+                # 完了メッセージ送信
+                if consumption_settings.completion_message_enabled:
+                    # print("[DEBUG] Sending completion message")
+                    message = consumption_settings.completion_message.format(
+                        user=f"<@{user_id}>",
+                        points=points,
+                        unit=point_unit.name,
+                        admin=interaction.user.mention
+                    )
+                    # print(f"[DEBUG] Completion message: {message}")
+                    self.bot.message_scheduler.send(interaction.channel, message, priority=Priority.INTERACTIVE)
+
+                # 履歴の記録
+                if consumption_settings.history_enabled and consumption_settings.history_channel_id:
+                    # print("[DEBUG] Recording consumption history")
+                    await self.log_consumption(
+                        interaction.guild_id,
+                        {
+                            'user_id': user_id,
+                            'points': points,
+                            'admin_id': str(interaction.user.id),
+                        },
+                        settings
+                    )
 
-                    # print("[DEBUG] Sending success message")
-                    # 承認処理完了後のメッセージ送信
-                    try:
-                        await interaction.followup.send("承認処理が完了しました。", ephemeral=True)
-                    except discord.NotFound:
-                        # Webhookが見つからない場合は、チャンネルに直接メッセージを送信
-                        await interaction.channel.send(
-                            f"{interaction.user.mention} 承認処理が完了しました。",
-                            ephemeral=True
-                        )
+                # print("[DEBUG] Sending success message")
+                # 承認処理完了後のメッセージ送信
+                try:
+                    await interaction.followup.send("承認処理が完了しました。", ephemeral=True)
+                except discord.NotFound:
+                    # Webhookが見つからない場合は、チャンネルに直接メッセージを送信
+                    await interaction.channel.send(
+                        f"{interaction.user.mention} 承認処理が完了しました。",
+                        ephemeral=True
+                    )
 
         except Exception as e:
-            print(f"[ERROR] Exception in approve button: {e}")
-            print(f"[ERROR] Traceback: {traceback.format_exc()}")
+            logger.error("Exception in approve button: %s", e, exc_info=True)
             await interaction.followup.send(
                 "エラーが発生しました。管理者にお問い合わせください。",
                 ephemeral=True
@@ -784,68 +722,73 @@ class PointsConsumption(commands.Cog):
             self._consumption_locks[lock_key] = asyncio.Lock()
         return self._consumption_locks[lock_key]
 
+    @instrument('button', 'cancel_consume')
     async def handle_cancel_button(self, interaction: discord.Interaction):
         """キャンセルボタンのハンドラー"""
-        print("[DEBUG] === Cancel button handler started ===")
+        logger.debug("=== Cancel button handler started ===")
         try:
             await interaction.response.defer(ephemeral=True)
 
-            print("[DEBUG] === Server Settings Retrieval ===")
+            logger.debug("=== Server Settings Retrieval ===")
             # サーバー設定の取得
             settings = await self.bot.get_server_settings(str(interaction.guild_id))
-            print(f"[DEBUG] Settings retrieved: {settings is not None}")
-            print(f"[DEBUG] Settings type: {type(settings)}")
-            print(f"[DEBUG] Point consumption settings exists: {settings.point_consumption_settings is not None if settings else False}")
+            logger.debug("Settings retrieved: %s", settings is not None)
+            logger.debug("Settings type: %s", type(settings))
+            logger.debug("Point consumption settings exists: %s", settings.point_consumption_settings is not None if settings else False)
 
             if not settings or not settings.point_consumption_settings:
-                print("[DEBUG] Settings validation failed")
+                logger.debug("Settings validation failed")
                 await interaction.followup.send(
                     "設定が見つかりません。",
                     ephemeral=True
                 )
                 return
 
-            print("[DEBUG] === Permission Check ===")
+            logger.debug("=== Permission Check ===")
             consumption_settings = settings.point_consumption_settings
-            print(f"[DEBUG] Consumption settings type: {type(consumption_settings)}")
+            logger.debug("Consumption settings type: %s", type(consumption_settings))
 
             # 承認権限チェック
             has_permission = await self.check_approval_permission(
                 interaction,
                 consumption_settings
             )
-            print(f"[DEBUG] Permission check result: {has_permission}")
+            logger.debug("Permission check result: %s", has_permission)
             
             if not has_permission:
-                print("[DEBUG] Permission check failed")
+                logger.debug("Permission check failed")
                 await interaction.followup.send(
                     "このアクションを実行する権限がありません。",
                     ephemeral=True
                 )
                 return
 
-            print("[DEBUG] === Custom ID Parsing ===")
-            # カスタムIDから情報を抽出
+            logger.debug("=== Request Lookup ===")
+            # カスタムIDから対象の申請を取得
             try:
-                custom_id = interaction.data['custom_id']
-                print(f"[DEBUG] Raw custom_id: {custom_id}")
-                user_id, points, unit_id, wallet_address = self._parse_button_custom_id(custom_id)
-                print(f"[DEBUG] Parsed data:")
-                print(f"  user_id: {user_id}")
-                print(f"  points: {points}")
-                print(f"  unit_id: {unit_id}")
-                print(f"  wallet_address: {wallet_address}")
-
-                print("[DEBUG] === Point Unit Validation ===")
+                request = await self._resolve_consumption_request(interaction, settings)
+                logger.debug("Request: %s", request)
+                if not request or request.get('status') != 'pending':
+                    logger.debug("No matching requests found")
+                    await interaction.followup.send(
+                        "対象の申請が見つかりません。",
+                        ephemeral=True
+                    )
+                    return
+
+                user_id = str(request['user_id'])
+                points = int(request['points'])
+                unit_id = str(request.get('unit_id'))
+
+                logger.debug("=== Point Unit Validation ===")
                 point_unit = next(
                     (unit for unit in settings.global_settings.point_units if unit.unit_id == unit_id),
                     None
                 )
-                print(f"[DEBUG] Found point unit: {point_unit}")
-                print(f"[DEBUG] Point unit type: {type(point_unit)}")
+                logger.debug("Found point unit: %s", point_unit)
                 
                 if not point_unit:
-                    print("[DEBUG] Point unit validation failed")
+                    logger.debug("Point unit validation failed")
                     await interaction.followup.send(
                         "無効なポイントプールです。",
                         ephemeral=True
@@ -853,113 +796,70 @@ class PointsConsumption(commands.Cog):
                     return
                     
             except ValueError as e:
-                print(f"[ERROR] Custom ID parsing failed: {e}")
+                logger.error("Custom ID parsing failed: %s", e)
                 await interaction.followup.send(
                     "無効なボタンデータです。",
                     ephemeral=True
                 )
                 return
             except Exception as e:
-                print(f"[ERROR] Unexpected error in custom ID processing: {e}")
-                print(f"[ERROR] Traceback: {traceback.format_exc()}")
+                logger.error("Unexpected error in custom ID processing: %s", e, exc_info=True)
                 await interaction.followup.send(
                     "データの処理中にエラーが発生しました。",
                     ephemeral=True
                 )
                 return
 
-            print("[DEBUG] === Database Operations ===")
-            # 対象の申請を検索
-            print("[DEBUG] Starting database scan...")
+            logger.debug("=== Database Operations ===")
             try:
-                scan_params = {
-                    'FilterExpression': 'server_id = :sid AND user_id = :uid AND #status = :status AND points = :p AND unit_id = :unit_id',
-                    'ExpressionAttributeNames': {'#status': 'status'},
-                    'ExpressionAttributeValues': {
-                        ':sid': str(interaction.guild_id),
-                        ':uid': user_id,
-                        ':status': 'pending',
-                        ':p': Decimal(str(points)),
-                        ':unit_id': unit_id
-                    }
-                }
-                print(f"[DEBUG] Scan parameters: {scan_params}")
-
-                response = await asyncio.to_thread(
-                    self.bot.db.point_consumption_history_table.scan,
-                    **scan_params
+                logger.debug("=== Delete Operations ===")
+                # 申請を削除（保留中のままの場合のみ）
+                deleted = await self.bot.db.delete_consumption_request(
+                    str(interaction.guild_id),
+                    request['timestamp'],
+                    expected_status='pending'
                 )
-
-                print(f"[DEBUG] Database response type: {type(response)}")
-                print(f"[DEBUG] Database response keys: {response.keys() if response else 'None'}")
-                print(f"[DEBUG] Found items: {len(response.get('Items', []))}")
-
-                if not response.get('Items'):
-                    print("[DEBUG] No matching requests found")
+                if not deleted:
                     await interaction.followup.send(
                         "対象の申請が見つかりません。",
                         ephemeral=True
                     )
                     return
-
-                # 最新の申請を取得
-                latest_request = sorted(
-                    response['Items'],
-                    key=lambda x: x['timestamp'],
-                    reverse=True
-                )[0]
-                print(f"[DEBUG] Latest request: {latest_request}")
-
-                print("[DEBUG] === Delete Operations ===")
-                # 申請を削除
-                delete_params = {
-                    'Key': {
-                        'server_id': str(interaction.guild_id),
-                        'timestamp': latest_request['timestamp']
-                    }
-                }
-                print(f"[DEBUG] Delete parameters: {delete_params}")
-
-                await asyncio.to_thread(
-                    self.bot.db.point_consumption_history_table.delete_item,
-                    **delete_params
-                )
-                print("[DEBUG] Database delete operation completed")
+                logger.debug("Database delete operation completed")
 
                 # メッセージ削除
                 try:
-                    print("[DEBUG] Attempting to delete interaction message")
+                    logger.debug("Attempting to delete interaction message")
                     await interaction.message.delete()
-                    print("[DEBUG] Message deletion successful")
+                    logger.debug("Message deletion successful")
                 except Exception as e:
-                    print(f"[ERROR] Message deletion failed: {e}")
-                    print(f"[ERROR] Message deletion traceback: {traceback.format_exc()}")
+                    logger.error("Message deletion failed: %s", e)
+                    logger.error("Message deletion traceback:", exc_info=True)
 
-                print("[DEBUG] === Completion Message ===")
+                logger.debug("=== Completion Message ===")
                 # 完了メッセージ送信
                 if consumption_settings.completion_message_enabled:
                     message = f"<@{user_id}>の{points}{point_unit.name}消費申請がキャンセルされました。"
-                    print(f"[DEBUG] Sending completion message: {message}")
-                    await interaction.channel.send(message)
+                    logger.debug("Sending completion message: %s", message)
+                    self.bot.message_scheduler.send(interaction.channel, message, priority=Priority.INTERACTIVE)
 
-                print("[DEBUG] === Final Response ===")
+                logger.debug("=== Final Response ===")
                 await interaction.followup.send(
                     "キャンセルが完了しました。",
                     ephemeral=True
                 )
-                print("[DEBUG] === Cancel button handler completed ===")
+                logger.debug("=== Cancel button handler completed ===")
 
             except Exception as db_error:
-                print(f"[ERROR] Database operation failed: {db_error}")
-                print(f"[ERROR] Database error traceback: {traceback.format_exc()}")
+                logger.error("Database operation failed: %s", db_error)
+                logger.error("Database error traceback:", exc_info=True)
                 await interaction.followup.send(
                     "データベース操作中にエラーが発生しました。",
                     ephemeral=True
                 )
 
         except Exception as e:
-            print(f"[ERROR] Top level error in cancel button handler: {e}")
-            print(f"[ERROR] Full error traceback: {traceback.format_exc()}")
+            logger.error("Top level error in cancel button handler: %s", e, exc_info=True)
             await interaction.followup.send(
                 "予期しないエラーが発生しました。",
                 ephemeral=True
@@ -972,19 +872,19 @@ class PointsConsumption(commands.Cog):
 
             # history_channel_id が設定されていない、または history_enabled が False の場合は終了
             if not consumption_settings.history_enabled:
-                print("[DEBUG] History logging is disabled")
+                logger.debug("History logging is disabled")
                 return
                 
             if not consumption_settings.history_channel_id:
-                print("[DEBUG] No history channel configured")
+                logger.debug("No history channel configured")
                 return
 
             # チャンネルの取得
             channel = self.bot.get_channel(int(consumption_settings.history_channel_id))
-            print(f"[DEBUG] Using history channel: {consumption_settings.history_channel_id}")
+            logger.debug("Using history channel: %s", consumption_settings.history_channel_id)
 
             if not channel:
-                print(f"[WARNING] History channel not found: {consumption_settings.history_channel_id}")
+                logger.warning("History channel not found: %s", consumption_settings.history_channel_id)
                 return
 
             # 権限チェック
@@ -993,11 +893,11 @@ class PointsConsumption(commands.Cog):
             
             # 必要な権限のチェック
             if not channel_permissions.send_messages:
-                print(f"[WARNING] Bot lacks 'Send Messages' permission in channel {channel.id}")
+                logger.warning("Bot lacks 'Send Messages' permission in channel %s", channel.id)
                 return
                 
             if not channel_permissions.embed_links:
-                print(f"[WARNING] Bot lacks 'Embed Links' permission in channel {channel.id}")
+                logger.warning("Bot lacks 'Embed Links' permission in channel %s", channel.id)
                 return
 
             # ログを送信
@@ -1015,14 +915,41 @@ class PointsConsumption(commands.Cog):
                 inline=True
             )
 
-            await channel.send(embed=embed)
+            self.bot.message_scheduler.send(channel, embed=embed)
 
         except discord.Forbidden as e:
-            print(f"[ERROR] Forbidden error while sending log: {e}")
-            print(f"Bot lacks required permissions in channel {consumption_settings.history_channel_id}")
+            logger.error("Forbidden error while sending log: %s", e)
+            logger.debug("Bot lacks required permissions in channel %s", consumption_settings.history_channel_id)
         except Exception as e:
-            print(f"[ERROR] Error logging consumption: {e}")
-            print(traceback.format_exc())
+            logger.error("Error logging consumption: %s", e, exc_info=True)
+
+    async def _resolve_consumption_request(self, interaction: discord.Interaction, settings: ServerSettings) -> Optional[dict]:
+        """
+        承認・キャンセルボタンの custom_id から対象の消費リクエストを取得
+
+        - 新形式 {prefix}{request_id}: キー指定の1回の読み込み
+        - 旧形式 {prefix}{user}_{points}_{unit}_{wallet}: サーバー+ステータス索引から最新の保留中申請を検索
+        """
+        custom_id = interaction.data['custom_id']
+        server_id = str(interaction.guild_id)
+
+        request_id = self._parse_request_id(custom_id)
+        if request_id:
+            return await self.bot.db.get_consumption_request(server_id, request_id)
+
+        user_id, points, unit_id, wallet_address = self._parse_button_custom_id(custom_id)
+        # 旧形式の申請は unit_id を持たない場合があるため補完してから検索
+        await self.update_missing_unit_ids(server_id, settings)
+        return await self.bot.db.find_latest_pending_consumption(server_id, user_id, points, unit_id)
+
+    def _parse_request_id(self, custom_id: str) -> Optional[str]:
+        """新形式のカスタムIDから消費リクエストIDを取り出す（旧形式の場合はNone）"""
+        for prefix in ("approve_consume_", "cancel_consume_"):
+            if custom_id.startswith(prefix):
+                request_id = custom_id[len(prefix):]
+                # 消費リクエストID（ISO形式のタイムスタンプ）は '_' を含まない
+                return request_id if request_id and '_' not in request_id else None
+        return None
 
     def _parse_button_custom_id(self, custom_id: str) -> tuple:
         """ボタンのカスタムIDからユーザーID、ポイント、ユニットIDを抽出 - 改善版"""
@@ -1034,39 +961,18 @@ class PointsConsumption(commands.Cog):
             user_id, points, unit_id, wallet_address = data
             return user_id, int(points), unit_id, wallet_address
         except Exception as e:
-            print(f"[ERROR] Failed to parse custom_id {custom_id}: {e}")
+            logger.error("Failed to parse custom_id %s: %s", custom_id, e)
             raise ValueError(f"Invalid custom_id format: {custom_id}")
     
 class PointConsumptionModal(discord.ui.Modal):
     @classmethod
     async def get_latest_wallet_address(cls, bot, server_id: str, user_id: str) -> Optional[str]:
-        """ユーザーの最新の承認済みウォレットアドレスを取得"""
+        """ユーザーの最新の承認済みウォレットアドレスを取得（プロフィールのキャッシュ経由）"""
         try:
-            response = await asyncio.to_thread(
-                bot.db.point_consumption_history_table.scan,
-                FilterExpression='server_id = :sid AND user_id = :uid AND #status = :status AND attribute_exists(wallet_address)',
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={
-                    ':sid': server_id,
-                    ':uid': user_id,
-                    ':status': 'approved'
-                }
-            )
-            
-            if not response.get('Items'):
-                return None
-                
-            # タイムスタンプでソートして最新のウォレットアドレスを取得
-            latest_record = sorted(
-                response['Items'],
-                key=lambda x: x['timestamp'],
-                reverse=True
-            )[0]
-            
-            return latest_record.get('wallet_address')
+            return await bot.profile_manager.get_wallet_address(server_id, user_id)
             
         except Exception as e:
-            print(f"[ERROR] Failed to get wallet address: {e}")
+            logger.error("Failed to get wallet address: %s", e)
             return None
 
     @classmethod
@@ -1108,38 +1014,38 @@ class PointConsumptionModal(discord.ui.Modal):
         # super().__init__(title=settings.point_consumption_settings.modal_settings.title)
 
         # 詳細な設定の検証とデバッグログ
-        print("[DEBUG] === Modal Initialization Start ===")
-        print(f"[DEBUG] Raw settings object: {settings}")
+        logger.debug("=== Modal Initialization Start ===")
+        logger.debug("Raw settings object: %s", settings)
         
         # 基本設定の存在チェック
         if not settings:
-            print("[ERROR] Settings object is None")
+            logger.error("Settings object is None")
             raise ValueError("Server settings object is missing")
 
         if not settings.point_consumption_settings:
-            print("[ERROR] Point consumption settings is None")
+            logger.error("Point consumption settings is None")
             raise ValueError("Point consumption settings is missing")
 
         if not hasattr(settings.point_consumption_settings, 'modal_settings'):
-            print("[ERROR] Modal settings attribute is missing")
+            logger.error("Modal settings attribute is missing")
             raise ValueError("Modal settings is missing from point consumption settings")
 
         modal_settings = settings.point_consumption_settings.modal_settings
-        print(f"[DEBUG] Modal settings object: {modal_settings}")
+        logger.debug("Modal settings object: %s", modal_settings)
 
         # fields設定の詳細チェック
         if not hasattr(modal_settings, 'fields'):
-            print("[ERROR] Fields attribute is missing from modal settings")
+            logger.error("Fields attribute is missing from modal settings")
             raise ValueError("Fields configuration is missing from modal settings")
 
-        print(f"[DEBUG] Modal fields configuration: {modal_settings.fields}")
+        logger.debug("Modal fields configuration: %s", modal_settings.fields)
         
         # wallet設定の詳細チェック
         if 'wallet' not in modal_settings.fields:
-            print("[ERROR] Wallet field configuration is missing")
+            logger.error("Wallet field configuration is missing")
             raise ValueError("Wallet field is not configured in modal settings")
 
-        print(f"[DEBUG] Wallet field configuration: {modal_settings.fields['wallet']}")
+        logger.debug("Wallet field configuration: %s", modal_settings.fields['wallet'])
         
         # Point unit validation
         point_unit = next(
@@ -1147,7 +1053,7 @@ class PointConsumptionModal(discord.ui.Modal):
             None
         )
         if not point_unit:
-            print("[ERROR] Invalid point unit ID")
+            logger.error("Invalid point unit ID")
             raise ValueError(f"Point unit with ID {unit_id} not found")
 
         # Modal initialization
@@ -1191,7 +1097,7 @@ class PointConsumptionModal(discord.ui.Modal):
             )
             self.add_item(self.wallet)
         else:
-            print(f"[ERROR] Invalid wallet field configuration: {wallet_config}")
+            logger.error("Invalid wallet field configuration: %s", wallet_config)
             raise ValueError(f"Wallet field is configured incorrectly. Expected boolean True, got {wallet_config}")
 
         # Email field (keeping the existing logic)
@@ -1206,7 +1112,7 @@ class PointConsumptionModal(discord.ui.Modal):
             )
             self.add_item(self.email)
 
-        print("[DEBUG] === Modal Initialization Complete ===")
+        logger.debug("=== Modal Initialization Complete ===")
 
     async def initialize_wallet(self):
         """ウォレットアドレスの初期値を設定"""
@@ -1219,6 +1125,7 @@ class PointConsumptionModal(discord.ui.Modal):
             if current_wallet:
                 self.wallet.default = current_wallet
 
+    @instrument('modal', 'point_consumption_modal')
     async def on_submit(self, interaction: discord.Interaction):
             """フォーム送信時の処理"""
             try:
@@ -1227,7 +1134,7 @@ class PointConsumptionModal(discord.ui.Modal):
                 # サーバー設定の再取得（最新の状態を確保）
                 settings = await interaction.client.get_server_settings(str(interaction.guild_id))
                 if not settings or not settings.point_consumption_settings:
-                    print("[ERROR] Server settings not found during form submission")
+                    logger.error("Server settings not found during form submission")
                     await interaction.response.send_message(
                         "サーバー設定の取得に失敗しました。",
                         ephemeral=True
@@ -1237,7 +1144,7 @@ class PointConsumptionModal(discord.ui.Modal):
                 modal_settings = settings.point_consumption_settings.modal_settings
                 consumption_settings = settings.point_consumption_settings
                 validation = modal_settings.validation
-                print(f"[DEBUG] Validation settings: {validation}")
+                logger.debug("Validation settings: %s", validation)
 
                 # 利用可能ポイントの再確認
                 available_points = await interaction.client.point_manager.get_points(
@@ -1245,7 +1152,7 @@ class PointConsumptionModal(discord.ui.Modal):
                     str(interaction.user.id),
                     self.unit_id  # unit_idを追加
                 )
-                print(f"[DEBUG] Available points for user {interaction.user.id}: {available_points}")
+                logger.debug("Available points for user %s: %s", interaction.user.id, available_points)
 
                 # ポイントのバリデーション
                 try:
@@ -1329,13 +1236,13 @@ class PointConsumptionModal(discord.ui.Modal):
                 }
 
                 # リクエストデータ作成時のデバッグログ
-                print(f"[DEBUG] Creating consumption request:")
-                print(f"  server_id: {str(interaction.guild_id)}")
-                print(f"  user_id: {str(interaction.user.id)}")
-                print(f"  points: {points}")
-                print(f"  unit_id: {self.unit_id}")
-                print(f"  thread_id: {str(interaction.channel.id)}")
-                print(f"  timestamp: {timestamp}")
+                logger.debug("Creating consumption request:")
+                logger.debug("server_id: %s", str(interaction.guild_id))
+                logger.debug("user_id: %s", str(interaction.user.id))
+                logger.debug("points: %s", points)
+                logger.debug("unit_id: %s", self.unit_id)
+                logger.debug("thread_id: %s", str(interaction.channel.id))
+                logger.debug("timestamp: %s", timestamp)
 
                 # 履歴の保存
                 success = await interaction.client.db.save_consumption_history(request_data)
@@ -1349,7 +1256,7 @@ class PointConsumptionModal(discord.ui.Modal):
                     )
                     return
 
-                print(f"[DEBUG] Save result: {success}")
+                logger.debug("Save result: %s", success)
 
                 # 通知チャンネルの取得と設定
                 target_channel = interaction.channel
@@ -1365,12 +1272,12 @@ class PointConsumptionModal(discord.ui.Modal):
                 view.add_item(discord.ui.Button(
                     label="承認",
                     style=discord.ButtonStyle.success,
-                    custom_id=f"approve_consume_{interaction.user.id}_{self.points.value}_{self.unit_id}_{wallet_address}"
+                    custom_id=f"approve_consume_{timestamp}"
                 ))
                 view.add_item(discord.ui.Button(
                     label="キャンセル",
                     style=discord.ButtonStyle.danger,
-                    custom_id=f"cancel_consume_{interaction.user.id}_{self.points.value}_{self.unit_id}_{wallet_address}"
+                    custom_id=f"cancel_consume_{timestamp}"
                 ))
 
                 # メンションの準備
@@ -1406,7 +1313,7 @@ class PointConsumptionModal(discord.ui.Modal):
                                 )
                             await log_channel.send(embed=log_embed)
                     except Exception as e:
-                        print(f"[ERROR] Failed to send log: {e}")
+                        logger.error("Failed to send log: %s", e)
 
                 # 通知メッセージの送信
                 notification_message = self.point_consumption_settings.notification_message.format(
@@ -1427,8 +1334,7 @@ class PointConsumptionModal(discord.ui.Modal):
                 )
 
             except Exception as e:
-                print(f"[ERROR] Error in modal submission: {e}")
-                print(traceback.format_exc())
+                logger.error("Error in modal submission: %s", e, exc_info=True)
                 await interaction.response.send_message(
                     modal_settings.error_messages.get(
                         "system_error",
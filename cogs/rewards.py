@@ -1,9 +1,11 @@
 # cogs/rewards.py
+import logging
 import discord
 from discord import app_commands
 from discord.ext import commands
 from typing import Optional, Literal
-import traceback
+
+logger = logging.getLogger(__name__)
 
 class Rewards(commands.Cog):
     def __init__(self, bot):
@@ -86,8 +88,7 @@ class Rewards(commands.Cog):
         except ValueError as e:
             await interaction.followup.send(str(e), ephemeral=True)
         except Exception as e:
-            print(f"Error in claim command: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in claim command: %s", e, exc_info=True)
             await interaction.followup.send(
                 "予期せぬエラーが発生しました。",
                 ephemeral=True
@@ -157,8 +158,7 @@ class Rewards(commands.Cog):
             await interaction.followup.send(embed=embed, ephemeral=True)
 
         except Exception as e:
-            print(f"Error in rewards_history command: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in rewards_history command: %s", e, exc_info=True)
             await interaction.followup.send(
                 "履歴の取得中にエラーが発生しました。",
                 ephemeral=True
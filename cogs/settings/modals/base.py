@@ -1,7 +1,10 @@
 # cogs/settings/modals/base.py
+import logging
 import discord
 from typing import Any, Tuple, Optional
 
+logger = logging.getLogger(__name__)
+
 class BaseSettingsModal(discord.ui.Modal):
     """設定モーダルの基本クラス"""
     def __init__(self, title: str, settings: Any):
@@ -68,5 +71,5 @@ class BaseSettingsModal(discord.ui.Modal):
                 settings
             )
         except Exception as e:
-            print(f"Error updating {feature} settings: {e}")
+            logger.error("Error updating %s settings: %s", feature, e)
             return False
\ No newline at end of file
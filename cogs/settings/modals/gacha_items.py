@@ -1,9 +1,13 @@
+import logging
 import discord
 from .base import BaseSettingsModal
+from utils.metrics import instrument
 from discord.ui import View
 import json
 from typing import Optional, List, Dict, Any
 
+logger = logging.getLogger(__name__)
+
 class GachaItemsView(View):
     def __init__(self, settings, settings_manager):
         super().__init__(timeout=None)
@@ -42,6 +46,7 @@ class GachaItemsView(View):
         self.add_item(back_button)
 
     def create_item_callback(self, index: int):
+        @instrument('button', 'gacha_items.edit')
         async def callback(interaction: discord.Interaction):
             modal = GachaItemsModal(
                 settings=self.settings,
@@ -52,6 +57,7 @@ class GachaItemsView(View):
             await interaction.response.send_modal(modal)
         return callback
 
+    @instrument('button', 'gacha_items.add')
     async def add_item_callback(self, interaction: discord.Interaction):
         modal = GachaItemsModal(
             settings=self.settings,
@@ -60,6 +66,7 @@ class GachaItemsView(View):
         )
         await interaction.response.send_modal(modal)
 
+    @instrument('button', 'gacha_items.back')
     async def back_callback(self, interaction: discord.Interaction):
         from .settings_view import SettingsView
         try:
@@ -67,7 +74,7 @@ class GachaItemsView(View):
             embed = await view.create_settings_embed()
             await interaction.response.edit_message(embed=embed, view=view)
         except Exception as e:
-            print(f"Error returning to settings view: {e}")
+            logger.error("Error returning to settings view: %s", e)
             await interaction.response.send_message(
                 "エラーが発生しました。",
                 ephemeral=True
@@ -189,6 +196,7 @@ class GachaItemsModal(BaseSettingsModal):
                             super().__init__(timeout=None)
                             
                         @discord.ui.button(label="削除", style=discord.ButtonStyle.danger)
+                        @instrument('button', 'gacha_items.delete')
                         async def delete_button(self, button_interaction: discord.Interaction, button: discord.ui.Button):
                             try:
                                 updated_items.pop(self.item_index)
@@ -205,7 +213,7 @@ class GachaItemsModal(BaseSettingsModal):
                                         view=items_view
                                     )
                             except Exception as e:
-                                print(f"Error deleting item: {e}")
+                                logger.error("Error deleting item: %s", e)
                                 await button_interaction.response.send_message(
                                     "削除中にエラーが発生しました。",
                                     ephemeral=True
@@ -240,7 +248,7 @@ class GachaItemsModal(BaseSettingsModal):
                 ephemeral=True
             )
         except Exception as e:
-            print(f"Error updating gacha item: {e}")
+            logger.error("Error updating gacha item: %s", e)
             await interaction.response.send_message(
                 "❌ エラーが発生しました。\n入力内容を確認してください。",
                 ephemeral=True
@@ -260,16 +268,16 @@ class GachaItemsModal(BaseSettingsModal):
         """機能の設定をDynamoDBに保存"""
         try:
             server_id = str(interaction.guild_id)
-            print(f"[INFO] Updating {feature} settings for server_id: {server_id}")
-            print(f"[DEBUG] Updated settings: {updated_settings}")
+            logger.info("Updating %s settings for server_id: %s", feature, server_id)
+            logger.debug("Updated settings: %s", updated_settings)
 
             success = await self.settings_manager.update_feature_settings(server_id, feature, updated_settings)
             
             if not success:
-                print(f"[ERROR] Failed to update {feature} settings in the database")
+                logger.error("Failed to update %s settings in the database", feature)
                 return False
 
             return True
         except Exception as e:
-            print(f"[ERROR] Failed to update {feature} settings: {e}")
+            logger.error("Failed to update %s settings: %s", feature, e)
             return False
\ No newline at end of file
@@ -1,7 +1,10 @@
+import logging
 import discord
 from .base import BaseSettingsModal
 from models.server_settings import MessageSettings, MediaSettings
 
+logger = logging.getLogger(__name__)
+
 class GachaSettingsModal(BaseSettingsModal):
     """ガチャ設定モーダル"""
     def __init__(self, settings, settings_manager):
@@ -75,7 +78,7 @@ class GachaSettingsModal(BaseSettingsModal):
             self.add_item(self.banner_url)
 
         except Exception as e:
-            print(f"[ERROR] Failed to setup fields: {e}")
+            logger.error("Failed to setup fields: %s", e)
             # デフォルト値を使用してフィールドをセットアップ
             self._setup_default_fields()
 
@@ -152,7 +155,7 @@ class GachaSettingsModal(BaseSettingsModal):
                 )
 
         except Exception as e:
-            print(f"[ERROR] Error in on_submit: {str(e)}")
+            logger.error("Error in on_submit: %s", str(e))
             await interaction.response.send_message(
                 "❌ エラーが発生しました。\n"
                 "しばらく待ってから再度お試しください。",
@@ -179,19 +182,19 @@ class GachaSettingsModal(BaseSettingsModal):
         """機能の設定をDynamoDBに保存"""
         try:
             server_id = str(interaction.guild_id)
-            print(f"[INFO] Updating {feature} settings for server_id: {server_id}")
-            print(f"[DEBUG] Updated settings: {updated_settings}")
+            logger.info("Updating %s settings for server_id: %s", feature, server_id)
+            logger.debug("Updated settings: %s", updated_settings)
 
             # settings_managerのupdate_feature_settingsを呼び出す
             success = await self.settings_manager.update_feature_settings(server_id, feature, updated_settings)
             
             if not success:
-                print(f"[ERROR] Failed to update {feature} settings in the database")
+                logger.error("Failed to update %s settings in the database", feature)
                 return False
 
             return True
         except Exception as e:
-            print(f"[ERROR] Failed to update {feature} settings: {e}")
+            logger.error("Failed to update %s settings: %s", feature, e)
             return False
 
     async def _validate_url(self, url: str) -> tuple:
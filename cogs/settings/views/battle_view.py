@@ -1,6 +1,7 @@
 # cogs/settings/views/battle_view.py
 import discord
 from .base import BaseSettingsView
+from utils.metrics import instrument
 
 class BattleSettingsView(BaseSettingsView):
     def __init__(self, settings):
@@ -62,6 +63,7 @@ class BattleSettingsView(BaseSettingsView):
         return embed
 
     @discord.ui.button(label="設定を更新", style=discord.ButtonStyle.success)
+    @instrument('button', 'battle_settings.update')
     async def update_settings(self, interaction: discord.Interaction, button: discord.ui.Button):
         """設定の更新"""
         try:
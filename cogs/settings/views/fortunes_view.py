@@ -1,6 +1,7 @@
 # cogs/settings/views/fortunes_view.py
 import discord
 from .base import BaseSettingsView
+from utils.metrics import instrument
 
 class FortuneSettingsView(BaseSettingsView):
     def __init__(self, settings):
@@ -56,6 +57,7 @@ class FortuneSettingsView(BaseSettingsView):
         return embed
 
     @discord.ui.button(label="設定を更新", style=discord.ButtonStyle.success)
+    @instrument('button', 'fortune_settings.update')
     async def update_settings(self, interaction: discord.Interaction, button: discord.ui.Button):
         """設定の更新"""
         try:
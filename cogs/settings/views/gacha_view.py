@@ -1,8 +1,12 @@
+import logging
 import discord
 from .base import BaseSettingsView
+from utils.metrics import instrument
 from ..modals.gacha_settings import GachaSettingsModal
 from ..modals.gacha_items import GachaItemsView
 
+logger = logging.getLogger(__name__)
+
 class GachaSettingsView(BaseSettingsView):
     def __init__(self, bot, settings):
         super().__init__(settings)
@@ -24,6 +28,7 @@ class GachaSettingsView(BaseSettingsView):
         custom_id="toggle_gacha",
         row=0
     )
+    @instrument('button', 'gacha_settings.toggle')
     async def toggle_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """ガチャ機能の有効/無効を切り替え"""
         try:
@@ -60,6 +65,7 @@ class GachaSettingsView(BaseSettingsView):
         custom_id="configure_gacha",
         row=0
     )
+    @instrument('button', 'gacha_settings.configure')
     async def configure_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """詳細設定モーダルを表示"""
         try:
@@ -74,6 +80,7 @@ class GachaSettingsView(BaseSettingsView):
         custom_id="items_gacha",
         row=0
     )
+    @instrument('button', 'gacha_settings.items')
     async def items_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """アイテム設定画面を表示"""
         try:
@@ -94,6 +101,7 @@ class GachaSettingsView(BaseSettingsView):
         row=1
     )
     
+    @instrument('button', 'gacha_settings.back')
     async def back_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """メイン設定画面に戻る"""
         from .settings_view import SettingsView
@@ -164,7 +172,7 @@ class GachaSettingsView(BaseSettingsView):
 
     async def _handle_error(self, interaction: discord.Interaction, error: Exception):
         """エラーハンドリング"""
-        print(f"Error in GachaSettingsView: {error}")
+        logger.error("Error in GachaSettingsView: %s", error)
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -1,6 +1,7 @@
 # cogs/settings/views/point_consumption_view.py
 import discord
 from .base import BaseSettingsView
+from utils.metrics import instrument
 
 class PointConsumptionSettingsView(BaseSettingsView):
     def __init__(self, settings):
@@ -80,6 +81,7 @@ class PointConsumptionSettingsView(BaseSettingsView):
         return embed
 
     @discord.ui.button(label="設定を更新", style=discord.ButtonStyle.success)
+    @instrument('button', 'point_consumption_settings.update')
     async def update_settings(self, interaction: discord.Interaction, button: discord.ui.Button):
         """設定の更新"""
         try:
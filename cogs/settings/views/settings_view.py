@@ -1,7 +1,11 @@
+import logging
 import discord
 from .base import BaseSettingsView
+from utils.metrics import instrument
 from ..modals import GlobalSettingsModal
 
+logger = logging.getLogger(__name__)
+
 class SettingsView(BaseSettingsView):
     """サーバー全体の設定を管理するビュー"""
     def __init__(self, bot, settings):
@@ -35,15 +39,15 @@ class SettingsView(BaseSettingsView):
 
     async def _handle_feature_settings(self, interaction: discord.Interaction, feature_id: str):
         """機能別設定の処理"""
-        print(f"[INFO] _handle_feature_settings called for feature: {feature_id}, user: {interaction.user.id}")
+        logger.info("_handle_feature_settings called for feature: %s, user: %s", feature_id, interaction.user.id)
         try:
             feature_settings = getattr(self.settings, f"{feature_id}_settings", None)
             if not feature_settings:
-                print(f"[ERROR] Feature settings not found for feature: {feature_id}")
+                logger.error("Feature settings not found for feature: %s", feature_id)
                 await interaction.response.send_message(f"{feature_id}の設定が見つかりません。", ephemeral=True)
                 return
 
-            print(f"[INFO] Feature settings retrieved successfully for feature: {feature_id}")
+            logger.info("Feature settings retrieved successfully for feature: %s", feature_id)
 
             # ガチャ設定の場合は専用ビューを使用
             if feature_id == "gacha":
@@ -53,13 +57,13 @@ class SettingsView(BaseSettingsView):
                 view = FeatureSettingsView(self.bot, self.settings, feature_id)
 
             embed = await view.create_settings_embed()
-            print(f"[INFO] Created embed and view for feature: {feature_id}")
+            logger.info("Created embed and view for feature: %s", feature_id)
 
             await interaction.response.edit_message(embed=embed, view=view)
-            print(f"[SUCCESS] Interaction response updated for feature: {feature_id}")
+            logger.info("Interaction response updated for feature: %s", feature_id)
 
         except Exception as e:
-            print(f"[ERROR] Exception in _handle_feature_settings: {e}")
+            logger.error("Exception in _handle_feature_settings: %s", e)
             await interaction.response.send_message("設定画面の表示中にエラーが発生しました。", ephemeral=True)
 
 
@@ -161,6 +165,7 @@ class GlobalSettingsButton(discord.ui.Button):
             custom_id="global_settings"
         )
 
+    @instrument('button', 'settings.global')
     async def callback(self, interaction: discord.Interaction):
         await self.view._handle_global_settings(interaction)
 
@@ -173,12 +178,13 @@ class FeatureButton(discord.ui.Button):
         )
         self.feature_id = feature_id
 
+    @instrument('button', 'settings.feature')
     async def callback(self, interaction: discord.Interaction):
-        print(f"[INFO] FeatureButton clicked: {self.feature_id}, by user: {interaction.user.id}")
+        logger.info("FeatureButton clicked: %s, by user: %s", self.feature_id, interaction.user.id)
         try:
             await self.view._handle_feature_settings(interaction, self.feature_id)
         except Exception as e:
-            print(f"[ERROR] Exception in FeatureButton callback: {e}")
+            logger.error("Exception in FeatureButton callback: %s", e)
             await interaction.response.send_message("エラーが発生しました。", ephemeral=True)
 
 
@@ -190,21 +196,22 @@ class ToggleButton(discord.ui.Button):
             custom_id="toggle_feature"
         )
 
+    @instrument('button', 'settings.toggle')
     async def callback(self, interaction: discord.Interaction):
         """機能の有効/無効を切り替え"""
         try:
             feature_id = self.view.feature_id
-            print(f"[DEBUG] Toggle callback started - feature_id: {feature_id}")
+            logger.debug("Toggle callback started - feature_id: %s", feature_id)
                 
             # 状態を反転
             current_state = self.view.settings.global_settings.features_enabled.get(feature_id, True)
             new_state = not current_state
-            print(f"[DEBUG] Current state: {current_state}, New state: {new_state}")
+            logger.debug("Current state: %s, New state: %s", current_state, new_state)
                 
             # 現在の機能の設定を取得
             feature_settings = getattr(self.view.settings, f"{feature_id}_settings")
             if not feature_settings:
-                print("[DEBUG] Feature settings not found")
+                logger.debug("Feature settings not found")
                 await interaction.response.send_message(
                     "設定の更新に失敗しました。",
                     ephemeral=True
@@ -213,7 +220,7 @@ class ToggleButton(discord.ui.Button):
 
             # 設定を更新
             settings_manager = self.view.bot.settings_manager
-            print(f"[DEBUG] Settings manager: {settings_manager}")
+            logger.debug("Settings manager: %s", settings_manager)
             
             current_settings_dict = {
                 'enabled': new_state,
@@ -221,14 +228,14 @@ class ToggleButton(discord.ui.Button):
                 'media': feature_settings.media.to_dict() if feature_settings.media else None,
                 'items': feature_settings.items if hasattr(feature_settings, 'items') else None
             }
-            print(f"[DEBUG] Update settings dict: {current_settings_dict}")
+            logger.debug("Update settings dict: %s", current_settings_dict)
                 
             success = await settings_manager.update_feature_settings(
                 str(interaction.guild_id),
                 feature_id,
                 current_settings_dict
             )
-            print(f"[DEBUG] Update result: {success}")
+            logger.debug("Update result: %s", success)
                 
             if success:
                 # 状態を更新
@@ -247,9 +254,7 @@ class ToggleButton(discord.ui.Button):
                     ephemeral=True
                 )
         except Exception as e:
-            print(f"[ERROR] Failed to toggle feature: {e}")
-            print(f"[ERROR] Error type: {type(e)}")
-            print(f"[ERROR] Error trace:", exc_info=True)
+            logger.error("Failed to toggle feature: %s (%s)", e, type(e), exc_info=True)
             await interaction.response.send_message(
                 "機能の切り替え中にエラーが発生しました。",
                 ephemeral=True
@@ -263,21 +268,22 @@ class ConfigureButton(discord.ui.Button):
             custom_id="configure_feature"
         )
 
+    @instrument('button', 'settings.configure')
     async def callback(self, interaction: discord.Interaction):
-        print(f"[INFO] ConfigureButton clicked by user: {interaction.user.id}")
+        logger.info("ConfigureButton clicked by user: %s", interaction.user.id)
         try:
             # Adminコグの取得
             admin_cog = self.view.bot.get_cog("Admin")
             if admin_cog:
-                print(f"[INFO] Found Admin cog. Calling _show_feature_config.")
+                logger.info("Found Admin cog. Calling _show_feature_config.")
                 settings = self.view.settings
                 feature_id = self.view.feature_id
                 await admin_cog._show_feature_config(interaction, settings, feature_id)
             else:
-                print(f"[ERROR] Admin cog not found.")
+                logger.error("Admin cog not found.")
                 await interaction.response.send_message("管理機能が見つかりません。", ephemeral=True)
         except Exception as e:
-            print(f"[ERROR] Exception in ConfigureButton callback: {e}")
+            logger.error("Exception in ConfigureButton callback: %s", e)
             await interaction.response.send_message("エラーが発生しました。", ephemeral=True)
 
 
@@ -289,6 +295,7 @@ class BackButton(discord.ui.Button):
             custom_id="back_to_main"
         )
 
+    @instrument('button', 'settings.back')
     async def callback(self, interaction: discord.Interaction):
         """メイン設定画面に戻る"""
         try:
@@ -323,7 +330,7 @@ class BackButton(discord.ui.Button):
             await interaction.response.edit_message(embed=embed, view=view)
             
         except Exception as e:
-            print(f"[ERROR] Failed to go back to main settings: {e}")
+            logger.error("Failed to go back to main settings: %s", e)
             await interaction.response.send_message(
                 "設定画面の表示中にエラーが発生しました。",
                 ephemeral=True
@@ -1,5 +1,6 @@
 import discord
 from .base import BaseSettingsView  # 正しい
+from utils.metrics import instrument
 from ..modals.token_settings import TokenSettingsModal
 from utils.token_operations import TokenOperations
 import logging
@@ -10,7 +11,7 @@ class TokenSettingsView(BaseSettingsView):  # BaseViewではなくBaseSettingsVi
     def __init__(self, bot):
         super().__init__(timeout=180)
         self.bot = bot
-        self.token_operations = TokenOperations()
+        self.token_operations = TokenOperations(getattr(getattr(bot, 'db', None), 'dynamodb', None))
 
     async def start(self, interaction: discord.Interaction):
         """設定ビューの表示開始"""
@@ -67,6 +68,7 @@ class TokenSettingsView(BaseSettingsView):  # BaseViewではなくBaseSettingsVi
         style=discord.ButtonStyle.primary,
         custom_id="token_settings:edit"
     )
+    @instrument('button', 'token_settings.edit')
     async def edit_settings(
         self,
         interaction: discord.Interaction,
@@ -96,6 +98,7 @@ class TokenSettingsView(BaseSettingsView):  # BaseViewではなくBaseSettingsVi
         style=discord.ButtonStyle.danger,
         custom_id="token_settings:disable"
     )
+    @instrument('button', 'token_settings.disable')
     async def disable_settings(
         self,
         interaction: discord.Interaction,
@@ -147,6 +150,7 @@ class TokenSettingsView(BaseSettingsView):  # BaseViewではなくBaseSettingsVi
         style=discord.ButtonStyle.secondary,
         custom_id="token_settings:refresh"
     )
+    @instrument('button', 'token_settings.refresh')
     async def refresh_view(
         self,
         interaction: discord.Interaction,
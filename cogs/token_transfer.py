@@ -15,7 +15,7 @@ class TokenTransfer(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.wallet_manager = WalletConnectManager()
-        self.token_operations = TokenOperations()
+        self.token_operations = TokenOperations(getattr(getattr(bot, 'db', None), 'dynamodb', None))
 
     @app_commands.command(name="wallet")
     @app_commands.describe(
@@ -1,4 +1,5 @@
 # main.py
+import logging
 import discord
 from discord.ext import commands
 from discord import app_commands
@@ -7,17 +8,33 @@ import os
 from dotenv import load_dotenv
 from utils.aws_database import AWSDatabase
 from utils.settings_manager import ServerSettingsManager
+from utils.profile_manager import UserProfileManager
+from utils.roll_ledger import DailyRollLedger
+from utils.gacha_draw import GachaDrawEngine
+from utils.fortune_table import FortuneTableCache
+from utils.fortune_ledger import FortuneLedger
+from utils.message_dispatcher import MessageDispatcher
+from utils.message_scheduler import MessageScheduler
+from utils.notification_digest import NotificationDigest
 from utils.point_manager import PointManager
 from utils.reward_manager import RewardManager
+from utils.logging_config import setup_logging
+from utils.metrics import MetricsCommandTree, MetricsServer, instrument_discord_http
 
 import traceback
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
+setup_logging()
 
 # 環境変数の読み込み
 DISCORD_BOT_TOKEN = os.getenv('DISCORD_BOT_TOKEN')
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+# これより長いレート制限は discord.py 内で待たずに discord.RateLimited として送出させる
+# （実況メッセージやメッセージスケジューラーが自分で間隔を広げる。discord.py の下限は 30 秒）
+DISCORD_MAX_RATELIMIT_TIMEOUT = float(os.getenv('DISCORD_MAX_RATELIMIT_TIMEOUT', '30'))
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -30,103 +47,130 @@ class GachaBot(commands.Bot):
             intents=intents,
             help_command=commands.DefaultHelpCommand(
                 no_category='Commands'
-            )
+            ),
+            tree_cls=MetricsCommandTree,
+            max_ratelimit_timeout=DISCORD_MAX_RATELIMIT_TIMEOUT
         )
-        # キャッシュの初期化
-        self.cache = {}
-        
+        # Discord API への送信を計測
+        instrument_discord_http(self)
+        self.metrics_server = MetricsServer.from_env()
+        # ガチャの抽選表（DB に依存しない）
+        self.gacha_draw = GachaDrawEngine()
+        # 占いの結果表（DB に依存しない）
+        self.fortune_tables = FortuneTableCache()
+        # チャンネルへの送信キュー
+        self.message_scheduler = MessageScheduler.from_env()
+        # 履歴チャンネルのダイジェスト通知
+        self.notification_digest = NotificationDigest(self.message_scheduler)
+        # ギルドメッセージの振り分け（各コグは on_message の代わりにハンドラを登録する）
+        self.message_dispatcher = MessageDispatcher()
+        self.add_listener(self.message_dispatcher.on_message, 'on_message')
         # データベース接続試行
         try:
             # コアコンポーネントの初期化
             self.db = AWSDatabase()
             self.settings_manager = ServerSettingsManager(self.db)
+            self.settings_manager.add_settings_listener(self.message_dispatcher.invalidate)
+            self.db.add_automation_rule_listener(self.message_dispatcher.invalidate)
+            self.profile_manager = UserProfileManager(self.db)
+            self.roll_ledger = DailyRollLedger(self.db)
+            self.fortune_ledger = FortuneLedger(self.db)
             self.point_manager = PointManager(self)
             self.db_available = True
-            print("Core database components initialized successfully")
+            logger.info("Core database components initialized successfully")
 
             # オプショナルコンポーネントの初期化
             try:
                 self.reward_manager = RewardManager(self)
-                print("Reward manager initialized successfully")
+                logger.info("Reward manager initialized successfully")
 
                 # TokenOperationsの初期化を追加
                 from utils.token_operations import TokenOperations
-                self.token_operations = TokenOperations()
-                print("Token operations initialized successfully")
+                self.token_operations = TokenOperations(self.db.dynamodb)
+                logger.info("Token operations initialized successfully")
             except Exception as e:
-                print(f"Warning: Failed to initialize reward manager: {e}")
+                logger.warning("Failed to initialize reward manager: %s", e)
                 self.reward_manager = None
                 self.token_operations = None
 
         except Exception as e:
-            print(f"Failed to initialize core database: {e}")
-            print(traceback.format_exc())
+            logger.error("Failed to initialize core database: %s", e, exc_info=True)
             self.db_available = False
 
     async def setup_hook(self):
         extension_status = []
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except Exception as e:
+                logger.warning("Failed to start metrics endpoint: %s", e)
+                self.metrics_server = None
+
         try:
             # 管理コマンドを読み込み
             try:
                 await self.load_extension('cogs.admin')
-                print("Loaded admin extension")
+                logger.info("Loaded admin extension")
                 extension_status.append("Admin: ✅")
             except Exception as e:
-                print(f"Failed to load admin extension: {e}")
-                print(traceback.format_exc())
+                logger.error("Failed to load admin extension: %s", e, exc_info=True)
                 extension_status.append("Admin: ❌")
 
             # 既存の拡張機能を読み込み
             for ext in ['gacha', 'fortunes', 'battle', 'automation', 'rewards', 'points_consumption', 'token_transfer']:
                 try:
                     await self.load_extension(f'cogs.{ext}')
-                    print(f"Loaded {ext} extension")
+                    logger.info("Loaded %s extension", ext)
                     extension_status.append(f"{ext.capitalize()}: ✅")
                 except Exception as e:
-                    print(f"Failed to load {ext} extension: {e}")
-                    print(traceback.format_exc())
+                    logger.error("Failed to load %s extension: %s", ext, e, exc_info=True)
                     extension_status.append(f"{ext.capitalize()}: ❌")
 
-            print("Extension loading completed")
-            print("\n".join(extension_status))
+            logger.info("Extension loading completed: %s", ', '.join(extension_status))
 
             # スラッシュコマンドを同期
-            print("Starting global command sync...")
+            logger.info("Starting global command sync...")
             await self.tree.sync()
-            print("Command sync completed")
+            logger.info("Command sync completed")
             
             commands = await self.tree.fetch_commands()
             for cmd in commands:
-                print(f" - /{cmd.name}")
+                logger.debug("- /%s", cmd.name)
 
         except Exception as e:
-            print(f"Critical error in setup_hook: {e}")
-            print(traceback.format_exc())
+            logger.error("Critical error in setup_hook: %s", e, exc_info=True)
+
+    async def close(self):
+        await self.notification_digest.close()
+        await self.message_scheduler.close()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await super().close()
 
     async def on_ready(self):
-        print(f'{self.user} has connected to Discord!')
-        print(f'Bot is ready in {len(self.guilds)} servers.')
-        print(f"Database status: {'Available' if self.db_available else 'Unavailable'}")
+        logger.info("%s has connected to Discord!", self.user)
+        logger.info("Bot is ready in %s servers.", len(self.guilds))
+        logger.info("Database status: %s", 'Available' if self.db_available else 'Unavailable')
 
         # Loaded cogsの確認を追加
-        print('[DEBUG] Loaded cogs:')
+        logger.debug("Loaded cogs:")
         for cog in self.cogs:
-            print(f'- {cog}')
+            logger.debug("- %s", cog)
             
     # ここにエラーハンドラを追加
     async def on_application_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
-        print(f'[ERROR] Command error occurred:')
-        print(f'Command: {interaction.command.name if interaction.command else "Unknown"}')
-        print(f'Error: {str(error)}')
-        print(f'Error type: {type(error)}')
-        print(traceback.format_exc())
+        logger.error(
+            "Command error occurred: command=%s error=%s (%s)",
+            interaction.command.name if interaction.command else 'Unknown', error, type(error),
+            exc_info=error
+        )
 
         if isinstance(error, discord.errors.InteractionResponded):
-            print("Detected stale interaction, attempting to resync...")
+            logger.warning("Detected stale interaction, attempting to resync...")
             try:
                 await self.tree.sync(guild=interaction.guild)
             except Exception as e:
-                print(f"Failed to resync: {e}")
+                logger.error("Failed to resync: %s", e)
 
         # 全サーバーの設定をデバッグ出力（必要ならループする）
         # for guild in self.guilds:
@@ -139,10 +183,10 @@ class GachaBot(commands.Bot):
 
     async def get_server_settings(self, guild_id: str):
         """サーバー設定を取得するヘルパーメソッド"""
-        print(f"[DEBUG] 取得するサーバーID: {guild_id}")
+        logger.debug("取得するサーバーID: %s", guild_id)
 
         if not self.db_available:
-            print("[DEBUG] Database is unavailable.")
+            logger.debug("Database is unavailable.")
             return None
 
         try:
@@ -155,8 +199,7 @@ class GachaBot(commands.Bot):
 
             return settings
         except Exception as e:
-            print(f"[ERROR] Error retrieving server settings for guild {guild_id}: {e}")
-            print(traceback.format_exc())
+            logger.error("Error retrieving server settings for guild %s: %s", guild_id, e, exc_info=True)
             return None
 
     async def on_guild_join(self, guild):
@@ -164,23 +207,22 @@ class GachaBot(commands.Bot):
         try:
             # データベースが利用可能か確認
             if not self.db_available:
-                print(f"Warning: Database unavailable. Could not process server {guild.id}")
+                logger.warning("Database unavailable. Could not process server %s", guild.id)
                 return
 
             # サーバーが既に存在するかチェック
             exists = await self.db.register_server(str(guild.id))
-            print(f"[DEBUG] Server {guild.id} registration check: {'Already exists' if exists else 'New registration'}")
+            logger.debug("Server %s registration check: %s", guild.id, 'Already exists' if exists else 'New registration')
 
             if not exists:
                 # 新規サーバーの場合、デフォルト設定を作成
                 await self.settings_manager.create_default_settings(str(guild.id))
-                print(f"Initialized new server: {guild.name} (ID: {guild.id}) with default settings")
+                logger.info("Initialized new server: %s (ID: %s) with default settings", guild.name, guild.id)
             else:
-                print(f"Reconnected to existing server: {guild.name} (ID: {guild.id})")
+                logger.info("Reconnected to existing server: %s (ID: %s)", guild.name, guild.id)
 
         except Exception as e:
-            print(f"Error processing server join for {guild.name} (ID: {guild.id}): {e}")
-            print(traceback.format_exc())
+            logger.error("Error processing server join for %s (ID: %s): %s", guild.name, guild.id, e, exc_info=True)
 
     # async def on_guild_remove(self, guild):
     #     """サーバーから削除された時の処理"""
@@ -203,8 +245,7 @@ async def main():
         async with bot:
             await bot.start(DISCORD_BOT_TOKEN)
     except Exception as e:
-        print(f"Main loop error: {e}")
-        print(traceback.format_exc())
+        logger.error("Main loop error: %s", e, exc_info=True)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
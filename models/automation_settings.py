@@ -1,3 +1,4 @@
+import logging
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
@@ -5,6 +6,8 @@ import pytz
 from enum import Enum
 import uuid
 
+logger = logging.getLogger(__name__)
+
 class ConditionType(Enum):
     POINTS_THRESHOLD = "points_threshold"
     POINTS_RANGE = "points_range"
@@ -59,7 +62,7 @@ class NotificationSettings:
 
     @classmethod
     def from_dict(cls, data: dict) -> 'NotificationSettings':
-        print(f"[DEBUG] NotificationSettings.from_dict input: {data}")
+        logger.debug("NotificationSettings.from_dict input: %s", data)
         return cls(
             enabled=data.get('enabled', False),
             channel_id=data.get('channelId', ''),  # 'channelId' に対応
@@ -82,25 +85,25 @@ class Action:
             'notification_settings': self.notification_settings.to_dict() 
                 if self.notification_settings else None
         }
-        print(f"[DEBUG] Action to_dict output: {data}")  # print文をreturnの前に移動
+        logger.debug("Action to_dict output: %s", data)
         return data
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Action':
-        print(f"[DEBUG] Action.from_dict input: {data}")
+        logger.debug("Action.from_dict input: %s", data)
         
         # notification_settings を作成
         notification_settings = None
         # ルートレベルの notification を確認
         if 'notification' in data:
-            print(f"[DEBUG] Found notification settings in action data")
+            logger.debug("Found notification settings in action data")
             notification_settings = NotificationSettings.from_dict(data['notification'])
         # parameters 内の notification を確認（既存の設定を保持）
         elif 'parameters' in data and 'notification' in data['parameters']:
-            print(f"[DEBUG] Found notification settings in parameters")
+            logger.debug("Found notification settings in parameters")
             notification_settings = NotificationSettings.from_dict(data['parameters']['notification'])
         else:
-            print(f"[DEBUG] No notification settings found")
+            logger.debug("No notification settings found")
 
         action = cls(
             type=ActionType(data['type']),
@@ -108,7 +111,7 @@ class Action:
             parameters=data.get('parameters', {}),
             notification_settings=notification_settings
         )
-        print(f"[DEBUG] Created action with notification_settings: {notification_settings}")
+        logger.debug("Created action with notification_settings: %s", notification_settings)
         return action
 
 @dataclass
@@ -151,7 +154,7 @@ class AutomationRule:
 
     @classmethod
     def from_dict(cls, data: dict) -> 'AutomationRule':
-        print(f"[DEBUG] AutomationRule.from_dict input: {data}")
+        logger.debug("AutomationRule.from_dict input: %s", data)
         
         # 各アクションに通知設定を追加
         actions_data = data['actions']
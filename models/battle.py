@@ -1,6 +1,7 @@
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
 from enum import Enum
+from itertools import islice
 from datetime import datetime
 
 class BattleStatus(Enum):
@@ -23,6 +24,7 @@ class BattleEvent:
     killed_players: List[str] = None
     revived_players: List[str] = None
     item_receivers: List[str] = None
+    killer: Optional[str] = None  # BATTLE イベントで倒したプレイヤー
 
 @dataclass
 class BattleResults:
@@ -42,25 +44,92 @@ class BattleSettings:
     test_mode: bool = False  # テストモードフラグ
     dummy_count: int = 10  # テストモード時のダミープレイヤー数
 
+class PlayerPool:
+    """
+    プレイヤーIDの集合（追加・削除・所属判定が O(1)）
+
+    配列とインデックスの辞書で持ち、削除は末尾の要素と入れ替えてから取り除く。
+    そのため削除があると並び順は変わる（追加だけなら追加順のまま）。
+    インデックス/スライスでの参照と len/in/for はリストと同じように使える。
+    """
+    __slots__ = ('_items', '_index')
+
+    def __init__(self, items: Iterable[str] = ()):
+        self._items: List[str] = []
+        self._index: Dict[str, int] = {}
+        for player_id in items:
+            self.add(player_id)
+
+    def add(self, player_id: str) -> bool:
+        """追加（既にいる場合は False）"""
+        if player_id in self._index:
+            return False
+        self._index[player_id] = len(self._items)
+        self._items.append(player_id)
+        return True
+
+    def discard(self, player_id: str) -> bool:
+        """削除（いない場合は False）"""
+        index = self._index.pop(player_id, None)
+        if index is None:
+            return False
+        last = self._items.pop()
+        if index < len(self._items):
+            self._items[index] = last
+            self._index[last] = index
+        return True
+
+    def __contains__(self, player_id) -> bool:
+        return player_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PlayerPool):
+            return self._items == other._items
+        return self._items == other
+
+    def __repr__(self) -> str:
+        return f"PlayerPool({self._items!r})"
+
+
 @dataclass
 class BattleGame:
     server_id: str
     status: BattleStatus
     settings: BattleSettings
-    players: List[str]  # 参加プレイヤーのID
-    alive_players: List[str]  # 生存プレイヤーのID
-    dead_players: List[str]  # 死亡プレイヤーのID
+    players: PlayerPool  # 参加プレイヤーのID（リストを渡した場合は PlayerPool に変換）
+    alive_players: PlayerPool  # 生存プレイヤーのID
+    dead_players: PlayerPool  # 死亡プレイヤーのID
     kill_counts: Dict[str, int]  # キル数カウント
     revival_counts: Dict[str, int]  # 復活回数カウント
     start_time: datetime
     round_number: int = 1
+    # 死亡中のプレイヤーID（脱落順。復活すると外れ、再び死亡すると末尾に付く）
+    death_order: Dict[str, None] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        if not isinstance(self.players, PlayerPool):
+            self.players = PlayerPool(self.players)
+        if not isinstance(self.alive_players, PlayerPool):
+            self.alive_players = PlayerPool(self.alive_players)
+        if not isinstance(self.dead_players, PlayerPool):
+            self.dead_players = PlayerPool(self.dead_players)
+        for player_id in self.dead_players:
+            self.death_order.setdefault(player_id, None)
 
     def add_player(self, player_id: str) -> bool:
         """プレイヤーを追加"""
-        if player_id in self.players:
+        if not self.players.add(player_id):
             return False
-        self.players.append(player_id)
-        self.alive_players.append(player_id)
+        self.alive_players.add(player_id)
         self.kill_counts[player_id] = 0
         self.revival_counts[player_id] = 0
         return True
@@ -69,17 +138,18 @@ class BattleGame:
         """プレイヤーを削除（ゲーム開始前のみ）"""
         if self.status != BattleStatus.WAITING:
             return False
-        if player_id in self.players:
-            self.players.remove(player_id)
-            self.alive_players.remove(player_id)
+        if self.players.discard(player_id):
+            self.alive_players.discard(player_id)
+            self.kill_counts.pop(player_id, None)
+            self.revival_counts.pop(player_id, None)
             return True
         return False
 
     def kill_player(self, player_id: str, killer_id: Optional[str] = None) -> bool:
         """プレイヤーを殺害"""
-        if player_id in self.alive_players:
-            self.alive_players.remove(player_id)
-            self.dead_players.append(player_id)
+        if self.alive_players.discard(player_id):
+            self.dead_players.add(player_id)
+            self.death_order[player_id] = None
             if killer_id:
                 self.kill_counts[killer_id] = self.kill_counts.get(killer_id, 0) + 1
             return True
@@ -87,9 +157,9 @@ class BattleGame:
 
     def revive_player(self, player_id: str) -> bool:
         """プレイヤーを復活"""
-        if player_id in self.dead_players:
-            self.dead_players.remove(player_id)
-            self.alive_players.append(player_id)
+        if self.dead_players.discard(player_id):
+            self.death_order.pop(player_id, None)
+            self.alive_players.add(player_id)
             self.revival_counts[player_id] = self.revival_counts.get(player_id, 0) + 1
             return True
         return False
@@ -105,9 +175,8 @@ class BattleGame:
             return None
             
         winner = self.alive_players[0] if self.alive_players else None
-        # 最後に死亡した順に上位入賞者を決定
-        runners_up = self.dead_players[-4:] if len(self.dead_players) >= 4 else self.dead_players[:]
-        runners_up.reverse()  # 2位から順に並べ替え
+        # 最後に死亡した順に上位入賞者を決定（2位から順）
+        runners_up = list(islice(reversed(self.death_order), 4))
         
         return BattleResults(
             winner=winner,
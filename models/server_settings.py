@@ -1,4 +1,5 @@
 # models/server_settings.py
+import logging
 from enum import Enum
 from typing import Dict, List, Optional, Union
 from dataclasses import dataclass, field, asdict
@@ -6,6 +7,11 @@ from datetime import datetime
 import pytz
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# 履歴ダイジェストの1回あたりの件数の上限（ダイジェストに行として載るユーザー数の上限と同じ）
+MAX_HISTORY_DIGEST_EVENTS = 400
+
 class FeatureType(Enum):
     GACHA = "gacha"
     BATTLE = "battle"
@@ -83,6 +89,7 @@ class GachaSettings:
     roles: List[Dict] = field(default_factory=list)
     use_daily_panel: bool = True
     point_unit_id: str = "1"  # 追加: ポイント単位ID
+    pulls_per_roll: int = 1  # 1回のボタン押下で引く回数（10連など）
 
     def to_dict(self) -> dict:
         return {
@@ -95,7 +102,8 @@ class GachaSettings:
             'items': self.items,
             'roles': self.roles,
             'use_daily_panel': self.use_daily_panel,
-            'point_unit_id': self.point_unit_id  # 追加
+            'point_unit_id': self.point_unit_id,  # 追加
+            'pulls_per_roll': self.pulls_per_roll
         }
 
     @classmethod
@@ -110,7 +118,8 @@ class GachaSettings:
             items=data.get('items', []),
             roles=data.get('roles', []),
             use_daily_panel=data.get('use_daily_panel', True),
-            point_unit_id=data.get('point_unit_id', "1")  # 追加
+            point_unit_id=data.get('point_unit_id', "1"),  # 追加
+            pulls_per_roll=max(1, int(data.get('pulls_per_roll', 1)))
         )
 
 @dataclass
@@ -157,7 +166,7 @@ class GachaFeatureSettings:
                 try:
                     gacha_list.append(GachaSettings.from_dict(gacha_data))
                 except Exception as e:
-                    print(f"Error converting gacha settings from list: {e}")
+                    logger.error("Error converting gacha settings from list: %s", e)
                     continue
             return cls(
                 enabled=True,
@@ -173,7 +182,7 @@ class GachaFeatureSettings:
                 try:
                     gacha_list.append(GachaSettings.from_dict(gacha_data))
                 except Exception as e:
-                    print(f"Error converting gacha settings: {e}")
+                    logger.error("Error converting gacha settings: %s", e)
                     continue
         # 古い形式のデータ構造の処理（後方互換性）
         elif 'messages' in data or 'media' in data or 'items' in data:
@@ -186,7 +195,7 @@ class GachaFeatureSettings:
                 )
                 gacha_list.append(legacy_gacha)
             except Exception as e:
-                print(f"Error converting legacy gacha settings: {e}")
+                logger.error("Error converting legacy gacha settings: %s", e)
 
         # print(f"[DEBUG] Converted gacha_list: {gacha_list}")
 
@@ -198,7 +207,7 @@ class GachaFeatureSettings:
                 try:
                     points.append(PointDistribution(**point_data))
                 except Exception as e:
-                    print(f"Error converting point distribution: {e}")
+                    logger.error("Error converting point distribution: %s", e)
 
         roles = []
         if 'roles' in data:
@@ -210,7 +219,7 @@ class GachaFeatureSettings:
                         condition=condition
                     ))
                 except Exception as e:
-                    print(f"Error converting role settings: {e}")
+                    logger.error("Error converting role settings: %s", e)
 
         return cls(
             enabled=data.get('enabled', True),
@@ -233,7 +242,8 @@ class BattleFeatureSettings:
 @dataclass
 class FortuneFeatureSettings:
     enabled: bool = True
-    # 占い機能固有の設定をここに追加
+    custom_messages: Dict[str, str] = field(default_factory=dict)  # 運勢 -> 説明文の上書き
+    daily_message: str = "今日はすでに占いをしています。明日また挑戦してください！"
 
 @dataclass
 class PointConsumptionModalSettings:
@@ -301,6 +311,11 @@ class PointConsumptionFeatureSettings:
     consumption_history_enabled: bool = False
     consumption_history_channel_id: Optional[str] = None
 
+    # 獲得/消費履歴のダイジェスト（まとめて通知する）設定
+    history_digest_enabled: bool = False
+    history_digest_interval: int = 300  # まとめて送信する間隔（秒）
+    history_digest_max_events: int = 100  # この件数たまったら間隔を待たずに送信
+
     # パネルメッセージ設定を追加
     panel_message: str = "クリックしてポイントの消費申請をしてください"  # デフォルトメッセージ
     panel_title: str = "ポイント消費"  # タイトルも設定可能に
@@ -418,8 +433,8 @@ class ServerSettings:
         """設定をDynamoDBに保存可能な形式に変換"""
         try:
             # デバッグ用のログを追加
-            print(f"[DEBUG] gacha_settings type: {type(self.gacha_settings)}")
-            print(f"[DEBUG] gacha_settings content: {self.gacha_settings}")
+            logger.debug("gacha_settings type: %s", type(self.gacha_settings))
+            logger.debug("gacha_settings content: %s", self.gacha_settings)
             return {
                 'server_id': self.server_id,
                 'global_settings': {
@@ -446,7 +461,9 @@ class ServerSettings:
                         'start_delay_minutes': self.battle_settings.start_delay_minutes
                     },
                     'fortune': {
-                        'enabled': self.fortune_settings.enabled
+                        'enabled': self.fortune_settings.enabled,
+                        'custom_messages': self.fortune_settings.custom_messages,
+                        'daily_message': self.fortune_settings.daily_message
                     },
                     'point_consumption': {
                         'enabled': self.point_consumption_settings.enabled,
@@ -463,7 +480,10 @@ class ServerSettings:
                         'gain_history_enabled': self.point_consumption_settings.gain_history_enabled,
                         'gain_history_channel_id': self.point_consumption_settings.gain_history_channel_id,
                         'consumption_history_enabled': self.point_consumption_settings.consumption_history_enabled,
-                        'consumption_history_channel_id': self.point_consumption_settings.consumption_history_channel_id
+                        'consumption_history_channel_id': self.point_consumption_settings.consumption_history_channel_id,
+                        'history_digest_enabled': self.point_consumption_settings.history_digest_enabled,
+                        'history_digest_interval': self.point_consumption_settings.history_digest_interval,
+                        'history_digest_max_events': self.point_consumption_settings.history_digest_max_events
                     },
 
                 },
@@ -472,7 +492,7 @@ class ServerSettings:
                 'version': self.version
             }
         except Exception as e:
-            print(f"[DEBUG] Error in to_dict: {e}")
+            logger.error("Error in to_dict: %s", e)
             raise
 
     @classmethod
@@ -517,8 +537,11 @@ class ServerSettings:
             start_delay_minutes=feature_settings.get('battle', {}).get('start_delay_minutes', 2)
         )
 
+        fortune_data = feature_settings.get('fortune', {})
         fortune_settings = FortuneFeatureSettings(
-            enabled=feature_settings.get('fortune', {}).get('enabled', True)
+            enabled=fortune_data.get('enabled', True),
+            custom_messages=fortune_data.get('custom_messages') or {},
+            daily_message=fortune_data.get('daily_message', "今日はすでに占いをしています。明日また挑戦してください！")
         )
 
         # ポイント消費設定を追加
@@ -557,6 +580,12 @@ class ServerSettings:
             gain_history_channel_id=point_consumption_data.get('gain_history_channel_id'),
             consumption_history_enabled=point_consumption_data.get('consumption_history_enabled', False),
             consumption_history_channel_id=point_consumption_data.get('consumption_history_channel_id'),
+            history_digest_enabled=point_consumption_data.get('history_digest_enabled', False),
+            history_digest_interval=int(point_consumption_data.get('history_digest_interval', 300)),
+            history_digest_max_events=min(
+                MAX_HISTORY_DIGEST_EVENTS,
+                max(1, int(point_consumption_data.get('history_digest_max_events', 100)))
+            ),
         )
         subscription_settings = SubscriptionSettings.from_dict(
                 data.get('subscription_settings', {})
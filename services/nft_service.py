@@ -3,6 +3,7 @@ from web3 import Web3
 from typing import Dict
 import json
 import os
+from utils.metrics import instrument_web3
 
 class NFTService:
     def __init__(self):
@@ -18,6 +19,7 @@ class NFTService:
             abi=self.contract_abi
         )
 
+    @instrument_web3('nft_service.mint_nft')
     async def mint_nft(self, recipient: str, metadata: Dict) -> str:
         """NFTを発行"""
         # トランザクションの構築
@@ -3,6 +3,7 @@ from web3 import Web3
 from decimal import Decimal
 import json
 import os
+from utils.metrics import instrument_web3
 
 class TokenService:
     def __init__(self):
@@ -20,6 +21,7 @@ class TokenService:
         
         self.conversion_rate = Decimal('0.1')  # 1ポイント = 0.1トークン
 
+    @instrument_web3('token_service.transfer_tokens')
     async def transfer_tokens(self, recipient: str, points: int) -> str:
         """トークンを転送"""
         # ポイントからトークン量を計算
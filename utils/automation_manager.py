@@ -1,29 +1,40 @@
+import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import pytz
 import traceback
 import discord  # discord importを追加
 from decimal import Decimal  # Decimal importを追加
+import os
 from models.automation_settings import (
     AutomationRule, Condition, Action, 
     ConditionType, ActionType, OperatorType
 )
+from utils.automation_rule_index import AutomationRuleIndex, ANY_UNIT, EVENT_POINTS_UPDATE, condition_unit_id
+
+logger = logging.getLogger(__name__)
 
 class AutomationManager:
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
+        # サーバーごとのコンパイル済みルール（ルール保存時とTTL経過で再構築）
+        self.rule_index = AutomationRuleIndex(
+            self.get_server_rules,
+            ttl_seconds=float(os.getenv('AUTOMATION_RULES_TTL', '300'))
+        )
+        if self.db:
+            self.db.add_automation_rule_listener(self.rule_index.invalidate)
 
     async def get_server_rules(self, server_id: str) -> List[AutomationRule]:
-        """サーバーのルール一覧を取得"""
+        """サーバーのルール一覧をDBから取得（イベント処理では rule_index を参照する）"""
         try:
             rules_data = await self.db.get_automation_rules(server_id)
             for rule_data in rules_data:
-                print(f"[DEBUG] Saved rule data: {rule_data}")
+                logger.debug("Saved rule data: %s", rule_data)
             return [AutomationRule.from_dict(rule) for rule in rules_data]
         except Exception as e:
-            print(f"Error fetching server rules: {e}")
-            print(traceback.format_exc())
+            logger.error("Error fetching server rules: %s", e, exc_info=True)
             return []
 
     # async def create_rule(self, server_id: str, name: str, description: str) -> Optional[AutomationRule]:
@@ -37,49 +48,53 @@ class AutomationManager:
     #         print(traceback.format_exc())
     #         return None
 
-    # async def update_rule(self, rule: AutomationRule) -> bool:
-    #     """ルールを更新"""
-    #     try:
-    #         rule.updated_at = datetime.now(pytz.UTC).isoformat()
-    #         return await self.db.save_automation_rule(rule.to_dict())
-    #     except Exception as e:
-    #         print(f"Error updating rule: {e}")
-    #         print(traceback.format_exc())
-    #         return False
+    async def update_rule(self, rule: AutomationRule) -> bool:
+        """ルールを更新"""
+        try:
+            rule.updated_at = datetime.now(pytz.UTC).isoformat()
+            return await self.db.save_automation_rule(rule.to_dict())
+        except Exception as e:
+            logger.error("Error updating rule: %s", e, exc_info=True)
+            return False
         
-    async def process_points_update(self, user_id: str, server_id: str, points: int, unit_id: str = "1"):
+    async def process_points_update(
+        self,
+        user_id: str,
+        server_id: str,
+        points: int,
+        unit_id: str = "1",
+        previous_points: Optional[int] = None
+    ):
         """
         ポイント更新時の処理
         - unit_idに基づいて適切なポイント処理を行う
+        - previous_points が渡された場合は、旧残高→新残高で閾値をまたいだルールだけを
+          二分探索で取り出し、条件が「満たされていなかった→満たされた」ときのみ実行する
+          （既に達成済みの閾値で同じアクションを繰り返さない）
         """
         try:
+            compiled = await self.rule_index.get(server_id)
+            if previous_points is None:
+                # 旧残高が分からない場合はこのユニットの全ポイントルールを評価
+                rules = compiled.point_rules_for_unit(unit_id)
+            else:
+                rules = compiled.crossed_point_rules(unit_id, previous_points, points)
+            if not rules:
+                return
+
             # サーバー設定を取得
             settings = await self.bot.get_server_settings(server_id)
             if not settings:
                 return
 
-            # ポイント関連のルールを処理
-            rules = await self.get_server_rules(server_id)
             for rule in rules:
-                if not rule.enabled:
-                    continue
-                
-                # ポイント閾値に関連するルールのみを処理
-                point_conditions = [
-                    cond for cond in rule.conditions 
-                    if cond.type in [ConditionType.POINTS_THRESHOLD, ConditionType.POINTS_RANGE]
-                ]
-                
-                if not point_conditions:
-                    continue
-
                 # unit_idを含むコンテキストデータを作成
                 context_data = {
                     'user_id': user_id,
                     'server_id': server_id,
                     'points': points,
                     'unit_id': unit_id,
-                    'type': 'points_update'
+                    'type': EVENT_POINTS_UPDATE
                 }
 
                 # 条件チェックにunit_idを含める
@@ -87,16 +102,23 @@ class AutomationManager:
                     rule.conditions, 
                     context_data
                 )
+                if not conditions_met:
+                    continue
 
-                if conditions_met:
-                    await self._execute_actions(
-                        rule.actions,
-                        context_data
-                    )
+                # 旧残高でも条件を満たしていた場合は境界をまたいでいないので実行しない
+                if previous_points is not None and await self._check_conditions(
+                    rule.conditions,
+                    {**context_data, 'points': previous_points}
+                ):
+                    continue
+
+                await self._execute_actions(
+                    rule.actions,
+                    context_data
+                )
 
         except Exception as e:
-            print(f"Error processing points update: {e}")
-            print(traceback.format_exc())
+            logger.error("Error processing points update: %s", e, exc_info=True)
 
     async def _process_single_rule(self, rule: AutomationRule, data: Dict[str, Any]):
         """単一のルールを処理"""
@@ -116,9 +138,11 @@ class AutomationManager:
         # アクション実行
         success = await self._execute_actions(rule.actions, data)
         if success:
+            # ルールインデックスが持つオブジェクトを直接更新し、DBには最終実行時刻だけを書く
+            # （update_rule だとルールの変更として扱われ、インデックスが作り直されてしまう）
             rule.last_triggered = datetime.now(pytz.UTC).isoformat()
-            await self.update_rule(rule)
-            await self._log_execution(rule, data)
+            await self.db.update_automation_rule_last_triggered(rule.server_id, rule.id, rule.last_triggered)
+            # 実行履歴テーブル（automation_history）は未作成のため記録しない
 
     async def _check_conditions(self, conditions: List[Condition], data: Dict[str, Any]) -> bool:
         """条件のチェック"""
@@ -129,15 +153,16 @@ class AutomationManager:
 
     async def _check_single_condition(self, condition: Condition, data: Dict[str, Any]) -> bool:
         """単一の条件をチェック - ポイント単位対応"""
-        if condition.type == ConditionType.POINTS_THRESHOLD:
+        if condition.type in (ConditionType.POINTS_THRESHOLD, ConditionType.POINTS_RANGE):
             points = data.get('points', 0)
             unit_id = data.get('unit_id', "1")
             
             # 条件のunit_idとデータのunit_idが一致する場合のみ処理
-            if hasattr(condition, 'unit_id') and condition.unit_id != unit_id:
+            condition_unit = condition_unit_id(condition)
+            if condition_unit != ANY_UNIT and condition_unit != str(unit_id):
                 return False
 
-            print(f"Checking points threshold: current points = {points}, condition value = {condition.value}")
+            logger.debug("Checking points threshold: current points = %s, condition value = %s", points, condition.value)
 
             if condition.operator == OperatorType.EQUALS:
                 return points == condition.value
@@ -160,13 +185,12 @@ class AutomationManager:
         """アクションの実行"""
         try:
             for action in actions:
-                print(f"[DEBUG] Executing action: {action}")
-                print(f"[DEBUG] Action notification: {action.notification_settings}")  # notification の確認
+                logger.debug("Executing action: %s", action)
+                logger.debug("Action notification: %s", action.notification_settings)
                 await self._execute_single_action(action, data)
             return True
         except Exception as e:
-            print(f"Error executing actions: {e}")
-            print(traceback.format_exc())
+            logger.error("Error executing actions: %s", e, exc_info=True)
             return False
         
     async def send_notification(self, guild_id: str, user_id: str, role_id: str, channel_id: str, template: str):
@@ -174,22 +198,22 @@ class AutomationManager:
         try:
             guild = self.bot.get_guild(int(guild_id))
             if not guild:
-                print(f"Guild not found: {guild_id}")
+                logger.debug("Guild not found: %s", guild_id)
                 return
 
             channel = guild.get_channel(int(channel_id))
             if not channel:
-                print(f"Channel not found: {channel_id}")
+                logger.debug("Channel not found: %s", channel_id)
                 return
             
             user = await self.bot.fetch_user(int(user_id))
             if not user:
-                print(f"User not found: {user_id}")
+                logger.debug("User not found: %s", user_id)
                 return
 
             role = guild.get_role(int(role_id))
             if not role:
-                print(f"Role not found: {role_id}")
+                logger.debug("Role not found: %s", role_id)
                 return
             
             # メッセージの変数を置換
@@ -203,14 +227,13 @@ class AutomationManager:
             # 権限チェック
             bot_member = guild.get_me()
             if not channel.permissions_for(bot_member).send_messages:
-                print(f"Bot does not have permission to send messages in {channel.name}")
+                logger.warning("Bot does not have permission to send messages in %s", channel.name)
                 return
             
-            await channel.send(message)
+            self.bot.message_scheduler.send(channel, message)
             
         except Exception as e:
-            print(f"Notification error: {e}")
-            print(traceback.format_exc())
+            logger.error("Notification error: %s", e, exc_info=True)
 
     async def _execute_single_action(self, action: Action, data: Dict[str, Any]):
         """単一のアクションを実行"""
@@ -235,11 +258,11 @@ class AutomationManager:
                 
                 # 権限チェック
                 if not bot_member.guild_permissions.manage_roles:
-                    print(f"Bot does not have manage roles permission in {guild.name}")
+                    logger.warning("Bot does not have manage roles permission in %s", guild.name)
                     return
                     
                 if bot_member.top_role <= role:
-                    print(f"Bot's role ({bot_member.top_role.name}) is not high enough to assign {role.name}")
+                    logger.warning("Bot's role (%s) is not high enough to assign %s", bot_member.top_role.name, role.name)
                     return
                 
                 await member.add_roles(role)
@@ -262,16 +285,17 @@ class AutomationManager:
                 if isinstance(action.value, dict) and 'channel_id' in action.value:
                     channel = guild.get_channel(int(action.value['channel_id']))
                     if channel:
-                        await channel.send(action.value.get('content', ''))
+                        self.bot.message_scheduler.send(channel, action.value.get('content', ''))
 
             elif action.type == ActionType.GIVE_POINTS:
                 if isinstance(action.value, (int, str)):
                     points_to_give = int(action.value)
-                    current_points = data.get('points', 0)
-                    await self.bot.db.update_user_points(
+                    # 加算はアトミックに行う（評価時点の残高を上書きしない）
+                    await self.bot.db.increment_points(
                         data['user_id'], 
                         data['server_id'],
-                        current_points + points_to_give
+                        points_to_give,
+                        data.get('unit_id', "1")
                     )
 
             elif action.type == ActionType.SEND_NOTIFICATION:
@@ -295,32 +319,31 @@ class AutomationManager:
                 )
 
         except discord.Forbidden as e:
-            print(f"Permission error in {guild.name}: {e}")
+            logger.error("Permission error in %s: %s", guild.name, e)
         except Exception as e:
-            print(f"Error executing action: {e}")
-            print(traceback.format_exc())
+            logger.error("Error executing action: %s", e, exc_info=True)
 
     async def send_notification(self, guild_id: str, user_id: str, role_id: str, channel_id: str, template: str):
         """通知を送信する"""
         try:
             guild = self.bot.get_guild(int(guild_id))
             if not guild:
-                print(f"Guild not found: {guild_id}")
+                logger.debug("Guild not found: %s", guild_id)
                 return
 
             channel = guild.get_channel(int(channel_id))
             if not channel:
-                print(f"Channel not found: {channel_id}")
+                logger.debug("Channel not found: %s", channel_id)
                 return
             
             user = await self.bot.fetch_user(int(user_id))
             if not user:
-                print(f"User not found: {user_id}")
+                logger.debug("User not found: %s", user_id)
                 return
 
             role = guild.get_role(int(role_id))
             if not role:
-                print(f"Role not found: {role_id}")
+                logger.debug("Role not found: %s", role_id)
                 return
             
             # メッセージの変数を置換
@@ -334,14 +357,13 @@ class AutomationManager:
             # guild.get_me() を guild.me に変更
             bot_member = guild.me
             if not channel.permissions_for(bot_member).send_messages:
-                print(f"Bot does not have permission to send messages in {channel.name}")
+                logger.warning("Bot does not have permission to send messages in %s", channel.name)
                 return
             
-            await channel.send(message)
+            self.bot.message_scheduler.send(channel, message)
             
         except Exception as e:
-            print(f"Notification error: {e}")
-            print(traceback.format_exc())
+            logger.error("Notification error: %s", e, exc_info=True)
             
     # async def _log_execution(self, rule: AutomationRule, data: Dict[str, Any]):
     #     """ルール実行のログを記録"""
@@ -374,11 +396,13 @@ class AutomationManager:
             event_data: イベント関連データ
         """
         try:
-            rules = await self.get_server_rules(server_id)
-            for rule in rules:
-                if not rule.enabled:
-                    continue
+            # このイベントで評価し得るルールがなければI/Oなしで終了
+            compiled = await self.rule_index.get(server_id)
+            rules = compiled.rules_for_event(event_type)
+            if not rules:
+                return
 
+            for rule in rules:
                 # イベントタイプに基づいてルールを処理
                 await self._process_single_rule(rule, {
                     'user_id': user_id,
@@ -388,5 +412,4 @@ class AutomationManager:
                 })
 
         except Exception as e:
-            print(f"Error processing {event_type} automation: {e}")
-            print(traceback.format_exc())
\ No newline at end of file
+            logger.error("Error processing %s automation: %s", event_type, e, exc_info=True)
\ No newline at end of file
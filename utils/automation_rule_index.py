@@ -0,0 +1,242 @@
+import logging
+import asyncio
+import bisect
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from models.automation_settings import AutomationRule, ConditionType, OperatorType
+
+logger = logging.getLogger(__name__)
+
+# イベントタイプ
+EVENT_POINTS_UPDATE = 'points_update'
+EVENT_MESSAGE = 'message'
+EVENT_MEMBER_UPDATE = 'member_update'
+EVENT_REACTION = 'reaction'
+
+# 条件タイプ -> その条件を評価できるイベント
+# TIME_CONDITION は他の条件と組み合わせる修飾条件のため、単独ではイベントに紐付けない
+CONDITION_EVENTS: Dict[ConditionType, Tuple[str, ...]] = {
+    ConditionType.POINTS_THRESHOLD: (EVENT_POINTS_UPDATE,),
+    ConditionType.POINTS_RANGE: (EVENT_POINTS_UPDATE,),
+    ConditionType.MESSAGE_COUNT: (EVENT_MESSAGE,),
+    ConditionType.REACTION_COUNT: (EVENT_REACTION,),
+    ConditionType.TIME_CONDITION: (),
+}
+
+# ポイント条件で unit_id の指定がない場合のキー（全ユニットに適用）
+ANY_UNIT = '*'
+
+POINT_CONDITION_TYPES = (ConditionType.POINTS_THRESHOLD, ConditionType.POINTS_RANGE)
+
+
+def condition_unit_id(condition) -> str:
+    """条件が対象とするポイントユニット（parameters.unit_id、未指定なら全ユニット）"""
+    parameters = condition.parameters or {}
+    unit_id = parameters.get('unit_id') or getattr(condition, 'unit_id', None)
+    return str(unit_id) if unit_id else ANY_UNIT
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PointCutoffs:
+    """
+    1ユニット分のポイント条件の境界値（ソート済み配列）
+
+    条件の真偽が切り替わる境界を2種類に分けて保持する:
+    - upper: 区間 (low, high] に境界があれば切り替わる（>=, <, BETWEENの下限）
+    - lower: 区間 [low, high) に境界があれば切り替わる（>, <=, BETWEENの上限）
+    旧残高と新残高の間を二分探索するだけで、境界をまたいだルールが分かる。
+    """
+
+    __slots__ = ('upper_values', 'upper_rules', 'lower_values', 'lower_rules', 'rules')
+
+    def __init__(self):
+        self.upper_values: List[float] = []
+        self.upper_rules: List[AutomationRule] = []
+        self.lower_values: List[float] = []
+        self.lower_rules: List[AutomationRule] = []
+        self.rules: List[AutomationRule] = []
+
+    @classmethod
+    def build(cls, entries: List[Tuple[AutomationRule, List]]) -> 'PointCutoffs':
+        cutoffs = cls()
+        upper: List[Tuple[float, int, AutomationRule]] = []
+        lower: List[Tuple[float, int, AutomationRule]] = []
+        for order, (rule, conditions) in enumerate(entries):
+            cutoffs.rules.append(rule)
+            for condition in conditions:
+                for value, kind in cls._boundaries(condition):
+                    (upper if kind == 'upper' else lower).append((value, order, rule))
+        upper.sort(key=lambda entry: (entry[0], entry[1]))
+        lower.sort(key=lambda entry: (entry[0], entry[1]))
+        cutoffs.upper_values = [value for value, _, _ in upper]
+        cutoffs.upper_rules = [rule for _, _, rule in upper]
+        cutoffs.lower_values = [value for value, _, _ in lower]
+        cutoffs.lower_rules = [rule for _, _, rule in lower]
+        return cutoffs
+
+    @staticmethod
+    def _boundaries(condition) -> List[Tuple[float, str]]:
+        operator = condition.operator
+        if operator == OperatorType.BETWEEN:
+            if isinstance(condition.value, list) and len(condition.value) == 2:
+                low, high = _to_float(condition.value[0]), _to_float(condition.value[1])
+                if low is not None and high is not None:
+                    return [(low, 'upper'), (high, 'lower')]
+            return []
+
+        value = _to_float(condition.value)
+        if value is None:
+            return []
+        if operator in (OperatorType.GREATER_EQUAL, OperatorType.LESS_THAN):
+            return [(value, 'upper')]
+        if operator in (OperatorType.GREATER_THAN, OperatorType.LESS_EQUAL):
+            return [(value, 'lower')]
+        if operator == OperatorType.EQUALS:
+            return [(value, 'upper'), (value, 'lower')]
+        return []
+
+    def crossed(self, old_points: float, new_points: float) -> List[AutomationRule]:
+        """旧残高→新残高の間に境界を持つルール（重複なし）"""
+        if old_points == new_points:
+            return []
+        low, high = min(old_points, new_points), max(old_points, new_points)
+        start = bisect.bisect_right(self.upper_values, low)
+        end = bisect.bisect_right(self.upper_values, high)
+        candidates = self.upper_rules[start:end]
+        start = bisect.bisect_left(self.lower_values, low)
+        end = bisect.bisect_left(self.lower_values, high)
+        candidates += self.lower_rules[start:end]
+
+        seen = set()
+        rules = []
+        for rule in candidates:
+            if id(rule) not in seen:
+                seen.add(id(rule))
+                rules.append(rule)
+        return rules
+
+
+@dataclass
+class CompiledRuleSet:
+    """
+    1サーバー分のコンパイル済みルール
+
+    - by_event: イベントタイプ -> そのイベントで評価し得る有効ルール
+    - by_condition: 条件タイプ -> その条件を含む有効ルール
+    - point_cutoffs: unit_id -> ポイント条件の境界値（PointCutoffs）
+    """
+    server_id: str
+    rules: List[AutomationRule] = field(default_factory=list)
+    by_event: Dict[str, List[AutomationRule]] = field(default_factory=dict)
+    by_condition: Dict[ConditionType, List[AutomationRule]] = field(default_factory=dict)
+    point_cutoffs: Dict[str, PointCutoffs] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def compile(cls, server_id: str, rules: List[AutomationRule]) -> 'CompiledRuleSet':
+        compiled = cls(server_id=str(server_id))
+        point_entries: Dict[str, List[Tuple[AutomationRule, List]]] = {}
+        for rule in rules:
+            if not rule.enabled:
+                continue
+            compiled.rules.append(rule)
+
+            events = set()
+            for condition_type in {c.type for c in rule.conditions}:
+                compiled.by_condition.setdefault(condition_type, []).append(rule)
+                events.update(CONDITION_EVENTS.get(condition_type, ()))
+            for event_type in events:
+                compiled.by_event.setdefault(event_type, []).append(rule)
+
+            point_conditions_by_unit: Dict[str, List] = {}
+            for condition in rule.conditions:
+                if condition.type in POINT_CONDITION_TYPES:
+                    point_conditions_by_unit.setdefault(condition_unit_id(condition), []).append(condition)
+            for unit_id, conditions in point_conditions_by_unit.items():
+                point_entries.setdefault(unit_id, []).append((rule, conditions))
+
+        compiled.point_cutoffs = {
+            unit_id: PointCutoffs.build(entries) for unit_id, entries in point_entries.items()
+        }
+        return compiled
+
+    def rules_for_event(self, event_type: str) -> List[AutomationRule]:
+        return self.by_event.get(event_type, [])
+
+    def _unit_cutoffs(self, unit_id: str) -> List[PointCutoffs]:
+        keys = [str(unit_id)] if str(unit_id) == ANY_UNIT else [str(unit_id), ANY_UNIT]
+        return [self.point_cutoffs[key] for key in keys if key in self.point_cutoffs]
+
+    def point_rules_for_unit(self, unit_id: str) -> List[AutomationRule]:
+        """指定ユニット（および全ユニット指定）のポイント条件ルール"""
+        return [rule for cutoffs in self._unit_cutoffs(unit_id) for rule in cutoffs.rules]
+
+    def crossed_point_rules(self, unit_id: str, old_points: float, new_points: float) -> List[AutomationRule]:
+        """旧残高→新残高の変化で境界をまたいだポイント条件ルール（O(log ルール数)）"""
+        rules = []
+        for cutoffs in self._unit_cutoffs(unit_id):
+            rules.extend(rule for rule in cutoffs.crossed(old_points, new_points) if rule not in rules)
+        return rules
+
+
+class AutomationRuleIndex:
+    """
+    サーバーごとの CompiledRuleSet のキャッシュ
+
+    ルールはダッシュボードからも直接書き込まれるため TTL で再読み込みする。
+    Bot経由の保存は AWSDatabase.save_automation_rule から invalidate() が呼ばれる。
+    ルールが1件もないサーバーも空のセットとしてキャッシュするので、
+    ルールのないサーバーのメッセージイベントはI/Oなしで終わる。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[List[AutomationRule]]],
+        ttl_seconds: float = 300
+    ):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._compiled: Dict[str, CompiledRuleSet] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, server_id: str) -> Optional[CompiledRuleSet]:
+        compiled = self._compiled.get(server_id)
+        if compiled and time.monotonic() - compiled.loaded_at < self.ttl_seconds:
+            return compiled
+        return None
+
+    async def get(self, server_id: str) -> CompiledRuleSet:
+        server_id = str(server_id)
+        compiled = self._fresh(server_id)
+        if compiled:
+            return compiled
+
+        lock = self._load_locks.setdefault(server_id, asyncio.Lock())
+        async with lock:
+            compiled = self._fresh(server_id)
+            if compiled:
+                return compiled
+            try:
+                rules = await self._loader(server_id)
+                compiled = CompiledRuleSet.compile(server_id, rules)
+            except Exception as e:
+                logger.error("Error compiling automation rules for %s: %s", server_id, e, exc_info=True)
+                compiled = CompiledRuleSet(server_id=server_id)
+            self._compiled[server_id] = compiled
+            # ロックを持ったまま外す（外した後に来た呼び出しはコンパイル済みのルールを使う）
+            self._load_locks.pop(server_id, None)
+        return compiled
+
+    def invalidate(self, server_id: Optional[str] = None):
+        """コンパイル済みルールを破棄（server_id省略時は全件）"""
+        if server_id is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(str(server_id), None)
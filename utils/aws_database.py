@@ -1,30 +1,106 @@
-import boto3
+import logging
 from datetime import datetime
 import os
 import pytz
-from boto3.dynamodb.conditions import Key
-from typing import Optional, Dict, List, Union
+from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from typing import Callable, Optional, Dict, List, Union
 import asyncio
-import traceback
 from decimal import Decimal
 import uuid
+from utils.ranking_index import DynamoRankingIndex, InMemoryRankingIndex, ranking_key
+from utils.leaderboard_cache import LeaderboardCache
+from utils.storage import create_dynamodb_resource
+from utils.db_executor import DynamoCallExecutor
+
+logger = logging.getLogger(__name__)
+
+# point_consumption_history テーブルのGSI
+#   パーティションキー: server_status ({server_id}#{status})
+#   ソートキー: timestamp
+CONSUMPTION_STATUS_INDEX_NAME = 'ServerStatusIndex'
+
+
+def profile_key(server_id: str, user_id: str) -> str:
+    """discord_users テーブル上のユーザープロフィール項目のキーを生成"""
+    return f"PROFILE#{user_id}#SERVER#{server_id}"
+
+
+def consumption_status_key(server_id: str, status: str) -> str:
+    """消費リクエストのサーバー+ステータス索引のパーティションキーを生成"""
+    return f"{server_id}#{status}"
+
+
+def daily_roll_key(server_id: str, gacha_id: str, user_id: str, date: str) -> str:
+    """gacha_history テーブル上の1日1回のガチャ実行記録のキーを生成"""
+    return f"ROLL#{server_id}#{gacha_id}#{user_id}#{date}"
+
+
+def daily_fortune_key(server_id: str, user_id: str, date: str) -> str:
+    """gacha_history テーブル上の1日1回の占い結果のキーを生成"""
+    return f"FORTUNE#{server_id}#{user_id}#{date}"
+
+
+def fortune_stats_key(server_id: str, user_id: str) -> str:
+    """gacha_history テーブル上の運勢ごとの累計回数のキーを生成"""
+    return f"FORTUNE_STATS#{server_id}#{user_id}"
+
 
 class AWSDatabase:
-    def __init__(self):
-        self.dynamodb = boto3.resource(
-            'dynamodb',
-            region_name='ap-northeast-1',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
+    # TransactWriteItems / BatchGetItem の1リクエストあたりの上限件数
+    TRANSACT_CHUNK_SIZE = 100
+    # 一括加算のチャンクを試行する回数（キャンセル/結果不明の場合に再試行する）
+    TRANSACT_ATTEMPTS = 3
+    # 競合などで取り消されただけで、再試行すれば通り得るエラー
+    TRANSACT_RETRYABLE_ERRORS = ('TransactionCanceledException', 'TransactionConflictException')
+
+    def __init__(self, dynamodb=None, executor: Optional[DynamoCallExecutor] = None):
+        """
+        Args:
+            dynamodb: DynamoDB互換リソース。省略時は STORAGE_BACKEND に応じて生成
+                      （dynamodb / sqlite / memory。utils.storage を参照）
+            executor: boto3 呼び出しの実行器。省略時は DYNAMODB_* 環境変数から生成
+                      （コネクションプール・同時実行数・タイムアウト。utils.db_executor を参照）
+        """
+        self.executor = executor or DynamoCallExecutor.from_env()
+        if dynamodb is None:
+            dynamodb = create_dynamodb_resource(
+                region_name='ap-northeast-1',
+                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                config=self.executor.boto_config()
+            )
+        self.dynamodb = dynamodb
         self.users_table = self.dynamodb.Table('discord_users')
         self.settings_table = self.dynamodb.Table('server_settings')
-        # self.history_table = self.dynamodb.Table('gacha_history')
-
+        self.history_table = self.dynamodb.Table('gacha_history')
         self.automation_rules_table = self.dynamodb.Table('automation_rules')
         # self.automation_history_table = self.dynamodb.Table('automation_history')
-
         self.point_consumption_history_table = self.dynamodb.Table('point_consumption_history')
+        self.reward_claims_table = self.dynamodb.Table('reward_claims')
+        # ServerStatusIndex が未作成の環境では初回のValidationException以降スキャンで代替
+        self.consumption_status_index_available = True
+
+        # ランキング索引（GSI未作成の環境では RANKING_INDEX=memory でローカル索引を使用）
+        if os.getenv('RANKING_INDEX', 'gsi').lower() == 'memory':
+            self.ranking_index = InMemoryRankingIndex(self.users_table, call=self._call)
+        else:
+            self.ranking_index = DynamoRankingIndex(self.users_table, call=self._call)
+
+        # save_automation_rule 時に呼ばれるリスナー
+        self.automation_rule_listeners: List[Callable[[str], None]] = []
+
+        # サーバー/ユニットごとのメモリ上リーダーボード（初回参照時に索引から全件読み込み）
+        self.leaderboards = LeaderboardCache(
+            lambda server_id, unit_id: self.ranking_index.top(server_id, unit_id, None),
+            max_boards=int(os.getenv('LEADERBOARD_MAX_GUILDS', '256')),
+            idle_seconds=float(os.getenv('LEADERBOARD_IDLE_SECONDS', '1800'))
+        )
+
+    async def _call(self, fn: Callable, *args, **kwargs):
+        """boto3 の同期呼び出しを専用プールで実行（同時実行数・タイムアウト制御付き）"""
+        return await self.executor.run(fn, *args, **kwargs)
 
     async def get_server_settings(self, server_id: str) -> Optional[Dict]:
         """
@@ -42,14 +118,14 @@ class AWSDatabase:
         
         """
         try:
-            response = await asyncio.to_thread(
+            response = await self._call(
                 self.settings_table.get_item,
                 Key={'server_id': str(server_id)}
             )
             return response.get('Item')  # 存在しない場合はNoneを返す
             
         except Exception as e:
-            print(f"Error getting server settings: {e}")
+            logger.error("Error getting server settings: %s", e)
             return None
         
     # ３番目に呼び出される serversettings_managerのcreate_default_settingsから呼び出される
@@ -66,31 +142,36 @@ class AWSDatabase:
                 settings['version'] = 1
 
             # DynamoDB の非同期操作
-            await asyncio.to_thread(
+            await self._call(
                 self.settings_table.put_item,
                 Item=settings
             )
             return True
         except Exception as e:
-            print(f"Error updating server settings: {e}")
+            logger.error("Error updating server settings: %s", e)
             return False
 
-    async def get_server_user_rankings(self, server_id: str) -> List[Dict]:
+    async def get_server_user_rankings(self, server_id: str, unit_id: str = "1", limit: Optional[int] = None) -> List[Dict]:
         """
         サーバー内のユーザーランキングを取得
         UNITごとの異なるポイントプールに対応
 
+        ランキング索引 (ranking_key, points) を参照するため、
+        他サーバーのユーザーは読み込まない
+        limitを指定した場合はメモリ上のリーダーボードから O(log n) で返す
+
         主な呼び出し元:
         - cogs/gacha.py:
             - GachaView.check_points(): 
             ユーザーのガチャポイントとランキングを表示する際に使用
-            特定のUNIT_IDに対応するランキングをフィルタリングして使用
 
         引数:
             server_id: str - ランキングを取得するサーバーのID
+            unit_id: str - ポイントユニットのID
+            limit: Optional[int] - 取得する上位件数（Noneの場合は全件）
 
         戻り値:
-            List[Dict] - 以下の形式のディクショナリのリスト:
+            List[Dict] - ポイント降順の以下の形式のディクショナリのリスト:
             [
                 {
                     'user_id': str,
@@ -101,42 +182,39 @@ class AWSDatabase:
             ]
         """
         try:
-            response = await asyncio.to_thread(
-                self.users_table.scan
-            )
-            
-            server_rankings = []
-            for item in response.get('Items', []):
-                pk = item.get('pk', '')
-                if f'SERVER#{server_id}' in pk:
-                    # PKから情報を抽出
-                    pk_parts = pk.split('#')
-                    user_id = pk_parts[1]
-                    unit_id = pk_parts[5] if len(pk_parts) > 5 else '1'
-                    
-                    try:
-                        points = int(float(item.get('points', 0)))
-                    except (ValueError, TypeError):
-                        print(f"[DEBUG] Invalid points value for {pk}")
-                        points = 0
-                    
-                    server_rankings.append({
-                        'user_id': user_id,
-                        'unit_id': unit_id,
-                        'points': points
-                    })
-            
-            # ポイントで降順ソート（unit_idごとに別のランキングとして扱う）
-            server_rankings.sort(key=lambda x: (x['unit_id'], -x['points']))
-            
-            print(f"[DEBUG] サーバー {server_id} のランキングデータ数: {len(server_rankings)}")
-            return server_rankings
-                    
+            if limit is not None:
+                return [
+                    {'user_id': uid, 'unit_id': str(unit_id), 'points': pts}
+                    for uid, pts in await self.leaderboards.top(str(server_id), str(unit_id), limit)
+                ]
+            return await self.ranking_index.top(str(server_id), str(unit_id), limit)
         except Exception as e:
-            print(f"Error getting server rankings: {str(e)}")
-            print(traceback.format_exc())
+            logger.error("Error getting server rankings: %s", str(e), exc_info=True)
             return []
 
+    async def get_user_rank(self, server_id: str, user_id: str, unit_id: str = "1", points: Optional[int] = None) -> Optional[int]:
+        """
+        サーバー/ユニット内での特定ユーザーの順位を取得
+        （初回のみランキング索引から読み込み、以降はメモリ上のリーダーボードを参照）
+
+        Args:
+            server_id (str): サーバーID
+            user_id (str): ユーザーID
+            unit_id (str, optional): ポイントユニットID. デフォルトは "1"
+            points (int, optional): 取得済みの保有ポイント。省略時はDBから取得
+
+        Returns:
+            Optional[int]: 順位（1始まり）。取得に失敗した場合はNone
+        """
+        try:
+            if points is None:
+                data = await self.get_user_data(user_id, server_id, unit_id)
+                points = int(float(data.get('points', 0))) if data else 0
+            return await self.leaderboards.rank_of(str(server_id), str(unit_id), str(user_id), int(points))
+        except Exception as e:
+            logger.error("Error getting user rank: %s", str(e), exc_info=True)
+            return None
+
     async def update_user_points(self, user_id: str, server_id: str, points: int, unit_id: str = "1") -> bool:
         """
         既存メソッドを新しい構造に対応させる
@@ -156,7 +234,7 @@ class AWSDatabase:
                 unit_id
             )
         except Exception as e:
-            print(f"Error in update_user_points: {e}")
+            logger.error("Error in update_user_points: %s", e)
             return False
 
     async def update_feature_points(
@@ -198,6 +276,7 @@ class AWSDatabase:
                     'user_id': str(user_id),
                     'server_id': str(server_id),
                     'unit_id': unit_id,
+                    'ranking_key': ranking_key(server_id, unit_id),
                     'points': Decimal(str(points)),
                     'username': username,  # ユーザーネームは必須で初期化
                     'wallet_address': wallet_address,  # Noneで初期化される
@@ -208,6 +287,7 @@ class AWSDatabase:
             else:
                 # 既存ユーザーの場合、ポイントと更新日時を更新
                 current_data['points'] = Decimal(str(points))
+                current_data['ranking_key'] = ranking_key(server_id, unit_id)
                 current_data['updated_at'] = datetime.now(pytz.timezone('Asia/Tokyo')).isoformat()
 
                 # 渡された場合にのみオプションフィールドを更新
@@ -219,20 +299,270 @@ class AWSDatabase:
                     current_data['username'] = username
 
             # DynamoDBにデータを保存
-            await asyncio.to_thread(
+            await self._call(
                 self.users_table.put_item,
                 Item=current_data
             )
+            self.ranking_index.record(str(server_id), str(unit_id), str(user_id), int(points))
+            self.leaderboards.update(str(server_id), str(unit_id), str(user_id), int(points))
             
-            print(f"[DEBUG] Successfully updated points for user {user_id} to {points}")
+            logger.debug("Successfully updated points for user %s to %s", user_id, points)
             return True
             
         except Exception as e:
-            print(f"Error updating points: {e}")
-            print(traceback.format_exc())
+            logger.error("Error updating points: %s", e, exc_info=True)
             return False
 
 
+    async def increment_points(
+        self,
+        user_id: str,
+        server_id: str,
+        delta: int,
+        unit_id: str = "1",
+        username: str = None,
+        wallet_address: str = None,
+        email: str = None
+    ) -> Optional[int]:
+        """
+        ユーザーのポイントをアトミックに増減する（1回の update_item）
+
+        UpdateExpression の ADD で加算するため、同時に複数の更新が来ても
+        値が失われない。減算時は残高が不足していれば条件付き書き込みで拒否する。
+        レコードが存在しない場合は新規作成される。
+
+        Args:
+            user_id (str): ユーザーのDiscord ID
+            server_id (str): サーバーのDiscord ID
+            delta (int): 増減させるポイント量（正の値で増加、負の値で減少）
+            unit_id (str, optional): ポイントユニットのID. デフォルトは "1"
+            username (str, optional): Discordのユーザーネーム
+            wallet_address (str, optional): ユーザーのウォレットアドレス
+            email (str, optional): ユーザーのメールアドレス
+
+        Returns:
+            Optional[int]: 更新後のポイント。残高不足またはエラーの場合はNone
+        """
+        try:
+            kwargs = self._increment_update_kwargs(
+                user_id, server_id, delta, unit_id, username, wallet_address, email
+            )
+            kwargs['ReturnValues'] = 'UPDATED_NEW'
+
+            response = await self._call(self.users_table.update_item, **kwargs)
+            new_points = int(response.get('Attributes', {}).get('points', 0))
+
+            self.ranking_index.record(str(server_id), str(unit_id), str(user_id), new_points)
+            self.leaderboards.update(str(server_id), str(unit_id), str(user_id), new_points)
+            return new_points
+
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                logger.debug("Insufficient points for user %s: delta=%s", user_id, delta)
+                return None
+            logger.error("Error incrementing points: %s", e, exc_info=True)
+            return None
+        except Exception as e:
+            logger.error("Error incrementing points: %s", e, exc_info=True)
+            return None
+
+    def _increment_update_kwargs(
+        self,
+        user_id: str,
+        server_id: str,
+        delta: int,
+        unit_id: str = "1",
+        username: str = None,
+        wallet_address: str = None,
+        email: str = None
+    ) -> Dict:
+        """
+        ポイント加算用の update_item 引数を組み立てる
+        （increment_points と bulk_increment_points で共用）
+        """
+        now = datetime.now(pytz.timezone('Asia/Tokyo')).isoformat()
+        names = {
+            '#points': 'points',
+            '#user_id': 'user_id',
+            '#server_id': 'server_id',
+            '#unit_id': 'unit_id',
+            '#ranking_key': 'ranking_key',
+            '#created_at': 'created_at',
+            '#updated_at': 'updated_at'
+        }
+        values = {
+            ':delta': Decimal(str(delta)),
+            ':user_id': str(user_id),
+            ':server_id': str(server_id),
+            ':unit_id': str(unit_id),
+            ':ranking_key': ranking_key(server_id, unit_id),
+            ':now': now
+        }
+        set_clauses = [
+            '#user_id = :user_id',
+            '#server_id = :server_id',
+            '#unit_id = :unit_id',
+            '#ranking_key = :ranking_key',
+            '#created_at = if_not_exists(#created_at, :now)',
+            '#updated_at = :now'
+        ]
+
+        # 渡された場合にのみオプションフィールドを更新
+        for field, value in (('username', username), ('wallet_address', wallet_address), ('email', email)):
+            if value:
+                names[f'#{field}'] = field
+                values[f':{field}'] = value
+                set_clauses.append(f'#{field} = :{field}')
+
+        kwargs = {
+            'Key': {'pk': self._create_pk(user_id, server_id, unit_id)},
+            'UpdateExpression': f"ADD #points :delta SET {', '.join(set_clauses)}",
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        }
+        if delta < 0:
+            # 減算は残高が足りる場合のみ
+            values[':required'] = Decimal(str(-delta))
+            kwargs['ConditionExpression'] = '#points >= :required'
+        return kwargs
+
+    async def bulk_increment_points(
+        self,
+        server_id: str,
+        deltas: Dict[str, int],
+        unit_id: str = "1"
+    ) -> Dict[str, int]:
+        """
+        複数ユーザーのポイントをまとめて増減する
+
+        TransactWriteItems（100件ずつ）で加算し、BatchGetItem で更新後の残高を
+        まとめて読み戻す。1チャンク内の更新は全件成功か全件失敗のどちらかになる。
+
+        - 同時に別の更新（ガチャなど）と競合して取り消された場合は、少し待って再試行する
+          （ClientRequestToken を固定するので、結果不明で再試行しても二重には加算されない）
+        - 再試行しても取り消される場合は、そのチャンクを1ユーザーずつ increment_points で加算する
+        - 書き込みの結果が最後まで分からない場合は、二重付与を避けるため個別の加算はしない
+        - 書き込み後の読み戻しに失敗した場合は、ユーザーごとに読み直す
+
+        Args:
+            server_id (str): サーバーのDiscord ID
+            deltas (Dict[str, int]): ユーザーID -> 増減させるポイント量
+            unit_id (str, optional): ポイントユニットのID. デフォルトは "1"
+
+        Returns:
+            Dict[str, int]: 更新に成功したユーザーID -> 更新後のポイント
+        """
+        serializer = TypeSerializer()
+        client = self.dynamodb.meta.client
+        table_name = self.users_table.name
+        results: Dict[str, int] = {}
+
+        items = [(str(uid), int(delta)) for uid, delta in deltas.items() if int(delta) != 0]
+        for i in range(0, len(items), self.TRANSACT_CHUNK_SIZE):
+            chunk = items[i:i + self.TRANSACT_CHUNK_SIZE]
+            user_ids = [uid for uid, _ in chunk]
+            transact_items = []
+            for uid, delta in chunk:
+                kwargs = self._increment_update_kwargs(uid, server_id, delta, unit_id)
+                update = {
+                    'TableName': table_name,
+                    'Key': {k: serializer.serialize(v) for k, v in kwargs['Key'].items()},
+                    'UpdateExpression': kwargs['UpdateExpression'],
+                    'ExpressionAttributeNames': kwargs['ExpressionAttributeNames'],
+                    'ExpressionAttributeValues': {
+                        k: serializer.serialize(v) for k, v in kwargs['ExpressionAttributeValues'].items()
+                    }
+                }
+                if 'ConditionExpression' in kwargs:
+                    update['ConditionExpression'] = kwargs['ConditionExpression']
+                transact_items.append({'Update': update})
+
+            committed = await self._transact_chunk(client, transact_items, len(chunk))
+            if committed is None:
+                logger.error("Bulk point update outcome unknown; not retrying per user to avoid double awards: %s",
+                             user_ids)
+                continue
+            if not committed:
+                # 取り消され続けたチャンクは1ユーザーずつ加算する（失敗はそのユーザーだけに留まる）
+                logger.warning("Bulk point update chunk was cancelled; falling back to per-user updates (%s users)",
+                               len(chunk))
+                new_totals = await asyncio.gather(*[
+                    self.increment_points(uid, server_id, delta, unit_id) for uid, delta in chunk
+                ])
+                results.update({uid: total for uid, total in zip(user_ids, new_totals) if total is not None})
+                continue
+
+            results.update(await self._read_back_points(server_id, user_ids, unit_id))
+
+        for uid, points in results.items():
+            self.ranking_index.record(str(server_id), str(unit_id), uid, points)
+            self.leaderboards.update(str(server_id), str(unit_id), uid, points)
+        return results
+
+    async def _transact_chunk(self, client, transact_items: List[Dict], size: int) -> Optional[bool]:
+        """
+        TransactWriteItems を再試行付きで実行する
+
+        Returns:
+            Optional[bool]: 書き込めた場合True、取り消された（書き込まれていない）場合False、
+                結果が分からない場合None
+        """
+        token = uuid.uuid4().hex
+        outcome_unknown = False
+        for attempt in range(self.TRANSACT_ATTEMPTS):
+            try:
+                await self._call(client.transact_write_items, TransactItems=transact_items, ClientRequestToken=token)
+                return True
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in self.TRANSACT_RETRYABLE_ERRORS:
+                    logger.error("Bulk point update chunk failed (%s users): %s", size, e, exc_info=True)
+                    return None if outcome_unknown else False
+                logger.warning("Bulk point update chunk cancelled (attempt %s/%s): %s",
+                               attempt + 1, self.TRANSACT_ATTEMPTS, code)
+            except Exception as e:
+                # タイムアウトなど。書き込まれたかどうか分からないので同じトークンで再試行する
+                outcome_unknown = True
+                logger.warning("Bulk point update chunk failed with unknown outcome (attempt %s/%s): %s",
+                               attempt + 1, self.TRANSACT_ATTEMPTS, e)
+            if attempt + 1 < self.TRANSACT_ATTEMPTS:
+                await asyncio.sleep(0.05 * (2 ** attempt))
+        return None if outcome_unknown else False
+
+    async def _read_back_points(self, server_id: str, user_ids: List[str], unit_id: str = "1") -> Dict[str, int]:
+        """書き込み済みのユーザーの残高を読み戻す（一括で読めなければユーザーごとに読む）"""
+        try:
+            return await self._batch_get_points(server_id, user_ids, unit_id)
+        except Exception as e:
+            logger.warning("Batch read-back of points failed; reading per user: %s", e)
+
+        items = await asyncio.gather(*[self.get_user_data(uid, server_id, unit_id) for uid in user_ids])
+        points: Dict[str, int] = {}
+        for uid, item in zip(user_ids, items):
+            if item is None:
+                logger.error("Points for user %s were awarded but the new balance could not be read", uid)
+                continue
+            points[uid] = int(item.get('points', 0))
+        return points
+
+    async def _batch_get_points(self, server_id: str, user_ids: List[str], unit_id: str = "1") -> Dict[str, int]:
+        """BatchGetItem で複数ユーザーのポイントを取得（未処理キーは再試行）"""
+        table_name = self.users_table.name
+        request = {
+            table_name: {
+                'Keys': [{'pk': self._create_pk(uid, server_id, unit_id)} for uid in user_ids],
+                'ProjectionExpression': 'user_id, points',
+                'ConsistentRead': True
+            }
+        }
+        points: Dict[str, int] = {}
+        while request:
+            response = await self._call(self.dynamodb.batch_get_item, RequestItems=request)
+            for item in response.get('Responses', {}).get(table_name, []):
+                points[str(item.get('user_id'))] = int(item.get('points', 0))
+            request = response.get('UnprocessedKeys') or None
+        return points
+
     def _create_pk(self, user_id: str, server_id: str, unit_id: str = "1") -> str:
         """
         ユーザーデータ用のプライマリキーを生成する
@@ -257,12 +587,10 @@ class AWSDatabase:
                 raise ValueError("All parameters must be non-empty strings")
 
             # プライマリキーの生成
-            pk = f"USER#{user_id}#SERVER#{server_id}#UNIT#{unit_id}"
-            print(f"[DEBUG] Generated PK: {pk}")
-            return pk
+            return f"USER#{user_id}#SERVER#{server_id}#UNIT#{unit_id}"
 
         except Exception as e:
-            print(f"[ERROR] Error in _create_pk: {e}")
+            logger.error("Error in _create_pk: %s", e)
             raise
 
     async def get_user_data(self, user_id: str, server_id: str, unit_id: str = "1") -> Optional[Dict]:
@@ -289,29 +617,20 @@ class AWSDatabase:
         
         """
         try:
-            print(f"[DEBUG] Getting user data for:")
-            print(f"  user_id: {user_id}")
-            print(f"  server_id: {server_id}")
-            print(f"  unit_id: {unit_id}")
-
             # プライマリキーの生成
             pk = self._create_pk(user_id, server_id, unit_id)
-            print(f"[DEBUG] Using PK for query: {pk}")
-            print(f"[DEBUG] PK exact length: {len(pk)}")
-            print(f"[DEBUG] PK character codes: {[ord(c) for c in pk]}")  # 不可視文字のチェック
 
             # DynamoDBからデータ取得
-            response = await asyncio.to_thread(
+            response = await self._call(
                 self.users_table.get_item,
                 Key={'pk': pk}
             )
-            print(f"[DEBUG] DynamoDB response: {response}")
+            logger.debug("get_user_data pk=%s item=%s", pk, response.get('Item'))
 
             return response.get('Item')
 
         except Exception as e:
-            print(f"[ERROR] Error in get_user_data: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in get_user_data: %s", e, exc_info=True)
             return None
 
         
@@ -329,25 +648,63 @@ class AWSDatabase:
         
         """
         try:
-            response = await asyncio.to_thread(
+            response = await self._call(
                 self.automation_rules_table.query,
                 KeyConditionExpression=Key('server_id').eq(str(server_id))
             )
             return response.get('Items', [])
         except Exception as e:
-            print(f"Error getting automation rules: {e}")
+            logger.error("Error getting automation rules: %s", e)
             return []
 
+    def add_automation_rule_listener(self, listener: Callable[[str], None]):
+        """ルール保存時に server_id を受け取るリスナーを登録（コンパイル済みルールの破棄用）"""
+        self.automation_rule_listeners.append(listener)
+
     async def save_automation_rule(self, rule_data: dict) -> bool:
         """オートメーションルールを非同期で保存"""
         try:
-            await asyncio.to_thread(
+            await self._call(
                 self.automation_rules_table.put_item,
                 Item=rule_data
             )
+            for listener in self.automation_rule_listeners:
+                try:
+                    listener(str(rule_data.get('server_id')))
+                except Exception as e:
+                    logger.error("Error notifying automation rule listener: %s", e)
             return True
         except Exception as e:
-            print(f"Error saving automation rule: {e}")
+            logger.error("Error saving automation rule: %s", e)
+            return False
+
+    async def update_automation_rule_last_triggered(self, server_id: str, rule_id: str, last_triggered: str) -> bool:
+        """
+        ルールの最終実行時刻だけを更新する
+
+        ルールの内容は変わらないのでリスナー（ルールインデックス/ディスパッチャーの破棄）には通知しない。
+        削除済みのルールは作り直さない。
+
+        呼び出し元
+        utils\\automation_manager.py
+            AutomationManager._process_single_rule
+        """
+        try:
+            await self._call(
+                self.automation_rules_table.update_item,
+                Key={'server_id': str(server_id), 'id': str(rule_id)},
+                UpdateExpression='SET last_triggered = :t',
+                ConditionExpression='attribute_exists(id)',
+                ExpressionAttributeValues={':t': last_triggered}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            logger.error("Error updating automation rule last_triggered: %s", e)
+            return False
+        except Exception as e:
+            logger.error("Error updating automation rule last_triggered: %s", e)
             return False
 
 
@@ -356,6 +713,9 @@ class AWSDatabase:
         """
         
         消費履歴をデータベースに保存
+
+        history_data['timestamp'] があればそれをソートキー（= 消費リクエストID）として使う。
+        承認・キャンセルボタンの custom_id にこの値を埋め込み、ボタン押下時にキーで直接読む。
         
         呼び出し元
 
@@ -368,7 +728,8 @@ class AWSDatabase:
 
         """
         try:
-            timestamp = datetime.now(pytz.UTC).isoformat()
+            timestamp = history_data.get('timestamp') or datetime.now(pytz.UTC).isoformat()
+            status = history_data.get('status', 'pending')
             item = {
                 'server_id': history_data['server_id'],
                 'timestamp': timestamp,
@@ -376,20 +737,43 @@ class AWSDatabase:
                 'points': history_data['points'],
                 'wallet_address': history_data.get('wallet_address'),
                 'email': history_data.get('email'),
-                'status': history_data.get('status', 'pending'),
+                'status': status,
+                'server_status': consumption_status_key(history_data['server_id'], status),
                 'created_at': timestamp,
                 'updated_at': timestamp,
                 'thread_id': history_data.get('thread_id'),
                 'unit_id': history_data.get('unit_id')  # unit_idを追加
             }
-            await asyncio.to_thread(
+            await self._call(
                 self.point_consumption_history_table.put_item,
                 Item=item
             )
             return True
         except Exception as e:
-            print(f"Error saving consumption history: {e}")
+            logger.error("Error saving consumption history: %s", e)
             return False
+
+    async def get_consumption_request(self, server_id: str, request_id: str) -> Optional[Dict]:
+        """
+        消費リクエストIDで消費リクエストを取得（キー指定の1回の読み込み）
+
+        Args:
+            server_id (str): サーバーID
+            request_id (str): 消費リクエストID（テーブルのソートキー timestamp）
+        """
+        try:
+            response = await self._call(
+                self.point_consumption_history_table.get_item,
+                Key={
+                    'server_id': str(server_id),
+                    'timestamp': request_id
+                },
+                ConsistentRead=True
+            )
+            return response.get('Item')
+        except Exception as e:
+            logger.error("Error getting consumption request: %s", e, exc_info=True)
+            return None
   
     async def update_consumption_status(
         self,
@@ -397,24 +781,31 @@ class AWSDatabase:
         timestamp: str,
         status: str,
         admin_id: str,
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        expected_status: Optional[str] = None
     ) -> bool:
         """
         
         消費リクエストのステータスを更新
+
+        expected_status を指定した場合は現在のステータスが一致するときだけ更新する
+        （複数の管理者が同時に承認した場合でも1回しか成功しない）。
         
         呼び出し元
         point_comsumption.py
             handle_approve_button
         
+        Returns:
+            bool: 更新できた場合True（条件不一致・エラー時はFalse）
         """
         try:
-            update_expression = "SET #s = :status, admin_id = :admin_id, updated_at = :time"
+            update_expression = "SET #s = :status, server_status = :server_status, admin_id = :admin_id, updated_at = :time"
             expression_names = {
                 '#s': 'status'  # status は予約語なので # を使用
             }
             expression_values = {
                 ':status': status,
+                ':server_status': consumption_status_key(server_id, status),
                 ':admin_id': admin_id,
                 ':time': datetime.now(pytz.UTC).isoformat()
             }
@@ -423,44 +814,406 @@ class AWSDatabase:
                 update_expression += ", status_reason = :reason"
                 expression_values[':reason'] = reason
 
-            print(f"[DEBUG] Updating DynamoDB with expression: {update_expression}")
-            print(f"[DEBUG] Expression names: {expression_names}")
-            print(f"[DEBUG] Expression values: {expression_values}")
-
-            await asyncio.to_thread(
-                self.point_consumption_history_table.update_item,
-                Key={
+            kwargs = {
+                'Key': {
                     'server_id': str(server_id),
                     'timestamp': timestamp
                 },
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_names,
-                ExpressionAttributeValues=expression_values
+                'UpdateExpression': update_expression,
+                'ExpressionAttributeNames': expression_names,
+                'ExpressionAttributeValues': expression_values,
+                'ReturnValues': 'ALL_NEW'
+            }
+            if expected_status is not None:
+                kwargs['ConditionExpression'] = "#s = :expected"
+                expression_values[':expected'] = expected_status
+
+            response = await self._call(self.point_consumption_history_table.update_item, **kwargs)
+            logger.debug("Updated item: %s", response.get('Attributes'))
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.debug("Consumption request %s is no longer %s", timestamp, expected_status)
+                return False
+            logger.error("Error updating consumption status: %s", e, exc_info=True)
+            return False
+        except Exception as e:
+            logger.error("Error updating consumption status: %s", e, exc_info=True)
+            return False
+
+    async def _scan_all(self, table, **kwargs) -> List[Dict]:
+        """LastEvaluatedKey をたどって全ページをスキャンする"""
+        items = []
+        while True:
+            response = await self._call(table.scan, **kwargs)
+            items.extend(response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return items
+            kwargs['ExclusiveStartKey'] = last_key
+
+    async def _find_latest_consumption_by_status(
+        self,
+        server_id: str,
+        status: str,
+        filter_expression: str,
+        expression_names: Dict,
+        expression_values: Dict
+    ) -> Optional[Dict]:
+        """
+        サーバー+ステータスの索引を新しい順に読み、フィルタに一致する最初の1件を返す
+
+        索引が未作成の環境ではフルスキャンにフォールバックする
+        """
+        if self.consumption_status_index_available:
+            kwargs = {
+                'IndexName': CONSUMPTION_STATUS_INDEX_NAME,
+                'KeyConditionExpression': Key('server_status').eq(consumption_status_key(server_id, status)),
+                'FilterExpression': filter_expression,
+                'ExpressionAttributeValues': expression_values,
+                'ScanIndexForward': False
+            }
+            if expression_names:
+                # 空の ExpressionAttributeNames はDynamoDBがValidationExceptionを返す
+                kwargs['ExpressionAttributeNames'] = expression_names
+            try:
+                while True:
+                    response = await self._call(self.point_consumption_history_table.query, **kwargs)
+                    items = response.get('Items', [])
+                    if items:
+                        return items[0]
+                    last_key = response.get('LastEvaluatedKey')
+                    if not last_key:
+                        return None
+                    kwargs['ExclusiveStartKey'] = last_key
+            except ClientError as e:
+                error = e.response['Error']
+                if error['Code'] != 'ValidationException' or 'index' not in error.get('Message', '').lower():
+                    raise
+                logger.warning("%s is not available, falling back to scan: %s", CONSUMPTION_STATUS_INDEX_NAME, e)
+                self.consumption_status_index_available = False
+
+        items = await self._scan_all(
+            self.point_consumption_history_table,
+            FilterExpression=f"server_id = :sid AND #status = :status AND ({filter_expression})",
+            ExpressionAttributeNames={**expression_names, '#status': 'status'},
+            ExpressionAttributeValues={**expression_values, ':sid': str(server_id), ':status': status}
+        )
+        if not items:
+            return None
+        return max(items, key=lambda x: x['timestamp'])
+
+    async def find_latest_pending_consumption(
+        self,
+        server_id: str,
+        user_id: str,
+        points: int,
+        unit_id: str
+    ) -> Optional[Dict]:
+        """
+        条件に一致する保留中の消費リクエストのうち最新のものを取得
+
+        消費リクエストIDを持たない旧形式のボタン用
+
+        呼び出し元
+        cogs\points_consumption.py
+            handle_approve_button
+            handle_cancel_button
+        """
+        try:
+            return await self._find_latest_consumption_by_status(
+                server_id,
+                'pending',
+                'user_id = :uid AND points = :p AND unit_id = :unit_id',
+                {},
+                {
+                    ':uid': str(user_id),
+                    ':p': Decimal(str(points)),
+                    ':unit_id': unit_id
+                }
             )
+        except Exception as e:
+            logger.error("Error finding pending consumption request: %s", e, exc_info=True)
+            return None
 
-            # 更新後の値を確認するためのログ
-            result = await asyncio.to_thread(
-                self.point_consumption_history_table.get_item,
-                Key={
+    async def delete_consumption_request(
+        self,
+        server_id: str,
+        timestamp: str,
+        expected_status: Optional[str] = None
+    ) -> bool:
+        """
+        消費リクエストを削除
+
+        expected_status を指定した場合は現在のステータスが一致するときだけ削除する
+        """
+        try:
+            kwargs = {
+                'Key': {
                     'server_id': str(server_id),
                     'timestamp': timestamp
                 }
+            }
+            if expected_status is not None:
+                kwargs['ConditionExpression'] = "#s = :expected"
+                kwargs['ExpressionAttributeNames'] = {'#s': 'status'}
+                kwargs['ExpressionAttributeValues'] = {':expected': expected_status}
+            await self._call(self.point_consumption_history_table.delete_item, **kwargs)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.debug("Consumption request %s is no longer %s", timestamp, expected_status)
+                return False
+            logger.error("Error deleting consumption request: %s", e, exc_info=True)
+            return False
+        except Exception as e:
+            logger.error("Error deleting consumption request: %s", e, exc_info=True)
+            return False
+
+    async def get_latest_approved_wallet_address(self, server_id: str, user_id: str) -> Optional[str]:
+        """
+        ユーザーの最新の承認済み消費リクエストのウォレットアドレスを取得
+
+        読み込みに失敗した場合は例外をそのまま送出する
+        （「アドレスなし」と区別できるように。呼び出し元でキャッシュしないため）
+
+        呼び出し元
+        utils\\profile_manager.py
+            get_profile
+        """
+        item = await self._find_latest_consumption_by_status(
+            server_id,
+            'approved',
+            'user_id = :uid AND attribute_exists(wallet_address)',
+            {},
+            {':uid': str(user_id)}
+        )
+        return item.get('wallet_address') if item else None
+
+    async def get_user_profile(self, server_id: str, user_id: str) -> Optional[Dict]:
+        """
+        サーバー内のユーザープロフィール（最新のウォレットアドレス・メールアドレス）を取得
+
+        存在しない場合はNone。読み込みに失敗した場合は例外をそのまま送出する
+
+        呼び出し元
+        utils\profile_manager.py
+            get_profile
+        """
+        response = await self._call(
+            self.users_table.get_item,
+            Key={'pk': profile_key(server_id, user_id)}
+        )
+        return response.get('Item')
+
+    async def update_user_profile(
+        self,
+        server_id: str,
+        user_id: str,
+        wallet_address: Optional[str] = None,
+        email: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        ユーザープロフィールを更新（指定された項目のみ上書き）
+
+        プロフィール項目は ranking_key / unit_id を持たないため、ランキング索引には含まれない
+
+        Returns:
+            Optional[Dict]: 更新後のプロフィール。エラー時はNone
+        """
+        try:
+            update_expression = "SET user_id = :uid, server_id = :sid, updated_at = :time"
+            expression_values = {
+                ':uid': str(user_id),
+                ':sid': str(server_id),
+                ':time': datetime.now(pytz.UTC).isoformat()
+            }
+            if wallet_address:
+                update_expression += ", wallet_address = :wallet"
+                expression_values[':wallet'] = wallet_address
+            if email:
+                update_expression += ", email = :email"
+                expression_values[':email'] = email
+
+            response = await self._call(
+                self.users_table.update_item,
+                Key={'pk': profile_key(server_id, user_id)},
+                UpdateExpression=update_expression,
+                ExpressionAttributeValues=expression_values,
+                ReturnValues='ALL_NEW'
+            )
+            return response.get('Attributes')
+        except Exception as e:
+            logger.error("Error updating user profile: %s", e, exc_info=True)
+            return None
+
+    async def get_daily_roll(self, server_id: str, gacha_id: str, user_id: str, date: str) -> Optional[Dict]:
+        """
+        その日のガチャ実行記録を取得（存在しない場合はNone）
+
+        呼び出し元
+        utils\roll_ledger.py
+            get_roll / claim_roll
+        """
+        try:
+            response = await self._call(
+                self.history_table.get_item,
+                Key={'pk': daily_roll_key(server_id, gacha_id, user_id, date)},
+                ConsistentRead=True
+            )
+            return response.get('Item')
+        except Exception as e:
+            logger.error("Error getting daily roll: %s", e)
+            return None
+
+    async def put_daily_roll(self, roll: Dict) -> Optional[bool]:
+        """
+        ガチャ実行記録を条件付きで保存（同じ日・同じガチャの記録がまだない場合のみ）
+
+        Args:
+            roll: server_id / gacha_id / user_id / date を含む記録（expires_at は TTL 属性）
+
+        Returns:
+            Optional[bool]: 保存できた場合True、既に記録がある場合False、エラー時はNone
+        """
+        try:
+            item = dict(roll)
+            item['pk'] = daily_roll_key(roll['server_id'], roll['gacha_id'], roll['user_id'], roll['date'])
+            await self._call(
+                self.history_table.put_item,
+                Item=item,
+                ConditionExpression='attribute_not_exists(pk)'
             )
-            print(f"[DEBUG] Updated item: {result.get('Item')}")
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            logger.error("Error saving daily roll: %s", e, exc_info=True)
+            return None
+        except Exception as e:
+            logger.error("Error saving daily roll: %s", e, exc_info=True)
+            return None
 
+    async def delete_daily_roll(self, roll: Dict) -> bool:
+        """
+        ガチャ実行記録を削除（put_daily_roll で保存した記録と created_at が一致する場合のみ）
+
+        呼び出し元
+        utils\roll_ledger.py
+            DailyRollLedger.release_roll
 
+        Returns:
+            bool: 削除できた場合True（既に別の記録に置き換わっている/存在しない場合もFalse）
+        """
+        try:
+            await self._call(
+                self.history_table.delete_item,
+                Key={'pk': daily_roll_key(roll['server_id'], roll['gacha_id'], roll['user_id'], roll['date'])},
+                ConditionExpression='created_at = :created_at',
+                ExpressionAttributeValues={':created_at': roll['created_at']}
+            )
             return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            logger.error("Error deleting daily roll: %s", e, exc_info=True)
+            return False
         except Exception as e:
-            print(f"Error updating consumption status: {e}")
-            print(traceback.format_exc())  # スタックトレースを出力
+            logger.error("Error deleting daily roll: %s", e, exc_info=True)
             return False
 
+    async def get_daily_fortune(self, server_id: str, user_id: str, date: str) -> Optional[Dict]:
+        """
+        その日の占い結果を取得（存在しない場合はNone）
+
+        呼び出し元
+        utils\fortune_ledger.py
+            FortuneLedger.get_fortune / claim_fortune
+        """
+        try:
+            response = await self._call(
+                self.history_table.get_item,
+                Key={'pk': daily_fortune_key(server_id, user_id, date)},
+                ConsistentRead=True
+            )
+            return response.get('Item')
+        except Exception as e:
+            logger.error("Error getting daily fortune: %s", e)
+            return None
+
+    async def put_daily_fortune(self, record: Dict) -> Optional[bool]:
+        """
+        占い結果を条件付きで保存（同じ日の結果がまだない場合のみ）
+
+        Returns:
+            Optional[bool]: 保存できた場合True、既に結果がある場合False、エラー時はNone
+        """
+        try:
+            item = dict(record)
+            item['pk'] = daily_fortune_key(record['server_id'], record['user_id'], record['date'])
+            await self._call(
+                self.history_table.put_item,
+                Item=item,
+                ConditionExpression='attribute_not_exists(pk)'
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            logger.error("Error saving daily fortune: %s", e, exc_info=True)
+            return None
+        except Exception as e:
+            logger.error("Error saving daily fortune: %s", e, exc_info=True)
+            return None
+
+    async def increment_fortune_stats(self, server_id: str, user_id: str, fortune_type: str, date: str) -> bool:
+        """運勢ごとの累計回数（count_{運勢} 属性）と合計回数を1増やす"""
+        try:
+            await self._call(
+                self.history_table.update_item,
+                Key={'pk': fortune_stats_key(server_id, user_id)},
+                UpdateExpression='ADD #count :one, #total :one SET #last_date = :date',
+                ExpressionAttributeNames={
+                    '#count': f"count_{fortune_type}",
+                    '#total': 'total',
+                    '#last_date': 'last_date'
+                },
+                ExpressionAttributeValues={':one': 1, ':date': date}
+            )
+            return True
+        except Exception as e:
+            logger.error("Error updating fortune stats: %s", e, exc_info=True)
+            return False
+
+    async def get_fortune_stats(self, server_id: str, user_id: str) -> Dict[str, int]:
+        """
+        運勢ごとの累計回数を取得（運勢 -> 回数）
+
+        呼び出し元
+        utils\fortune_ledger.py
+            FortuneLedger.get_stats
+        """
+        try:
+            response = await self._call(
+                self.history_table.get_item,
+                Key={'pk': fortune_stats_key(server_id, user_id)}
+            )
+            item = response.get('Item') or {}
+            return {
+                name[len('count_'):]: int(value)
+                for name, value in item.items()
+                if name.startswith('count_')
+            }
+        except Exception as e:
+            logger.error("Error getting fortune stats: %s", e)
+            return {}
+
     # bot招待後一番最初に仕事をする→settings_managerのcreate_default_settingsへ
     async def register_server(self, server_id: str):
         """サーバーがDB上に存在するかどうかをチェックする関数"""
         try:
             # 既存の設定を確認
-            response = await asyncio.to_thread(
+            response = await self._call(
                 self.settings_table.get_item,
                 Key={'server_id': str(server_id)}
             )
@@ -470,19 +1223,19 @@ class AWSDatabase:
             return exists
 
         except Exception as e:
-            print(f"Error checking server {server_id}: {e}")
+            logger.error("Error checking server %s: %s", server_id, e)
             raise
 
     async def remove_server(self, server_id: str):
         """サーバーIDをserver_settingsテーブルから削除"""
         try:
-            await asyncio.to_thread(
+            await self._call(
                 self.settings_table.delete_item,
                 Key={'server_id': str(server_id)}
             )
             return True
         except Exception as e:
-            print(f"Error removing server {server_id}: {e}")
+            logger.error("Error removing server %s: %s", server_id, e)
             raise
 
     async def register_existing_servers(self, guilds):
@@ -490,21 +1243,21 @@ class AWSDatabase:
         for guild in guilds:
             try:
                 await self.register_server(str(guild.id))
-                print(f"Registered existing server: {guild.name} (ID: {guild.id})")
+                logger.debug("Registered existing server: %s (ID: %s)", guild.name, guild.id)
             except Exception as e:
-                print(f"Error registering existing server {guild.id}: {e}")
+                logger.error("Error registering existing server %s: %s", guild.id, e)
 
     # 未実装
     async def save_reward(self, reward_data: dict) -> bool:
         """報酬データを保存"""
         try:
-            await asyncio.to_thread(
+            await self._call(
                 self.reward_claims_table.put_item,
                 Item=reward_data
             )
             return True
         except Exception as e:
-            print(f"Error saving reward: {e}")
+            logger.error("Error saving reward: %s", e)
             return False
 
     async def get_user_rewards(
@@ -534,14 +1287,14 @@ class AWSDatabase:
             if filter_expression:
                 kwargs['FilterExpression'] = filter_expression
 
-            response = await asyncio.to_thread(
+            response = await self._call(
                 self.reward_claims_table.query,
                 **kwargs
             )
             return response.get('Items', [])
 
         except Exception as e:
-            print(f"Error getting user rewards: {e}")
+            logger.error("Error getting user rewards: %s", e)
             return []
         
     async def get_rewards_by_status(
@@ -562,28 +1315,12 @@ class AWSDatabase:
             if server_id:
                 kwargs['FilterExpression'] = Attr('server_id').eq(str(server_id))
 
-            response = await asyncio.to_thread(
+            response = await self._call(
                 self.reward_claims_table.query,
                 **kwargs
             )
             return response.get('Items', [])
 
         except Exception as e:
-            print(f"Error getting rewards by status: {e}")
+            logger.error("Error getting rewards by status: %s", e)
             return []
-        
-    # インスタンス初期化時にテーブル参照を追加
-    def __init__(self):
-        self.dynamodb = boto3.resource(
-            'dynamodb',
-            region_name='ap-northeast-1',
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
-        # 既存のテーブル参照
-        self.users_table = self.dynamodb.Table('discord_users')
-        self.settings_table = self.dynamodb.Table('server_settings')
-        self.history_table = self.dynamodb.Table('gacha_history')
-        self.automation_rules_table = self.dynamodb.Table('automation_rules')
-        # 新規テーブル参照を追加
-        self.point_consumption_history_table = self.dynamodb.Table('point_consumption_history')
\ No newline at end of file
@@ -0,0 +1,264 @@
+"""
+バトルロイヤルの進行エンジン
+
+Discord への送信や待機を含まない純粋なラウンド処理。
+BattleRoyale.run_battle_rounds（表示側）はこのエンジンが返すラウンド結果を順に送信し、
+シミュレーション（batch/simulate_battles.py）は待機なしで最後まで進める。
+
+- 乱数は random.Random のインスタンスを使うので、シードを指定すれば同じ展開を再現できる
+- イベントの発生率は event_weights で変更できる
+- キルイベントでは倒したプレイヤーを記録し、kill_counts に反映する
+"""
+import random
+from bisect import bisect
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from models.battle import BattleEvent, BattleGame, BattleResults, BattleSettings, BattleStatus, EventType
+from utils.battle_events import (
+    ACCIDENT_MESSAGES, ITEM_MESSAGES, KILL_MESSAGES, RANDOM_MESSAGES, REVIVAL_MESSAGES, format_player_name
+)
+
+DEFAULT_EVENT_WEIGHTS: Dict[EventType, float] = {
+    EventType.BATTLE: 0.4,
+    EventType.ACCIDENT: 0.2,
+    EventType.ITEM: 0.2,
+    EventType.RANDOM: 0.15,
+    EventType.REVIVAL: 0.05,
+}
+
+# 1ラウンドあたりの最大イベント数
+MAX_EVENTS_PER_ROUND = 5
+
+# 1試合の最大ラウンド数（復活が続いて終わらない場合の打ち切り）
+MAX_ROUNDS = 1000
+
+
+@dataclass
+class RoundResult:
+    """1ラウンドの結果（表示側が Embed にする）"""
+    round_number: int
+    events: List[BattleEvent]
+    alive_count: int
+    dead_count: int
+
+
+class BattleEngine:
+    """
+    BattleGame を1ラウンドずつ進める
+
+    Args:
+        game: 進行するゲーム（alive_players / dead_players / kill_counts などを更新する）
+        seed: 乱数シード（rng を渡した場合は無視）
+        rng: 使用する乱数生成器
+        event_weights: イベント種別ごとの発生率
+        render_messages: False の場合はイベントの文章を作らない（シミュレーション用）
+    """
+
+    def __init__(
+        self,
+        game: BattleGame,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+        event_weights: Optional[Dict[EventType, float]] = None,
+        render_messages: bool = True
+    ):
+        self.game = game
+        self.rng = rng or random.Random(seed)
+        weights = event_weights or DEFAULT_EVENT_WEIGHTS
+        self.event_types = list(weights.keys())
+        total = 0.0
+        self.cum_weights = []
+        for event_type in self.event_types:
+            total += weights[event_type]
+            self.cum_weights.append(total)
+        self.total_weight = total
+        self.render_messages = render_messages
+
+    def _message(self, templates: List[str], **players) -> str:
+        if not self.render_messages:
+            return ''
+        return self.rng.choice(templates).format(
+            **{role: format_player_name(player_id) for role, player_id in players.items()}
+        )
+
+    def draw_event(self) -> Optional[BattleEvent]:
+        """イベントを1つ抽選する（ゲームの状態は変更しない）"""
+        alive = self.game.alive_players
+        if len(alive) < 2:
+            return None
+
+        rng = self.rng
+        event_type = self.event_types[bisect(self.cum_weights, rng.random() * self.total_weight)]
+
+        if event_type is EventType.BATTLE:
+            # rng.sample(alive, 2) と同じ分布（重複しない2人）を軽い計算で選ぶ
+            count = len(alive)
+            killer_index = int(rng.random() * count)
+            victim_index = int(rng.random() * (count - 1))
+            if victim_index >= killer_index:
+                victim_index += 1
+            killer, victim = alive[killer_index], alive[victim_index]
+            return BattleEvent(
+                event_type=event_type,
+                message=self._message(KILL_MESSAGES, killer=killer, victim=victim),
+                killed_players=[victim],
+                killer=killer
+            )
+
+        if event_type is EventType.ACCIDENT:
+            victim = alive[int(rng.random() * len(alive))]
+            return BattleEvent(
+                event_type=event_type,
+                message=self._message(ACCIDENT_MESSAGES, victim=victim),
+                killed_players=[victim]
+            )
+
+        if event_type is EventType.ITEM:
+            player = alive[int(rng.random() * len(alive))]
+            return BattleEvent(
+                event_type=event_type,
+                message=self._message(ITEM_MESSAGES, player=player),
+                item_receivers=[player]
+            )
+
+        if event_type is EventType.RANDOM:
+            player = alive[int(rng.random() * len(alive))]
+            return BattleEvent(
+                event_type=event_type,
+                message=self._message(RANDOM_MESSAGES, player=player)
+            )
+
+        if event_type is EventType.REVIVAL and self.game.dead_players:
+            player = rng.choice(self.game.dead_players)
+            return BattleEvent(
+                event_type=event_type,
+                message=self._message(REVIVAL_MESSAGES, player=player),
+                revived_players=[player]
+            )
+
+        return None
+
+    def apply_event(self, event: BattleEvent):
+        """イベントをゲームに反映する"""
+        for player_id in event.killed_players or ():
+            self.game.kill_player(player_id, event.killer)
+        for player_id in event.revived_players or ():
+            self.game.revive_player(player_id)
+
+    def play_round(self) -> RoundResult:
+        """1ラウンド進める（イベント数は開始時の生存者数の半分、最大 MAX_EVENTS_PER_ROUND）"""
+        game = self.game
+        events = []
+        for _ in range(min(len(game.alive_players) // 2, MAX_EVENTS_PER_ROUND)):
+            event = self.draw_event()
+            if event:
+                events.append(event)
+                self.apply_event(event)
+
+        result = RoundResult(
+            round_number=game.round_number,
+            events=events,
+            alive_count=len(game.alive_players),
+            dead_count=len(game.dead_players)
+        )
+        game.round_number += 1
+        return result
+
+    def rounds(self) -> Iterator[RoundResult]:
+        """ゲームが終わるまでラウンド結果を順に返す"""
+        while not self.game.is_finished and self.game.round_number <= MAX_ROUNDS:
+            yield self.play_round()
+
+    def run(self) -> BattleResults:
+        """待機なしで最後まで進めて結果を返す"""
+        for _ in self.rounds():
+            pass
+        self.game.status = BattleStatus.FINISHED
+        return self.game.get_results()
+
+
+def new_game(server_id: str, player_ids: List[str], settings: Optional[BattleSettings] = None) -> BattleGame:
+    """プレイヤーを登録済みの開始前のゲームを作る"""
+    game = BattleGame(
+        server_id=server_id,
+        status=BattleStatus.WAITING,
+        settings=settings or BattleSettings(
+            required_role_id=None,
+            winner_role_id=None,
+            points_enabled=False,
+            points_per_kill=0,
+            winner_points=0
+        ),
+        players=[],
+        alive_players=[],
+        dead_players=[],
+        kill_counts={},
+        revival_counts={},
+        start_time=datetime.now(),
+        round_number=1
+    )
+    for player_id in player_ids:
+        game.add_player(player_id)
+    return game
+
+
+@dataclass
+class SimulationSummary:
+    """複数試合のシミュレーション結果"""
+    games: int
+    players: int
+    rounds: List[int] = field(default_factory=list)
+    winner_kills: List[int] = field(default_factory=list)
+    max_kills: List[int] = field(default_factory=list)
+    kill_histogram: Dict[int, int] = field(default_factory=dict)  # キル数 -> 人数
+    deaths_by_battle: int = 0
+    deaths_by_accident: int = 0
+    revivals: int = 0
+    unfinished: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def simulate_battles(
+    games: int,
+    players: int,
+    seed: Optional[int] = None,
+    event_weights: Optional[Dict[EventType, float]] = None
+) -> SimulationSummary:
+    """
+    ダミープレイヤーだけの試合を games 回実行して集計する
+
+    呼び出し元
+    batch\\simulate_battles.py
+    """
+    import time
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    summary = SimulationSummary(games=games, players=players)
+    player_ids = [f"dummy_{i + 1}" for i in range(players)]
+
+    for _ in range(games):
+        game = new_game('simulation', player_ids)
+        game.status = BattleStatus.IN_PROGRESS
+        engine = BattleEngine(game, rng=rng, event_weights=event_weights, render_messages=False)
+        for round_result in engine.rounds():
+            for event in round_result.events:
+                if event.event_type is EventType.BATTLE:
+                    summary.deaths_by_battle += 1
+                elif event.event_type is EventType.ACCIDENT:
+                    summary.deaths_by_accident += 1
+                elif event.event_type is EventType.REVIVAL:
+                    summary.revivals += 1
+        if not game.is_finished:
+            summary.unfinished += 1
+            continue
+
+        summary.rounds.append(game.round_number - 1)
+        winner = game.alive_players[0] if game.alive_players else None
+        summary.winner_kills.append(game.kill_counts.get(winner, 0) if winner else 0)
+        summary.max_kills.append(max(game.kill_counts.values(), default=0))
+        for kills in game.kill_counts.values():
+            summary.kill_histogram[kills] = summary.kill_histogram.get(kills, 0) + 1
+
+    summary.elapsed_seconds = time.perf_counter() - started
+    return summary
@@ -1,6 +1,4 @@
-import random
-from typing import List, Optional
-import discord
+from typing import List
 from models.battle import EventType, BattleEvent
 
 # メッセージテンプレートは変更なし
@@ -49,105 +47,16 @@ def format_player_name(player_id: str) -> str:
         return f"ダミープレイヤー {player_id}"
     return f"<@{player_id}>"
 
-def generate_battle_event(alive_players: List[str], dead_players: List[str]) -> Optional[BattleEvent]:
-    """ランダムなバトルイベントを生成"""
-    if len(alive_players) < 2:
-        return None
+EVENT_ICONS = {
+    EventType.BATTLE: "💀",
+    EventType.ACCIDENT: "☠️",
+    EventType.ITEM: "🎁",
+    EventType.RANDOM: "👣",
+    EventType.REVIVAL: "✨"
+}
 
-    event_type = random.choices(
-        [EventType.BATTLE, EventType.ACCIDENT, EventType.ITEM, EventType.RANDOM, EventType.REVIVAL],
-        weights=[0.4, 0.2, 0.2, 0.15, 0.05]
-    )[0]
+NO_EVENT_MESSAGE = "このラウンドは特に何も起こりませんでした..."
 
-    if event_type == EventType.BATTLE:
-        killer, victim = random.sample(alive_players, 2)
-        message = random.choice(KILL_MESSAGES).format(
-            killer=format_player_name(killer),
-            victim=format_player_name(victim)
-        )
-        return BattleEvent(
-            event_type=event_type,  # typeをevent_typeに変更
-            message=message,
-            killed_players=[victim]
-        )
-
-    elif event_type == EventType.ACCIDENT:
-        victim = random.choice(alive_players)
-        message = random.choice(ACCIDENT_MESSAGES).format(
-            victim=format_player_name(victim)
-        )
-        return BattleEvent(
-            event_type=event_type,  # typeをevent_typeに変更
-            message=message,
-            killed_players=[victim]
-        )
-
-    elif event_type == EventType.ITEM:
-        player = random.choice(alive_players)
-        message = random.choice(ITEM_MESSAGES).format(
-            player=format_player_name(player)
-        )
-        return BattleEvent(
-            event_type=event_type,  # typeをevent_typeに変更
-            message=message,
-            item_receivers=[player]
-        )
-
-    elif event_type == EventType.RANDOM:
-        player = random.choice(alive_players)
-        message = random.choice(RANDOM_MESSAGES).format(
-            player=format_player_name(player)
-        )
-        return BattleEvent(
-            event_type=event_type,  # typeをevent_typeに変更
-            message=message
-        )
-
-    elif event_type == EventType.REVIVAL and dead_players:
-        player = random.choice(dead_players)
-        message = random.choice(REVIVAL_MESSAGES).format(
-            player=format_player_name(player)
-        )
-        return BattleEvent(
-            event_type=event_type,  # すでに正しい
-            message=message,
-            revived_players=[player]
-        )
-
-    return None
-
-def format_round_message(round_number: int, events: List[BattleEvent], players_left: int) -> discord.Embed:
-    """ラウンドメッセージを埋め込みとして整形"""
-    embed = discord.Embed(
-        title=f"⚔️ ラウンド {round_number}",
-        color=discord.Color.blue()
-    )
-
-    # イベントメッセージを埋め込みの説明として追加
-    event_messages = []
-    for event in events:
-        if event:
-            # イベントタイプに応じてアイコンを追加（event.typeをevent.event_typeに修正）
-            icon = {
-                EventType.BATTLE: "💀",
-                EventType.ACCIDENT: "☠️",
-                EventType.ITEM: "🎁",
-                EventType.RANDOM: "👣",
-                EventType.REVIVAL: "✨"
-            }.get(event.event_type, "📢")
-            
-            event_messages.append(f"{icon} {event.message}")
-
-    if event_messages:
-        embed.description = "\n".join(event_messages)
-    else:
-        embed.description = "このラウンドは特に何も起こりませんでした..."
-
-    # 生存者数を埋め込みのフィールドとして追加
-    embed.add_field(
-        name="生存者",
-        value=f"👥 残り {players_left}人",
-        inline=False
-    )
-
-    return embed
\ No newline at end of file
+def format_event_lines(events: List[BattleEvent]) -> List[str]:
+    """イベントをアイコン付きの行にする"""
+    return [f"{EVENT_ICONS.get(event.event_type, '📢')} {event.message}" for event in events if event]
@@ -0,0 +1,195 @@
+"""
+バトルロイヤルの実況メッセージ
+
+ラウンドごとに新しいメッセージを送る代わりに、1つのメッセージを編集して実況する。
+
+- ラウンド結果はバッファに溜め、前回の編集から edit_interval 秒以上たったときだけ編集する
+  （その間のラウンドは1回の編集にまとめる）
+- 編集はバックグラウンドで行い、ラウンドの進行を待たせない（同時に行う編集は1つだけ）
+- Embed の文字数上限に近づいたら、そのメッセージを確定して新しいメッセージに切り替える
+- レート制限（429）を受けたら編集間隔を広げ、成功したら元の間隔に戻す。
+  失敗した内容はバッファに残るので次の編集で反映される
+  （discord.RateLimited はボットに max_ratelimit_timeout を設定したときだけ送出される。main.py を参照）
+- テストモードのデバッグ情報は別メッセージではなくフィールドに表示する
+
+環境変数:
+    BATTLE_FEED_EDIT_INTERVAL: 編集の最短間隔（秒、デフォルト 10）
+"""
+import asyncio
+import logging
+import time
+from typing import List, Optional
+import os
+import discord
+from utils.battle_engine import RoundResult
+from utils.battle_events import NO_EVENT_MESSAGE, format_event_lines
+
+logger = logging.getLogger(__name__)
+
+# Embed の description の上限は 4096 文字。余裕をもって切り替える
+DESCRIPTION_LIMIT = 3800
+
+# レート制限時の編集間隔の上限（秒）
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class BattleFeed:
+    """
+    1試合ぶんの実況メッセージ
+
+    Args:
+        channel: 実況するチャンネル
+        test_mode: テストモード（タイトルとデバッグ情報の表示）
+        edit_interval: 編集の最短間隔（秒）
+    """
+
+    def __init__(self, channel: discord.abc.Messageable, test_mode: bool = False, edit_interval: Optional[float] = None):
+        self.channel = channel
+        self.test_mode = test_mode
+        self.edit_interval = (
+            edit_interval if edit_interval is not None else float(os.getenv('BATTLE_FEED_EDIT_INTERVAL', '10'))
+        )
+        self.current_interval = self.edit_interval
+        self.message: Optional[discord.Message] = None
+        self.page = 1
+        self.lines: List[str] = []
+        self.length = 0
+        self.last_round: Optional[RoundResult] = None
+        self.last_edit = 0.0
+        self.dirty = False
+        # バッファを変更するたびに増やす（編集中に追加されたラウンドを未反映として残すため）
+        self.version = 0
+        self._pending: Optional[asyncio.Task] = None
+        self.api_calls = 0
+        self.rate_limited = 0
+
+    def _build_embed(self) -> discord.Embed:
+        title = "⚔️ バトル実況" + (f"（{self.page}）" if self.page > 1 else "")
+        embed = discord.Embed(
+            title=f"🧪 {title}" if self.test_mode else title,
+            description="\n".join(self.lines) or "バトル開始！",
+            color=discord.Color.blue()
+        )
+        if self.last_round:
+            embed.add_field(
+                name="生存者",
+                value=f"👥 残り {self.last_round.alive_count}人",
+                inline=False
+            )
+            if self.test_mode:
+                embed.add_field(
+                    name="🧪 デバッグ情報",
+                    value=f"ラウンド {self.last_round.round_number}\n"
+                          f"生存: {self.last_round.alive_count}人\n脱落: {self.last_round.dead_count}人\n"
+                          f"API 呼び出し: {self.api_calls}回（レート制限 {self.rate_limited}回）"
+                )
+        return embed
+
+    async def start(self):
+        """最初の実況メッセージを送信する"""
+        self.message = await self.channel.send(embed=self._build_embed())
+        self.api_calls += 1
+        self.last_edit = time.monotonic()
+
+    async def push_round(self, round_result: RoundResult):
+        """
+        ラウンド結果を追加し、編集間隔が空いていれば反映する
+
+        呼び出し元
+        cogs\\battle.py
+            BattleRoyale.run_battle_rounds
+        """
+        lines = [f"**ラウンド {round_result.round_number}**"]
+        lines.extend(format_event_lines(round_result.events) or [NO_EVENT_MESSAGE])
+        added = sum(len(line) + 1 for line in lines)
+
+        if self.lines and self.length + added > DESCRIPTION_LIMIT:
+            # 今のメッセージを確定して次のメッセージに切り替える
+            await self._wait_pending()
+            await self.flush(force=True)
+            self.message = None
+            self.page += 1
+            self.lines = []
+            self.length = 0
+
+        self.lines.extend(lines)
+        self.length += added
+        self.last_round = round_result
+        self.version += 1
+        self.dirty = True
+
+        if self._pending is None and time.monotonic() - self.last_edit >= self.current_interval:
+            self._pending = asyncio.create_task(self._flush_in_background())
+
+    async def _flush_in_background(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Error updating battle feed: %s", e, exc_info=True)
+        finally:
+            self._pending = None
+
+    async def _wait_pending(self):
+        """バックグラウンドの編集が終わるのを待つ"""
+        if self._pending is not None:
+            await asyncio.shield(self._pending)
+
+    async def close(self):
+        """残っている内容を反映する（レート制限中や実況メッセージが削除された場合も1回は再試行する）"""
+        await self._wait_pending()
+        await self.flush(force=True)
+
+    async def flush(self, force: bool = False):
+        """
+        バッファの内容をメッセージに反映する
+
+        force=True のときは、反映できなければ1回だけ再試行する
+        （レート制限なら待ってから、実況メッセージが削除されていれば新しいメッセージとして送る）
+        """
+        if not self.dirty:
+            return
+
+        retry_after = await self._write()
+        if force and self.dirty:
+            if retry_after is not None:
+                await asyncio.sleep(retry_after)
+            await self._write()
+
+    async def _write(self) -> Optional[float]:
+        """
+        メッセージを送信/編集する
+
+        Returns:
+            レート制限を受けた場合は待つべき秒数、それ以外は None
+        """
+        version = self.version
+        embed = self._build_embed()
+        try:
+            self.api_calls += 1
+            if self.message is None:
+                self.message = await self.channel.send(embed=embed)
+            else:
+                await self.message.edit(embed=embed)
+            self.dirty = self.version != version
+            self.last_edit = time.monotonic()
+            self.current_interval = max(self.edit_interval, self.current_interval / 2)
+            return None
+
+        except discord.RateLimited as e:
+            return self._backoff(e.retry_after)
+        except discord.NotFound:
+            # 実況メッセージが削除された場合は次回新しく送る
+            logger.warning("Battle feed message was deleted; sending a new one")
+            self.message = None
+            return None
+        except discord.HTTPException as e:
+            if e.status == 429:
+                return self._backoff(self.current_interval)
+            logger.warning("Failed to update battle feed: %s", e)
+            return None
+
+    def _backoff(self, retry_after: float) -> float:
+        self.rate_limited += 1
+        self.current_interval = min(MAX_BACKOFF_SECONDS, max(self.current_interval * 2, retry_after))
+        logger.warning("Battle feed rate limited; edit interval is now %.1fs", self.current_interval)
+        return min(MAX_BACKOFF_SECONDS, retry_after)
@@ -0,0 +1,165 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from botocore.config import Config
+from utils import metrics
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class DynamoCallExecutor:
+    """
+    DynamoDB 呼び出し専用の実行器
+
+    - boto3 の同期呼び出しを専用スレッドプールで実行する（デフォルトエグゼキューターを使わない）
+    - スレッド数は botocore の HTTP コネクションプール（max_pool_connections）と揃える
+    - 同時実行数はセマフォで制限し、超えた分はイベントループ上で待機させる
+    - 読み取りの呼び出しにはタイムアウトを設定する（書き込みは botocore のタイムアウト/リトライに任せる）
+
+    環境変数:
+        DYNAMODB_MAX_POOL_CONNECTIONS: HTTPコネクションプールのサイズ（デフォルト 50）
+        DYNAMODB_MAX_CONCURRENCY: 同時実行数の上限（デフォルトはプールサイズ）
+        DYNAMODB_CALL_TIMEOUT: 読み取り1呼び出しのタイムアウト秒（デフォルト 10）
+        DYNAMODB_CONNECT_TIMEOUT / DYNAMODB_READ_TIMEOUT: botocore のタイムアウト秒
+        DYNAMODB_MAX_ATTEMPTS: botocore のリトライ回数（adaptive モード）
+    """
+
+    # 書き込み系の操作。待つのをやめてもスレッド側で書き込まれ得るため、
+    # 失敗として扱うと呼び出し元の巻き戻し（ガチャ権の返却など）と二重に効いてしまう
+    MUTATING_OPERATIONS = frozenset({
+        'put_item', 'update_item', 'delete_item', 'batch_write_item', 'transact_write_items'
+    })
+
+    def __init__(
+        self,
+        max_pool_connections: int = 50,
+        max_concurrency: Optional[int] = None,
+        call_timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 5.0,
+        max_attempts: int = 3
+    ):
+        self.max_pool_connections = max_pool_connections
+        self.max_concurrency = max_concurrency or max_pool_connections
+        self.call_timeout = call_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max_attempts
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix='dynamodb'
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+        # 統計
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'DynamoCallExecutor':
+        pool = _env_int('DYNAMODB_MAX_POOL_CONNECTIONS', 50)
+        return cls(
+            max_pool_connections=pool,
+            max_concurrency=_env_int('DYNAMODB_MAX_CONCURRENCY', pool),
+            call_timeout=_env_float('DYNAMODB_CALL_TIMEOUT', 10.0),
+            connect_timeout=_env_float('DYNAMODB_CONNECT_TIMEOUT', 3.0),
+            read_timeout=_env_float('DYNAMODB_READ_TIMEOUT', 5.0),
+            max_attempts=_env_int('DYNAMODB_MAX_ATTEMPTS', 3)
+        )
+
+    def boto_config(self) -> Config:
+        """boto3.resource に渡す botocore の設定"""
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            retries={'max_attempts': self.max_attempts, 'mode': 'adaptive'}
+        )
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        同期関数 fn を専用プールで実行して結果を返す
+
+        タイムアウトした場合は asyncio.TimeoutError を送出する
+        （実行中のスレッドは botocore の read_timeout で打ち切られる）。
+        書き込み系の操作は timeout を明示しない限り完了まで待ち、
+        結果が分からないまま失敗を返さないようにする
+        """
+        semaphore = self._get_semaphore()
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        wait = started - queued_at
+        self.total_wait_seconds += wait
+
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        error = None
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+            if timeout is None and getattr(fn, '__name__', '') in self.MUTATING_OPERATIONS:
+                return await future
+            return await asyncio.wait_for(future, timeout if timeout is not None else self.call_timeout)
+        except asyncio.TimeoutError as e:
+            self.timeouts += 1
+            error = e
+            raise
+        except Exception as e:
+            self.errors += 1
+            error = e
+            raise
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+            metrics.record_db_call(fn, time.perf_counter() - started, wait, error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pool_size': self.max_pool_connections,
+            'max_concurrency': self.max_concurrency,
+            'calls': self.calls,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'waiting': self.waiting,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'avg_wait_ms': (self.total_wait_seconds / self.calls * 1000) if self.calls else 0.0
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
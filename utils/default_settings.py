@@ -38,6 +38,7 @@ def create_default_settings(server_id: str) -> Dict:
                     'roles': [],
                     'use_daily_panel': True,
                     'point_unit_id': "1",
+                    'pulls_per_roll': 1,
                     'items': [
                         {
                             'name': 'URアイテム',
@@ -124,7 +125,8 @@ def create_default_settings(server_id: str) -> Dict:
             },
             'fortune': {
                 'enabled': True,
-                'custom_messages': {}
+                'custom_messages': {},
+                'daily_message': "今日はすでに占いをしています。明日また挑戦してください！"
             },
             'point_consumption': {
                 'enabled': True,
@@ -152,6 +154,9 @@ def create_default_settings(server_id: str) -> Dict:
                 'gain_history_channel_id': None,
                 'consumption_history_enabled': False,
                 'consumption_history_channel_id': None,
+                'history_digest_enabled': False,
+                'history_digest_interval': 300,
+                'history_digest_max_events': 100,
                 'modal_settings': {
                     'title': "ポイント消費申請",
                     'fields': {
@@ -0,0 +1,142 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import os
+import pytz
+from utils.roll_ledger import DailyRollLedger, JST
+
+logger = logging.getLogger(__name__)
+
+
+class FortuneLedger:
+    """
+    1日1回の占い結果の台帳と、運勢ごとの累計回数
+
+    - 結果は gacha_history テーブルの FORTUNE#{server_id}#{user_id}#{date} 項目に
+      条件付き書き込み（attribute_not_exists）で保存する（再起動や複数プロセスでも1日1回）
+    - 記録できたときだけ FORTUNE_STATS#{server_id}#{user_id} 項目の count_{運勢} と total を加算する。
+      統計の表示はこの1項目を読むだけで済む
+    - 当日の結果は件数上限付きの LRU キャッシュに載せ、2回目以降の判定は DB を読まない
+    - expires_at（エポック秒）を TTL 属性として書き込む（累計回数の項目には書かない）
+
+    環境変数:
+        FORTUNE_LEDGER_CACHE_SIZE: キャッシュする結果数の上限（デフォルト 8192）
+        ROLL_LEDGER_RETENTION_DAYS: 結果を残す日数（デイリーロール台帳と共通、デフォルト 2）
+    """
+
+    def __init__(self, db, max_entries: Optional[int] = None, retention_days: Optional[int] = None):
+        self.db = db
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('FORTUNE_LEDGER_CACHE_SIZE', '8192'))
+        self.retention_days = (
+            retention_days if retention_days is not None else int(os.getenv('ROLL_LEDGER_RETENTION_DAYS', '2'))
+        )
+        # (server_id, user_id, date) -> 結果
+        self.fortune_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _expires_at(self, date: str) -> int:
+        day_start = JST.localize(datetime.strptime(date, '%Y-%m-%d'))
+        return int((day_start + timedelta(days=1 + self.retention_days)).timestamp())
+
+    def _cache_put(self, key: tuple, record: Dict):
+        self.fortune_cache[key] = record
+        self.fortune_cache.move_to_end(key)
+        while len(self.fortune_cache) > self.max_entries:
+            self.fortune_cache.popitem(last=False)
+
+    def prune(self, keep_date: Optional[str] = None):
+        """keep_date（デフォルトは今日）以外の結果をキャッシュから外す"""
+        keep_date = keep_date or DailyRollLedger.today()
+        for key in [key for key in self.fortune_cache if key[2] != keep_date]:
+            del self.fortune_cache[key]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        total = self.cache_hits + self.cache_misses
+        return {
+            'entries': len(self.fortune_cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': (self.cache_hits / total) if total else 0.0
+        }
+
+    async def get_fortune(self, server_id: str, user_id: str, date: Optional[str] = None) -> Optional[Dict]:
+        """
+        その日の結果を取得（キャッシュになければ DB を読む）
+
+        呼び出し元
+        cogs\\fortunes.py
+            Fortunes.perform_fortune
+        """
+        date = date or DailyRollLedger.today()
+        key = (str(server_id), str(user_id), date)
+        record = self.fortune_cache.get(key)
+        if record is not None:
+            self.fortune_cache.move_to_end(key)
+            self.cache_hits += 1
+            return record
+
+        self.cache_misses += 1
+        record = await self.db.get_daily_fortune(*key)
+        if record is not None:
+            self._cache_put(key, record)
+        return record
+
+    async def claim_fortune(
+        self,
+        server_id: str,
+        user_id: str,
+        fortune_type: str,
+        lucky_item: str,
+        lucky_color: str,
+        date: Optional[str] = None
+    ) -> Tuple[Optional[bool], Optional[Dict]]:
+        """
+        その日の占い結果を記録する
+
+        呼び出し元
+        cogs\\fortunes.py
+            Fortunes.perform_fortune
+
+        Returns:
+            (claimed, record):
+                claimed が True なら今回の結果を記録した（record は今回の結果）
+                False なら既に占い済み（record はその日の既存の結果）
+                None なら保存に失敗した
+        """
+        date = date or DailyRollLedger.today()
+        key = (str(server_id), str(user_id), date)
+        record = {
+            'server_id': key[0],
+            'user_id': key[1],
+            'date': date,
+            'fortune_type': fortune_type,
+            'lucky_item': lucky_item,
+            'lucky_color': lucky_color,
+            'created_at': datetime.now(pytz.UTC).isoformat(),
+            'expires_at': self._expires_at(date)
+        }
+        claimed = await self.db.put_daily_fortune(record)
+        if claimed:
+            self._cache_put(key, record)
+            await self.db.increment_fortune_stats(key[0], key[1], fortune_type, date)
+            return True, record
+        if claimed is None:
+            return None, None
+
+        # 別のプロセス/再起動前に占い済み
+        existing = await self.db.get_daily_fortune(*key)
+        if existing is not None:
+            self._cache_put(key, existing)
+        return False, existing
+
+    async def get_stats(self, server_id: str, user_id: str) -> Dict[str, int]:
+        """
+        運勢ごとの累計回数（運勢 -> 回数）
+
+        呼び出し元
+        cogs\\fortunes.py
+            Fortunes._create_stats_embed
+        """
+        return await self.db.get_fortune_stats(str(server_id), str(user_id))
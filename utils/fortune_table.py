@@ -0,0 +1,129 @@
+"""
+占いの結果表（サーバーごとにコンパイルして使い回す）
+
+- デフォルトの結果定義（DEFAULT_FORTUNE_RESULTS）にサーバーのカスタムメッセージを
+  適用した表を、設定が変わったときだけ作り直す
+  （デフォルトの定義は書き換えない）
+- 重み付き抽選は utils.gacha_draw のエイリアス表で O(1) で行う
+"""
+import copy
+import logging
+import random
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import os
+from utils.gacha_draw import AliasTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FORTUNE_RESULTS = {
+    "大吉": {
+        "description": "とても良い1日になりそう！チャレンジが実を結ぶ時です。",
+        "color": 0xFF0000,
+        "lucky_item": ["四つ葉のクローバー", "赤い靴下", "クリスタル"],
+        "lucky_color": ["赤", "金", "白"],
+        "weight": 10
+    },
+    "吉": {
+        "description": "良いことが待っています。前向きな姿勢で過ごしましょう。",
+        "color": 0xFFA500,
+        "lucky_item": ["硬貨", "手帳", "鈴"],
+        "lucky_color": ["青", "緑", "黄"],
+        "weight": 30
+    },
+    "中吉": {
+        "description": "平穏な一日になりそう。小さな幸せを大切に。",
+        "color": 0xFFFF00,
+        "lucky_item": ["ペン", "メモ帳", "キーホルダー"],
+        "lucky_color": ["紫", "ピンク", "オレンジ"],
+        "weight": 40
+    },
+    "小吉": {
+        "description": "穏やかな日になりそう。慎重に行動すれば良い結果に。",
+        "color": 0x00FF00,
+        "lucky_item": ["消しゴム", "カレンダー", "マスク"],
+        "lucky_color": ["水色", "茶色", "グレー"],
+        "weight": 15
+    },
+    "凶": {
+        "description": "少し慎重に行動した方が良さそう。でも心配はいりません。",
+        "color": 0x808080,
+        "lucky_item": ["お守り", "傘", "時計"],
+        "lucky_color": ["黒", "紺", "深緑"],
+        "weight": 5
+    }
+}
+
+
+class CompiledFortuneTable:
+    """1サーバーぶんの結果表"""
+
+    def __init__(self, custom_messages: Optional[Dict[str, str]] = None):
+        self.results: Dict[str, Dict[str, Any]] = copy.deepcopy(DEFAULT_FORTUNE_RESULTS)
+        for fortune_type, message in (custom_messages or {}).items():
+            if fortune_type in self.results and message:
+                self.results[fortune_type]['description'] = message
+        self.fingerprint = fortune_fingerprint(custom_messages)
+        self.types = list(self.results.keys())
+        self.table = AliasTable([self.results[fortune_type]['weight'] for fortune_type in self.types])
+
+    def draw(self, rng: random.Random = random) -> Tuple[str, Dict[str, Any], str, str]:
+        """運勢を抽選する（戻り値: 運勢, 結果の定義, ラッキーアイテム, ラッキーカラー）"""
+        fortune_type = self.types[self.table.draw(rng)]
+        data = self.results[fortune_type]
+        return fortune_type, data, rng.choice(data['lucky_item']), rng.choice(data['lucky_color'])
+
+
+def fortune_fingerprint(custom_messages: Optional[Dict[str, str]]) -> Tuple:
+    return tuple(sorted((str(key), str(value)) for key, value in (custom_messages or {}).items()))
+
+
+class FortuneTableCache:
+    """
+    サーバーごとのコンパイル済み結果表
+
+    環境変数:
+        FORTUNE_TABLE_CACHE_SIZE: キャッシュするサーバー数の上限（デフォルト 1024）
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('FORTUNE_TABLE_CACHE_SIZE', '1024'))
+        # server_id -> (コンパイル元の FortuneFeatureSettings, CompiledFortuneTable)
+        self.compiled: "OrderedDict[str, Tuple[Any, CompiledFortuneTable]]" = OrderedDict()
+        self.compiles = 0
+        self.cache_hits = 0
+
+    def get(self, server_id: str, fortune_settings) -> CompiledFortuneTable:
+        """
+        サーバーの結果表を返す
+
+        設定キャッシュが同じ設定オブジェクトを返している間はオブジェクトの同一性だけで判定し、
+        設定が更新された（別のオブジェクトになった）場合はカスタムメッセージの内容で比較する
+
+        呼び出し元
+        cogs\\fortunes.py
+            Fortunes.perform_fortune
+        """
+        server_id = str(server_id)
+        entry = self.compiled.get(server_id)
+        custom_messages = getattr(fortune_settings, 'custom_messages', None)
+        if entry is not None:
+            source, compiled = entry
+            if source is fortune_settings or compiled.fingerprint == fortune_fingerprint(custom_messages):
+                if source is not fortune_settings:
+                    self.compiled[server_id] = (fortune_settings, compiled)
+                self.compiled.move_to_end(server_id)
+                self.cache_hits += 1
+                return compiled
+
+        compiled = CompiledFortuneTable(custom_messages)
+        self.compiles += 1
+        logger.debug("Compiled fortune table for server %s", server_id)
+        self.compiled[server_id] = (fortune_settings, compiled)
+        self.compiled.move_to_end(server_id)
+        while len(self.compiled) > self.max_entries:
+            self.compiled.popitem(last=False)
+        return compiled
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self.compiled), 'compiles': self.compiles, 'hits': self.cache_hits}
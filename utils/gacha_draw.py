@@ -0,0 +1,178 @@
+"""
+ガチャの抽選エンジン
+
+- ガチャごとのアイテム一覧を Walker のエイリアス法の表にコンパイルし、1回の抽選を O(1) で行う
+- コンパイル結果は gacha_id ごとに LRU キャッシュし、アイテム（名前・重み・ポイント）が
+  変わったときだけ作り直す
+- 複数回の抽選（10連など）は1回の呼び出しでまとめて引く。NumPy がある場合は
+  一定回数以上の抽選をベクトル化して行う（シミュレーション用）
+"""
+import logging
+import random
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import os
+
+try:
+    import numpy as np
+except ImportError:  # NumPy はオプション
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# この回数以上の抽選は NumPy でまとめて行う
+NUMPY_MIN_BATCH = 64
+
+
+class AliasTable:
+    """
+    重み付き抽選のエイリアス表（Vose の構築法）
+
+    Args:
+        weights: 各要素の重み（0以上。合計が正であること）
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("抽選対象がありません")
+        if any(w < 0 for w in weights):
+            raise ValueError("重みに負の値があります")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("重みの合計が0です")
+
+        self.size = n
+        self.probabilities = [w / total for w in weights]
+        scaled = [p * n for p in self.probabilities]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 丸め誤差で残ったものは確率1
+        for i in large + small:
+            self.prob[i] = 1.0
+            self.alias[i] = i
+
+        self._np_prob = np.array(self.prob) if np is not None else None
+        self._np_alias = np.array(self.alias) if np is not None else None
+
+    def draw(self, rng: random.Random = random) -> int:
+        """1回抽選して要素のインデックスを返す"""
+        i = int(rng.random() * self.size)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+    def draw_many(self, count: int, rng: random.Random = random, np_rng=None) -> List[int]:
+        """count 回抽選してインデックスのリストを返す"""
+        if np is not None and count >= NUMPY_MIN_BATCH:
+            np_rng = np_rng if np_rng is not None else np.random.default_rng(rng.getrandbits(64))
+            return self.sample(count, np_rng).tolist()
+        return [self.draw(rng) for _ in range(count)]
+
+    def sample(self, shape, np_rng) -> "np.ndarray":
+        """NumPy の乱数生成器で shape の形のインデックス配列を抽選する（NumPy 必須）"""
+        columns = np_rng.integers(0, self.size, shape)
+        accept = np_rng.random(shape) < self._np_prob[columns]
+        return np.where(accept, columns, self._np_alias[columns])
+
+
+def items_fingerprint(items: List[Dict]) -> Tuple:
+    """抽選結果に影響する項目（名前・重み・ポイント）の組"""
+    return tuple((str(item.get('name')), str(item.get('weight')), str(item.get('points'))) for item in items)
+
+
+class CompiledGacha:
+    """1つのガチャのコンパイル済み抽選表"""
+
+    def __init__(self, gacha_id: str, items: List[Dict]):
+        self.gacha_id = gacha_id
+        self.items = list(items)
+        self.fingerprint = items_fingerprint(self.items)
+        self.points = [int(item['points']) for item in self.items]
+        self.table = AliasTable([float(item['weight']) for item in self.items])
+
+    def draw(self, count: int = 1, rng: random.Random = random) -> List[Dict]:
+        """count 回抽選してアイテムのリストを返す"""
+        if count == 1:
+            return [self.items[self.table.draw(rng)]]
+        return [self.items[i] for i in self.table.draw_many(count, rng)]
+
+    def draw_indices(self, count: int, rng: random.Random = random, np_rng=None) -> List[int]:
+        return self.table.draw_many(count, rng, np_rng)
+
+    def expected_points(self) -> float:
+        """1回あたりの獲得ポイントの期待値"""
+        return sum(p * points for p, points in zip(self.table.probabilities, self.points))
+
+
+class GachaDrawEngine:
+    """
+    ガチャごとのコンパイル済み抽選表を管理する
+
+    環境変数:
+        GACHA_DRAW_CACHE_SIZE: キャッシュするガチャ数の上限（デフォルト 1024）
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('GACHA_DRAW_CACHE_SIZE', '1024'))
+        # gacha_id -> (コンパイル元の items リスト, CompiledGacha)
+        self.compiled: "OrderedDict[str, Tuple[List[Dict], CompiledGacha]]" = OrderedDict()
+        self.compiles = 0
+        self.cache_hits = 0
+
+    def compile(self, gacha_settings) -> CompiledGacha:
+        """
+        ガチャ設定の抽選表を返す（アイテムが変わっていなければキャッシュを使う）
+
+        設定キャッシュが同じ items リストを返している間はリストの同一性だけで判定し、
+        設定が読み直された場合は内容の指紋で比較する
+        （items リストをその場で書き換えた場合は invalidate を呼ぶこと）
+        """
+        gacha_id = str(gacha_settings.gacha_id)
+        items = gacha_settings.items
+        entry = self.compiled.get(gacha_id)
+        if entry is not None:
+            source, compiled = entry
+            if source is items or compiled.fingerprint == items_fingerprint(items):
+                if source is not items:
+                    self.compiled[gacha_id] = (items, compiled)
+                self.compiled.move_to_end(gacha_id)
+                self.cache_hits += 1
+                return compiled
+
+        compiled = CompiledGacha(gacha_id, items)
+        self.compiles += 1
+        logger.debug("Compiled draw table for gacha %s (%s items)", gacha_id, len(items))
+        self.compiled[gacha_id] = (items, compiled)
+        self.compiled.move_to_end(gacha_id)
+        while len(self.compiled) > self.max_entries:
+            self.compiled.popitem(last=False)
+        return compiled
+
+    def draw(self, gacha_settings, count: int = 1, rng: random.Random = random) -> List[Dict]:
+        """
+        ガチャを count 回引いてアイテムのリストを返す
+
+        呼び出し元
+        cogs\\gacha.py
+            GachaView.gacha_button
+        """
+        return self.compile(gacha_settings).draw(max(1, int(count)), rng)
+
+    def invalidate(self, gacha_id: str):
+        self.compiled.pop(str(gacha_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self.compiled),
+            'compiles': self.compiles,
+            'hits': self.cache_hits,
+            'numpy': np is not None
+        }
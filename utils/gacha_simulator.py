@@ -0,0 +1,278 @@
+"""
+ガチャ経済のモンテカルロシミュレーション
+
+ガチャのアイテム設定（重み・ポイント）で、ユーザー層（コホート）ごとに毎日のガチャを
+指定日数ぶん引いた場合のポイント分布と、しきい値（ポイント消費の必要ポイント・
+ロール付与のポイント条件）に到達するまでの日数を見積もる。
+
+- 抽選は utils.gacha_draw のエイリアス表を使い、NumPy がある場合は
+  (ユーザー, 日, 連数) の配列でまとめて引く（数百万回の抽選が数秒で終わる）
+- NumPy がない場合は1回ずつ抽選する（同じ結果の形だが遅い）
+- ポイント消費による減少は考慮しない（獲得ポイントの累計）
+"""
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from utils.gacha_draw import CompiledGacha, np
+
+logger = logging.getLogger(__name__)
+
+# 1回の配列抽選で扱う抽選回数の上限（メモリ使用量の目安: 約 100 バイト/回）
+MAX_DRAWS_PER_CHUNK = 2_000_000
+
+PERCENTILES = (10, 50, 90, 99)
+
+
+@dataclass
+class Cohort:
+    """
+    ユーザー層
+
+    Attributes:
+        name: 表示名
+        users: 人数
+        participation: 1日にガチャを引く確率（0〜1）
+    """
+    name: str
+    users: int
+    participation: float = 1.0
+
+
+def default_cohorts(users: int) -> List[Cohort]:
+    """毎日引く層・ときどき引く層・たまに引く層"""
+    return [
+        Cohort('毎日', users, 1.0),
+        Cohort('ときどき', users, 0.5),
+        Cohort('たまに', users, 0.15),
+    ]
+
+
+@dataclass
+class ThresholdResult:
+    label: str
+    points: int
+    reached_ratio: float
+    median_days: Optional[float]
+    p90_days: Optional[float]
+
+
+@dataclass
+class CohortResult:
+    cohort: Cohort
+    mean: float
+    std: float
+    percentiles: Dict[int, float]
+    daily_mean: float
+    thresholds: List[ThresholdResult] = field(default_factory=list)
+
+
+@dataclass
+class SimulationResult:
+    gacha_name: str
+    days: int
+    pulls_per_roll: int
+    expected_points_per_roll: float
+    total_draws: int
+    elapsed_seconds: float
+    cohorts: List[CohortResult] = field(default_factory=list)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """線形補間の分位点（sorted_values は昇順）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _condition_threshold(role) -> Optional[int]:
+    """ロール設定（dict / RoleSettings）のポイント条件を取り出す"""
+    condition = role.get('condition') if isinstance(role, dict) else getattr(role, 'condition', None)
+    if condition is None:
+        return None
+    if isinstance(condition, dict):
+        condition_type, value = condition.get('type'), condition.get('value')
+    else:
+        condition_type, value = getattr(condition, 'type', None), getattr(condition, 'value', None)
+    if condition_type != 'points_threshold' or value is None:
+        return None
+    return int(value)
+
+
+def collect_thresholds(server_settings, gacha_settings) -> Dict[str, int]:
+    """
+    シミュレーションで到達日数を見るしきい値を集める
+
+    - ポイント消費の必要ポイント（point_consumption_settings.required_points）
+    - ガチャ/ガチャ機能全体のロール付与条件（points_threshold）
+    """
+    thresholds: Dict[str, int] = {}
+    consumption = getattr(server_settings, 'point_consumption_settings', None) if server_settings else None
+    if consumption and consumption.required_points:
+        thresholds['消費申請'] = int(consumption.required_points)
+
+    roles = list(getattr(gacha_settings, 'roles', None) or [])
+    feature = getattr(server_settings, 'gacha_settings', None) if server_settings else None
+    roles += list(getattr(feature, 'roles', None) or [])
+    for role in roles:
+        value = _condition_threshold(role)
+        if value is None:
+            continue
+        role_id = role.get('role_id') if isinstance(role, dict) else getattr(role, 'role_id', '')
+        thresholds[f"ロール {role_id}"] = value
+    return thresholds
+
+
+class GachaEconomySimulator:
+    """
+    1つのガチャ設定のシミュレーター
+
+    Args:
+        items: GachaSettings.items
+        pulls_per_roll: 1日1回のガチャで引く回数
+        seed: 乱数シード（同じシードなら同じ結果）
+    """
+
+    def __init__(self, items: List[Dict], pulls_per_roll: int = 1, name: str = '', seed: Optional[int] = None):
+        self.compiled = CompiledGacha(name, items)
+        self.pulls_per_roll = max(1, int(pulls_per_roll))
+        self.name = name
+        self.seed = seed
+
+    @classmethod
+    def from_settings(cls, gacha_settings, seed: Optional[int] = None) -> 'GachaEconomySimulator':
+        return cls(
+            gacha_settings.items,
+            getattr(gacha_settings, 'pulls_per_roll', 1),
+            name=gacha_settings.name,
+            seed=seed
+        )
+
+    def run(self, days: int, cohorts: List[Cohort], thresholds: Optional[Dict[str, int]] = None) -> SimulationResult:
+        """
+        シミュレーションを実行する（CPU を使うので、イベントループからは asyncio.to_thread で呼ぶ）
+        """
+        thresholds = thresholds or {}
+        started = time.perf_counter()
+        rng = random.Random(self.seed)
+        np_rng = np.random.default_rng(self.seed) if np is not None else None
+
+        result = SimulationResult(
+            gacha_name=self.name,
+            days=days,
+            pulls_per_roll=self.pulls_per_roll,
+            expected_points_per_roll=self.compiled.expected_points() * self.pulls_per_roll,
+            total_draws=0,
+            elapsed_seconds=0.0
+        )
+        for cohort in cohorts:
+            if np_rng is not None:
+                finals, reach_days, draws = self._simulate_numpy(cohort, days, thresholds, np_rng)
+            else:
+                finals, reach_days, draws = self._simulate_python(cohort, days, thresholds, rng)
+            result.total_draws += draws
+            result.cohorts.append(self._summarize(cohort, days, finals, reach_days, thresholds))
+
+        result.elapsed_seconds = time.perf_counter() - started
+        logger.info("Simulated %s draws for gacha %s in %.2fs", result.total_draws, self.name, result.elapsed_seconds)
+        return result
+
+    def _simulate_numpy(self, cohort: Cohort, days: int, thresholds: Dict[str, int], np_rng):
+        points = np.array(self.compiled.points, dtype=np.int64)
+        per_user = days * self.pulls_per_roll
+        chunk_users = max(1, MAX_DRAWS_PER_CHUNK // max(1, per_user))
+        finals = []
+        reach_days = {label: [] for label in thresholds}
+        draws = 0
+
+        for start in range(0, cohort.users, chunk_users):
+            users = min(chunk_users, cohort.users - start)
+            indices = self.compiled.table.sample((users, days, self.pulls_per_roll), np_rng)
+            daily = points[indices].sum(axis=2)
+            played = np_rng.random((users, days)) < cohort.participation
+            daily *= played
+            draws += int(played.sum()) * self.pulls_per_roll
+            cumulative = np.cumsum(daily, axis=1)
+            finals.extend(cumulative[:, -1].tolist())
+            for label, threshold in thresholds.items():
+                reached = cumulative >= threshold
+                hit = reached[:, -1]
+                reach_days[label].extend((reached[hit].argmax(axis=1) + 1).tolist())
+        return finals, reach_days, draws
+
+    def _simulate_python(self, cohort: Cohort, days: int, thresholds: Dict[str, int], rng: random.Random):
+        points = self.compiled.points
+        finals = []
+        reach_days = {label: [] for label in thresholds}
+        draws = 0
+        for _ in range(cohort.users):
+            total = 0
+            pending = dict(thresholds)
+            for day in range(1, days + 1):
+                if rng.random() >= cohort.participation:
+                    continue
+                total += sum(points[i] for i in self.compiled.table.draw_many(self.pulls_per_roll, rng))
+                draws += self.pulls_per_roll
+                for label, threshold in list(pending.items()):
+                    if total >= threshold:
+                        reach_days[label].append(day)
+                        del pending[label]
+            finals.append(total)
+        return finals, reach_days, draws
+
+    @staticmethod
+    def _summarize(cohort: Cohort, days: int, finals: List[int], reach_days: Dict[str, List[int]],
+                   thresholds: Dict[str, int]) -> CohortResult:
+        values = sorted(finals)
+        count = len(values) or 1
+        mean = sum(values) / count
+        std = (sum((v - mean) ** 2 for v in values) / count) ** 0.5
+        result = CohortResult(
+            cohort=cohort,
+            mean=mean,
+            std=std,
+            percentiles={q: _percentile(values, q) for q in PERCENTILES},
+            daily_mean=mean / days if days else 0.0
+        )
+        for label, threshold in thresholds.items():
+            reached = sorted(reach_days.get(label, []))
+            result.thresholds.append(ThresholdResult(
+                label=label,
+                points=threshold,
+                reached_ratio=len(reached) / count,
+                median_days=_percentile(reached, 50) if reached else None,
+                p90_days=_percentile(reached, 90) if reached else None
+            ))
+        return result
+
+
+def format_report(result: SimulationResult, unit: str = 'pt') -> str:
+    """シミュレーション結果を Discord / コンソール向けのテキストにする"""
+    lines = [
+        f"【ガチャ経済シミュレーション】{result.gacha_name}",
+        f"期間 {result.days}日 / 1回 {result.pulls_per_roll}連 / 1回あたり期待値 {result.expected_points_per_roll:,.1f}{unit}",
+        f"抽選回数 {result.total_draws:,}回（{result.elapsed_seconds:.2f}秒）",
+    ]
+    for cohort_result in result.cohorts:
+        cohort = cohort_result.cohort
+        percentiles = " / ".join(f"{cohort_result.percentiles[q]:,.0f}" for q in PERCENTILES)
+        lines.append("")
+        lines.append(f"■ {cohort.name}（{cohort.users:,}人, 参加率 {cohort.participation:.0%}）")
+        lines.append(
+            f"  平均 {cohort_result.mean:,.0f}{unit}（標準偏差 {cohort_result.std:,.0f}）"
+            f" / 1日あたり {cohort_result.daily_mean:,.1f}{unit}"
+        )
+        lines.append(f"  p{' / p'.join(str(q) for q in PERCENTILES)}: {percentiles}")
+        for threshold in cohort_result.thresholds:
+            if threshold.median_days is None:
+                lines.append(f"  {threshold.label}（{threshold.points:,}{unit}）: 期間内に到達なし")
+                continue
+            lines.append(
+                f"  {threshold.label}（{threshold.points:,}{unit}）: 到達 {threshold.reached_ratio:.1%}"
+                f" / 中央値 {threshold.median_days:.0f}日 / p90 {threshold.p90_days:.0f}日"
+            )
+    return "\n".join(lines)
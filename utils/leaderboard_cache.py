@@ -0,0 +1,177 @@
+import logging
+import asyncio
+import bisect
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # sortedcontainers はオプション（pip install sortedcontainers）
+    SortedList = None
+
+logger = logging.getLogger(__name__)
+
+
+class _BisectList:
+    """
+    sortedcontainers がない場合の SortedList の代わり（Leaderboard が使う操作のみ）
+
+    ソート済みの list を bisect で更新する。追加/削除は O(n) の移動を伴うが、
+    1サーバー・1ユニット分のランキングの規模なら十分に速い
+    """
+
+    __slots__ = ('_items',)
+
+    def __init__(self, iterable=()):
+        self._items = sorted(iterable)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, value):
+        bisect.insort(self._items, value)
+
+    def discard(self, value):
+        index = bisect.bisect_left(self._items, value)
+        if index < len(self._items) and self._items[index] == value:
+            del self._items[index]
+
+    def bisect_left(self, value) -> int:
+        return bisect.bisect_left(self._items, value)
+
+    def islice(self, start: int, stop: int):
+        return islice(self._items, start, stop)
+
+
+class Leaderboard:
+    """
+    単一 (server_id, unit_id) のソート済みランキング
+
+    (-points, user_id) を SortedList に保持するため、
+    更新・順位・上位N件の取得はいずれも O(log n)
+    （sortedcontainers がない場合はソート済み list で代用し、更新は O(n)）
+    """
+
+    __slots__ = ('_entries', '_points', 'loaded_at', 'last_used')
+
+    def __init__(self, rankings: List[Dict]):
+        self._points: Dict[str, int] = {
+            str(entry['user_id']): int(entry['points']) for entry in rankings
+        }
+        entries = ((-points, user_id) for user_id, points in self._points.items())
+        self._entries = SortedList(entries) if SortedList is not None else _BisectList(entries)
+        self.loaded_at = time.monotonic()
+        self.last_used = self.loaded_at
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, user_id: str, points: int):
+        """ユーザーのポイントを差し替える"""
+        user_id = str(user_id)
+        old_points = self._points.get(user_id)
+        if old_points is not None:
+            self._entries.discard((-old_points, user_id))
+        self._points[user_id] = int(points)
+        self._entries.add((-int(points), user_id))
+
+    def points_of(self, user_id: str) -> Optional[int]:
+        return self._points.get(str(user_id))
+
+    def rank_of(self, points: int) -> int:
+        """指定ポイントの順位（自分より多いユーザー数 + 1）"""
+        return self._entries.bisect_left((-int(points), '')) + 1
+
+    def top(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """上位limit件を (user_id, points) で返す"""
+        return [(user_id, -neg_points) for neg_points, user_id in self._entries.islice(0, limit)]
+
+
+class LeaderboardCache:
+    """
+    (server_id, unit_id) ごとの Leaderboard のLRUキャッシュ
+
+    - 初回参照時に loader（ランキング索引の全件取得）で遅延読み込み
+    - ポイント更新は update() で読み込み済みのボードにのみ反映
+    - max_boards を超えた分、および idle_seconds 参照のないボードを破棄
+    - 他プロセスからの更新を取り込むため max_age_seconds で再読み込み
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str, str], Awaitable[List[Dict]]],
+        max_boards: int = 256,
+        idle_seconds: float = 1800,
+        max_age_seconds: float = 300
+    ):
+        self._loader = loader
+        self.max_boards = max_boards
+        self.idle_seconds = idle_seconds
+        self.max_age_seconds = max_age_seconds
+        self._boards: "OrderedDict[Tuple[str, str], Leaderboard]" = OrderedDict()
+        self._load_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _is_fresh(self, board: Leaderboard, now: float) -> bool:
+        return now - board.loaded_at < self.max_age_seconds
+
+    async def get(self, server_id: str, unit_id: str = "1") -> Leaderboard:
+        """ボードを取得（未読み込み・期限切れの場合は読み込む）"""
+        key = (str(server_id), str(unit_id))
+        now = time.monotonic()
+        board = self._boards.get(key)
+        if board is not None and self._is_fresh(board, now):
+            board.last_used = now
+            self._boards.move_to_end(key)
+            return board
+
+        lock = self._load_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            board = self._boards.get(key)
+            if board is None or not self._is_fresh(board, time.monotonic()):
+                board = Leaderboard(await self._loader(*key))
+                self._boards[key] = board
+            self._boards.move_to_end(key)
+            board.last_used = time.monotonic()
+            # 待っていた呼び出しは同じロックを使い終えるので、ロックを持ったまま外す
+            # （外した後に来た呼び出しは読み込み済みのボードを使う）
+            self._load_locks.pop(key, None)
+        self._evict()
+        return board
+
+    def update(self, server_id: str, unit_id: str, user_id: str, points: int):
+        """読み込み済みのボードにポイント更新を反映する"""
+        board = self._boards.get((str(server_id), str(unit_id)))
+        if board is not None:
+            board.update(user_id, points)
+
+    def invalidate(self, server_id: str, unit_id: Optional[str] = None):
+        for key in [k for k in self._boards if k[0] == str(server_id) and (unit_id is None or k[1] == str(unit_id))]:
+            del self._boards[key]
+
+    async def rank_of(self, server_id: str, unit_id: str, user_id: str, points: Optional[int] = None) -> int:
+        board = await self.get(server_id, unit_id)
+        if points is None:
+            points = board.points_of(user_id) or 0
+        return board.rank_of(points)
+
+    async def top(self, server_id: str, unit_id: str = "1", limit: int = 10) -> List[Tuple[str, int]]:
+        board = await self.get(server_id, unit_id)
+        return board.top(limit)
+
+    def _evict(self):
+        now = time.monotonic()
+        try:
+            while len(self._boards) > self.max_boards:
+                self._boards.popitem(last=False)
+            for key in [k for k, b in self._boards.items() if now - b.last_used > self.idle_seconds]:
+                del self._boards[key]
+        except Exception as e:
+            logger.error("Error evicting leaderboards: %s", e, exc_info=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'boards': len(self._boards),
+            'entries': sum(len(board) for board in self._boards.values())
+        }
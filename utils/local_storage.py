@@ -0,0 +1,992 @@
+"""
+DynamoDB 互換のローカルストレージ（SQLite / インメモリ）
+
+boto3 の DynamoDB リソース / Table のうち、このBotが使う範囲を同じ引数・同じ戻り値で実装する。
+AWSDatabase からはバックエンドを意識せずに使える。
+
+    resource = LocalDynamoResource(':memory:')       # インメモリ
+    resource = LocalDynamoResource('local.sqlite3')  # ファイルに永続化
+    table = resource.Table('discord_users')
+
+対応している操作:
+- Table: get_item / put_item / update_item / delete_item / query / scan / batch_writer
+- Resource: batch_get_item / batch_write_item
+- Client (resource.meta.client): transact_write_items / batch_write_item
+- 式: KeyCondition / Filter / Condition / Update / Projection 式、boto3.dynamodb.conditions の条件オブジェクト
+- GSI（TABLE_SCHEMAS の indexes）、Limit / ExclusiveStartKey によるページング、Segment / TotalSegments
+"""
+import copy
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# テーブル定義: テーブル名 -> キースキーマとGSI
+#   hash / range: プライマリキーの属性名（rangeがない場合はNone）
+#   indexes: インデックス名 -> (パーティションキー, ソートキー)
+TABLE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    'discord_users': {
+        'hash': 'pk', 'range': None,
+        'indexes': {'ServerUnitRankingIndex': ('ranking_key', 'points')}
+    },
+    'server_settings': {'hash': 'server_id', 'range': None, 'indexes': {}},
+    'ServerSettings': {'hash': 'server_id', 'range': None, 'indexes': {}},
+    'gacha_history': {'hash': 'pk', 'range': None, 'indexes': {}},
+    'automation_rules': {'hash': 'server_id', 'range': 'id', 'indexes': {}},
+    'point_consumption_history': {
+        'hash': 'server_id', 'range': 'timestamp',
+        'indexes': {'ServerStatusIndex': ('server_status', 'timestamp')}
+    },
+    'reward_claims': {
+        'hash': 'user_id', 'range': 'id',
+        'indexes': {'StatusIndex': ('status', 'created_at')}
+    },
+}
+
+DEFAULT_SCHEMA = {'hash': 'pk', 'range': None, 'indexes': {}}
+
+# 1ページあたりの最大件数（DynamoDBの1MB制限の代わり。ページング処理を通すため）
+DEFAULT_PAGE_SIZE = 1000
+
+
+def register_table_schema(table_name: str, hash_key: str, range_key: Optional[str] = None,
+                          indexes: Optional[Dict[str, Tuple[str, Optional[str]]]] = None):
+    """テーブル定義を追加（新しいテーブルを使う機能から呼ぶ）"""
+    TABLE_SCHEMAS[table_name] = {'hash': hash_key, 'range': range_key, 'indexes': dict(indexes or {})}
+
+
+def _client_error(code: str, message: str, operation: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+# ---------------------------------------------------------------------------
+# 式の字句解析・構文解析
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<op><>|<=|>=|=|<|>)|(?P<punct>[(),.\[\]+\-])|(?P<value>:[A-Za-z0-9_]+)"
+    r"|(?P<name>#[A-Za-z0-9_]+)|(?P<ident>[A-Za-z_][A-Za-z0-9_]*)|(?P<number>\d+))"
+)
+
+_KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'REMOVE', 'ADD', 'DELETE'}
+_FUNCTIONS = {'attribute_exists', 'attribute_not_exists', 'attribute_type', 'begins_with', 'contains', 'size',
+              'if_not_exists', 'list_append'}
+
+_MISSING = object()
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise _client_error('ValidationException', f"Invalid expression near: {expression[pos:]}", 'Expression')
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'ident' and text.upper() in _KEYWORDS:
+            kind, text = 'keyword', text.upper()
+        tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    DynamoDB の式を構文木（タプル）に変換する
+
+    条件: ('and', a, b) / ('or', a, b) / ('not', a) / ('cmp', op, l, r)
+          ('between', x, lo, hi) / ('in', x, [..]) / ('func', name, [args])
+    オペランド: ('path', [部品]) / ('value', 値) / ('size', オペランド)
+    """
+
+    def __init__(self, expression: str, names: Optional[Dict[str, str]], values: Optional[Dict[str, Any]]):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    # -- 基本操作 --
+    def _peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def _take(self, kind: Optional[str] = None, text: Optional[str] = None) -> Tuple[str, str]:
+        token = self._peek()
+        if token[0] is None or (kind and token[0] != kind) or (text and token[1] != text):
+            raise _client_error('ValidationException', f"Unexpected token {token[1]!r} (expected {text or kind})", 'Expression')
+        self.pos += 1
+        return token
+
+    def _accept(self, kind: str, text: Optional[str] = None) -> bool:
+        token = self._peek()
+        if token[0] == kind and (text is None or token[1] == text):
+            self.pos += 1
+            return True
+        return False
+
+    def done(self) -> bool:
+        return self.pos >= len(self.tokens)
+
+    # -- パス・オペランド --
+    def _name(self) -> str:
+        kind, text = self._peek()
+        if kind == 'name':
+            self.pos += 1
+            if text not in self.names:
+                raise _client_error('ValidationException', f"Undefined attribute name {text}", 'Expression')
+            return self.names[text]
+        if kind in ('ident', 'keyword'):
+            self.pos += 1
+            return text
+        raise _client_error('ValidationException', f"Expected attribute name, got {text!r}", 'Expression')
+
+    def path(self) -> Tuple:
+        parts: List[Any] = [self._name()]
+        while True:
+            if self._accept('punct', '.'):
+                parts.append(self._name())
+            elif self._accept('punct', '['):
+                parts.append(int(self._take('number')[1]))
+                self._take('punct', ']')
+            else:
+                return ('path', parts)
+
+    def operand(self) -> Tuple:
+        kind, text = self._peek()
+        if kind == 'value':
+            self.pos += 1
+            if text not in self.values:
+                raise _client_error('ValidationException', f"Undefined attribute value {text}", 'Expression')
+            return ('value', self.values[text])
+        if kind == 'ident' and text == 'size' and self._peek(1) == ('punct', '('):
+            self.pos += 2
+            inner = self.operand()
+            self._take('punct', ')')
+            return ('size', inner)
+        return self.path()
+
+    # -- 条件式 --
+    def condition(self) -> Tuple:
+        node = self._and()
+        while self._accept('keyword', 'OR'):
+            node = ('or', node, self._and())
+        return node
+
+    def _and(self) -> Tuple:
+        node = self._not()
+        while self._accept('keyword', 'AND'):
+            node = ('and', node, self._not())
+        return node
+
+    def _not(self) -> Tuple:
+        if self._accept('keyword', 'NOT'):
+            return ('not', self._not())
+        return self._primary()
+
+    def _primary(self) -> Tuple:
+        if self._accept('punct', '('):
+            node = self.condition()
+            self._take('punct', ')')
+            return node
+
+        kind, text = self._peek()
+        if kind == 'ident' and text in _FUNCTIONS and text != 'size' and self._peek(1) == ('punct', '('):
+            self.pos += 2
+            args = [self.operand()]
+            while self._accept('punct', ','):
+                args.append(self.operand())
+            self._take('punct', ')')
+            return ('func', text, args)
+
+        left = self.operand()
+        kind, text = self._peek()
+        if kind == 'op':
+            self.pos += 1
+            return ('cmp', text, left, self.operand())
+        if kind == 'keyword' and text == 'BETWEEN':
+            self.pos += 1
+            low = self.operand()
+            self._take('keyword', 'AND')
+            return ('between', left, low, self.operand())
+        if kind == 'keyword' and text == 'IN':
+            self.pos += 1
+            self._take('punct', '(')
+            options = [self.operand()]
+            while self._accept('punct', ','):
+                options.append(self.operand())
+            self._take('punct', ')')
+            return ('in', left, options)
+        raise _client_error('ValidationException', f"Invalid condition near {text!r}", 'Expression')
+
+    # -- 更新式 --
+    def update(self) -> List[Tuple]:
+        actions = []
+        while not self.done():
+            _, clause = self._take('keyword')
+            while True:
+                if clause == 'SET':
+                    target = self.path()
+                    self._take('op', '=')
+                    actions.append(('SET', target, self._set_value()))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', self.path(), None))
+                elif clause in ('ADD', 'DELETE'):
+                    target = self.path()
+                    actions.append((clause, target, self.operand()))
+                else:
+                    raise _client_error('ValidationException', f"Invalid update clause {clause}", 'Expression')
+                if not self._accept('punct', ','):
+                    break
+        return actions
+
+    def _set_value(self) -> Tuple:
+        node = self._set_term()
+        kind, text = self._peek()
+        if kind == 'punct' and text in ('+', '-'):
+            self.pos += 1
+            return ('arith', text, node, self._set_term())
+        return node
+
+    def _set_term(self) -> Tuple:
+        kind, text = self._peek()
+        if kind == 'ident' and text in ('if_not_exists', 'list_append') and self._peek(1) == ('punct', '('):
+            self.pos += 2
+            first = self.operand()
+            self._take('punct', ',')
+            second = self.operand()
+            self._take('punct', ')')
+            return (text, first, second)
+        return self.operand()
+
+    # -- 射影式 --
+    def projection(self) -> List[Tuple]:
+        paths = [self.path()]
+        while self._accept('punct', ','):
+            paths.append(self.path())
+        return paths
+
+
+# ---------------------------------------------------------------------------
+# 式の評価
+# ---------------------------------------------------------------------------
+
+def _get_path(item: Any, parts: List[Any]) -> Any:
+    current = item
+    for part in parts:
+        if isinstance(part, int):
+            if not isinstance(current, list) or part >= len(current):
+                return _MISSING
+            current = current[part]
+        else:
+            if not isinstance(current, dict) or part not in current:
+                return _MISSING
+            current = current[part]
+    return current
+
+
+def _set_path(item: Dict, parts: List[Any], value: Any):
+    current = item
+    for part in parts[:-1]:
+        try:
+            current = current[part]
+        except (KeyError, IndexError, TypeError):
+            raise _client_error('ValidationException', "The document path provided in the update expression is invalid for update", 'UpdateItem')
+    last = parts[-1]
+    if isinstance(last, int):
+        if not isinstance(current, list):
+            raise _client_error('ValidationException', "The document path provided in the update expression is invalid for update", 'UpdateItem')
+        if last >= len(current):
+            current.append(value)
+        else:
+            current[last] = value
+    else:
+        current[last] = value
+
+
+def _remove_path(item: Dict, parts: List[Any]):
+    parent = _get_path(item, parts[:-1]) if len(parts) > 1 else item
+    if parent is _MISSING:
+        return
+    last = parts[-1]
+    if isinstance(last, int):
+        if isinstance(parent, list) and last < len(parent):
+            del parent[last]
+    elif isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+def _eval_operand(node: Tuple, item: Dict) -> Any:
+    kind = node[0]
+    if kind == 'value':
+        return node[1]
+    if kind == 'path':
+        return _get_path(item, node[1])
+    if kind == 'size':
+        value = _eval_operand(node[1], item)
+        if value is _MISSING or value is None or isinstance(value, (bool, Decimal, int)):
+            return _MISSING
+        return Decimal(len(value))
+    raise _client_error('ValidationException', f"Invalid operand {node!r}", 'Expression')
+
+
+def _comparable(a: Any, b: Any) -> bool:
+    if a is _MISSING or b is _MISSING:
+        return False
+    numeric = (Decimal, int)
+    if isinstance(a, numeric) and isinstance(b, numeric) and not isinstance(a, bool) and not isinstance(b, bool):
+        return True
+    return type(a) is type(b)
+
+
+def _compare(op: str, a: Any, b: Any) -> bool:
+    if op == '=':
+        return _comparable(a, b) and a == b
+    if op == '<>':
+        return a is not _MISSING and not (_comparable(a, b) and a == b)
+    if not _comparable(a, b) or not isinstance(a, (Decimal, int, str, bytes)):
+        return False
+    return {'<': a < b, '<=': a <= b, '>': a > b, '>=': a >= b}[op]
+
+
+_TYPE_CODES = {'S': str, 'N': (Decimal, int), 'B': (bytes, bytearray), 'BOOL': bool, 'NULL': type(None),
+               'L': list, 'M': dict, 'SS': set, 'NS': set, 'BS': set}
+
+
+def _eval_condition(node: Tuple, item: Dict) -> bool:
+    kind = node[0]
+    if kind == 'and':
+        return _eval_condition(node[1], item) and _eval_condition(node[2], item)
+    if kind == 'or':
+        return _eval_condition(node[1], item) or _eval_condition(node[2], item)
+    if kind == 'not':
+        return not _eval_condition(node[1], item)
+    if kind == 'cmp':
+        return _compare(node[1], _eval_operand(node[2], item), _eval_operand(node[3], item))
+    if kind == 'between':
+        value = _eval_operand(node[1], item)
+        return (_compare('>=', value, _eval_operand(node[2], item))
+                and _compare('<=', value, _eval_operand(node[3], item)))
+    if kind == 'in':
+        value = _eval_operand(node[1], item)
+        return any(_compare('=', value, _eval_operand(option, item)) for option in node[2])
+    if kind == 'func':
+        name, args = node[1], node[2]
+        first = _eval_operand(args[0], item)
+        if name == 'attribute_exists':
+            return first is not _MISSING
+        if name == 'attribute_not_exists':
+            return first is _MISSING
+        if name == 'attribute_type':
+            expected = _TYPE_CODES.get(str(_eval_operand(args[1], item)))
+            return first is not _MISSING and expected is not None and isinstance(first, expected)
+        if name == 'begins_with':
+            prefix = _eval_operand(args[1], item)
+            return isinstance(first, (str, bytes)) and type(first) is type(prefix) and first.startswith(prefix)
+        if name == 'contains':
+            needle = _eval_operand(args[1], item)
+            if isinstance(first, str):
+                return isinstance(needle, str) and needle in first
+            if isinstance(first, (set, list)):
+                return needle in first
+            return False
+    raise _client_error('ValidationException', f"Invalid condition {node!r}", 'Expression')
+
+
+def _eval_set_value(node: Tuple, item: Dict) -> Any:
+    kind = node[0]
+    if kind == 'if_not_exists':
+        current = _eval_operand(node[1], item)
+        return current if current is not _MISSING else _eval_operand(node[2], item)
+    if kind == 'list_append':
+        first, second = _eval_operand(node[1], item), _eval_operand(node[2], item)
+        if not isinstance(first, list) or not isinstance(second, list):
+            raise _client_error('ValidationException', "list_append requires two lists", 'UpdateItem')
+        return first + second
+    if kind == 'arith':
+        left, right = _eval_set_value(node[2], item), _eval_set_value(node[3], item)
+        if not isinstance(left, (Decimal, int)) or not isinstance(right, (Decimal, int)):
+            raise _client_error('ValidationException', "An operand in the update expression has an incorrect data type", 'UpdateItem')
+        return Decimal(left) + Decimal(right) if node[1] == '+' else Decimal(left) - Decimal(right)
+    value = _eval_operand(node, item)
+    if value is _MISSING:
+        raise _client_error('ValidationException', "The provided expression refers to an attribute that does not exist in the item", 'UpdateItem')
+    return value
+
+
+def _apply_update(item: Dict, actions: List[Tuple]) -> List[str]:
+    """更新式を item に適用し、変更したトップレベル属性名を返す"""
+    original = copy.deepcopy(item)
+    touched = []
+    for clause, target, value_node in actions:
+        parts = target[1]
+        touched.append(parts[0])
+        if clause == 'SET':
+            _set_path(item, parts, copy.deepcopy(_eval_set_value(value_node, original)))
+        elif clause == 'REMOVE':
+            _remove_path(item, parts)
+        elif clause == 'ADD':
+            value = _eval_operand(value_node, original)
+            current = _get_path(item, parts)
+            if isinstance(value, (Decimal, int)) and not isinstance(value, bool):
+                if current is _MISSING:
+                    current = Decimal(0)
+                if not isinstance(current, (Decimal, int)) or isinstance(current, bool):
+                    raise _client_error('ValidationException', "An operand in the update expression has an incorrect data type", 'UpdateItem')
+                _set_path(item, parts, Decimal(current) + Decimal(value))
+            elif isinstance(value, set):
+                _set_path(item, parts, (current if current is not _MISSING else set()) | value)
+            else:
+                raise _client_error('ValidationException', "ADD supports numbers and sets only", 'UpdateItem')
+        elif clause == 'DELETE':
+            value = _eval_operand(value_node, original)
+            current = _get_path(item, parts)
+            if isinstance(current, set) and isinstance(value, set):
+                remaining = current - value
+                if remaining:
+                    _set_path(item, parts, remaining)
+                else:
+                    _remove_path(item, parts)
+    return touched
+
+
+def _project(item: Dict, paths: List[Tuple]) -> Dict:
+    result: Dict = {}
+    for _, parts in paths:
+        value = _get_path(item, parts)
+        if value is _MISSING:
+            continue
+        current = result
+        for part in parts[:-1]:
+            if isinstance(part, int):
+                break
+            current = current.setdefault(part, {})
+        else:
+            if not isinstance(parts[-1], int):
+                current[parts[-1]] = copy.deepcopy(value)
+                continue
+        # リストの添字を含む射影はトップレベル属性ごと返す
+        result[parts[0]] = copy.deepcopy(item[parts[0]])
+    return result
+
+
+class _ExpressionContext:
+    """1リクエスト分の式（条件オブジェクトは同じビルダーで文字列化してプレースホルダーを共有）"""
+
+    def __init__(self, kwargs: Dict[str, Any]):
+        self.names = dict(kwargs.get('ExpressionAttributeNames') or {})
+        self.values = dict(kwargs.get('ExpressionAttributeValues') or {})
+        self._builder = ConditionExpressionBuilder()
+
+    def text(self, expression: Any, is_key_condition: bool = False) -> Optional[str]:
+        if expression is None:
+            return None
+        if isinstance(expression, ConditionBase):
+            built = self._builder.build_expression(expression, is_key_condition=is_key_condition)
+            self.names.update(built.attribute_name_placeholders)
+            self.values.update(built.attribute_value_placeholders)
+            return built.condition_expression
+        return expression
+
+    def condition(self, expression: Any, is_key_condition: bool = False) -> Optional[Tuple]:
+        text = self.text(expression, is_key_condition)
+        if not text:
+            return None
+        parser = _Parser(text, self.names, self.values)
+        node = parser.condition()
+        if not parser.done():
+            raise _client_error('ValidationException', f"Invalid expression: {text}", 'Expression')
+        return node
+
+    def update(self, expression: str) -> List[Tuple]:
+        return _Parser(expression, self.names, self.values).update()
+
+    def projection(self, expression: Optional[str]) -> Optional[List[Tuple]]:
+        if not expression:
+            return None
+        return _Parser(expression, self.names, self.values).projection()
+
+
+def _find_key_equality(node: Optional[Tuple], attribute: str) -> Any:
+    """キー条件から attribute = :value の値を取り出す"""
+    if node is None:
+        return _MISSING
+    if node[0] == 'and':
+        found = _find_key_equality(node[1], attribute)
+        return found if found is not _MISSING else _find_key_equality(node[2], attribute)
+    if node[0] == 'cmp' and node[1] == '=':
+        left, right = node[2], node[3]
+        if left[0] == 'path' and left[1] == [attribute] and right[0] == 'value':
+            return right[1]
+        if right[0] == 'path' and right[1] == [attribute] and left[0] == 'value':
+            return left[1]
+    return _MISSING
+
+
+# ---------------------------------------------------------------------------
+# ストレージ本体
+# ---------------------------------------------------------------------------
+
+class LocalStorageEngine:
+    """
+    SQLite 上の項目ストア
+
+    items: (tbl, hk, rk) -> 項目本体（DynamoDB JSON）
+    index_entries: (tbl, idx, ihk) -> 項目のキー（GSI用）
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL" if path != ':memory:' else "PRAGMA journal_mode=MEMORY")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " tbl TEXT NOT NULL, hk TEXT NOT NULL, rk TEXT NOT NULL, body TEXT NOT NULL,"
+                " PRIMARY KEY (tbl, hk, rk))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS index_entries ("
+                " tbl TEXT NOT NULL, idx TEXT NOT NULL, ihk TEXT NOT NULL, hk TEXT NOT NULL, rk TEXT NOT NULL,"
+                " PRIMARY KEY (tbl, idx, hk, rk))"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS index_entries_lookup ON index_entries (tbl, idx, ihk)"
+            )
+
+    # -- 変換 --
+    def encode_key_value(self, value: Any) -> str:
+        return json.dumps(self._serializer.serialize(value), sort_keys=True)
+
+    def encode_item(self, item: Dict) -> str:
+        return json.dumps({k: self._serializer.serialize(v) for k, v in item.items()}, sort_keys=True)
+
+    def decode_item(self, body: str) -> Dict:
+        return {k: self._deserializer.deserialize(v) for k, v in json.loads(body).items()}
+
+    @staticmethod
+    def schema(table_name: str) -> Dict[str, Any]:
+        return TABLE_SCHEMAS.get(table_name, DEFAULT_SCHEMA)
+
+    def key_of(self, table_name: str, key: Dict, operation: str) -> Tuple[str, str]:
+        schema = self.schema(table_name)
+        if schema['hash'] not in key or (schema['range'] and schema['range'] not in key):
+            raise _client_error('ValidationException', "The provided key element does not match the schema", operation)
+        hk = self.encode_key_value(key[schema['hash']])
+        rk = self.encode_key_value(key[schema['range']]) if schema['range'] else ''
+        return hk, rk
+
+    def key_dict(self, table_name: str, item: Dict) -> Dict:
+        schema = self.schema(table_name)
+        key = {schema['hash']: item[schema['hash']]}
+        if schema['range']:
+            key[schema['range']] = item[schema['range']]
+        return key
+
+    # -- 読み書き（呼び出し側で lock を取得すること） --
+    def get(self, table_name: str, hk: str, rk: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT body FROM items WHERE tbl = ? AND hk = ? AND rk = ?", (table_name, hk, rk)
+        ).fetchone()
+        return self.decode_item(row[0]) if row else None
+
+    def put(self, table_name: str, hk: str, rk: str, item: Dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO items (tbl, hk, rk, body) VALUES (?, ?, ?, ?)",
+            (table_name, hk, rk, self.encode_item(item))
+        )
+        self.conn.execute("DELETE FROM index_entries WHERE tbl = ? AND hk = ? AND rk = ?", (table_name, hk, rk))
+        for index_name, (index_hash, index_range) in self.schema(table_name)['indexes'].items():
+            if index_hash in item and (index_range is None or index_range in item):
+                self.conn.execute(
+                    "INSERT INTO index_entries (tbl, idx, ihk, hk, rk) VALUES (?, ?, ?, ?, ?)",
+                    (table_name, index_name, self.encode_key_value(item[index_hash]), hk, rk)
+                )
+
+    def delete(self, table_name: str, hk: str, rk: str):
+        self.conn.execute("DELETE FROM items WHERE tbl = ? AND hk = ? AND rk = ?", (table_name, hk, rk))
+        self.conn.execute("DELETE FROM index_entries WHERE tbl = ? AND hk = ? AND rk = ?", (table_name, hk, rk))
+
+    def partition(self, table_name: str, hk: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT body FROM items WHERE tbl = ? AND hk = ?", (table_name, hk)
+        ).fetchall()
+        return [self.decode_item(row[0]) for row in rows]
+
+    def index_partition(self, table_name: str, index_name: str, ihk: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT i.body FROM index_entries e JOIN items i ON i.tbl = e.tbl AND i.hk = e.hk AND i.rk = e.rk"
+            " WHERE e.tbl = ? AND e.idx = ? AND e.ihk = ?",
+            (table_name, index_name, ihk)
+        ).fetchall()
+        return [self.decode_item(row[0]) for row in rows]
+
+    def scan_rows(self, table_name: str, after: Optional[Tuple[str, str]] = None):
+        if after:
+            return self.conn.execute(
+                "SELECT hk, rk, body FROM items WHERE tbl = ? AND (hk > ? OR (hk = ? AND rk > ?)) ORDER BY hk, rk",
+                (table_name, after[0], after[0], after[1])
+            )
+        return self.conn.execute(
+            "SELECT hk, rk, body FROM items WHERE tbl = ? ORDER BY hk, rk", (table_name,)
+        )
+
+    def transaction(self):
+        return _Transaction(self)
+
+
+class _Transaction:
+    def __init__(self, engine: LocalStorageEngine):
+        self.engine = engine
+
+    def __enter__(self):
+        self.engine.lock.acquire()
+        self.engine.conn.execute("BEGIN")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.engine.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.engine.lock.release()
+        return False
+
+
+def _sort_value(value: Any):
+    if isinstance(value, (Decimal, int)) and not isinstance(value, bool):
+        return (0, Decimal(value))
+    if isinstance(value, str):
+        return (1, value)
+    if isinstance(value, (bytes, bytearray)):
+        return (2, bytes(value))
+    return (3, str(value))
+
+
+class LocalTable:
+    """boto3 の DynamoDB Table と同じ呼び出し方ができるローカルテーブル"""
+
+    def __init__(self, resource: 'LocalDynamoResource', name: str):
+        self.resource = resource
+        self.engine = resource.engine
+        self.name = name
+        self.table_name = name
+
+    # -- 単一項目 --
+    def get_item(self, Key: Dict, ProjectionExpression: Optional[str] = None,
+                 ExpressionAttributeNames: Optional[Dict] = None, ConsistentRead: bool = False) -> Dict:
+        hk, rk = self.engine.key_of(self.name, Key, 'GetItem')
+        with self.engine.lock:
+            item = self.engine.get(self.name, hk, rk)
+        if item is None:
+            return {}
+        context = _ExpressionContext({'ExpressionAttributeNames': ExpressionAttributeNames})
+        projection = context.projection(ProjectionExpression)
+        return {'Item': _project(item, projection) if projection else item}
+
+    def put_item(self, Item: Dict, **kwargs) -> Dict:
+        with self.engine.transaction():
+            return self._put(Item, kwargs)
+
+    def _put(self, item: Dict, kwargs: Dict) -> Dict:
+        key = self.engine.key_of(self.name, item, 'PutItem')
+        existing = self.engine.get(self.name, *key)
+        self._check_condition(kwargs, existing, 'PutItem')
+        self.engine.put(self.name, *key, copy.deepcopy(item))
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and existing is not None:
+            return {'Attributes': existing}
+        return {}
+
+    def update_item(self, Key: Dict, **kwargs) -> Dict:
+        with self.engine.transaction():
+            return self._update(Key, kwargs)
+
+    def _update(self, key: Dict, kwargs: Dict) -> Dict:
+        hk, rk = self.engine.key_of(self.name, key, 'UpdateItem')
+        existing = self.engine.get(self.name, hk, rk)
+        context = self._check_condition(kwargs, existing, 'UpdateItem')
+
+        item = copy.deepcopy(existing) if existing is not None else copy.deepcopy(key)
+        touched: List[str] = []
+        if kwargs.get('UpdateExpression'):
+            touched = _apply_update(item, context.update(kwargs['UpdateExpression']))
+        for key_name, key_value in key.items():
+            if item.get(key_name) != key_value:
+                raise _client_error('ValidationException', "Cannot update attribute that is part of the key", 'UpdateItem')
+        self.engine.put(self.name, hk, rk, item)
+
+        return_values = kwargs.get('ReturnValues', 'NONE')
+        if return_values == 'ALL_NEW':
+            return {'Attributes': item}
+        if return_values == 'ALL_OLD':
+            return {'Attributes': existing} if existing else {}
+        if return_values == 'UPDATED_NEW':
+            return {'Attributes': {name: item[name] for name in touched if name in item}}
+        if return_values == 'UPDATED_OLD':
+            return {'Attributes': {name: existing[name] for name in touched if existing and name in existing}}
+        return {}
+
+    def delete_item(self, Key: Dict, **kwargs) -> Dict:
+        with self.engine.transaction():
+            return self._delete(Key, kwargs)
+
+    def _delete(self, key: Dict, kwargs: Dict) -> Dict:
+        hk, rk = self.engine.key_of(self.name, key, 'DeleteItem')
+        existing = self.engine.get(self.name, hk, rk)
+        self._check_condition(kwargs, existing, 'DeleteItem')
+        self.engine.delete(self.name, hk, rk)
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and existing is not None:
+            return {'Attributes': existing}
+        return {}
+
+    def _check_condition(self, kwargs: Dict, existing: Optional[Dict], operation: str) -> _ExpressionContext:
+        context = _ExpressionContext(kwargs)
+        condition = context.condition(kwargs.get('ConditionExpression'))
+        if condition is not None and not _eval_condition(condition, existing or {}):
+            raise _client_error('ConditionalCheckFailedException', "The conditional request failed", operation)
+        return context
+
+    # -- 複数項目 --
+    def query(self, **kwargs) -> Dict:
+        context = _ExpressionContext(kwargs)
+        key_condition = context.condition(kwargs.get('KeyConditionExpression'), is_key_condition=True)
+        filter_condition = context.condition(kwargs.get('FilterExpression'))
+        projection = context.projection(kwargs.get('ProjectionExpression'))
+
+        schema = self.engine.schema(self.name)
+        index_name = kwargs.get('IndexName')
+        if index_name:
+            if index_name not in schema['indexes']:
+                raise _client_error('ValidationException', f"The table does not have the specified index: {index_name}", 'Query')
+            hash_attr, range_attr = schema['indexes'][index_name]
+        else:
+            hash_attr, range_attr = schema['hash'], schema['range']
+
+        hash_value = _find_key_equality(key_condition, hash_attr)
+        if hash_value is _MISSING:
+            raise _client_error('ValidationException', "Query condition missed key schema element", 'Query')
+
+        with self.engine.lock:
+            encoded = self.engine.encode_key_value(hash_value)
+            if index_name:
+                items = self.engine.index_partition(self.name, index_name, encoded)
+            else:
+                items = self.engine.partition(self.name, encoded)
+
+        items = [item for item in items if _eval_condition(key_condition, item)]
+        table_key_names = [schema['hash']] + ([schema['range']] if schema['range'] else [])
+
+        def sort_key(item):
+            parts = [_sort_value(item.get(range_attr))] if range_attr else []
+            # 同じソートキー値の順序を安定させるためテーブルのキーでも並べる
+            parts.extend(_sort_value(item.get(name)) for name in table_key_names)
+            return parts
+
+        items.sort(key=sort_key, reverse=not kwargs.get('ScanIndexForward', True))
+
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key:
+            start_table_key = {name: start_key.get(name) for name in table_key_names}
+            for position, item in enumerate(items):
+                if {name: item.get(name) for name in table_key_names} == start_table_key:
+                    items = items[position + 1:]
+                    break
+
+        key_names = table_key_names + [name for name in (hash_attr, range_attr) if name and name not in table_key_names]
+        return self._page(items, kwargs, filter_condition, projection, key_names)
+
+    def scan(self, **kwargs) -> Dict:
+        context = _ExpressionContext(kwargs)
+        filter_condition = context.condition(kwargs.get('FilterExpression'))
+        projection = context.projection(kwargs.get('ProjectionExpression'))
+        segment = kwargs.get('Segment')
+        total_segments = kwargs.get('TotalSegments')
+        limit = kwargs.get('Limit') or DEFAULT_PAGE_SIZE
+
+        after = None
+        if kwargs.get('ExclusiveStartKey'):
+            after = self.engine.key_of(self.name, kwargs['ExclusiveStartKey'], 'Scan')
+
+        items = []
+        with self.engine.lock:
+            for hk, rk, body in self.engine.scan_rows(self.name, after):
+                if total_segments and zlib.crc32(hk.encode('utf-8')) % total_segments != segment:
+                    continue
+                items.append(self.engine.decode_item(body))
+                # 次ページの有無を判定するため1件多く読む
+                if len(items) > limit:
+                    break
+
+        schema = self.engine.schema(self.name)
+        key_names = [schema['hash']] + ([schema['range']] if schema['range'] else [])
+        return self._page(items, kwargs, filter_condition, projection, key_names)
+
+    def _page(self, items: List[Dict], kwargs: Dict, filter_condition: Optional[Tuple],
+              projection: Optional[List[Tuple]], key_names: List[str]) -> Dict:
+        limit = kwargs.get('Limit') or DEFAULT_PAGE_SIZE
+        evaluated = items[:limit]
+        response: Dict[str, Any] = {}
+        if len(items) > limit and evaluated:
+            last = evaluated[-1]
+            response['LastEvaluatedKey'] = {name: last[name] for name in key_names if name in last}
+
+        matched = [item for item in evaluated if filter_condition is None or _eval_condition(filter_condition, item)]
+        response['Count'] = len(matched)
+        response['ScannedCount'] = len(evaluated)
+        if kwargs.get('Select') != 'COUNT':
+            response['Items'] = [_project(item, projection) if projection else item for item in matched]
+        return response
+
+    def batch_writer(self, overwrite_by_pkeys: Optional[List[str]] = None) -> '_LocalBatchWriter':
+        return _LocalBatchWriter(self)
+
+
+class _LocalBatchWriter:
+    """Table.batch_writer() 相当（ローカルでは即時書き込み）"""
+
+    def __init__(self, table: LocalTable):
+        self.table = table
+
+    def put_item(self, Item: Dict):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key: Dict):
+        self.table.delete_item(Key=Key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class LocalDynamoClient:
+    """resource.meta.client 相当（低レベル形式の型付き値を受け取る）"""
+
+    def __init__(self, resource: 'LocalDynamoResource'):
+        self.resource = resource
+        self._deserializer = TypeDeserializer()
+        self._serializer = TypeSerializer()
+
+    def _plain(self, values: Optional[Dict]) -> Dict:
+        return {k: self._deserializer.deserialize(v) for k, v in (values or {}).items()}
+
+    def _typed(self, values: Dict) -> Dict:
+        return {k: self._serializer.serialize(v) for k, v in values.items()}
+
+    def transact_write_items(self, TransactItems: List[Dict], **kwargs) -> Dict:
+        engine = self.resource.engine
+        if len(TransactItems) > 100:
+            raise _client_error('ValidationException', "Member must have length less than or equal to 100", 'TransactWriteItems')
+        with engine.transaction():
+            reasons = []
+            operations: List[Callable[[], Any]] = []
+            for entry in TransactItems:
+                (kind, request), = entry.items()
+                table = self.resource.Table(request['TableName'])
+                params = {k: v for k, v in request.items() if k not in ('TableName', 'Key', 'Item')}
+                params['ExpressionAttributeValues'] = self._plain(request.get('ExpressionAttributeValues'))
+                key = self._plain(request.get('Key'))
+                item = self._plain(request.get('Item'))
+                operations.append((kind, table, key, item, params))
+
+            # 全件の条件を先に判定し、1件でも失敗したら何も書き込まない
+            for kind, table, key, item, params in operations:
+                existing = engine.get(table.name, *engine.key_of(table.name, key or item, 'TransactWriteItems'))
+                try:
+                    table._check_condition(params, existing, 'TransactWriteItems')
+                    reasons.append({'Code': 'None'})
+                except ClientError:
+                    reasons.append({'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'})
+
+            if any(reason['Code'] != 'None' for reason in reasons):
+                error = _client_error(
+                    'TransactionCanceledException',
+                    "Transaction cancelled, please refer cancellation reasons for specific reasons",
+                    'TransactWriteItems'
+                )
+                error.response['CancellationReasons'] = reasons
+                raise error
+
+            for kind, table, key, item, params in operations:
+                params = {k: v for k, v in params.items() if k != 'ConditionExpression'}
+                if kind == 'Put':
+                    table._put(item, params)
+                elif kind == 'Update':
+                    table._update(key, params)
+                elif kind == 'Delete':
+                    table._delete(key, params)
+        return {}
+
+    def batch_write_item(self, RequestItems: Dict, **kwargs) -> Dict:
+        converted = {
+            table_name: [
+                {kind: {field: self._plain(value) for field, value in request.items()}}
+                for entry in requests for kind, request in entry.items()
+            ]
+            for table_name, requests in RequestItems.items()
+        }
+        return self.resource.batch_write_item(RequestItems=converted)
+
+    def batch_get_item(self, RequestItems: Dict, **kwargs) -> Dict:
+        converted = {
+            table_name: {**request, 'Keys': [self._plain(key) for key in request['Keys']]}
+            for table_name, request in RequestItems.items()
+        }
+        response = self.resource.batch_get_item(RequestItems=converted)
+        return {
+            'Responses': {
+                table_name: [self._typed(item) for item in items]
+                for table_name, items in response['Responses'].items()
+            },
+            'UnprocessedKeys': {}
+        }
+
+
+class LocalDynamoResource:
+    """boto3.resource('dynamodb') 相当のローカル実装"""
+
+    def __init__(self, path: str = ':memory:'):
+        self.engine = LocalStorageEngine(path)
+        self._tables: Dict[str, LocalTable] = {}
+        self.meta = SimpleNamespace(client=LocalDynamoClient(self))
+
+    def Table(self, name: str) -> LocalTable:
+        if name not in self._tables:
+            self._tables[name] = LocalTable(self, name)
+        return self._tables[name]
+
+    def batch_get_item(self, RequestItems: Dict, **kwargs) -> Dict:
+        responses: Dict[str, List[Dict]] = {}
+        for table_name, request in RequestItems.items():
+            table = self.Table(table_name)
+            items = responses.setdefault(table_name, [])
+            for key in request['Keys']:
+                response = table.get_item(
+                    Key=key,
+                    ProjectionExpression=request.get('ProjectionExpression'),
+                    ExpressionAttributeNames=request.get('ExpressionAttributeNames')
+                )
+                if 'Item' in response:
+                    items.append(response['Item'])
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems: Dict, **kwargs) -> Dict:
+        for table_name, requests in RequestItems.items():
+            table = self.Table(table_name)
+            for entry in requests:
+                if 'PutRequest' in entry:
+                    table.put_item(Item=entry['PutRequest']['Item'])
+                elif 'DeleteRequest' in entry:
+                    table.delete_item(Key=entry['DeleteRequest']['Key'])
+        return {'UnprocessedItems': {}}
@@ -0,0 +1,115 @@
+"""
+ログ出力の設定
+
+- ルートロガーには QueueHandler だけを付け、実際の書き込みは QueueListener のスレッドで行う
+  （イベントループ上では標準出力への書き込みでブロックしない）
+- 各モジュールは logger = logging.getLogger(__name__) を使い、引数は %s で渡す
+  （レベルが無効なログは文字列を組み立てない）
+- 高頻度のログはモジュールごとにサンプリングできる
+
+環境変数:
+    LOG_LEVEL: ルートのレベル（デフォルト INFO）
+    LOG_LEVELS: モジュールごとのレベル（例: "utils.aws_database=DEBUG,cogs.points_consumption=WARNING"）
+    LOG_SAMPLE_RATES: モジュールごとのサンプリング間隔（例: "utils.point_manager=100"）
+                      指定したモジュールの INFO 以下のログは、同じメッセージにつき N 件に1件だけ出力する
+    LOG_FORMAT: ログの書式
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from typing import Dict, Optional
+
+DEFAULT_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _parse_mapping(value: str) -> Dict[str, str]:
+    """'a=1,b=2' 形式の環境変数を dict にする"""
+    mapping = {}
+    for entry in (value or '').split(','):
+        if '=' in entry:
+            name, setting = entry.split('=', 1)
+            mapping[name.strip()] = setting.strip()
+    return mapping
+
+
+class SamplingFilter(logging.Filter):
+    """
+    指定したロガー（およびその子ロガー）の INFO 以下のログを N 件に1件だけ通す
+
+    同じ書式文字列（record.msg）ごとに数えるので、引数が違っても同じ種類のログとして扱う。
+    WARNING 以上は常に通す。
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = {name: rate for name, rate in rates.items() if rate > 1}
+        self._counts: Dict[tuple, int] = {}
+
+    def _rate_for(self, logger_name: str) -> int:
+        name = logger_name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate_for(record.name)
+        if rate <= 1:
+            return True
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        return count % rate == 0
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    module_levels: Optional[Dict[str, str]] = None,
+    sample_rates: Optional[Dict[str, int]] = None
+) -> logging.handlers.QueueListener:
+    """
+    キュー経由のログ出力を設定する（2回目以降の呼び出しは何もしない）
+
+    Returns:
+        QueueListener: 停止は atexit で行われる
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    if module_levels is None:
+        module_levels = _parse_mapping(os.getenv('LOG_LEVELS', ''))
+    if sample_rates is None:
+        sample_rates = {
+            name: int(rate) for name, rate in _parse_mapping(os.getenv('LOG_SAMPLE_RATES', '')).items()
+            if rate.isdigit()
+        }
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(os.getenv('LOG_FORMAT', DEFAULT_FORMAT)))
+
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,236 @@
+"""
+ギルドメッセージの一括ディスパッチ
+
+各コグがそれぞれ on_message を持つ代わりに、1つのリスナーでメッセージを1回だけ処理し、
+関心のあるハンドラにだけ渡す。
+
+- ハンドラはコグの読み込み時に register し、機能ビットと（必要なら）トリガーワードを登録する
+- 全ハンドラのトリガーワードを1つの正規表現にまとめ、本文を1回走査して該当するビットを求める
+  （トリガーワードを持たないハンドラはすべてのメッセージが対象）
+- サーバーごとに「有効な機能のビットマップ」をキャッシュし、候補のビットと重ならなければ
+  I/O なしで終わる。ビットマップは TTL 経過時と、設定/自動化ルールの保存時に作り直す
+- DM とボットのメッセージは処理しない
+
+環境変数:
+    MESSAGE_DISPATCH_TTL: 機能ビットマップのキャッシュ秒数（デフォルト 60）
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+import os
+import discord
+from utils.metrics import instrument
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MessageHandler:
+    """
+    1機能ぶんのハンドラ
+
+    - bit: 機能ビット（ハンドラごとに1ビット、register で割り当てる）
+    - triggers: トリガーワード（None ならすべてのメッセージが対象）
+    - is_enabled: サーバーでこの機能が有効か（ビットマップの作成時だけ呼ばれる）
+    - handle: メッセージの処理
+    """
+    name: str
+    bit: int
+    handle: Callable[[discord.Message], Awaitable[None]]
+    is_enabled: Callable[[str], Awaitable[bool]]
+    triggers: Optional[Tuple[str, ...]] = None
+
+
+class MessageDispatcher:
+    """
+    メッセージをサーバーで有効な機能のハンドラにだけ振り分ける
+
+    呼び出し元
+    main.py
+        GachaBot.__init__（bot.message_dispatcher、on_message リスナーとして登録）
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('MESSAGE_DISPATCH_TTL', '60'))
+        self.handlers: Dict[str, MessageHandler] = {}
+        # server_id -> (作成時刻, 有効な機能のビットマップ)
+        self._bitmaps: Dict[str, Tuple[float, int]] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._trigger_pattern: Optional[Pattern] = None
+        self._trigger_bits: Dict[str, int] = {}
+        self._trigger_mask = 0
+        self._always_mask = 0
+        self.messages = 0
+        self.skipped = 0
+        self.dispatched = 0
+        self.bitmap_loads = 0
+
+    def register(
+        self,
+        name: str,
+        handle: Callable[[discord.Message], Awaitable[None]],
+        is_enabled: Callable[[str], Awaitable[bool]],
+        triggers: Optional[Sequence[str]] = None
+    ) -> MessageHandler:
+        """
+        ハンドラを登録する（同じ名前のハンドラは置き換える）
+
+        呼び出し元
+        cogs\\fortunes.py
+            Fortunes.cog_load
+        cogs\\automation.py
+            Automation.cog_load
+        """
+        existing = self.handlers.get(name)
+        if existing is not None:
+            bit = existing.bit
+        else:
+            used = 0
+            for handler in self.handlers.values():
+                used |= handler.bit
+            bit = 1
+            while used & bit:
+                bit <<= 1
+
+        handler = MessageHandler(
+            name=name,
+            bit=bit,
+            handle=handle,
+            is_enabled=is_enabled,
+            triggers=tuple(triggers) if triggers is not None else None
+        )
+        self.handlers[name] = handler
+        self._rebuild()
+        return handler
+
+    def unregister(self, name: str):
+        """
+        ハンドラの登録を外す
+
+        呼び出し元
+        cogs\\fortunes.py
+            Fortunes.cog_unload
+        cogs\\automation.py
+            Automation.cog_unload
+        """
+        if self.handlers.pop(name, None) is not None:
+            self._rebuild()
+
+    def _rebuild(self):
+        """トリガーワードの正規表現を作り直し、ビットマップのキャッシュを破棄する"""
+        self._trigger_bits = {}
+        self._always_mask = 0
+        for handler in self.handlers.values():
+            if handler.triggers is None:
+                self._always_mask |= handler.bit
+                continue
+            for word in handler.triggers:
+                if word:
+                    self._trigger_bits[word] = self._trigger_bits.get(word, 0) | handler.bit
+
+        self._trigger_mask = 0
+        for bits in self._trigger_bits.values():
+            self._trigger_mask |= bits
+        if self._trigger_bits:
+            # 長い語を先に並べ、同じ位置から始まる語は長い方に一致させる
+            words = sorted(self._trigger_bits, key=len, reverse=True)
+            self._trigger_pattern = re.compile("|".join(re.escape(word) for word in words))
+        else:
+            self._trigger_pattern = None
+        self.invalidate()
+
+    def match(self, content: str) -> int:
+        """本文に含まれるトリガーワードのビット（正規表現で1回だけ走査する）"""
+        if self._trigger_pattern is None or not content:
+            return 0
+        mask = 0
+        for found in self._trigger_pattern.finditer(content):
+            mask |= self._trigger_bits[found.group()]
+            if mask == self._trigger_mask:
+                break
+        return mask
+
+    def invalidate(self, server_id: Optional[str] = None):
+        """
+        機能ビットマップのキャッシュを破棄（server_id省略時は全件）
+
+        呼び出し元
+        utils\\settings_manager.py
+            ServerSettingsManager（設定の保存時、add_settings_listener で登録）
+        utils\\aws_database.py
+            AWSDatabase.save_automation_rule（add_automation_rule_listener で登録）
+        """
+        if server_id is None:
+            self._bitmaps.clear()
+        else:
+            self._bitmaps.pop(str(server_id), None)
+
+    def _fresh(self, server_id: str) -> Optional[int]:
+        entry = self._bitmaps.get(server_id)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        return None
+
+    async def enabled_bitmap(self, server_id: str) -> int:
+        """サーバーで有効な機能のビットマップ（キャッシュになければ各ハンドラに問い合わせる）"""
+        server_id = str(server_id)
+        bitmap = self._fresh(server_id)
+        if bitmap is not None:
+            return bitmap
+
+        lock = self._load_locks.setdefault(server_id, asyncio.Lock())
+        async with lock:
+            bitmap = self._fresh(server_id)
+            if bitmap is not None:
+                return bitmap
+            bitmap = 0
+            for handler in list(self.handlers.values()):
+                try:
+                    if await handler.is_enabled(server_id):
+                        bitmap |= handler.bit
+                except Exception as e:
+                    logger.error("Error resolving %s for server %s: %s", handler.name, server_id, e, exc_info=True)
+            self._bitmaps[server_id] = (time.monotonic(), bitmap)
+            self.bitmap_loads += 1
+            # ロックを持ったまま外す（外した後に来た呼び出しは作成済みのビットマップを使う）
+            self._load_locks.pop(server_id, None)
+        return bitmap
+
+    @instrument('listener', 'message_dispatcher.on_message')
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or message.guild is None:
+            return
+        self.messages += 1
+
+        # 本文の走査だけで候補を絞る（候補がなければ I/O なしで終了）
+        candidates = self._always_mask | self.match(message.content)
+        if not candidates:
+            self.skipped += 1
+            return
+
+        targets = candidates & await self.enabled_bitmap(str(message.guild.id))
+        if not targets:
+            self.skipped += 1
+            return
+
+        handlers: List[MessageHandler] = [handler for handler in self.handlers.values() if handler.bit & targets]
+        self.dispatched += len(handlers)
+        results = await asyncio.gather(
+            *[handler.handle(message) for handler in handlers], return_exceptions=True
+        )
+        for handler, result in zip(handlers, results):
+            if isinstance(result, Exception):
+                logger.error("Error in %s message handler: %s", handler.name, result, exc_info=result)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'handlers': len(self.handlers),
+            'servers': len(self._bitmaps),
+            'messages': self.messages,
+            'skipped': self.skipped,
+            'dispatched': self.dispatched,
+            'bitmap_loads': self.bitmap_loads
+        }
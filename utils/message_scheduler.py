@@ -0,0 +1,444 @@
+"""
+チャンネルへの送信キュー（レート制限を考慮した送信スケジューラー）
+
+各 Cog/マネージャーが channel.send を直接呼ぶ代わりに、このスケジューラーに送信を預ける。
+
+- チャンネルごとにトークンバケット（デフォルト 5通/5秒）で送信間隔を空ける
+- 送信の種類（ルート）ごとにボット全体のトークンバケットを持ち、
+  バックグラウンドの通知はバケットの一部を残して送る（ユーザー操作への応答を優先する）
+- チャンネル内では優先度の高いレーン（INTERACTIVE > NORMAL > BACKGROUND）から送る
+- 同じチャンネル・同じ優先度で溜まったテキスト/Embed のメッセージは1通にまとめる
+- 送信は専用のタスクで行うので、呼び出し元（インタラクションの処理など）は
+  ライブラリのレート制限待ちで止まらない
+- 429 を受けたらチャンネルのバケットを止めて再送する。長いレート制限を discord.RateLimited として
+  受け取るには、ボットに max_ratelimit_timeout を設定しておく（main.py を参照）
+- キューの長さ・待ち時間・処理結果を utils.metrics に記録する
+
+環境変数:
+    MESSAGE_SCHEDULER_CHANNEL_RATE: チャンネルごとの送信レート（通/秒、デフォルト 1.0）
+    MESSAGE_SCHEDULER_CHANNEL_BURST: チャンネルごとの連続送信数（デフォルト 5）
+    MESSAGE_SCHEDULER_ROUTE_RATE: ルートごとの送信レート（通/秒、デフォルト 40）
+    MESSAGE_SCHEDULER_MAX_QUEUE: チャンネルごとのキューの上限（デフォルト 200）
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional
+import os
+import discord
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Discord のメッセージの上限
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_DESCRIPTION = 4096
+# 1通に含める Embed の合計文字数（タイトル・説明・フィールド・フッターなど）
+MAX_EMBEDS_LENGTH = 6000
+
+# レート制限を受けたメッセージを再送する回数
+MAX_ATTEMPTS = 3
+
+# バックグラウンドの送信が残しておくルートのトークンの割合
+BACKGROUND_RESERVE = 0.2
+
+
+def embeds_length(embeds: List[discord.Embed]) -> int:
+    """Embed の合計文字数（Discord が 6000 文字の上限と比べる値）"""
+    return sum(len(embed) for embed in embeds)
+
+
+def pack_line_embeds(
+    lines: List[str],
+    title: str,
+    color: discord.Color,
+    footer: Optional[str] = None
+) -> List[List[discord.Embed]]:
+    """
+    行を Embed の説明に詰め、1通ぶん（Embed 10件・合計6000文字以内）ずつに分ける
+
+    説明は 4096 文字以内で、フッターは最後の Embed にだけ付ける（どの1通に付いても収まるよう文字数を空けておく）
+
+    呼び出し元
+    utils\\point_manager.py
+        PointManager._notify_point_gain_bulk
+    utils\\notification_digest.py
+        NotificationDigest._flush
+    """
+    budget = MAX_EMBEDS_LENGTH - len(footer or '')
+    line_limit = min(MAX_EMBED_DESCRIPTION, budget - len(title))
+    # 1通 -> Embed -> 行
+    groups: List[List[List[str]]] = [[]]
+    used = 0
+    description = 0
+    for line in lines:
+        line = line[:line_limit]
+        message = groups[-1]
+        added = len(line) + 1
+        if message and description + added <= MAX_EMBED_DESCRIPTION and used + added <= budget:
+            message[-1].append(line)
+            description += added
+            used += added
+            continue
+
+        # 新しい Embed（入りきらなければ次の1通）
+        if len(message) >= MAX_EMBEDS or used + len(title) + len(line) > budget:
+            message = []
+            groups.append(message)
+            used = 0
+        message.append([line])
+        description = len(line)
+        used += len(title) + len(line)
+
+    messages = [
+        [discord.Embed(title=title, description="\n".join(embed_lines), color=color) for embed_lines in message]
+        for message in groups if message
+    ]
+    if messages and footer:
+        messages[-1][-1].set_footer(text=footer)
+    return messages
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # ユーザー操作への応答（承認結果など）
+    NORMAL = 1  # ゲームの進行など
+    BACKGROUND = 2  # 履歴・通知
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
+class TokenBucket:
+    """
+    トークンバケット
+
+    Args:
+        rate: 1秒あたりに補充するトークン数
+        capacity: バケットの容量（連続で使えるトークン数）
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, reserve: float = 0.0) -> float:
+        """トークンを1つ使えるまでの秒数（reserve 個は残す）"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        needed = 1.0 + reserve - self.tokens
+        return needed / self.rate if needed > 0 else 0.0
+
+    def consume(self):
+        self.tokens -= 1.0
+
+    def block(self, seconds: float):
+        """レート制限を受けたときに seconds 秒止める"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    @property
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity and time.monotonic() >= self.blocked_until
+
+
+@dataclass
+class OutboundMessage:
+    channel: Any
+    content: Optional[str]
+    embeds: List[discord.Embed]
+    kwargs: Dict[str, Any]
+    priority: Priority
+    route: str
+    coalesce: bool
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+    @property
+    def mergeable(self) -> bool:
+        return self.coalesce and not self.kwargs
+
+
+class ChannelQueue:
+    """1チャンネルぶんの優先度別キューとトークンバケット"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.lanes: List[Deque[OutboundMessage]] = [deque() for _ in Priority]
+        self.bucket = bucket
+        self.worker: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self.lanes)
+
+    def pop(self) -> Optional[OutboundMessage]:
+        for lane in self.lanes:
+            if lane:
+                return lane.popleft()
+        return None
+
+
+class MessageScheduler:
+    """
+    送信スケジューラー
+
+    呼び出し元
+    main.py
+        GachaBot.__init__（bot.message_scheduler）
+    """
+
+    def __init__(
+        self,
+        channel_rate: float = 1.0,
+        channel_burst: int = 5,
+        route_rate: float = 40.0,
+        max_queue: int = 200
+    ):
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.route_rate = route_rate
+        self.max_queue = max_queue
+        self.queues: Dict[int, ChannelQueue] = {}
+        self.routes: Dict[str, TokenBucket] = {}
+        self.closed = False
+
+        # 統計
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+    @classmethod
+    def from_env(cls) -> 'MessageScheduler':
+        return cls(
+            channel_rate=float(os.getenv('MESSAGE_SCHEDULER_CHANNEL_RATE', '1.0')),
+            channel_burst=int(os.getenv('MESSAGE_SCHEDULER_CHANNEL_BURST', '5')),
+            route_rate=float(os.getenv('MESSAGE_SCHEDULER_ROUTE_RATE', '40')),
+            max_queue=int(os.getenv('MESSAGE_SCHEDULER_MAX_QUEUE', '200'))
+        )
+
+    def send(
+        self,
+        channel,
+        content: Optional[str] = None,
+        *,
+        embed: Optional[discord.Embed] = None,
+        embeds: Optional[List[discord.Embed]] = None,
+        priority: Priority = Priority.BACKGROUND,
+        route: str = 'channel_message',
+        coalesce: bool = True,
+        **kwargs
+    ) -> asyncio.Future:
+        """
+        メッセージを送信キューに入れる
+
+        待たずに呼び捨ててよい。送信結果が必要な場合は戻り値を await すると
+        discord.Message（まとめて送った場合は同じメッセージ、失敗した場合は None）が返る。
+        view / file などを指定したメッセージはまとめない。
+
+        呼び出し元
+        utils\\point_manager.py
+            PointManager._notify_point_gain など
+        utils\\automation_manager.py
+            AutomationManager.send_notification
+        cogs\\points_consumption.py
+            PointsConsumption.log_consumption
+        cogs\\battle.py
+            BattleRoyale.start_countdown など
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        message = OutboundMessage(
+            channel=channel,
+            content=content,
+            embeds=list(embeds or ([embed] if embed else [])),
+            kwargs=kwargs,
+            priority=Priority(priority),
+            route=route,
+            coalesce=coalesce,
+            future=future
+        )
+        if self.closed:
+            self._finish([message], None, 'dropped')
+            return future
+
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            queue = self.queues[channel.id] = ChannelQueue(TokenBucket(self.channel_rate, self.channel_burst))
+
+        if len(queue) >= self.max_queue and not self._make_room(queue, message.priority):
+            self._finish([message], None, 'dropped')
+            return future
+
+        queue.lanes[message.priority].append(message)
+        metrics.OUTBOUND_QUEUE_DEPTH.inc(message.priority.label)
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._run(channel.id, queue))
+        return future
+
+    def _make_room(self, queue: ChannelQueue, priority: Priority) -> bool:
+        """キューが満杯のとき、新しいメッセージより優先度の低い最古のメッセージを捨てる"""
+        for lane_priority in reversed(Priority):
+            if lane_priority < priority:
+                break
+            lane = queue.lanes[lane_priority]
+            if lane and lane_priority > priority:
+                dropped = lane.popleft()
+                metrics.OUTBOUND_QUEUE_DEPTH.dec(dropped.priority.label)
+                self._finish([dropped], None, 'dropped')
+                return True
+        return False
+
+    def _take_batch(self, queue: ChannelQueue, first: OutboundMessage) -> List[OutboundMessage]:
+        """first と同じレーンの後続メッセージのうち、1通にまとめられるものを取り出す"""
+        batch = [first]
+        if not first.mergeable:
+            return batch
+        lane = queue.lanes[first.priority]
+        length = len(first.content or '')
+        embed_count = len(first.embeds)
+        embed_chars = embeds_length(first.embeds)
+        while lane and lane[0].mergeable and lane[0].route == first.route:
+            candidate = lane[0]
+            added = len(candidate.content or '') + (1 if candidate.content and length else 0)
+            added_chars = embeds_length(candidate.embeds)
+            if (length + added > MAX_CONTENT_LENGTH
+                    or embed_count + len(candidate.embeds) > MAX_EMBEDS
+                    or embed_chars + added_chars > MAX_EMBEDS_LENGTH):
+                break
+            batch.append(lane.popleft())
+            length += added
+            embed_count += len(candidate.embeds)
+            embed_chars += added_chars
+        return batch
+
+    async def _wait_for_tokens(self, queue: ChannelQueue, message: OutboundMessage):
+        route_bucket = self.routes.get(message.route)
+        if route_bucket is None:
+            route_bucket = self.routes[message.route] = TokenBucket(self.route_rate, self.route_rate)
+        reserve = route_bucket.capacity * BACKGROUND_RESERVE if message.priority == Priority.BACKGROUND else 0.0
+        while True:
+            delay = max(queue.bucket.delay(), route_bucket.delay(reserve))
+            if delay <= 0:
+                queue.bucket.consume()
+                route_bucket.consume()
+                return
+            await asyncio.sleep(delay)
+
+    async def _run(self, channel_id: int, queue: ChannelQueue):
+        """1チャンネルの送信ループ（キューが空になったら終了する）"""
+        try:
+            while True:
+                first = queue.pop()
+                if first is None:
+                    break
+                batch = self._take_batch(queue, first)
+                for message in batch:
+                    metrics.OUTBOUND_QUEUE_DEPTH.dec(message.priority.label)
+
+                await self._wait_for_tokens(queue, first)
+                await self._deliver(queue, batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error in message scheduler for channel %s: %s", channel_id, e, exc_info=True)
+        finally:
+            queue.worker = None
+            if len(queue):
+                if not self.closed:
+                    queue.worker = asyncio.create_task(self._run(channel_id, queue))
+            elif queue.bucket.full:
+                self.queues.pop(channel_id, None)
+
+    async def _deliver(self, queue: ChannelQueue, batch: List[OutboundMessage]):
+        first = batch[0]
+        contents = [message.content for message in batch if message.content]
+        embeds = [embed for message in batch for embed in message.embeds]
+        kwargs = dict(first.kwargs)
+        if embeds:
+            kwargs['embeds'] = embeds
+        try:
+            sent = await first.channel.send("\n".join(contents) if contents else None, **kwargs)
+            self._finish(batch, sent, 'sent')
+        except (discord.RateLimited, discord.HTTPException) as e:
+            if isinstance(e, discord.RateLimited) or e.status == 429:
+                retry_after = getattr(e, 'retry_after', None) or 1.0
+                self.rate_limited += 1
+                queue.bucket.block(retry_after)
+                logger.warning("Rate limited on channel %s; retrying in %.1fs", first.channel.id, retry_after)
+                retry = [message for message in batch if message.attempts + 1 < MAX_ATTEMPTS]
+                for message in reversed(retry):
+                    message.attempts += 1
+                    queue.lanes[message.priority].appendleft(message)
+                    metrics.OUTBOUND_QUEUE_DEPTH.inc(message.priority.label)
+                self._finish([message for message in batch if message not in retry], None, 'failed')
+            else:
+                logger.error("Failed to send message to channel %s: %s", first.channel.id, e)
+                self._finish(batch, None, 'failed')
+        except Exception as e:
+            logger.error("Failed to send message to channel %s: %s", first.channel.id, e)
+            self._finish(batch, None, 'failed')
+
+    def _finish(self, batch: List[OutboundMessage], result, status: str):
+        now = time.monotonic()
+        for index, message in enumerate(batch):
+            label = message.priority.label
+            if status == 'sent':
+                metrics.OUTBOUND_WAIT_SECONDS.observe(now - message.enqueued_at, label)
+                if index:
+                    self.coalesced += 1
+                    metrics.OUTBOUND_MESSAGES.inc(label, 'coalesced')
+                else:
+                    self.sent += 1
+                    metrics.OUTBOUND_MESSAGES.inc(label, status)
+            else:
+                if status == 'dropped':
+                    self.dropped += 1
+                else:
+                    self.failed += 1
+                metrics.OUTBOUND_MESSAGES.inc(label, status)
+            if not message.future.done():
+                message.future.set_result(result)
+
+    async def close(self, timeout: float = 5.0):
+        """溜まっている送信を timeout 秒まで待ち、残りは破棄する"""
+        self.closed = True
+        workers = [queue.worker for queue in self.queues.values() if queue.worker]
+        if workers:
+            _, pending = await asyncio.wait(workers, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        for queue in self.queues.values():
+            for lane in queue.lanes:
+                while lane:
+                    message = lane.popleft()
+                    metrics.OUTBOUND_QUEUE_DEPTH.dec(message.priority.label)
+                    self._finish([message], None, 'dropped')
+        self.queues.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'channels': len(self.queues),
+            'queued': sum(len(queue) for queue in self.queues.values()),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'rate_limited': self.rate_limited
+        }
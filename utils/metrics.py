@@ -0,0 +1,460 @@
+"""
+メトリクス（カウンター/ヒストグラム）の収集と公開
+
+- 計測はプロセス内のレジストリに集計するだけで、外部への送信は行わない
+  （1回の記録は perf_counter 2回と bisect 1回、dict の更新程度なので本番でも常時有効にできる）
+- スラッシュコマンドは MetricsCommandTree、ボタン/リスナーは @instrument で計測する
+- ハンドラ実行中の DynamoDB 呼び出し回数は contextvars で数える
+- Discord への送信は HTTP リクエスト単位（ルートのテンプレートごと）で計測する
+- /metrics で Prometheus のテキスト形式を返す HTTP サーバーを起動できる
+
+環境変数:
+    METRICS_HOST: 公開するアドレス（デフォルト 127.0.0.1）
+    METRICS_PORT: 公開するポート（デフォルト 9108、0 で無効）
+"""
+import logging
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import discord
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+# 秒単位のデフォルトバケット
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """ラベルごとの累積カウンター"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Gauge:
+    """ラベルごとの現在値（キューの長さなど）"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    ラベルごとの固定バケットヒストグラム
+
+    バケットごとの件数（累積ではない）と合計・件数を保持し、出力時に累積する
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [バケットごとの件数..., +Inf の件数], 合計, 件数
+        self.values: Dict[Tuple, List] = {}
+
+    def observe(self, value: float, *labels):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def quantile(self, q: float, *labels) -> float:
+        """バケットから分位点を見積もる（該当バケットの上限。+Inf の場合は最大バケット）"""
+        entry = self.values.get(labels)
+        if not entry or not entry[2]:
+            return 0.0
+        rank = q * entry[2]
+        seen = 0
+        for index, count in enumerate(entry[0]):
+            seen += count
+            if seen >= rank:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録と Prometheus テキスト形式での出力"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.metrics.setdefault(name, Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+HANDLER_SECONDS = registry.histogram(
+    'discord_handler_seconds', 'コマンド/ボタン/リスナーの処理時間', ('kind', 'name'))
+HANDLER_TOTAL = registry.counter(
+    'discord_handler_total', 'コマンド/ボタン/リスナーの実行回数', ('kind', 'name', 'status'))
+HANDLER_DB_CALLS = registry.histogram(
+    'discord_handler_db_calls', '1回の処理あたりの DynamoDB 呼び出し回数', ('kind', 'name'),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34))
+DB_CALL_SECONDS = registry.histogram(
+    'dynamodb_call_seconds', 'DynamoDB 呼び出しの所要時間（待機時間を除く）', ('operation', 'table'))
+DB_CALL_ERRORS = registry.counter(
+    'dynamodb_call_errors_total', 'DynamoDB 呼び出しのエラー回数', ('operation', 'table', 'error'))
+DB_QUEUE_SECONDS = registry.histogram(
+    'dynamodb_queue_wait_seconds', 'DynamoDB 呼び出しの同時実行枠の待機時間',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+WEB3_CALL_SECONDS = registry.histogram(
+    'web3_call_seconds', 'web3 呼び出しの所要時間', ('operation',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+WEB3_CALL_ERRORS = registry.counter(
+    'web3_call_errors_total', 'web3 呼び出しのエラー回数', ('operation', 'error'))
+DISCORD_HTTP_SECONDS = registry.histogram(
+    'discord_http_seconds', 'Discord API リクエストの所要時間（レート制限の待機を含む）', ('method', 'route'))
+DISCORD_HTTP_ERRORS = registry.counter(
+    'discord_http_errors_total', 'Discord API リクエストのエラー回数', ('method', 'route', 'status'))
+OUTBOUND_QUEUE_DEPTH = registry.gauge(
+    'discord_outbound_queue_depth', '送信待ちのメッセージ数', ('priority',))
+OUTBOUND_MESSAGES = registry.counter(
+    'discord_outbound_messages_total', '送信キューに入れたメッセージの処理結果', ('priority', 'status'))
+OUTBOUND_WAIT_SECONDS = registry.histogram(
+    'discord_outbound_wait_seconds', 'キューに入れてから送信するまでの時間', ('priority',),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+# 実行中のハンドラの DynamoDB 呼び出し回数（ハンドラ外では None）
+_db_call_count: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    'metrics_db_call_count', default=None
+)
+
+
+def _error_name(error: BaseException) -> str:
+    if isinstance(error, discord.HTTPException):
+        return str(error.status)
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        code = response.get('Error', {}).get('Code')
+        if code:
+            return code
+    return type(error).__name__
+
+
+# ハンドラの計測
+
+
+class HandlerTimer:
+    """1回のハンドラ実行の計測（開始時に DynamoDB 呼び出し回数のカウンターを用意する）"""
+
+    __slots__ = ('kind', 'name', 'started', 'db_calls', 'token')
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.db_calls = [0]
+        self.token = _db_call_count.set(self.db_calls)
+        self.started = time.perf_counter()
+
+    def finish(self, status: str = 'ok'):
+        HANDLER_SECONDS.observe(time.perf_counter() - self.started, self.kind, self.name)
+        HANDLER_TOTAL.inc(self.kind, self.name, status)
+        HANDLER_DB_CALLS.observe(self.db_calls[0], self.kind, self.name)
+        try:
+            _db_call_count.reset(self.token)
+        except ValueError:
+            # 別のコンテキストで終了した場合（完了イベントのタスクなど）は戻す必要がない
+            return
+        # 入れ子のハンドラ（リスナーから呼ばれるボタン処理など）の呼び出し回数は外側にも加える
+        parent = _db_call_count.get()
+        if parent is not None:
+            parent[0] += self.db_calls[0]
+
+
+def instrument(kind: str, name: Optional[str] = None):
+    """
+    非同期ハンドラ（ボタンのコールバック/リスナーなど）を計測するデコレーター
+
+    @discord.ui.button や @commands.Cog.listener() の内側（関数の直上）に付ける
+    """
+    def decorator(func):
+        handler_name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            timer = HandlerTimer(kind, handler_name)
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                timer.finish('error')
+                raise
+            timer.finish()
+            return result
+
+        return wrapper
+    return decorator
+
+
+class MetricsCommandTree(app_commands.CommandTree):
+    """
+    スラッシュコマンドの処理時間を記録する CommandTree
+
+    interaction_check で計測を開始し、完了イベント（app_command_completion）か on_error で終了する
+    """
+
+    def __init__(self, client, *args, **kwargs):
+        super().__init__(client, *args, **kwargs)
+        if hasattr(client, 'add_listener'):
+            client.add_listener(self._on_command_completion, 'on_app_command_completion')
+
+    @staticmethod
+    def _finish(interaction: discord.Interaction, status: str):
+        timer = interaction.extras.pop('metrics_timer', None)
+        if timer is not None:
+            timer.finish(status)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is discord.InteractionType.autocomplete:
+            return True
+        command = interaction.command
+        name = command.qualified_name if command else (interaction.data or {}).get('name', 'unknown')
+        interaction.extras['metrics_timer'] = HandlerTimer('command', name)
+        return True
+
+    async def _on_command_completion(self, interaction: discord.Interaction, command):
+        self._finish(interaction, 'ok')
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self._finish(interaction, 'error')
+        await super().on_error(interaction, error)
+
+
+# DynamoDB / web3 / Discord HTTP の計測
+
+
+def record_db_call(fn: Callable, elapsed: float, wait: float, error: Optional[BaseException] = None):
+    """DynamoDB 呼び出し1回分を記録する（DynamoCallExecutor.run から呼ばれる）"""
+    operation = getattr(fn, '__name__', 'unknown')
+    table = getattr(getattr(fn, '__self__', None), 'name', '')
+    if not isinstance(table, str):
+        table = ''
+    DB_CALL_SECONDS.observe(elapsed, operation, table)
+    DB_QUEUE_SECONDS.observe(wait)
+    if error is not None:
+        DB_CALL_ERRORS.inc(operation, table, _error_name(error))
+    counter = _db_call_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def instrument_web3(operation: Optional[str] = None):
+    """web3 を呼び出す関数（同期/非同期）の所要時間とエラーを記録するデコレーター"""
+    def decorator(func):
+        name = operation or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    WEB3_CALL_ERRORS.inc(name, _error_name(e))
+                    raise
+                finally:
+                    WEB3_CALL_SECONDS.observe(time.perf_counter() - started, name)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                WEB3_CALL_ERRORS.inc(name, _error_name(e))
+                raise
+            finally:
+                WEB3_CALL_SECONDS.observe(time.perf_counter() - started, name)
+        return wrapper
+    return decorator
+
+
+def _timed_request(request: Callable) -> Callable:
+    @functools.wraps(request)
+    async def wrapper(*args, **kwargs):
+        # HTTPClient.request(route, ...) / AsyncWebhookAdapter.request(self, route, ...)
+        route = next(arg for arg in args if isinstance(arg, discord.http.Route))
+        started = time.perf_counter()
+        try:
+            return await request(*args, **kwargs)
+        except Exception as e:
+            DISCORD_HTTP_ERRORS.inc(route.method, route.path, _error_name(e))
+            raise
+        finally:
+            DISCORD_HTTP_SECONDS.observe(time.perf_counter() - started, route.method, route.path)
+    wrapper.__metrics_instrumented__ = True
+    return wrapper
+
+
+def instrument_discord_http(client: discord.Client):
+    """
+    Discord API へのリクエストを計測する
+
+    チャンネルへの送信などは client.http、インタラクションの応答/フォローアップは
+    Webhook アダプター経由で送られるため両方を包む
+    """
+    if not getattr(client.http.request, '__metrics_instrumented__', False):
+        client.http.request = _timed_request(client.http.request)
+
+    from discord.webhook.async_ import AsyncWebhookAdapter
+    if not getattr(AsyncWebhookAdapter.request, '__metrics_instrumented__', False):
+        AsyncWebhookAdapter.request = _timed_request(AsyncWebhookAdapter.request)
+
+
+# 集計結果の参照
+
+
+def handler_summary(limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    ハンドラごとの集計（合計処理時間の長い順）
+
+    Returns:
+        List[Dict]: kind / name / count / errors / avg_ms / p95_ms / db_calls（1回あたり）
+    """
+    errors: Dict[Tuple, float] = {}
+    for (kind, name, status), value in HANDLER_TOTAL.values.items():
+        if status != 'ok':
+            errors[(kind, name)] = errors.get((kind, name), 0) + value
+
+    rows = []
+    for labels, (_, total, count) in HANDLER_SECONDS.values.items():
+        db_entry = HANDLER_DB_CALLS.values.get(labels)
+        rows.append({
+            'kind': labels[0],
+            'name': labels[1],
+            'count': count,
+            'errors': int(errors.get(labels, 0)),
+            'total_seconds': total,
+            'avg_ms': total / count * 1000 if count else 0.0,
+            'p95_ms': HANDLER_SECONDS.quantile(0.95, *labels) * 1000,
+            'db_calls': (db_entry[1] / db_entry[2]) if db_entry and db_entry[2] else 0.0
+        })
+    rows.sort(key=lambda row: row['total_seconds'], reverse=True)
+    return rows[:limit]
+
+
+def timing_summary(histogram: Histogram, limit: int = 5) -> List[Dict[str, Any]]:
+    """任意のヒストグラムのラベルごとの件数と平均（件数の多い順）"""
+    rows = [
+        {'labels': labels, 'count': count, 'avg_ms': total / count * 1000 if count else 0.0,
+         'p95_ms': histogram.quantile(0.95, *labels) * 1000}
+        for labels, (_, total, count) in histogram.values.items()
+    ]
+    rows.sort(key=lambda row: row['count'], reverse=True)
+    return rows[:limit]
+
+
+class MetricsServer:
+    """/metrics で Prometheus のテキスト形式を返す HTTP サーバー（aiohttp）"""
+
+    def __init__(self, metrics_registry: MetricsRegistry = registry, host: str = '127.0.0.1', port: int = 9108):
+        self.registry = metrics_registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    @classmethod
+    def from_env(cls) -> Optional['MetricsServer']:
+        try:
+            port = int(os.getenv('METRICS_PORT', '9108'))
+        except ValueError:
+            port = 9108
+        if port <= 0:
+            return None
+        return cls(host=os.getenv('METRICS_HOST', '127.0.0.1'), port=port)
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Metrics endpoint listening on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,256 @@
+"""
+DynamoDB テーブルのマイグレーション/バックフィル実行器
+
+- 並列セグメントスキャン（Segment / TotalSegments）で LastEvaluatedKey をたどって全件を読む
+  （Migration.key_condition を指定した場合は1パーティションだけをクエリする）
+- 各ページの更新は batch_size 件ずつ同時に発行する
+  （UpdateItem は BatchWriteItem に載らないため、条件付き UpdateItem を束ねて送る）
+- 読み込み/書き込みのキャパシティ消費をトークンバケットで制限する
+- セグメントごとの進捗（LastEvaluatedKey）を JSON にチェックポイントし、中断後は続きから再開する
+"""
+import logging
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+@dataclass
+class Migration:
+    """
+    1つのマイグレーション定義
+
+    Attributes:
+        name: チェックポイントファイル名にも使う識別子
+        table: 対象テーブル（AWSDatabase の *_table）
+        transform: 項目 -> update_item の引数（Key / UpdateExpression など）。更新不要ならNone
+        scan_kwargs: scan / query に渡す追加引数（FilterExpression / ProjectionExpression など）
+        key_condition: 指定した場合はスキャンではなくこの条件でクエリする（セグメント分割なし）
+    """
+    name: str
+    table: Any
+    transform: Callable[[Dict], Awaitable[Optional[Dict]]]
+    scan_kwargs: Dict[str, Any] = field(default_factory=dict)
+    key_condition: Any = None
+    description: str = ''
+
+
+class CapacityThrottle:
+    """キャパシティユニット/秒のトークンバケット（0以下なら無制限）"""
+
+    def __init__(self, units_per_second: float):
+        self.rate = units_per_second
+        self.tokens = units_per_second
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def consume(self, units: float):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= min(units, self.rate):
+                    self.tokens -= units
+                    return
+                await asyncio.sleep((min(units, self.rate) - self.tokens) / self.rate)
+
+
+class MigrationCheckpoint:
+    """
+    セグメントごとの進捗を保存する JSON ファイル
+
+    {"segments": {"0": {"last_key": <DynamoDB JSON>, "done": false, "scanned": 0, "updated": 0}}}
+
+    read_only=True のときは既存の進捗を読むだけで、ファイルには書き込まない（ドライラン用）
+    """
+
+    def __init__(self, path: Optional[str], total_segments: int, read_only: bool = False):
+        self.path = path
+        self.total_segments = total_segments
+        self.read_only = read_only
+        self.segments: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('total_segments') == total_segments:
+                self.segments = data.get('segments', {})
+            else:
+                logger.warning("Checkpoint %s was written with %s segments; starting over", path, data.get('total_segments'))
+
+    def state(self, segment: int) -> Dict:
+        return self.segments.setdefault(str(segment), {'last_key': None, 'done': False, 'scanned': 0, 'updated': 0})
+
+    def last_key(self, segment: int) -> Optional[Dict]:
+        encoded = self.state(segment)['last_key']
+        if not encoded:
+            return None
+        return {name: _deserializer.deserialize(value) for name, value in encoded.items()}
+
+    def advance(self, segment: int, last_key: Optional[Dict], scanned: int, updated: int):
+        state = self.state(segment)
+        state['last_key'] = {name: _serializer.serialize(value) for name, value in last_key.items()} if last_key else None
+        state['done'] = last_key is None
+        state['scanned'] += scanned
+        state['updated'] += updated
+        self.save()
+
+    def save(self):
+        if not self.path or self.read_only:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'total_segments': self.total_segments, 'segments': self.segments}, f)
+        os.replace(tmp_path, self.path)
+
+
+class MigrationRunner:
+    """
+    Migration を実行する
+
+    Args:
+        call: boto3 呼び出しの実行関数（AWSDatabase.executor.run）
+        total_segments: 並列スキャンのセグメント数
+        page_size: 1ページあたりの読み込み件数（Limit）
+        batch_size: 同時に発行する更新件数
+        max_read_units / max_write_units: 1秒あたりのキャパシティ上限（0で無制限）
+        checkpoint_dir: チェックポイントの保存先（Noneで保存しない）
+        dry_run: 更新を発行せずに件数だけ数える（チェックポイントは読むだけで書き込まない）
+    """
+
+    def __init__(
+        self,
+        call: Callable[..., Awaitable],
+        total_segments: int = 4,
+        page_size: int = 500,
+        batch_size: int = 25,
+        max_read_units: float = 0,
+        max_write_units: float = 0,
+        checkpoint_dir: Optional[str] = None,
+        dry_run: bool = False
+    ):
+        self._call = call
+        self.total_segments = max(1, total_segments)
+        self.page_size = page_size
+        self.batch_size = max(1, batch_size)
+        self.read_throttle = CapacityThrottle(max_read_units)
+        self.write_throttle = CapacityThrottle(max_write_units)
+        self.checkpoint_dir = checkpoint_dir
+        self.dry_run = dry_run
+
+    def checkpoint_path(self, migration: Migration) -> Optional[str]:
+        if not self.checkpoint_dir:
+            return None
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        return os.path.join(self.checkpoint_dir, f"{migration.name}.json")
+
+    async def run(self, migration: Migration, reset: bool = False) -> Dict[str, int]:
+        """
+        マイグレーションを実行して件数を返す
+
+        Returns:
+            Dict[str, int]: scanned（読んだ件数）/ updated（更新件数）/ skipped（条件不一致）/ failed
+        """
+        total_segments = 1 if migration.key_condition is not None else self.total_segments
+        path = self.checkpoint_path(migration)
+        if reset and path and os.path.exists(path):
+            if self.dry_run:
+                # ドライランでは本番の進捗を消さず、最初から数えるだけにする
+                path = None
+            else:
+                os.remove(path)
+        # ドライランで進捗を書き込むと、次の本番実行が完了済みとして何もしなくなる
+        checkpoint = MigrationCheckpoint(path, total_segments, read_only=self.dry_run)
+
+        totals = {'scanned': 0, 'updated': 0, 'skipped': 0, 'failed': 0}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._run_segment(migration, segment, total_segments, checkpoint, totals)
+            for segment in range(total_segments)
+        ))
+        elapsed = time.perf_counter() - started
+        logger.info("Migration %s finished in %.1fs: %s", migration.name, elapsed, totals)
+        return totals
+
+    async def _run_segment(self, migration: Migration, segment: int, total_segments: int,
+                           checkpoint: MigrationCheckpoint, totals: Dict[str, int]):
+        if checkpoint.state(segment)['done']:
+            return
+
+        kwargs = dict(migration.scan_kwargs)
+        kwargs['Limit'] = self.page_size
+        kwargs['ReturnConsumedCapacity'] = 'TOTAL'
+        if migration.key_condition is not None:
+            operation = migration.table.query
+            kwargs['KeyConditionExpression'] = migration.key_condition
+        else:
+            operation = migration.table.scan
+            if total_segments > 1:
+                kwargs['Segment'] = segment
+                kwargs['TotalSegments'] = total_segments
+
+        last_key = checkpoint.last_key(segment)
+        while True:
+            if last_key:
+                kwargs['ExclusiveStartKey'] = last_key
+            response = await self._call(operation, **kwargs)
+            scanned = response.get('ScannedCount', len(response.get('Items', [])))
+            consumed = (response.get('ConsumedCapacity') or {}).get('CapacityUnits')
+            # ConsumedCapacity を返さないバックエンドでは 1KB/項目・結果整合性読み込みとして見積もる
+            await self.read_throttle.consume(consumed if consumed is not None else max(1.0, scanned / 8))
+
+            updates = []
+            for item in response.get('Items', []):
+                try:
+                    update = await migration.transform(item)
+                except Exception as e:
+                    logger.error("Migration %s failed to transform %s: %s", migration.name, item, e)
+                    totals['failed'] += 1
+                    continue
+                if update:
+                    updates.append(update)
+
+            updated = 0
+            for start in range(0, len(updates), self.batch_size):
+                updated += await self._write_batch(migration, updates[start:start + self.batch_size], totals)
+
+            last_key = response.get('LastEvaluatedKey')
+            totals['scanned'] += scanned
+            totals['updated'] += updated
+            checkpoint.advance(segment, last_key, scanned, updated)
+            if not last_key:
+                return
+
+    async def _write_batch(self, migration: Migration, updates: List[Dict], totals: Dict[str, int]) -> int:
+        if self.dry_run:
+            return len(updates)
+        await self.write_throttle.consume(len(updates))
+
+        async def write(update: Dict) -> bool:
+            try:
+                await self._call(migration.table.update_item, **update)
+                return True
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                    # スキャン後に別の処理で更新された項目
+                    totals['skipped'] += 1
+                    return False
+                logger.error("Migration %s failed to update %s: %s", migration.name, update.get('Key'), e)
+            except Exception as e:
+                logger.error("Migration %s failed to update %s: %s", migration.name, update.get('Key'), e, exc_info=True)
+            totals['failed'] += 1
+            return False
+
+        results = await asyncio.gather(*(write(update) for update in updates))
+        return sum(1 for ok in results if ok)
@@ -0,0 +1,128 @@
+"""
+AWSDatabase のテーブルに対するマイグレーション定義（utils.migration_runner で実行する）
+
+batch/run_migration.py から名前で指定して実行できる:
+- consumption_unit_ids: unit_id を持たない（または NULL の）消費履歴に、単一ポイントプールのサーバーの unit_id を設定
+- ranking_keys: ranking_key を持たないユーザーレコードに属性を付与（ServerUnitRankingIndex 用）
+- consumption_server_status: server_status を持たない消費履歴に属性を付与（ServerStatusIndex 用）
+"""
+import logging
+from typing import Callable, Dict, Optional
+from boto3.dynamodb.conditions import Key
+from utils.aws_database import AWSDatabase, consumption_status_key
+from utils.migration_runner import Migration
+from utils.ranking_index import ranking_key
+
+logger = logging.getLogger(__name__)
+
+
+def consumption_unit_ids(db: AWSDatabase, server_id: Optional[str] = None, unit_id: Optional[str] = None) -> Migration:
+    """
+    unit_id を持たない消費履歴に unit_id を設定する
+
+    server_id を指定した場合はそのサーバーのパーティションだけをクエリする。
+    unit_id を省略した場合はサーバー設定の最初のポイントユニットを使い、
+    複数ポイントプールが有効なサーバーは手動での対応が必要なためスキップする。
+    """
+    default_units: Dict[str, Optional[str]] = {}
+
+    async def resolve_unit_id(item_server_id: str) -> Optional[str]:
+        if unit_id:
+            return unit_id
+        if item_server_id not in default_units:
+            settings = await db.get_server_settings(item_server_id) or {}
+            global_settings = settings.get('global_settings', {})
+            if global_settings.get('multiple_points_enabled'):
+                logger.warning("Server %s has multiple points enabled. Manual unit_id mapping required.", item_server_id)
+                default_units[item_server_id] = None
+            else:
+                point_units = global_settings.get('point_units') or [{'unit_id': '1'}]
+                default_units[item_server_id] = str(point_units[0]['unit_id'])
+        return default_units[item_server_id]
+
+    async def transform(item: Dict) -> Optional[Dict]:
+        resolved = await resolve_unit_id(str(item['server_id']))
+        if not resolved:
+            return None
+        return {
+            'Key': {'server_id': item['server_id'], 'timestamp': item['timestamp']},
+            'UpdateExpression': "SET unit_id = :uid",
+            'ConditionExpression': "attribute_not_exists(unit_id) OR attribute_type(unit_id, :null)",
+            'ExpressionAttributeValues': {':uid': resolved, ':null': 'NULL'}
+        }
+
+    return Migration(
+        name='consumption_unit_ids' + (f"_{server_id}" if server_id else ''),
+        table=db.point_consumption_history_table,
+        transform=transform,
+        scan_kwargs={
+            # 以前の save_consumption_history は unit_id 未指定時に NULL を書いていた
+            'FilterExpression': 'attribute_not_exists(unit_id) OR attribute_type(unit_id, :null)',
+            'ProjectionExpression': 'server_id, #ts',
+            'ExpressionAttributeNames': {'#ts': 'timestamp'},
+            'ExpressionAttributeValues': {':null': 'NULL'}
+        },
+        key_condition=Key('server_id').eq(str(server_id)) if server_id else None,
+        description='unit_id を持たない消費履歴に unit_id を設定'
+    )
+
+
+def ranking_keys(db: AWSDatabase) -> Migration:
+    """ranking_key を持たないユーザーレコードに属性を付与する"""
+
+    async def transform(item: Dict) -> Optional[Dict]:
+        pk_parts = item['pk'].split('#')
+        server_id = item.get('server_id') or pk_parts[3]
+        unit_id = item.get('unit_id') or (pk_parts[5] if len(pk_parts) > 5 else '1')
+        return {
+            'Key': {'pk': item['pk']},
+            'UpdateExpression': "SET ranking_key = :rk",
+            'ConditionExpression': "attribute_exists(pk)",
+            'ExpressionAttributeValues': {':rk': ranking_key(server_id, unit_id)}
+        }
+
+    return Migration(
+        name='ranking_keys',
+        table=db.users_table,
+        transform=transform,
+        scan_kwargs={
+            'FilterExpression': 'attribute_not_exists(ranking_key) AND begins_with(pk, :prefix)',
+            'ExpressionAttributeValues': {':prefix': 'USER#'},
+            'ProjectionExpression': 'pk, server_id, unit_id'
+        },
+        description='ranking_key を持たないユーザーレコードに属性を付与'
+    )
+
+
+def consumption_server_status(db: AWSDatabase) -> Migration:
+    """server_status を持たない消費履歴に属性を付与する"""
+
+    async def transform(item: Dict) -> Optional[Dict]:
+        status = item.get('status', 'pending')
+        return {
+            'Key': {'server_id': item['server_id'], 'timestamp': item['timestamp']},
+            'UpdateExpression': "SET server_status = :ss",
+            # スキャン後にステータスが変わった項目は update_consumption_status が server_status も書く
+            'ConditionExpression': "attribute_not_exists(server_status)",
+            'ExpressionAttributeValues': {':ss': consumption_status_key(item['server_id'], status)}
+        }
+
+    return Migration(
+        name='consumption_server_status',
+        table=db.point_consumption_history_table,
+        transform=transform,
+        scan_kwargs={
+            'FilterExpression': 'attribute_not_exists(server_status)',
+            'ProjectionExpression': 'server_id, #ts, #s',
+            'ExpressionAttributeNames': {'#ts': 'timestamp', '#s': 'status'}
+        },
+        description='server_status を持たない消費履歴に属性を付与'
+    )
+
+
+# 名前 -> Migration を生成する関数
+MIGRATIONS: Dict[str, Callable[..., Migration]] = {
+    'consumption_unit_ids': consumption_unit_ids,
+    'ranking_keys': ranking_keys,
+    'consumption_server_status': consumption_server_status,
+}
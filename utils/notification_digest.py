@@ -0,0 +1,159 @@
+"""
+ポイント獲得/消費履歴のダイジェスト通知
+
+point_consumption_settings.history_digest_enabled のサーバーでは、履歴チャンネルへの通知を
+1件ずつ送らずにチャンネル・種類（獲得/消費）ごとに溜め、まとめて1通の Embed にして送る。
+
+- 溜めた通知はユーザーごと（ポイント単位ごと）に合計して1行にする
+- history_digest_interval 秒たつか history_digest_max_events 件たまったら送信する
+- 1つのダイジェストに載せるユーザー数には上限があり、超えた分は件数だけ表示する
+- 行は Embed 10件・合計6000文字以内ずつに分けて、必要なら複数通で送る
+- ボット終了時（GachaBot.close）に溜まっている分を送信する
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import discord
+from models.server_settings import MAX_HISTORY_DIGEST_EVENTS
+from utils.message_scheduler import pack_line_embeds
+
+logger = logging.getLogger(__name__)
+
+# 1つのダイジェストに行として載せるユーザー数の上限
+MAX_DIGEST_USERS = MAX_HISTORY_DIGEST_EVENTS
+
+DIGEST_KINDS = {
+    'gain': ("ポイント獲得（まとめ）", discord.Color.green(), '+'),
+    'consumption': ("ポイント消費（まとめ）", discord.Color.red(), '-'),
+}
+
+
+@dataclass
+class DigestEntry:
+    """1ユーザー・1ポイント単位ぶんの集計"""
+    points: int = 0
+    count: int = 0
+    sources: Dict[str, int] = field(default_factory=dict)  # 発生元 -> 件数
+
+
+@dataclass
+class ChannelDigest:
+    channel: discord.abc.Messageable
+    kind: str
+    interval: float
+    max_events: int
+    entries: Dict[Tuple[str, str], DigestEntry] = field(default_factory=dict)  # (user_id, 単位名) -> 集計
+    events: int = 0
+    overflow_events: int = 0
+    overflow_points: Dict[str, int] = field(default_factory=dict)  # 単位名 -> 上限を超えた分のポイント
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class NotificationDigest:
+    """
+    履歴チャンネルごとのダイジェスト
+
+    呼び出し元
+    main.py
+        GachaBot.__init__（bot.notification_digest）
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.digests: Dict[Tuple[int, str], ChannelDigest] = {}
+        self.flush_tasks = set()
+        self.events = 0
+        self.flushes = 0
+
+    def add(
+        self,
+        channel,
+        kind: str,
+        user_id: str,
+        points: int,
+        source: str,
+        unit_name: str,
+        interval: float = 300,
+        max_events: int = 100
+    ):
+        """
+        通知を1件溜める
+
+        呼び出し元
+        utils\\point_manager.py
+            PointManager._notify_point_gain / _notify_point_gain_bulk / _notify_point_consumption
+        """
+        key = (channel.id, kind)
+        digest = self.digests.get(key)
+        if digest is None:
+            digest = self.digests[key] = ChannelDigest(
+                channel=channel, kind=kind, interval=max(1.0, float(interval)),
+                max_events=min(MAX_HISTORY_DIGEST_EVENTS, max(1, int(max_events)))
+            )
+            digest.timer = asyncio.get_running_loop().call_later(digest.interval, self._schedule_flush, key)
+
+        entry = digest.entries.get((str(user_id), unit_name))
+        if entry is None and len(digest.entries) >= MAX_DIGEST_USERS:
+            digest.overflow_events += 1
+            digest.overflow_points[unit_name] = digest.overflow_points.get(unit_name, 0) + int(points)
+        else:
+            if entry is None:
+                entry = digest.entries[(str(user_id), unit_name)] = DigestEntry()
+            entry.points += int(points)
+            entry.count += 1
+            label = source or '-'
+            entry.sources[label] = entry.sources.get(label, 0) + 1
+        digest.events += 1
+        self.events += 1
+
+        if digest.events >= digest.max_events:
+            self._schedule_flush(key)
+
+    def _schedule_flush(self, key: Tuple[int, str]):
+        digest = self.digests.pop(key, None)
+        if digest is None:
+            return
+        if digest.timer:
+            digest.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._flush(digest))
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+
+    async def _flush(self, digest: ChannelDigest):
+        try:
+            for embeds in self._build_messages(digest):
+                self.scheduler.send(digest.channel, embeds=embeds, coalesce=False)
+            self.flushes += 1
+        except Exception as e:
+            logger.error("Error flushing notification digest for channel %s: %s", digest.channel.id, e, exc_info=True)
+
+    @staticmethod
+    def _build_messages(digest: ChannelDigest) -> List[List[discord.Embed]]:
+        title, color, sign = DIGEST_KINDS.get(digest.kind, ("ポイント履歴（まとめ）", discord.Color.blue(), ''))
+        lines = []
+        for (user_id, unit_name), entry in digest.entries.items():
+            detail = "、".join(
+                f"{source}×{count}" if count > 1 else source for source, count in entry.sources.items()
+            )
+            lines.append(f"<@{user_id}> {sign}{entry.points}{unit_name}（{detail}）")
+        if digest.overflow_events:
+            overflow = "、".join(f"{sign}{points}{unit}" for unit, points in digest.overflow_points.items())
+            lines.append(f"ほか {digest.overflow_events}件（{overflow}）")
+
+        return pack_line_embeds(lines, title, color, footer=f"{digest.events}件 / {len(digest.entries)}人")
+
+    async def close(self):
+        """溜まっている通知をすべて送信する"""
+        for key in list(self.digests):
+            self._schedule_flush(key)
+        if self.flush_tasks:
+            await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending_channels': len(self.digests),
+            'pending_events': sum(digest.events for digest in self.digests.values()),
+            'events': self.events,
+            'flushes': self.flushes
+        }
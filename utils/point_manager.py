@@ -1,9 +1,13 @@
 # utils/point_manager.py
-import traceback
+import logging
+import asyncio
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Tuple
 import pytz
 import discord
+from utils.message_scheduler import pack_line_embeds
+
+logger = logging.getLogger(__name__)
 
 class PointSource:
     GACHA = 'gacha'
@@ -12,6 +16,13 @@ class PointSource:
     BATTLE_KILL = 'battle_kill'
     CONSUMPTION = 'consumption'
 
+SOURCE_LABELS = {
+    'gacha': 'ガチャ',
+    'battle': 'バトル',
+    'battle_win': 'バトル優勝',
+    'battle_kill': 'バトルキル報酬',
+}
+
 class PointManager:
     def __init__(self, bot):
         self.bot = bot
@@ -30,48 +41,98 @@ class PointManager:
             int: ユーザーの保有ポイント。データが存在しない場合は0
         """
         try:
-            print(f"[DEBUG] Getting points for:")
-            print(f"  Server ID: {server_id}")
-            print(f"  User ID: {user_id}")
-            print(f"  Unit ID: {unit_id}")
-            
             # ユーザーデータの取得
             data = await self.db.get_user_data(user_id, server_id, unit_id)
-            print(f"[DEBUG] Retrieved user data: {data}")
             
-            if not data:
-                print("[DEBUG] No data found for user")
-                return 0
-                
-            if 'points' not in data:
-                print("[DEBUG] No points field in data")
+            if not data or 'points' not in data:
+                logger.debug("No points for user %s in server %s (unit %s)", user_id, server_id, unit_id)
                 return 0
             
             # ポイントの取得と変換
             points_data = data['points']
-            print(f"[DEBUG] Points data type: {type(points_data)}")
             
             try:
                 # pointsが辞書型の場合の処理
                 if isinstance(points_data, dict):
-                    points = int(points_data.get(unit_id, 0))
-                    print(f"[DEBUG] Retrieved points from dict: {points}")
-                    return points
+                    return int(points_data.get(unit_id, 0))
                 
                 # 従来の単一値の場合
-                points = int(points_data)
-                print(f"[DEBUG] Retrieved points as single value: {points}")
-                return points
+                return int(points_data)
                 
             except (ValueError, TypeError) as e:
-                print(f"[ERROR] Error converting points value: {e}")
+                logger.error("Error converting points value: %s", e)
                 return 0
                 
         except Exception as e:
-            print(f"[ERROR] Error in get_points: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in get_points: %s", e, exc_info=True)
             return 0
 
+    async def add_points(
+        self, 
+        user_id: str, 
+        server_id: str, 
+        points: int, 
+        unit_id: str = "1", 
+        source: str = None,
+        wallet_address: str = None,
+        username: str = None
+    ) -> Optional[int]:
+        """
+        ポイントを増減させ、更新後の残高を返す（増加は正の値、減少は負の値）
+
+        残高の読み取りと書き込みは AWSDatabase.increment_points の
+        1回のアトミックな更新で行うため、同時更新でも加算が失われない。
+
+        Args:
+            user_id (str): ユーザーID
+            server_id (str): サーバーID
+            points (int): 増減させるポイント量（正の値で増加、負の値で減少）
+            unit_id (str, optional): ポイントユニットID. デフォルトは "1"
+            source (str, optional): ポイント変動の発生元（例: 承認者のユーザーID）
+            wallet_address (str, optional): ユーザーのウォレットアドレス. デフォルトは None
+            username (str, optional): Discordのユーザーネーム
+
+        Returns:
+            Optional[int]: 更新後の残高。残高不足・失敗時はNone
+        """
+        try:
+            # ポイントを更新（減算時に残高が不足していればNone）
+            # ※ メモリ上のリーダーボードも increment_points 内で差分更新される
+            new_total = await self.db.increment_points(
+                user_id=user_id, 
+                server_id=server_id, 
+                delta=points, 
+                unit_id=unit_id,
+                username=username,
+                wallet_address=wallet_address
+            )
+            if new_total is None:
+                return None
+
+            # サーバー設定を取得してポイント単位名を決定
+            settings = await self.bot.get_server_settings(server_id)
+            point_unit_name = self._get_unit_name(settings, unit_id)
+
+            # 通知処理
+            if points > 0:
+                await self._notify_point_gain(server_id, user_id, points, source, unit_id, point_unit_name)
+            elif points < 0:
+                await self._notify_point_consumption(server_id, user_id, abs(points), source, unit_id, point_unit_name)
+
+            # Automationマネージャーに通知
+            automation_cog = self.bot.get_cog('Automation')
+            if automation_cog:
+                await automation_cog.automation_manager.process_points_update(
+                    user_id, server_id, new_total, unit_id,
+                    previous_points=new_total - points
+                )
+
+            return new_total
+
+        except Exception as e:
+            logger.error("Error updating points: %s", e, exc_info=True)
+            return None
+
     async def update_points(
         self, 
         user_id: str, 
@@ -94,64 +155,146 @@ class PointManager:
             wallet_address (str, optional): ユーザーのウォレットアドレス. デフォルトは None
 
         Returns:
-            bool: 操作が成功したかどうか
+            bool: 操作が成功したかどうか（残高不足の場合はFalse）
+        """
+        new_total = await self.add_points(
+            user_id=user_id,
+            server_id=server_id,
+            points=points,
+            unit_id=unit_id,
+            source=source,
+            wallet_address=wallet_address,
+            username=username
+        )
+        return new_total is not None
+
+    async def award_points_bulk(
+        self,
+        server_id: str,
+        awards: Iterable[Tuple[str, int, str]],
+        unit_id: str = "1",
+        title: str = "ポイント獲得"
+    ) -> Dict[str, int]:
+        """
+        複数ユーザーへのポイント付与をまとめて行う
 
-        Raises:
-            Exception: 処理中に予期しないエラーが発生した場合
+        - (user_id, points, source) を集計し、DB更新は bulk_increment_points で一括実行
+        - 獲得通知はユーザーごとではなく1つのEmbedにまとめて送信
+        - Automationはユーザーごとに1回だけ、並行して評価
+
+        Args:
+            server_id (str): サーバーID
+            awards (Iterable[Tuple[str, int, str]]): (ユーザーID, 付与ポイント, 発生元) の並び
+            unit_id (str, optional): ポイントユニットID. デフォルトは "1"
+            title (str, optional): 通知Embedのタイトル
+
+        Returns:
+            Dict[str, int]: 更新に成功したユーザーID -> 更新後の残高
         """
         try:
-            # 現在のポイントを取得
-            current_points = await self.get_points(server_id, user_id, unit_id)
-            
-            # 新しい合計を計算
-            new_total = current_points + points
-            
-            # マイナスにならないようにチェック
-            if new_total < 0:
-                return False
-                
-            # ポイントを更新 (ウォレットアドレスを含めて保存)
-            success = await self.db.update_feature_points(
-                user_id=user_id, 
-                server_id=server_id, 
-                points=new_total, 
-                unit_id=unit_id,
-                wallet_address=wallet_address,
-                username=username  # 渡す
-            )            
-            if success:
-
-                # サーバー設定を取得してポイント単位名を決定
-                settings = await self.bot.get_server_settings(server_id)
-                point_unit_name = settings.global_settings.point_unit
-                if settings.global_settings.multiple_points_enabled:
-                    point_unit = next(
-                        (unit for unit in settings.global_settings.point_units 
-                        if unit.unit_id == unit_id),
-                        None
-                    )
-                    if point_unit:
-                        point_unit_name = point_unit.name
-
-                # 通知処理
-                if points > 0:
-                    await self._notify_point_gain(server_id, user_id, points, source, unit_id, point_unit_name)
-                elif points < 0:
-                    await self._notify_point_consumption(server_id, user_id, abs(points), source, unit_id, point_unit_name)
-
-                # Automationマネージャーに通知
-                automation_cog = self.bot.get_cog('Automation')
-                if automation_cog:
-                    await automation_cog.automation_manager.process_points_update(
-                        user_id, server_id, new_total, unit_id
+            deltas: Dict[str, int] = {}
+            breakdown: Dict[str, list] = {}
+            for user_id, points, source in awards:
+                if not points:
+                    continue
+                user_id = str(user_id)
+                deltas[user_id] = deltas.get(user_id, 0) + int(points)
+                breakdown.setdefault(user_id, []).append((source, int(points)))
+
+            if not deltas:
+                return {}
+
+            new_totals = await self.db.bulk_increment_points(server_id, deltas, unit_id)
+            if not new_totals:
+                return {}
+
+            settings = await self.bot.get_server_settings(server_id)
+            if settings:
+                point_unit_name = self._get_unit_name(settings, unit_id)
+                await self._notify_point_gain_bulk(
+                    settings, server_id,
+                    {uid: breakdown[uid] for uid in new_totals},
+                    point_unit_name, title
+                )
+
+            # Automationマネージャーに通知（ユーザーごとに並行実行）
+            automation_cog = self.bot.get_cog('Automation')
+            if automation_cog:
+                results = await asyncio.gather(*[
+                    automation_cog.automation_manager.process_points_update(
+                        user_id, server_id, new_total, unit_id,
+                        previous_points=new_total - deltas[user_id]
                     )
+                    for user_id, new_total in new_totals.items()
+                ], return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error("Error in bulk automation update: %s", result)
 
-            return success
+            return new_totals
 
         except Exception as e:
-            print(f"Error updating points: {e}")
-            print(traceback.format_exc())
-            return False
+            logger.error("Error awarding points in bulk: %s", e, exc_info=True)
+            return {}
+
+    def _get_unit_name(self, settings, unit_id: str) -> str:
+        """ポイントユニットの表示名を取得"""
+        point_unit_name = settings.global_settings.point_unit
+        if settings.global_settings.multiple_points_enabled:
+            point_unit = next(
+                (unit for unit in settings.global_settings.point_units 
+                if unit.unit_id == unit_id),
+                None
+            )
+            if point_unit:
+                point_unit_name = point_unit.name
+        return point_unit_name
+
+    def _add_to_digest(self, settings, channel, kind: str, user_id: str, points: int, source: str, unit_name: str):
+        """履歴通知をダイジェストに溜める（送信は NotificationDigest がまとめて行う）"""
+        consumption_settings = settings.point_consumption_settings
+        self.bot.notification_digest.add(
+            channel, kind, user_id, points, source, unit_name,
+            interval=consumption_settings.history_digest_interval,
+            max_events=consumption_settings.history_digest_max_events
+        )
+
+    async def _notify_point_gain_bulk(self, settings, server_id: str, breakdown: Dict[str, list],
+                                      unit_name: str, title: str):
+        """複数ユーザーのポイント獲得を1件のメッセージにまとめて通知"""
+        try:
+            if not settings.point_consumption_settings.gain_history_enabled:
+                return
+
+            channel_id = settings.point_consumption_settings.gain_history_channel_id
+            if not channel_id:
+                return
+
+            channel = self.bot.get_channel(int(channel_id))
+            if not channel:
+                return
+
+            if settings.point_consumption_settings.history_digest_enabled:
+                for user_id, entries in breakdown.items():
+                    for source, points in entries:
+                        self._add_to_digest(settings, channel, 'gain', user_id, points,
+                                            SOURCE_LABELS.get(source, source), unit_name)
+                return
+
+            lines = []
+            for user_id, entries in breakdown.items():
+                detail = "、".join(
+                    f"{SOURCE_LABELS.get(source, source)} {points}{unit_name}" for source, points in entries
+                )
+                total = sum(points for _, points in entries)
+                lines.append(f"<@{user_id}> +{total}{unit_name}（{detail}）")
+
+            # 1通につき Embed 10件・合計6000文字以内に分けて送る
+            for embeds in pack_line_embeds(lines, title, discord.Color.green()):
+                self.bot.message_scheduler.send(channel, embeds=embeds)
+
+        except Exception as e:
+            logger.error("Error in bulk point gain notification: %s", e)
 
     async def _notify_point_gain(self, server_id: str, user_id: str, points: int, 
                                source: str, unit_id: str, unit_name: str):
@@ -169,12 +312,10 @@ class PointManager:
             if not channel:
                 return
 
-            source_text = {
-                'gacha': 'ガチャ',
-                'battle': 'バトル',
-                'battle_win': 'バトル優勝',
-                'battle_kill': 'バトルキル報酬',
-            }.get(source, source)
+            source_text = SOURCE_LABELS.get(source, source)
+            if settings.point_consumption_settings.history_digest_enabled:
+                self._add_to_digest(settings, channel, 'gain', user_id, points, source_text, unit_name)
+                return
 
             embed = discord.Embed(
                 title="ポイント獲得",
@@ -182,10 +323,10 @@ class PointManager:
                 color=discord.Color.green()
             )
             
-            await channel.send(embed=embed)
+            self.bot.message_scheduler.send(channel, embed=embed)
 
         except Exception as e:
-            print(f"Error in point gain notification: {e}")
+            logger.error("Error in point gain notification: %s", e)
 
     async def _notify_point_consumption(self, server_id: str, user_id: str, points: int, 
                                       source: str, unit_id: str, unit_name: str):
@@ -203,16 +344,20 @@ class PointManager:
             if not channel:
                 return
 
+            if settings.point_consumption_settings.history_digest_enabled:
+                self._add_to_digest(settings, channel, 'consumption', user_id, points, source, unit_name)
+                return
+
             embed = discord.Embed(
                 title="ポイント消費",
                 description=f"<@{user_id}>が{source}で{points}{unit_name}を消費しました",
                 color=discord.Color.red()
             )
             
-            await channel.send(embed=embed)
+            self.bot.message_scheduler.send(channel, embed=embed)
 
         except Exception as e:
-            print(f"Error in point consumption notification: {e}")
+            logger.error("Error in point consumption notification: %s", e)
 
     async def consume_points(
         self, 
@@ -243,19 +388,8 @@ class PointManager:
             Exception: 処理中に予期しないエラーが発生した場合
         """
         try:
-            # 現在のポイントを取得
-            current_points = await self.get_points(server_id, user_id, unit_id)
-
-            # ポイント不足チェック
-            if current_points < points:
-                print(f"[DEBUG] User {user_id} has insufficient points. Required: {points}, Available: {current_points}")
-                return False
-
-            # 新しいポイントを計算
-            new_points = current_points - points
-
-            # ポイントの更新
-            success = await self.update_points(
+            # ポイントの更新（残高不足は条件付き書き込みで弾かれる）
+            new_points = await self.add_points(
                 user_id=user_id, 
                 server_id=server_id, 
                 points=-points,  # ここをマイナスに
@@ -264,22 +398,17 @@ class PointManager:
                 wallet_address=wallet_address  # ウォレットアドレスを追加
             )
 
-            if not success:
-                print(f"[DEBUG] Failed to update points for user {user_id} in server {server_id}")
+            if new_points is None:
+                logger.info("Failed to consume points for user %s in server %s (insufficient balance or update error). Required: %s", user_id, server_id, points)
                 return False
 
-            # ログ出力（デバッグ用）
-            print(f"[INFO] Points successfully consumed for user {user_id} in server {server_id}.")
-            print(f"  - Points consumed: {points}")
-            print(f"  - New balance: {new_points}")
-            print(f"  - Unit ID: {unit_id}")
-            print(f"  - Source: {source}")
-            if wallet_address:
-                print(f"  - Wallet Address: {wallet_address}")
+            logger.info(
+                "Points consumed: user=%s server=%s points=%s balance=%s unit=%s source=%s wallet=%s",
+                user_id, server_id, points, new_points, unit_id, source, wallet_address
+            )
 
             return True
 
         except Exception as e:
-            print(f"[ERROR] Error in consume_points: {e}")
-            print(traceback.format_exc())
+            logger.error("Error in consume_points: %s", e, exc_info=True)
             return False
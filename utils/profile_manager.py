@@ -0,0 +1,106 @@
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileManager:
+    """
+    サーバー内ユーザーのプロフィール（最新のウォレットアドレス・メールアドレス）を管理する
+
+    プロフィールは discord_users テーブルの PROFILE#{user_id}#SERVER#{server_id} 項目に保存し、
+    消費申請の承認時に更新する。読み込みは LRU キャッシュを経由するので、
+    消費モーダルの初期値はキャッシュヒットかキー指定の1回の読み込みで取得できる。
+    プロフィール未作成のユーザーは承認済み消費履歴から1度だけ引き継ぐ。
+    """
+
+    def __init__(self, db, max_entries: Optional[int] = None):
+        self.db = db
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('PROFILE_CACHE_SIZE', '4096'))
+        # (server_id, user_id) -> プロフィール（存在しない場合は空のdict）
+        self.profile_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _cache_put(self, key: tuple, profile: Dict):
+        self.profile_cache[key] = profile
+        self.profile_cache.move_to_end(key)
+        while len(self.profile_cache) > self.max_entries:
+            self.profile_cache.popitem(last=False)
+
+    def invalidate(self, server_id: str, user_id: str):
+        self.profile_cache.pop((str(server_id), str(user_id)), None)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """キャッシュのヒット/ミス統計"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            'entries': len(self.profile_cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': (self.cache_hits / total) if total else 0.0
+        }
+
+    async def get_profile(self, server_id: str, user_id: str) -> Dict:
+        """
+        プロフィールを取得（存在しない場合は空のdict）
+
+        呼び出し元
+        cogs\\points_consumption.py
+            PointConsumptionModal.get_latest_wallet_address
+        """
+        key = (str(server_id), str(user_id))
+        profile = self.profile_cache.get(key)
+        if profile is not None:
+            self.profile_cache.move_to_end(key)
+            self.cache_hits += 1
+            return profile
+
+        self.cache_misses += 1
+        try:
+            profile = await self.db.get_user_profile(*key)
+            if profile is None:
+                # プロフィール導入前のユーザーは承認済み消費履歴から引き継ぐ
+                wallet_address = await self.db.get_latest_approved_wallet_address(*key)
+                if wallet_address:
+                    profile = await self.db.update_user_profile(*key, wallet_address=wallet_address)
+                    if profile is None:
+                        # 引き継ぎの保存に失敗した場合は次回もう一度引き継ぐ（キャッシュしない）
+                        return {'wallet_address': wallet_address}
+            profile = profile or {}
+        except Exception as e:
+            logger.error("Failed to load user profile: %s", e, exc_info=True)
+            # 読み込みに失敗した結果はキャッシュしない
+            return {}
+
+        self._cache_put(key, profile)
+        return profile
+
+    async def get_wallet_address(self, server_id: str, user_id: str) -> Optional[str]:
+        return (await self.get_profile(server_id, user_id)).get('wallet_address')
+
+    async def record_approval(
+        self,
+        server_id: str,
+        user_id: str,
+        wallet_address: Optional[str] = None,
+        email: Optional[str] = None
+    ) -> bool:
+        """
+        消費申請の承認時にプロフィールを更新する（ライトスルー）
+
+        呼び出し元
+        cogs\\points_consumption.py
+            handle_approve_button
+        """
+        if not wallet_address and not email:
+            return True
+        key = (str(server_id), str(user_id))
+        profile = await self.db.update_user_profile(*key, wallet_address=wallet_address, email=email)
+        if profile is None:
+            self.invalidate(*key)
+            return False
+        self._cache_put(key, profile)
+        return True
@@ -0,0 +1,166 @@
+import logging
+import asyncio
+import bisect
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from boto3.dynamodb.conditions import Key, Attr
+
+logger = logging.getLogger(__name__)
+
+# discord_users テーブルのGSI
+#   パーティションキー: ranking_key (SERVER#{server_id}#UNIT#{unit_id})
+#   ソートキー: points (Number)
+RANKING_INDEX_NAME = 'ServerUnitRankingIndex'
+
+
+def ranking_key(server_id: str, unit_id: str = "1") -> str:
+    """ランキング索引のパーティションキーを生成"""
+    return f"SERVER#{server_id}#UNIT#{unit_id}"
+
+
+def _to_int(value) -> int:
+    try:
+        return int(float(value or 0))
+    except (ValueError, TypeError):
+        return 0
+
+
+class DynamoRankingIndex:
+    """
+    GSI (ranking_key, points) を使ったサーバー/ユニット単位のランキング
+
+    他サーバーのユーザーを一切読まずに、上位N件と特定ユーザーの順位を返す。
+    ranking_key属性は AWSDatabase.update_feature_points / increment_points が書き込む。
+    """
+
+    def __init__(self, table, index_name: str = RANKING_INDEX_NAME, call: Optional[Callable[..., Awaitable]] = None):
+        self.table = table
+        # boto3 呼び出しの実行関数（AWSDatabase._call を渡す。省略時は asyncio.to_thread）
+        self._call = call or asyncio.to_thread
+        self.index_name = index_name
+
+    async def top(self, server_id: str, unit_id: str = "1", limit: Optional[int] = None) -> List[Dict]:
+        """ポイント降順で上位limit件を取得（limit=Noneの場合は全件）"""
+        rankings = []
+        kwargs = {
+            'IndexName': self.index_name,
+            'KeyConditionExpression': Key('ranking_key').eq(ranking_key(server_id, unit_id)),
+            'ProjectionExpression': 'user_id, points',
+            'ScanIndexForward': False
+        }
+        while True:
+            if limit is not None:
+                kwargs['Limit'] = limit - len(rankings)
+            response = await self._call(self.table.query, **kwargs)
+            for item in response.get('Items', []):
+                rankings.append({
+                    'user_id': str(item.get('user_id')),
+                    'unit_id': unit_id,
+                    'points': _to_int(item.get('points'))
+                })
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key or (limit is not None and len(rankings) >= limit):
+                break
+            kwargs['ExclusiveStartKey'] = last_key
+        return rankings
+
+    async def rank_of(self, server_id: str, unit_id: str, points: int) -> int:
+        """
+        指定ポイントの順位を返す（自分より多いユーザー数 + 1）
+
+        COUNTクエリなので項目本体は転送されない
+        """
+        count = 0
+        kwargs = {
+            'IndexName': self.index_name,
+            'KeyConditionExpression': (
+                Key('ranking_key').eq(ranking_key(server_id, unit_id)) & Key('points').gt(points)
+            ),
+            'Select': 'COUNT'
+        }
+        while True:
+            response = await self._call(self.table.query, **kwargs)
+            count += response.get('Count', 0)
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            kwargs['ExclusiveStartKey'] = last_key
+        return count + 1
+
+    def record(self, server_id: str, unit_id: str, user_id: str, points: int):
+        """GSIはDynamoDB側で更新されるため何もしない"""
+        return None
+
+
+class InMemoryRankingIndex:
+    """
+    GSIが作成されていない環境向けのローカル代替
+
+    サーバー/ユニットごとに (-points, user_id) のソート済み配列を保持する。
+    初回参照時に該当サーバーの項目だけをページングスキャンで読み込み、
+    以降は record() によるポイント更新で差分更新する。
+    """
+
+    def __init__(self, table, call: Optional[Callable[..., Awaitable]] = None):
+        self.table = table
+        self._call = call or asyncio.to_thread
+        self._buckets: Dict[str, Tuple[List[Tuple[int, str]], Dict[str, int]]] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+
+    async def _load(self, server_id: str, unit_id: str):
+        key = ranking_key(server_id, unit_id)
+        if key in self._buckets:
+            return self._buckets[key]
+
+        lock = self._load_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key in self._buckets:
+                return self._buckets[key]
+
+            points_by_user: Dict[str, int] = {}
+            kwargs = {
+                'FilterExpression': Attr('server_id').eq(str(server_id)) & Attr('unit_id').eq(str(unit_id)),
+                'ProjectionExpression': 'user_id, points'
+            }
+            try:
+                while True:
+                    response = await self._call(self.table.scan, **kwargs)
+                    for item in response.get('Items', []):
+                        points_by_user[str(item.get('user_id'))] = _to_int(item.get('points'))
+                    last_key = response.get('LastEvaluatedKey')
+                    if not last_key:
+                        break
+                    kwargs['ExclusiveStartKey'] = last_key
+            except Exception as e:
+                logger.error("Error loading ranking bucket %s: %s", key, e, exc_info=True)
+
+            ordered = sorted((-points, user_id) for user_id, points in points_by_user.items())
+            self._buckets[key] = (ordered, points_by_user)
+            return self._buckets[key]
+
+    async def top(self, server_id: str, unit_id: str = "1", limit: Optional[int] = None) -> List[Dict]:
+        ordered, _ = await self._load(server_id, unit_id)
+        entries = ordered if limit is None else ordered[:limit]
+        return [
+            {'user_id': user_id, 'unit_id': unit_id, 'points': -neg_points}
+            for neg_points, user_id in entries
+        ]
+
+    async def rank_of(self, server_id: str, unit_id: str, points: int) -> int:
+        ordered, _ = await self._load(server_id, unit_id)
+        # 自分より多いポイントを持つユーザー数 = (-points, '') より前の要素数
+        return bisect.bisect_left(ordered, (-points, '')) + 1
+
+    def record(self, server_id: str, unit_id: str, user_id: str, points: int):
+        """読み込み済みのバケットのみ差分更新する"""
+        bucket = self._buckets.get(ranking_key(server_id, unit_id))
+        if bucket is None:
+            return
+        ordered, points_by_user = bucket
+        user_id = str(user_id)
+        old_points = points_by_user.get(user_id)
+        if old_points is not None:
+            index = bisect.bisect_left(ordered, (-old_points, user_id))
+            if index < len(ordered) and ordered[index] == (-old_points, user_id):
+                del ordered[index]
+        points_by_user[user_id] = points
+        bisect.insort(ordered, (-points, user_id))
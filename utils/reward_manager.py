@@ -1,12 +1,15 @@
+import logging
 from typing import Optional, List, Dict
 from datetime import datetime
-import traceback
 import json
 from web3 import Web3
 from models.rewards import Reward
 from services.coupon_service import CouponService
 from services.nft_service import NFTService
 from services.token_service import TokenService
+from utils.metrics import instrument_web3
+
+logger = logging.getLogger(__name__)
 
 class RewardManager:
     def __init__(self, bot):
@@ -49,10 +52,10 @@ class RewardManager:
         try:
             return await self.db.save_reward(reward.to_dict())
         except Exception as e:
-            print(f"Error saving reward: {e}")
-            print(traceback.format_exc())
+            logger.error("Error saving reward: %s", e, exc_info=True)
             return False
 
+    @instrument_web3('mint_nft')
     async def _mint_nft(self, w3: Web3, contract, private_key: str, user_id: str) -> str:
         """NFTを発行"""
         # トランザクションの構築
@@ -75,6 +78,7 @@ class RewardManager:
         tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
         return tx_receipt.transactionHash.hex()
 
+    @instrument_web3('reward_transfer_tokens')
     async def _transfer_tokens(self, w3: Web3, contract, private_key: str, user_id: str, amount: float) -> str:
         """トークンを転送"""
         # Wei単位に変換（18桁）
@@ -177,8 +181,7 @@ class RewardManager:
             return reward
 
         except Exception as e:
-            print(f"Error claiming reward: {e}")
-            print(traceback.format_exc())
+            logger.error("Error claiming reward: %s", e, exc_info=True)
             return None
 
     async def get_user_rewards(
@@ -192,8 +195,7 @@ class RewardManager:
             rewards_data = await self.db.get_user_rewards(user_id, server_id, status)
             return [Reward.from_dict(data) for data in rewards_data]
         except Exception as e:
-            print(f"Error getting user rewards: {e}")
-            print(traceback.format_exc())
+            logger.error("Error getting user rewards: %s", e, exc_info=True)
             return []
 
     async def get_pending_rewards(self, server_id: Optional[str] = None) -> List[Reward]:
@@ -202,8 +204,7 @@ class RewardManager:
             rewards_data = await self.db.get_rewards_by_status('PENDING', server_id)
             return [Reward.from_dict(data) for data in rewards_data]
         except Exception as e:
-            print(f"Error getting pending rewards: {e}")
-            print(traceback.format_exc())
+            logger.error("Error getting pending rewards: %s", e, exc_info=True)
             return []
 
     async def retry_failed_reward(self, reward_id: str) -> Optional[Reward]:
@@ -219,6 +220,5 @@ class RewardManager:
             return await self.process_reward(reward)
 
         except Exception as e:
-            print(f"Error retrying failed reward: {e}")
-            print(traceback.format_exc())
+            logger.error("Error retrying failed reward: %s", e, exc_info=True)
             return None
\ No newline at end of file
@@ -0,0 +1,160 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import os
+import pytz
+
+logger = logging.getLogger(__name__)
+
+JST = pytz.timezone('Asia/Tokyo')
+
+
+class DailyRollLedger:
+    """
+    1日1回のガチャ実行記録（デイリーロール台帳）
+
+    記録は gacha_history テーブルの ROLL#{server_id}#{gacha_id}#{user_id}#{date} 項目に保存する。
+    - 実行済みかどうかの判定は条件付き書き込み（attribute_not_exists）で行うので、
+      再起動後や複数プロセスで動かしても1日1回を超えない
+    - 当日の記録は件数上限付きの LRU キャッシュに載せ、2回目以降の参照は DB を読まない
+    - expires_at（エポック秒）を TTL 属性として書き込む
+      （gacha_history テーブルで expires_at の TTL を有効にしておく）
+
+    環境変数:
+        ROLL_LEDGER_CACHE_SIZE: キャッシュする記録数の上限（デフォルト 8192）
+        ROLL_LEDGER_RETENTION_DAYS: 記録を残す日数（デフォルト 2）
+    """
+
+    def __init__(self, db, max_entries: Optional[int] = None, retention_days: Optional[int] = None):
+        self.db = db
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('ROLL_LEDGER_CACHE_SIZE', '8192'))
+        self.retention_days = (
+            retention_days if retention_days is not None else int(os.getenv('ROLL_LEDGER_RETENTION_DAYS', '2'))
+        )
+        # (server_id, gacha_id, user_id, date) -> 記録
+        self.roll_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @staticmethod
+    def today() -> str:
+        """日付の区切りは日本時間"""
+        return datetime.now(JST).strftime('%Y-%m-%d')
+
+    def _expires_at(self, date: str) -> int:
+        day_start = JST.localize(datetime.strptime(date, '%Y-%m-%d'))
+        return int((day_start + timedelta(days=1 + self.retention_days)).timestamp())
+
+    def _cache_put(self, key: tuple, roll: Dict):
+        self.roll_cache[key] = roll
+        self.roll_cache.move_to_end(key)
+        while len(self.roll_cache) > self.max_entries:
+            self.roll_cache.popitem(last=False)
+
+    def prune(self, keep_date: Optional[str] = None):
+        """keep_date（デフォルトは今日）以外の記録をキャッシュから外す"""
+        keep_date = keep_date or self.today()
+        for key in [key for key in self.roll_cache if key[3] != keep_date]:
+            del self.roll_cache[key]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """キャッシュのヒット/ミス統計"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            'entries': len(self.roll_cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': (self.cache_hits / total) if total else 0.0
+        }
+
+    def get_cached_roll(self, server_id: str, gacha_id: str, user_id: str, date: Optional[str] = None) -> Optional[Dict]:
+        """キャッシュにある記録だけを返す（DB は読まない）"""
+        key = (str(server_id), str(gacha_id), str(user_id), date or self.today())
+        roll = self.roll_cache.get(key)
+        if roll is not None:
+            self.roll_cache.move_to_end(key)
+            self.cache_hits += 1
+        return roll
+
+    async def get_roll(self, server_id: str, gacha_id: str, user_id: str, date: Optional[str] = None) -> Optional[Dict]:
+        """
+        その日の記録を取得（キャッシュになければ DB を読む）
+
+        呼び出し元
+        cogs\\gacha.py
+            GachaView.share_to_twitter
+        """
+        date = date or self.today()
+        roll = self.get_cached_roll(server_id, gacha_id, user_id, date)
+        if roll is not None:
+            return roll
+
+        self.cache_misses += 1
+        roll = await self.db.get_daily_roll(str(server_id), str(gacha_id), str(user_id), date)
+        if roll is not None:
+            self._cache_put((str(server_id), str(gacha_id), str(user_id), date), roll)
+        return roll
+
+    async def claim_roll(
+        self,
+        server_id: str,
+        gacha_id: str,
+        user_id: str,
+        item_name: str,
+        points: int,
+        date: Optional[str] = None
+    ) -> Tuple[Optional[bool], Optional[Dict]]:
+        """
+        その日のガチャ実行を記録する
+
+        呼び出し元
+        cogs\\gacha.py
+            GachaView.gacha_button
+
+        Returns:
+            (claimed, roll):
+                claimed が True なら今回の実行を記録した（roll は今回の記録）
+                False なら既に実行済み（roll はその日の既存の記録）
+                None なら保存に失敗した
+        """
+        date = date or self.today()
+        key = (str(server_id), str(gacha_id), str(user_id), date)
+        roll = {
+            'server_id': key[0],
+            'gacha_id': key[1],
+            'user_id': key[2],
+            'date': date,
+            'last_item': item_name,
+            'last_points': int(points),
+            'created_at': datetime.now(pytz.UTC).isoformat(),
+            'expires_at': self._expires_at(date)
+        }
+        claimed = await self.db.put_daily_roll(roll)
+        if claimed:
+            self._cache_put(key, roll)
+            return True, roll
+        if claimed is None:
+            return None, None
+
+        # 別のプロセス/再起動前に実行済み
+        existing = await self.db.get_daily_roll(*key)
+        if existing is not None:
+            self._cache_put(key, existing)
+        return False, existing
+
+    async def release_roll(self, roll: Dict) -> bool:
+        """
+        claim_roll で記録した実行を取り消す（ポイントの付与に失敗した場合に同じ日にもう一度引けるようにする）
+
+        呼び出し元
+        cogs\gacha.py
+            GachaView.gacha_button
+        """
+        key = (roll['server_id'], roll['gacha_id'], roll['user_id'], roll['date'])
+        if self.roll_cache.get(key) is roll:
+            del self.roll_cache[key]
+        released = await self.db.delete_daily_roll(roll)
+        if not released:
+            logger.error("Failed to release daily roll %s", key)
+        return released
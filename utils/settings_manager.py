@@ -1,17 +1,95 @@
+import logging
 from models.server_settings import ServerSettings, GachaFeatureSettings, BattleFeatureSettings, FortuneFeatureSettings, PointConsumptionFeatureSettings, PointConsumptionModalSettings
 from models.server_settings import MessageSettings, MediaSettings, GachaSettings
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, List
+from collections import OrderedDict
 import copy
+import os
+import time
 from decimal import Decimal
 from utils.default_settings import create_default_settings
 
+logger = logging.getLogger(__name__)
+
 class ServerSettingsManager:
-    def __init__(self, db):
+    """
+    サーバー設定の読み書きを管理する
+
+    get_settings は TTL付きのLRUキャッシュを経由する（リードスルー）。
+    このマネージャー経由の更新はキャッシュにも反映する（ライトスルー）。
+    ダッシュボード等の外部から書き込まれた設定は TTL 経過後に反映される。
+    """
+
+    def __init__(self, db, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
         self.db = db
-        self.settings_cache = {}
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('SETTINGS_CACHE_TTL', '60'))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('SETTINGS_CACHE_SIZE', '1024'))
+        # server_id -> (格納時刻, ServerSettings)
+        self.settings_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.settings_listeners: List[Callable[[str], None]] = []
+
+    def add_settings_listener(self, listener: Callable[[str], None]):
+        """設定の保存/破棄時に server_id を受け取るリスナーを登録（設定から作るキャッシュの破棄用）"""
+        self.settings_listeners.append(listener)
+
+    def _notify_listeners(self, server_id: Optional[str]):
+        for listener in self.settings_listeners:
+            try:
+                listener(server_id)
+            except Exception as e:
+                logger.error("Error notifying settings listener: %s", e)
+
+    def _cache_get(self, server_id: str) -> Optional[ServerSettings]:
+        entry = self.settings_cache.get(server_id)
+        if entry is None:
+            return None
+        stored_at, settings = entry
+        if time.monotonic() - stored_at >= self.ttl_seconds:
+            del self.settings_cache[server_id]
+            return None
+        self.settings_cache.move_to_end(server_id)
+        return settings
+
+    def _cache_put(self, server_id: str, settings: ServerSettings):
+        self.settings_cache[server_id] = (time.monotonic(), settings)
+        self.settings_cache.move_to_end(server_id)
+        while len(self.settings_cache) > self.max_entries:
+            self.settings_cache.popitem(last=False)
+
+    def invalidate(self, server_id: Optional[str] = None):
+        """キャッシュを破棄（server_id省略時は全件）"""
+        if server_id is None:
+            self.settings_cache.clear()
+        else:
+            self.settings_cache.pop(str(server_id), None)
+        self._notify_listeners(str(server_id) if server_id is not None else None)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """キャッシュのヒット/ミス統計"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            'entries': len(self.settings_cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': (self.cache_hits / total) if total else 0.0
+        }
 
     async def get_settings(self, server_id: str) -> Optional[ServerSettings]:
-        """サーバー設定を取得"""
+        """
+        サーバー設定を取得
+
+        返されるオブジェクトはキャッシュと共有されるため、
+        変更する場合はコピーするか update_settings で保存すること
+        """
+        server_id = str(server_id)
+        settings = self._cache_get(server_id)
+        if settings is not None:
+            self.cache_hits += 1
+            return settings
+
+        self.cache_misses += 1
         settings_data = await self.db.get_server_settings(server_id)
 
         if not settings_data:
@@ -19,7 +97,7 @@ class ServerSettingsManager:
             return None
         
         settings = ServerSettings.from_dict(settings_data)
-        self.settings_cache[server_id] = settings
+        self._cache_put(server_id, settings)
         return settings
 
     async def update_feature_settings(self, server_id: str, feature: str, new_settings: Dict[str, Any]) -> bool:
@@ -78,11 +156,16 @@ class ServerSettingsManager:
             # DynamoDBに保存
             success = await self.db.update_server_settings(server_id, updated_settings.to_dict())
             if success:
-                self.settings_cache[server_id] = updated_settings
+                self._cache_put(str(server_id), updated_settings)
+                self._notify_listeners(str(server_id))
+            else:
+                # 呼び出し元（gacha_view のトグルなど）がキャッシュ中の設定を直接変更している場合があるので破棄
+                self.invalidate(server_id)
             return success
 
         except Exception as e:
-            print(f"Error updating feature settings: {e}")
+            logger.error("Error updating feature settings: %s", e)
+            self.invalidate(server_id)
             return False
 
     async def update_settings(self, server_id: str, settings: ServerSettings) -> bool:
@@ -91,19 +174,24 @@ class ServerSettingsManager:
             # print(f"[DEBUG] Type of settings in update_settings: {type(settings)}")
             # print(f"[DEBUG] settings in update_settings: {settings}")
 
-            success = await self.db.update_server_settings(server_id, settings.to_dict())
+            if not isinstance(settings, ServerSettings):
+                logger.error("settings is not a ServerSettings object")
 
-            if isinstance(settings, ServerSettings):
-                settings_dict = settings.to_dict()
-                print(f"[DEBUG] settings.to_dict() result: {settings_dict}")
-            else:
-                print("[ERROR] settings is not a ServerSettings object")
+            # 保存する辞書は1回だけ作る（デバッグログも同じ辞書を使う）
+            settings_dict = settings.to_dict()
+            logger.debug("settings.to_dict() result: %s", settings_dict)
+            success = await self.db.update_server_settings(server_id, settings_dict)
 
             if success:
-                self.settings_cache[server_id] = settings
+                self._cache_put(str(server_id), settings)
+                self._notify_listeners(str(server_id))
+            else:
+                # 呼び出し元で変更済みのオブジェクトがキャッシュに残らないよう破棄
+                self.invalidate(server_id)
             return success
         except Exception as e:
-            print(f"Error updating settings: {e}")
+            logger.error("Error updating settings: %s", e)
+            self.invalidate(server_id)
             return False
         
     # ボット招待後２番目に仕事する aws_databaseのonguild_serverより呼び出される
@@ -116,10 +204,11 @@ class ServerSettingsManager:
             # 設定を保存
             success = await self.db.update_server_settings(server_id, settings.to_dict())
             if success:
-                self.settings_cache[server_id] = settings
+                self._cache_put(str(server_id), settings)
+                self._notify_listeners(str(server_id))
             return success
         except Exception as e:
-            print(f"Error creating default settings: {e}")
+            logger.error("Error creating default settings: %s", e)
             return False
     
     def _create_default_settings(self, server_id: str) -> ServerSettings:
@@ -0,0 +1,52 @@
+"""
+ストレージバックエンドの選択
+
+環境変数 STORAGE_BACKEND で切り替える:
+- dynamodb（デフォルト）: boto3 の DynamoDB リソース
+- sqlite: utils.local_storage の SQLite 実装（LOCAL_STORAGE_PATH に保存）
+- memory: utils.local_storage のインメモリ実装（プロセス終了で消える）
+
+どのバックエンドも boto3 の DynamoDB リソースと同じインターフェース
+（.Table(name)、.batch_get_item、.meta.client.transact_write_items など）を持つ。
+"""
+import os
+import threading
+from typing import Dict, Optional
+import boto3
+
+BACKEND_DYNAMODB = 'dynamodb'
+BACKEND_SQLITE = 'sqlite'
+BACKEND_MEMORY = 'memory'
+
+DEFAULT_LOCAL_STORAGE_PATH = 'local_storage.sqlite3'
+
+# ローカルバックエンドは同一プロセス内で共有する（AWSDatabase と TokenOperations が同じデータを見るため）
+_local_resources: Dict[str, object] = {}
+_local_lock = threading.Lock()
+
+
+def storage_backend() -> str:
+    return os.getenv('STORAGE_BACKEND', BACKEND_DYNAMODB).lower()
+
+
+def create_dynamodb_resource(backend: Optional[str] = None, **boto3_kwargs):
+    """
+    設定されたバックエンドの DynamoDB 互換リソースを返す
+
+    Args:
+        backend: 'dynamodb' / 'sqlite' / 'memory'（省略時は STORAGE_BACKEND）
+        **boto3_kwargs: DynamoDB バックエンドの場合に boto3.resource へ渡す引数
+    """
+    backend = (backend or storage_backend()).lower()
+    if backend == BACKEND_DYNAMODB:
+        return boto3.resource('dynamodb', **boto3_kwargs)
+
+    if backend not in (BACKEND_SQLITE, BACKEND_MEMORY):
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    from utils.local_storage import LocalDynamoResource
+    path = ':memory:' if backend == BACKEND_MEMORY else os.getenv('LOCAL_STORAGE_PATH', DEFAULT_LOCAL_STORAGE_PATH)
+    with _local_lock:
+        if path not in _local_resources:
+            _local_resources[path] = LocalDynamoResource(path)
+        return _local_resources[path]
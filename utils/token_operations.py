@@ -3,8 +3,9 @@ import json
 import logging
 from web3 import Web3
 from eth_account.messages import encode_defunct
-import boto3
 from botocore.exceptions import ClientError
+from utils.storage import create_dynamodb_resource
+from utils.metrics import instrument_web3
 from decimal import Decimal
 
 logger = logging.getLogger(__name__)
@@ -14,10 +15,10 @@ class TokenOperations:
         """
         トークン操作のユーティリティクラス
         Args:
-            dynamodb: boto3のDynamoDBリソース（テスト用にモック可能）
+            dynamodb: DynamoDB互換リソース（省略時は STORAGE_BACKEND に応じて生成）
         """
         if dynamodb is None:
-            self.dynamodb = boto3.resource('dynamodb')
+            self.dynamodb = create_dynamodb_resource()
         else:
             self.dynamodb = dynamodb
         
@@ -103,6 +104,7 @@ class TokenOperations:
             abi=self.token_abi
         )
 
+    @instrument_web3('get_balance')
     async def get_balance(
         self, 
         web3: Web3,
@@ -129,6 +131,7 @@ class TokenOperations:
             logger.error(f"Failed to get token balance: {str(e)}")
             return None
 
+    @instrument_web3('transfer_tokens')
     async def transfer_tokens(
         self,
         web3: Web3,